@@ -1,6 +1,7 @@
 """
 Banner 广告系统 - 管理员API路由
 """
+import asyncio
 import logging
 import re
 from typing import Optional, List
@@ -474,8 +475,10 @@ async def upload_banner_image(
         # 导入图片上传服务
         from app.services import ImageCategory, get_image_upload_service
         
-        # 读取文件内容
-        content = await image.read()
+        from app.file_stream_utils import spool_upload
+        
+        # 落盘读取文件内容（恒定内存）
+        spooled = await spool_upload(image)
         
         # 使用图片上传服务
         service = get_image_upload_service()
@@ -484,14 +487,16 @@ async def upload_banner_image(
         is_temp = banner_id is None
         resource_id = str(banner_id) if banner_id else None
         
-        result = service.upload(
-            content=content,
-            category=ImageCategory.BANNER,
-            resource_id=resource_id,
-            user_id=current_admin.id,
-            filename=image.filename,
-            is_temp=is_temp
-        )
+        with spooled:
+            result = await asyncio.to_thread(
+                service.upload_stream,
+                spooled.rewind(),
+                category=ImageCategory.BANNER,
+                resource_id=resource_id,
+                user_id=current_admin.id,
+                filename=image.filename,
+                is_temp=is_temp
+            )
         
         if not result.success:
             raise HTTPException(
@@ -15,6 +15,14 @@ from app import models
 from app.content_filter.filter_service import force_refresh
 from app.deps import get_async_db_dependency
 from app.utils import get_utc_time
+from app.utils.keyset_pagination import (
+    InvalidCursor,
+    SortKey,
+    apply_ordering,
+    count_rows,
+    decode_cursor,
+    paginate,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -89,12 +97,35 @@ class ReviewAction(BaseModel):
     reason: Optional[str] = None
 
 
+async def _list_page(db: AsyncSession, query, id_column, skip: int, limit: int, cursor: Optional[str], scope: str):
+    """
+    列表分页：第一页或传 cursor 时按 id 键集翻页，其余兼容 skip/limit；
+    总数用规划器估算（结果集较小时精确 count）
+
+    Returns:
+        (items, total, next_cursor)
+    """
+    keys = [SortKey(id_column)]
+    try:
+        after = decode_cursor(cursor, scope) if cursor else None
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+
+    total = await count_rows(db, query, mode="estimate")
+    if after is not None or skip == 0:
+        page = await paginate(db, query, keys, limit, scope=scope, after=after)
+        return page.items, total, page.next_cursor
+    result = await db.execute(apply_ordering(query, keys).offset(skip).limit(limit))
+    return result.scalars().all(), total, None
+
+
 # ── 敏感词 CRUD ───────────────────────────────
 
 @router.get("/sensitive-words")
 async def list_sensitive_words(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（传入后忽略 skip）"),
     category: Optional[str] = None,
     is_active: Optional[bool] = None,
     keyword: Optional[str] = None,
@@ -111,18 +142,13 @@ async def list_sensitive_words(
     if keyword:
         query = query.where(models.SensitiveWord.word.ilike(f"%{keyword}%"))
 
-    # 总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    # 分页
-    query = query.order_by(desc(models.SensitiveWord.created_at)).offset(skip).limit(limit)
-    result = await db.execute(query)
-    words = result.scalars().all()
+    # 按 id 倒序（与创建时间顺序一致，走主键索引）
+    scope = json.dumps(["sensitive_words", category, is_active, keyword], ensure_ascii=False)
+    words, total, next_cursor = await _list_page(db, query, models.SensitiveWord.id, skip, limit, cursor, scope)
 
     return {
         "total": total,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": w.id,
@@ -297,6 +323,7 @@ async def batch_import_sensitive_words(
 async def list_homophone_mappings(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（传入后忽略 skip）"),
     keyword: Optional[str] = None,
     admin: models.AdminUser = Depends(get_current_admin_async),
     db: AsyncSession = Depends(get_async_db_dependency),
@@ -310,16 +337,12 @@ async def list_homophone_mappings(
             | models.HomophoneMapping.standard.ilike(f"%{keyword}%")
         )
 
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    query = query.order_by(models.HomophoneMapping.id.desc()).offset(skip).limit(limit)
-    result = await db.execute(query)
-    mappings = result.scalars().all()
+    scope = json.dumps(["homophone_mappings", keyword], ensure_ascii=False)
+    mappings, total, next_cursor = await _list_page(db, query, models.HomophoneMapping.id, skip, limit, cursor, scope)
 
     return {
         "total": total,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": m.id,
@@ -394,6 +417,7 @@ async def delete_homophone_mapping(
 async def list_content_reviews(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（传入后忽略 skip）"),
     status_filter: Optional[str] = Query(None, alias="status"),
     content_type: Optional[str] = None,
     admin: models.AdminUser = Depends(get_current_admin_async),
@@ -407,16 +431,13 @@ async def list_content_reviews(
     if content_type:
         query = query.where(models.ContentReview.content_type == content_type)
 
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    query = query.order_by(desc(models.ContentReview.created_at)).offset(skip).limit(limit)
-    result = await db.execute(query)
-    reviews = result.scalars().all()
+    # 按 id 倒序（与创建时间顺序一致，走主键索引）
+    scope = json.dumps(["content_reviews", status_filter, content_type], ensure_ascii=False)
+    reviews, total, next_cursor = await _list_page(db, query, models.ContentReview.id, skip, limit, cursor, scope)
 
     return {
         "total": total,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": r.id,
@@ -556,6 +577,7 @@ async def review_content(
 async def list_filter_logs(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（传入后忽略 skip）"),
     action: Optional[str] = None,
     content_type: Optional[str] = None,
     user_id: Optional[str] = None,
@@ -572,16 +594,13 @@ async def list_filter_logs(
     if user_id:
         query = query.where(models.FilterLog.user_id == user_id)
 
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    query = query.order_by(desc(models.FilterLog.created_at)).offset(skip).limit(limit)
-    result = await db.execute(query)
-    logs = result.scalars().all()
+    # 按 id 倒序（与创建时间顺序一致，走主键索引）
+    scope = json.dumps(["filter_logs", action, content_type, user_id], ensure_ascii=False)
+    logs, total, next_cursor = await _list_page(db, query, models.FilterLog.id, skip, limit, cursor, scope)
 
     return {
         "total": total,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": log.id,
@@ -8,6 +8,7 @@ import shutil
 from typing import Optional, List
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Body
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
@@ -390,3 +391,99 @@ def admin_get_audit_logs(
         "page": page,
         "size": size,
     }
+
+
+@router.get("/admin/debug/query-profile")
+def admin_get_query_profile(
+    top: int = Query(20, ge=1, le=200),
+    reset: bool = Query(False, description="读取后清空统计"),
+    current_admin=Depends(get_current_admin),
+):
+    """查看每个路由的 SQL 条数、疑似 N+1 / 超预算的最近请求、高频 SQL 指纹（仅本 worker）"""
+    from app.observability.query_profiler import query_profiler
+
+    report = query_profiler.report(top=top)
+    if reset:
+        query_profiler.reset()
+    return report
+
+
+@router.get("/admin/debug/profiler")
+def admin_get_profiler_status(
+    top: int = Query(20, ge=1, le=200),
+    current_admin=Depends(get_current_admin),
+):
+    """采样剖析器状态和自身耗时最高的函数（仅处理本请求的 worker）"""
+    from app.observability.sampling_profiler import stack_sampler
+
+    return {**stack_sampler.get_status(), "top_functions": stack_sampler.top_functions(top)}
+
+
+@router.post("/admin/debug/profiler/start")
+def admin_start_profiler(
+    interval_ms: float = Query(50, ge=5, le=1000, description="采样间隔（毫秒）"),
+    duration_seconds: Optional[float] = Query(None, gt=0, le=3600, description="自动停止前的持续时间，不传则一直运行"),
+    include_idle: bool = Query(False, description="包含停在等待点上的空闲线程"),
+    reset: bool = Query(True, description="清空之前的样本"),
+    current_admin=Depends(get_current_admin),
+):
+    """在处理本请求的 worker 上开启采样剖析"""
+    from app.observability.sampling_profiler import stack_sampler
+
+    stack_sampler.start(interval_ms=interval_ms, duration_seconds=duration_seconds,
+                        include_idle=include_idle, reset=reset)
+    logger.info(f"管理员 {current_admin.id} 开启采样剖析器（间隔 {interval_ms}ms）")
+    return stack_sampler.get_status()
+
+
+@router.post("/admin/debug/profiler/stop")
+def admin_stop_profiler(current_admin=Depends(get_current_admin)):
+    """停止采样（样本保留，可继续导出）"""
+    from app.observability.sampling_profiler import stack_sampler
+
+    stack_sampler.stop()
+    return stack_sampler.get_status()
+
+
+@router.get("/admin/debug/profiler/folded", response_class=PlainTextResponse)
+def admin_get_profiler_folded(
+    limit: Optional[int] = Query(None, ge=1, description="只返回样本最多的前 N 个栈"),
+    current_admin=Depends(get_current_admin),
+):
+    """导出折叠栈（flamegraph.pl / speedscope 可直接读取）"""
+    from app.observability.sampling_profiler import stack_sampler, worker_id
+
+    return PlainTextResponse(
+        stack_sampler.folded(limit=limit),
+        headers={"X-Profiler-Worker": worker_id()},
+    )
+
+
+@router.get("/admin/debug/loop-lag")
+def admin_get_loop_lag(
+    top: int = Query(20, ge=1, le=200),
+    reset: bool = Query(False, description="读取后清空统计"),
+    current_admin=Depends(get_current_admin),
+):
+    """事件循环延迟和阻塞循环的协程（仅处理本请求的 worker）"""
+    from app.observability.sampling_profiler import loop_lag_monitor
+
+    report = loop_lag_monitor.report(limit=top)
+    if reset:
+        loop_lag_monitor.reset()
+    return report
+
+
+@router.get("/admin/debug/loop-blocking")
+def admin_get_loop_blocking(
+    top: int = Query(20, ge=1, le=200),
+    reset: bool = Query(False, description="读取后清空统计"),
+    current_admin=Depends(get_current_admin),
+):
+    """async 路由中阻塞事件循环的调用：按路由、调用点汇总（仅处理本请求的 worker）"""
+    from app.observability.loop_blocking import loop_blocking_detector
+
+    report = loop_blocking_detector.report(limit=top)
+    if reset:
+        loop_blocking_detector.reset()
+    return report
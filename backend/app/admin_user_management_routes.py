@@ -18,6 +18,7 @@ from app.rate_limiting import rate_limit
 from app.separate_auth_deps import get_current_admin
 from app.security import get_client_ip
 from app.performance_monitor import measure_api_performance
+from app.principal_cache import invalidate_principal
 from app.utils.time_utils import format_iso_utc, get_utc_time
 
 logger = logging.getLogger(__name__)
@@ -291,6 +292,7 @@ def admin_set_user_status(
         user.suspend_until = parse_iso_utc(suspend_until)
     
     db.commit()
+    invalidate_principal(user_id)
     
     # 记录审计日志
     if old_values:
@@ -16,6 +16,7 @@ from fastapi import HTTPException
 
 from app import models, schemas
 from app.security import get_password_hash
+from app.utils.keyset_pagination import CursorState, SortKey, apply_ordering, count_rows, decode_cursor, paginate
 from app.utils.time_utils import get_utc_time, parse_iso_utc, format_iso_utc
 import uuid
 
@@ -209,6 +210,10 @@ class AsyncUserCRUD:
             return []
 
 
+# "附近"任务未指定半径时的粗筛范围（约 1 度纬度）
+_NEARBY_DEFAULT_BOX_KM = 111.0
+
+
 # 异步任务操作
 class AsyncTaskCRUD:
     """异步任务CRUD操作"""
@@ -526,6 +531,256 @@ class AsyncTaskCRUD:
             logger.error(f"Error getting tasks: {e}")
             return []
 
+    @staticmethod
+    def _task_list_base_query(
+        now_utc: datetime,
+        task_type: Optional[str] = None,
+        location: Optional[str] = None,
+        status: Optional[str] = None,
+        keyword: Optional[str] = None,
+        expert_creator_id: Optional[str] = None,
+        is_multi_participant: Optional[bool] = None,
+        parent_activity_id: Optional[int] = None,
+    ):
+        """
+        任务列表的筛选条件（offset 分页、游标分页、总数共用）
+
+        Returns:
+            (base_query, actual_status)；actual_status 为参与总数缓存键的状态
+        """
+        # 如果指定了 parent_activity_id，显示所有状态的任务（用于统计活动关联的任务）
+        if parent_activity_id is not None:
+            actual_status = None
+            base_query = select(models.Task)
+        elif expert_creator_id:
+            # 达人查看自己的活动时，显示所有状态
+            actual_status = status or None
+            base_query = select(models.Task)
+            if status and status != "all":
+                base_query = base_query.where(models.Task.status == status)
+        else:
+            # 公开任务列表：只显示开放中的任务
+            actual_status = status or "open"
+            if actual_status == "all":
+                # status='all' 时，显示所有状态的任务
+                base_query = select(models.Task)
+            else:
+                base_query = select(models.Task).where(
+                    or_(
+                        models.Task.status == "open",
+                        models.Task.status == "taken"
+                    )
+                ).where(
+                    or_(
+                        models.Task.deadline > now_utc,  # 有截止日期且未过期
+                        models.Task.deadline.is_(None)  # 灵活模式（无截止日期）
+                    )
+                )
+
+        # 内容过滤：公开列表只显示通过审核的任务（is_visible == True）
+        # 达人查看自己创建的任务时不过滤（需要看到被隐藏的内容）
+        if not expert_creator_id:
+            base_query = base_query.where(models.Task.is_visible == True)
+
+        # 任务类型筛选
+        if task_type and task_type not in ["全部类型", "全部", "all"]:
+            base_query = base_query.where(models.Task.task_type == task_type)
+
+        # 地点筛选（使用精确城市匹配）
+        if location and location not in ["全部城市", "全部", "all"]:
+            if location.lower() == 'other':
+                # "Other" 筛选：排除所有预定义城市和 Online（支持中英文地址）
+                from sqlalchemy import not_
+                from app.utils.city_filter_utils import build_other_exclusion_filter
+                exclusion_expr = build_other_exclusion_filter(models.Task.location)
+                if exclusion_expr is not None:
+                    base_query = base_query.where(not_(exclusion_expr))
+            elif location.lower() == 'online':
+                base_query = base_query.where(models.Task.location.ilike("%online%"))
+            else:
+                # 优先走 city_canonical 索引等值；canonicalize 失败时回退 ILIKE 兼容罕见城市
+                from app.utils.city_filter_utils import (
+                    build_city_location_filter,
+                    resolve_city_canonical,
+                )
+                canonical = resolve_city_canonical(location)
+                if canonical:
+                    base_query = base_query.where(models.Task.city_canonical == canonical)
+                else:
+                    city_expr = build_city_location_filter(models.Task.location, location)
+                    if city_expr is not None:
+                        base_query = base_query.where(city_expr)
+        
+        # 关键词筛选（jieba 分词 + 双语扩展 + pg_trgm）
+        if keyword:
+            keyword = keyword.strip()
+            from app.utils.search_expander import build_keyword_filter
+            keyword_expr = build_keyword_filter(
+                columns=[
+                    models.Task.title, models.Task.description,
+                    models.Task.title_zh, models.Task.title_en,
+                    models.Task.description_zh, models.Task.description_en,
+                    models.Task.task_type, models.Task.location,
+                ],
+                keyword=keyword,
+                use_similarity=True,
+            )
+            if keyword_expr is not None:
+                base_query = base_query.where(keyword_expr)
+        
+        # 达人创建者筛选
+        if expert_creator_id:
+            base_query = base_query.where(models.Task.expert_creator_id == expert_creator_id)
+        
+        # 多人任务筛选
+        if is_multi_participant is not None:
+            base_query = base_query.where(models.Task.is_multi_participant == is_multi_participant)
+        
+        if parent_activity_id is not None:
+            base_query = base_query.where(models.Task.parent_activity_id == parent_activity_id)
+        
+        return base_query, actual_status
+
+    @staticmethod
+    def _task_sort_keys(sort_by: Optional[str], keyword: Optional[str], as_of: datetime) -> list:
+        """
+        任务列表的排序键（最后一列为 id，保证顺序确定，可用于游标分页）
+
+        as_of 为"新任务优先"权重的计算时刻，游标翻页期间保持不变。
+        可空列用 coalesce 兜底：奖励为空按 0，截止日期为空排在最后。
+        """
+        from datetime import timedelta, timezone
+        from sqlalchemy import DateTime, case, literal
+
+        created_desc = [SortKey(models.Task.created_at), SortKey(models.Task.id)]
+        created_asc = [SortKey(models.Task.created_at, False), SortKey(models.Task.id, False)]
+        if keyword and keyword.strip():
+            # 按多字段相似度最大值排序（相关性）
+            kw = keyword.strip()
+            relevance = func.greatest(*[
+                func.coalesce(func.similarity(column, kw), 0)
+                for column in (
+                    models.Task.title, models.Task.description,
+                    models.Task.title_zh, models.Task.title_en,
+                    models.Task.description_zh, models.Task.description_en,
+                )
+            ])
+            return [SortKey(relevance)] + created_desc
+        if sort_by == "latest":
+            # 优先显示新任务（24小时内）：新任务权重=2，普通任务权重=1
+            sort_weight = case((models.Task.created_at >= as_of - timedelta(hours=24), 2), else_=1)
+            return [SortKey(sort_weight)] + created_desc
+        if sort_by == "oldest":
+            return created_asc
+        reward = func.coalesce(models.Task.base_reward, 0)
+        if sort_by in ("reward_high", "reward_desc"):
+            return [SortKey(reward)] + created_desc
+        if sort_by in ("reward_low", "reward_asc"):
+            return [SortKey(reward, False)] + created_asc
+        if sort_by in ("deadline_asc", "deadline_desc"):
+            # 无截止日期（灵活模式）在两个方向上都排在最后
+            descending = sort_by == "deadline_desc"
+            no_deadline = datetime(1, 1, 1, tzinfo=timezone.utc) if descending else datetime(9999, 12, 31, tzinfo=timezone.utc)
+            deadline = func.coalesce(models.Task.deadline, literal(no_deadline, DateTime(timezone=True)))
+            return [SortKey(deadline, descending)] + created_desc
+        # 默认按最新
+        return created_desc
+
+    @staticmethod
+    async def _get_tasks_by_distance(
+        db: AsyncSession,
+        base_query,
+        *,
+        skip: int,
+        limit: int,
+        user_latitude: float,
+        user_longitude: float,
+        radius_km: Optional[float],
+        city_filtered: bool,
+    ) -> tuple[List[models.Task], int]:
+        """
+        按距离排序的任务列表 + 总数，只物化当前页
+
+        - 有坐标的任务：边界框条件走 GiST 索引 idx_tasks_location_coordinates 粗筛，
+          再在数据库里按球面距离过滤、排序
+        - 没有坐标的任务：city_canonical 与用户坐标所在城市一致时保留，排在有坐标任务之后
+        - 已按城市筛选：有坐标的任务按 radius 过滤（未指定时只做粗筛），同城无坐标任务保留
+        - 未按城市筛选：默认 50km 内；没有结果放宽到 2 倍半径；
+          仍没有则返回最近的至多 20 个（包括同城的无坐标任务）
+        """
+        from sqlalchemy import case, or_
+        from app.utils.city_filter_utils import cities_at_coordinates
+        from app.utils.location_utils import bounding_box, distance_km_expr, within_bounding_box
+
+        # "附近"不包括线上任务
+        base_query = base_query.where(~models.Task.location.ilike("%online%"))
+
+        distance = distance_km_expr(models.Task.latitude, models.Task.longitude, user_latitude, user_longitude)
+        user_cities = cities_at_coordinates(user_latitude, user_longitude)
+        same_city = (
+            and_(
+                or_(models.Task.latitude.is_(None), models.Task.longitude.is_(None)),
+                models.Task.city_canonical.in_(user_cities),
+            )
+            if user_cities
+            else None
+        )
+
+        def nearby(max_km: Optional[float], box_km: float):
+            condition = within_bounding_box(
+                models.Task.latitude, models.Task.longitude,
+                bounding_box(user_latitude, user_longitude, box_km),
+            )
+            if max_km is not None:
+                condition = and_(condition, distance <= max_km)
+            return condition
+
+        def with_same_city(condition):
+            return or_(condition, same_city) if same_city is not None else condition
+
+        async def fetch_page(query, offset: int, size: int) -> List[models.Task]:
+            if size <= 0:
+                return []
+            # 无坐标任务（distance 为 NULL）排在所有有坐标任务之后
+            page_query = (
+                query.add_columns(distance.label("distance_km"))
+                .options(selectinload(models.Task.poster))
+                .order_by(
+                    case((distance.is_(None), 1), else_=0),
+                    distance,
+                    models.Task.created_at.desc(),
+                    models.Task.id.desc(),
+                )
+                .offset(offset)
+                .limit(size)
+            )
+            rows = (await db.execute(page_query)).all()
+            tasks = []
+            for task, distance_km in rows:
+                task._distance_km = float(distance_km) if distance_km is not None else None
+                tasks.append(task)
+            return tasks
+
+        if city_filtered:
+            # 未指定半径时沿用约 1 度（111km）的粗筛范围
+            query = base_query.where(with_same_city(nearby(radius_km, radius_km or _NEARBY_DEFAULT_BOX_KM)))
+            total = await count_rows(db, query)
+            return await fetch_page(query, skip, limit), total
+
+        max_distance_km = radius_km if radius_km is not None else 50.0
+        for max_km in (max_distance_km, max_distance_km * 2):
+            query = base_query.where(nearby(max_km, max_km))
+            total = await count_rows(db, query)
+            if total:
+                return await fetch_page(query, skip, limit), total
+
+        # 兜底：最近的几个任务（包括同城的无坐标任务）
+        cap = min(limit * 2, 20)
+        box_km = max(max_distance_km * 2, _NEARBY_DEFAULT_BOX_KM)
+        query = base_query.where(with_same_city(nearby(None, box_km)))
+        total = min(await count_rows(db, query), cap)
+        return await fetch_page(query, skip, min(limit, total - skip)), total
+
     @staticmethod
     async def get_tasks_with_total(
         db: AsyncSession,
@@ -555,446 +810,70 @@ class AsyncTaskCRUD:
             from sqlalchemy import or_, func
             from app.utils.time_utils import get_utc_time
             from app.redis_cache import get_tasks_count_cache_key
-            from app.config import Config
             
             # 获取当前UTC时间
             now_utc = get_utc_time()
             
             # 1. 构建 base_query（列表 & 总数共用）
-            # 如果指定了 parent_activity_id，显示所有状态的任务（用于统计活动关联的任务）
-            if parent_activity_id is not None:
-                actual_status = None
-                base_query = select(models.Task)
-            elif expert_creator_id:
-                # 达人查看自己的活动时，显示所有状态
-                actual_status = status or None
-                base_query = select(models.Task)
-                if status and status != "all":
-                    base_query = base_query.where(models.Task.status == status)
-            else:
-                # 公开任务列表：只显示开放中的任务
-                actual_status = status or "open"
-                if actual_status == "all":
-                    # status='all' 时，显示所有状态的任务
-                    base_query = select(models.Task)
-                else:
-                    base_query = select(models.Task).where(
-                        or_(
-                            models.Task.status == "open",
-                            models.Task.status == "taken"
-                        )
-                    ).where(
-                        or_(
-                            models.Task.deadline > now_utc,  # 有截止日期且未过期
-                            models.Task.deadline.is_(None)  # 灵活模式（无截止日期）
-                        )
-                    )
-
-            # 内容过滤：公开列表只显示通过审核的任务（is_visible == True）
-            # 达人查看自己创建的任务时不过滤（需要看到被隐藏的内容）
-            if not expert_creator_id:
-                base_query = base_query.where(models.Task.is_visible == True)
-
-            # 任务类型筛选
-            if task_type and task_type not in ["全部类型", "全部", "all"]:
-                base_query = base_query.where(models.Task.task_type == task_type)
-
-            # 地点筛选（使用精确城市匹配）
-            if location and location not in ["全部城市", "全部", "all"]:
-                if location.lower() == 'other':
-                    # "Other" 筛选：排除所有预定义城市和 Online（支持中英文地址）
-                    from sqlalchemy import not_
-                    from app.utils.city_filter_utils import build_other_exclusion_filter
-                    exclusion_expr = build_other_exclusion_filter(models.Task.location)
-                    if exclusion_expr is not None:
-                        base_query = base_query.where(not_(exclusion_expr))
-                elif location.lower() == 'online':
-                    base_query = base_query.where(models.Task.location.ilike("%online%"))
-                else:
-                    # 优先走 city_canonical 索引等值；canonicalize 失败时回退 ILIKE 兼容罕见城市
-                    from app.utils.city_filter_utils import (
-                        build_city_location_filter,
-                        resolve_city_canonical,
-                    )
-                    canonical = resolve_city_canonical(location)
-                    if canonical:
-                        base_query = base_query.where(models.Task.city_canonical == canonical)
-                    else:
-                        city_expr = build_city_location_filter(models.Task.location, location)
-                        if city_expr is not None:
-                            base_query = base_query.where(city_expr)
-            
-            # 关键词筛选（jieba 分词 + 双语扩展 + pg_trgm）
+            base_query, actual_status = AsyncTaskCRUD._task_list_base_query(
+                now_utc,
+                task_type=task_type,
+                location=location,
+                status=status,
+                keyword=keyword,
+                expert_creator_id=expert_creator_id,
+                is_multi_participant=is_multi_participant,
+                parent_activity_id=parent_activity_id,
+            )
             if keyword:
                 keyword = keyword.strip()
-                from app.utils.search_expander import build_keyword_filter
-                keyword_expr = build_keyword_filter(
-                    columns=[
-                        models.Task.title, models.Task.description,
-                        models.Task.title_zh, models.Task.title_en,
-                        models.Task.description_zh, models.Task.description_en,
-                        models.Task.task_type, models.Task.location,
-                    ],
-                    keyword=keyword,
-                    use_similarity=True,
-                )
-                if keyword_expr is not None:
-                    base_query = base_query.where(keyword_expr)
-            
-            # 达人创建者筛选
-            if expert_creator_id:
-                base_query = base_query.where(models.Task.expert_creator_id == expert_creator_id)
-            
-            # 多人任务筛选
-            if is_multi_participant is not None:
-                base_query = base_query.where(models.Task.is_multi_participant == is_multi_participant)
-            
-            if parent_activity_id is not None:
-                base_query = base_query.where(models.Task.parent_activity_id == parent_activity_id)
-            
-            # 只有明确使用距离排序时，才过滤掉"Online"任务（用于"附近"功能）
+
+            # 明确使用距离排序时（"附近"功能）：距离计算、过滤、排序和分页都在数据库完成
             # 推荐任务和任务大厅不使用距离排序，也不隐藏 online 任务
             if user_latitude is not None and user_longitude is not None and sort_by in ("distance", "nearby"):
-                base_query = base_query.where(
-                    ~models.Task.location.ilike("%online%")
+                return await AsyncTaskCRUD._get_tasks_by_distance(
+                    db,
+                    base_query,
+                    skip=skip,
+                    limit=limit,
+                    user_latitude=user_latitude,
+                    user_longitude=user_longitude,
+                    radius_km=radius_km,
+                    city_filtered=bool(location and location not in ["全部城市", "全部", "all"]),
                 )
             
             # 2. 先算 total（缓存 + 精确 count）
-            # 如果有用户位置且使用距离排序，total计算需要过滤掉没有坐标的任务
-            # 这样 total 才能和实际返回的任务数量匹配
-            count_query_for_total = base_query
-            if user_latitude is not None and user_longitude is not None and sort_by in ("distance", "nearby"):
-                # 对于距离排序，total 应该只计算有坐标的任务（和 list_query 保持一致）
-                count_query_for_total = count_query_for_total.where(
-                    (models.Task.latitude.isnot(None)) & 
-                    (models.Task.longitude.isnot(None))
-                )
-            
             cache_key = get_tasks_count_cache_key(
                 task_type=task_type,
                 location=location,
                 status=actual_status,  # 包含默认 'open'
                 keyword=keyword,
             )
-            
-            # 如果有用户位置，修改缓存键以区分
-            if user_latitude is not None and user_longitude is not None:
-                # 将位置信息四舍五入到小数点后2位（约1km精度），用于缓存分组
-                lat_rounded = round(user_latitude, 2)
-                lon_rounded = round(user_longitude, 2)
-                cache_key = f"{cache_key}:nearby:{lat_rounded}:{lon_rounded}"
-                # 如果使用距离排序，在缓存键中标记
-                if sort_by in ("distance", "nearby"):
-                    cache_key = f"{cache_key}:distance"
-            
-            # For distance sort, skip count cache — total is computed after
-            # Python-side distance filtering (overwritten later).
-            if sort_by in ("distance", "nearby"):
-                total = 0  # placeholder; will be overwritten after filtering
-            else:
-                # 尝试从缓存获取总数
-                try:
-                    # 使用异步Redis客户端（使用上下文管理器确保正确关闭）
-                    import redis.asyncio as aioredis  # type: ignore[import-untyped]
-                    redis_url = Config.REDIS_URL or f"redis://{Config.REDIS_HOST}:{Config.REDIS_PORT}/{Config.REDIS_DB}"
-
-                    async with aioredis.from_url(redis_url, decode_responses=True) as async_redis:
-                        cached_total = await async_redis.get(cache_key)
-                        if cached_total is not None:
-                            try:
-                                total = int(cached_total)
-                            except ValueError:
-                                total = 0
-                        else:
-                            # 缓存未命中，执行精确 count
-                            count_query = select(func.count()).select_from(count_query_for_total.subquery())
-                            total_result = await db.execute(count_query)
-                            total = total_result.scalar() or 0
-                            # 缓存总数（TTL 可以按需调整）
-                            await async_redis.setex(cache_key, 300, str(total))
-                except Exception as e:
-                    # Redis 不可用时，直接执行 count
-                    logger.warning(f"Redis缓存失败，直接执行count: {e}")
-                    count_query = select(func.count()).select_from(count_query_for_total.subquery())
-                    total_result = await db.execute(count_query)
-                    total = total_result.scalar() or 0
+            total = await count_rows(db, base_query, mode="cached", cache_key=cache_key, ttl=300)
             
             # 3. 列表查询（基于同一个 base_query）
+            # 有关键词时按相关性（契合度），否则按 sort_by；与游标分页（get_tasks_cursor）同一套排序键
             list_query = base_query.options(
                 selectinload(models.Task.poster)
             )
-            
-            # 排序：有关键词时按相关性（契合度），否则按 sort_by
-            use_distance_sorting = False
-            if keyword and keyword.strip():
-                # 按多字段相似度最大值排序（相关性）
-                kw = keyword.strip()
-                relevance = func.greatest(
-                    func.coalesce(func.similarity(models.Task.title, kw), 0),
-                    func.coalesce(func.similarity(models.Task.description, kw), 0),
-                    func.coalesce(func.similarity(models.Task.title_zh, kw), 0),
-                    func.coalesce(func.similarity(models.Task.title_en, kw), 0),
-                    func.coalesce(func.similarity(models.Task.description_zh, kw), 0),
-                    func.coalesce(func.similarity(models.Task.description_en, kw), 0),
-                )
-                list_query = list_query.order_by(
-                    relevance.desc(),
-                    models.Task.created_at.desc(),
-                    models.Task.id.desc(),
-                )
-            elif user_latitude is not None and user_longitude is not None and sort_by in ("distance", "nearby"):
-                use_distance_sorting = True
-                
-                # 粗略的距离过滤：使用简单的经纬度范围过滤
-                # 1度纬度 ≈ 111km；1度经度在UK纬度（约51度）≈ 70km
-                import math
-                if radius_km is not None:
-                    # 根据用户选择的半径计算范围，乘以1.2留余量
-                    lat_range = (radius_km / 111.0) * 1.2
-                    cos_lat = math.cos(math.radians(user_latitude))
-                    lon_range = (radius_km / (111.0 * max(cos_lat, 0.1))) * 1.2
-                else:
-                    lat_range = 1.0  # 约111km（默认）
-                    lon_range = 1.5  # 约105km（默认）
-                
-                # 获取有坐标的任务（在粗略范围内）和没有坐标但同城的任务（用于城市匹配）
-                # 使用 OR 条件：有坐标且在范围内 OR 没有坐标但同城
-                from sqlalchemy import or_, and_
-                
-                # 如果已经按城市过滤（location参数不为空），则只获取同城的无坐标任务
-                # 如果没有按城市过滤，则获取所有无坐标任务（将在Python中按城市匹配）
-                if location and location not in ["全部城市", "全部", "all"]:
-                    # 已经按城市过滤，只获取同城的任务（有坐标或在范围内，或无坐标但同城）
-                    list_query = list_query.where(
-                        or_(
-                            # 有坐标且在粗略范围内
-                            and_(
-                                models.Task.latitude.isnot(None),
-                                models.Task.longitude.isnot(None),
-                                models.Task.latitude >= user_latitude - lat_range,
-                                models.Task.latitude <= user_latitude + lat_range,
-                                models.Task.longitude >= user_longitude - lon_range,
-                                models.Task.longitude <= user_longitude + lon_range
-                            ),
-                            # 没有坐标的任务（已经通过location参数过滤为同城）
-                            and_(
-                                or_(
-                                    models.Task.latitude.is_(None),
-                                    models.Task.longitude.is_(None)
-                                )
-                            )
-                        )
-                    )
-                else:
-                    # 没有按城市过滤，获取有坐标的任务和所有无坐标的任务（将在Python中按城市匹配）
-                    list_query = list_query.where(
-                        or_(
-                            # 有坐标且在粗略范围内
-                            and_(
-                                models.Task.latitude.isnot(None),
-                                models.Task.longitude.isnot(None),
-                                models.Task.latitude >= user_latitude - lat_range,
-                                models.Task.latitude <= user_latitude + lat_range,
-                                models.Task.longitude >= user_longitude - lon_range,
-                                models.Task.longitude <= user_longitude + lon_range
-                            ),
-                            # 没有坐标的任务（将在后续按城市匹配排序）
-                            and_(
-                                or_(
-                                    models.Task.latitude.is_(None),
-                                    models.Task.longitude.is_(None)
-                                )
-                            )
-                        )
-                    )
-                
-                list_query = list_query.order_by(
-                    models.Task.created_at.desc(), models.Task.id.desc()
-                )
-                
-                # 增加获取数量（用于距离计算和城市匹配），但限制在合理范围内
-                # 例如：如果用户请求20条，我们获取200条来计算距离，然后返回最近的20条
-                max_fetch_for_distance = min(limit * 10, 500)  # 最多500条
-                list_query = list_query.limit(max_fetch_for_distance)
-            elif sort_by == "latest":
-                # 优先显示新任务（24小时内）
-                from datetime import timedelta
-                from sqlalchemy import case
-                recent_24h = now_utc - timedelta(hours=24)
-                sort_weight = case(
-                    (models.Task.created_at >= recent_24h, 2),  # 新任务权重=2
-                    else_=1  # 普通任务权重=1
-                )
-                list_query = list_query.order_by(
-                    sort_weight.desc(),  # 先按权重排序
-                    models.Task.created_at.desc(),  # 再按创建时间
-                    models.Task.id.desc()  # 最后按ID
-                )
-            elif sort_by == "oldest":
-                list_query = list_query.order_by(
-                    models.Task.created_at.asc(), models.Task.id.asc()
-                )
-            elif sort_by == "reward_high" or sort_by == "reward_desc":
-                list_query = list_query.order_by(
-                    models.Task.base_reward.desc(), models.Task.created_at.desc()
-                )
-            elif sort_by == "reward_low" or sort_by == "reward_asc":
-                list_query = list_query.order_by(
-                    models.Task.base_reward.asc(), models.Task.created_at.asc()
-                )
-            elif sort_by == "deadline_asc":
-                list_query = list_query.order_by(
-                    models.Task.deadline.asc().nulls_last(),
-                    models.Task.created_at.desc(),
-                )
-            elif sort_by == "deadline_desc":
-                list_query = list_query.order_by(
-                    models.Task.deadline.desc().nulls_last(),
-                    models.Task.created_at.desc(),
-                )
-            else:
-                # 默认按最新
-                list_query = list_query.order_by(
-                    models.Task.created_at.desc(), models.Task.id.desc()
-                )
-            
-            # 如果不是距离排序，才应用offset和limit（距离排序在Python中处理）
-            if not use_distance_sorting:
-                list_query = list_query.offset(skip).limit(limit)
+            sort_keys = AsyncTaskCRUD._task_sort_keys(sort_by, keyword, now_utc)
+            list_query = apply_ordering(list_query, sort_keys).offset(skip).limit(limit)
             
             result = await db.execute(list_query)
             tasks = list(result.scalars().all())
             
-            # 如果有用户位置，计算距离并按距离排序
+            # 有用户位置但不按距离排序：只为当前页计算距离值用于显示
             if user_latitude is not None and user_longitude is not None:
                 from app.utils.location_utils import calculate_distance
                 
-                # 根据用户坐标判断大致城市（用于匹配没有坐标的任务）
-                def get_user_city_from_coords(lat: float, lon: float) -> list:
-                    """根据坐标判断用户可能所在的城市列表"""
-                    # UK主要城市的坐标范围（粗略判断）
-                    city_ranges = {
-                        "London": (51.3, 51.7, -0.5, 0.3),
-                        "Birmingham": (52.3, 52.6, -2.0, -1.7),
-                        "Manchester": (53.3, 53.6, -2.4, -2.0),
-                        "Edinburgh": (55.8, 56.0, -3.3, -3.0),
-                        "Glasgow": (55.7, 55.9, -4.4, -4.1),
-                        "Bristol": (51.4, 51.5, -2.7, -2.5),
-                        "Sheffield": (53.3, 53.4, -1.6, -1.4),
-                        "Leeds": (53.7, 53.9, -1.7, -1.4),
-                        "Nottingham": (52.9, 53.0, -1.3, -1.1),
-                        "Newcastle": (54.9, 55.0, -1.7, -1.5),
-                        "Southampton": (50.8, 51.0, -1.5, -1.3),
-                        "Liverpool": (53.3, 53.5, -3.0, -2.8),
-                        "Cardiff": (51.4, 51.5, -3.3, -3.1),
-                        "Coventry": (52.3, 52.5, -1.6, -1.4),
-                        "Exeter": (50.7, 50.8, -3.6, -3.4),
-                        "Leicester": (52.6, 52.7, -1.2, -1.0),
-                        "York": (53.9, 54.0, -1.1, -0.9),
-                        "Aberdeen": (57.1, 57.2, -2.2, -2.0),
-                        "Bath": (51.3, 51.4, -2.4, -2.3),
-                        "Dundee": (56.4, 56.5, -3.0, -2.9),
-                        "Reading": (51.4, 51.5, -1.0, -0.9),
-                        "St Andrews": (56.3, 56.4, -2.8, -2.7),
-                        "Belfast": (54.5, 54.7, -6.0, -5.8),
-                        "Brighton": (50.8, 50.9, -0.2, 0.0),
-                        "Durham": (54.7, 54.8, -1.6, -1.5),
-                        "Norwich": (52.6, 52.7, 1.2, 1.3),
-                        "Swansea": (51.6, 51.7, -4.0, -3.9),
-                        "Loughborough": (52.7, 52.8, -1.2, -1.1),
-                        "Lancaster": (54.0, 54.1, -2.8, -2.7),
-                        "Warwick": (52.2, 52.3, -1.6, -1.5),
-                        "Cambridge": (52.2, 52.3, 0.0, 0.2),
-                        "Oxford": (51.7, 51.8, -1.3, -1.2),
-                    }
-                    
-                    matched_cities = []
-                    for city, (min_lat, max_lat, min_lon, max_lon) in city_ranges.items():
-                        if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
-                            matched_cities.append(city)
-                    return matched_cities
-                
-                # 获取用户可能所在的城市列表
-                user_cities = get_user_city_from_coords(user_latitude, user_longitude)
-                
-                # 计算每个任务的距离或城市匹配度
-                tasks_with_distance = []
                 for task in tasks:
                     if task.latitude is not None and task.longitude is not None:
-                        # 有坐标：计算精确距离
-                        distance = calculate_distance(
+                        task._distance_km = calculate_distance(
                             user_latitude, user_longitude,
                             float(task.latitude), float(task.longitude)
                         )
-                        task._distance_km = distance
-                        tasks_with_distance.append((distance, task, True))  # True表示有坐标
                     else:
-                        # 没有坐标：根据位置字符串匹配城市
                         task._distance_km = None
-                        location_lower = (task.location or "").lower()
-                        
-                        # 检查任务位置是否包含用户所在城市
-                        city_match = False
-                        for city in user_cities:
-                            if city.lower() in location_lower:
-                                city_match = True
-                                break
-                        
-                        if city_match:
-                            # 匹配用户城市，给予一个较大的距离值（排在有坐标任务之后）
-                            tasks_with_distance.append((50000.0, task, False))  # False表示无坐标但匹配城市
-                        else:
-                            # 不匹配，给予更大的距离值（排在最后）
-                            tasks_with_distance.append((999999.0, task, False))
-                
-                # 如果按距离排序，重新排序并限制距离范围
-                if sort_by in ("distance", "nearby"):
-                    # 排序：先按距离，然后按是否有坐标（有坐标优先）
-                    tasks_with_distance.sort(key=lambda x: (x[0], not x[2]))
-                    
-                    # 如果已经按城市过滤（location参数不为空），只返回同城的任务
-                    # 否则，按距离过滤
-                    if location and location not in ["全部城市", "全部", "all"]:
-                        # 已经按城市过滤：有坐标的任务按radius过滤，无坐标的同城任务保留
-                        max_km = radius_km if radius_km is not None else 999998.0
-                        nearby_tasks = [
-                            (d, t) for d, t, has_coords in tasks_with_distance
-                            if (has_coords and d <= max_km) or (not has_coords and d < 999999.0)
-                        ]
-                    else:
-                        # 没有按城市过滤，使用距离过滤
-                        # 使用前端传入的半径，默认50km
-                        max_distance_km = radius_km if radius_km is not None else 50.0
-                        nearby_tasks = [
-                            (d, t) for d, t, has_coords in tasks_with_distance
-                            if d <= max_distance_km
-                        ]
-
-                        # 如果指定半径内没有任务，放宽到2倍半径
-                        if not nearby_tasks and tasks_with_distance:
-                            fallback_km = max_distance_km * 2
-                            nearby_tasks = [
-                                (d, t) for d, t, has_coords in tasks_with_distance
-                                if d <= fallback_km
-                            ]
-
-                        # 如果还是没有，返回最近的几个任务（包括匹配城市的无坐标任务）
-                        if not nearby_tasks and tasks_with_distance:
-                            nearby_tasks = [
-                                (d, t) for d, t, has_coords in tasks_with_distance
-                                if d < 999999.0  # 排除完全不匹配的
-                            ][:min(limit * 2, 20)]  # 最多返回20个
-                    
-                    # 更新 total 为实际可以返回的任务数量（距离过滤后）
-                    total = len(nearby_tasks)
-                    
-                    # 应用分页：只返回请求的数量
-                    start_idx = skip
-                    end_idx = skip + limit
-                    tasks = [task for _, task in nearby_tasks[start_idx:end_idx]]
-                else:
-                    # 不按距离排序，只计算距离值用于显示
-                    tasks = [task for _, task, _ in tasks_with_distance]
             
             return tasks, total
         except RuntimeError as e:
@@ -1048,6 +927,24 @@ class AsyncTaskCRUD:
             logger.error(f"Error getting tasks with total: {e}")
             return [], 0
 
+    @staticmethod
+    def _task_cursor_scope(
+        sort_by: Optional[str],
+        task_type: Optional[str] = None,
+        location: Optional[str] = None,
+        status: Optional[str] = None,
+        keyword: Optional[str] = None,
+        expert_creator_id: Optional[str] = None,
+        is_multi_participant: Optional[bool] = None,
+        parent_activity_id: Optional[int] = None,
+    ) -> str:
+        """任务列表游标的作用域：排序或筛选条件变化后旧游标失效"""
+        return json.dumps(
+            ["tasks", sort_by, task_type, location, status, (keyword or "").strip(),
+             expert_creator_id, is_multi_participant, parent_activity_id],
+            ensure_ascii=False,
+        )
+
     @staticmethod
     async def get_tasks_cursor(
         db: AsyncSession,
@@ -1056,171 +953,53 @@ class AsyncTaskCRUD:
         task_type: Optional[str] = None,
         location: Optional[str] = None,
         keyword: Optional[str] = None,
-        sort_by: str = "latest",  # 只支持 latest / oldest
+        sort_by: str = "latest",
         expert_creator_id: Optional[str] = None,
         is_multi_participant: Optional[bool] = None,
         parent_activity_id: Optional[int] = None,
+        status: Optional[str] = None,
     ) -> tuple[List[models.Task], Optional[str]]:
         """
-        使用游标分页获取任务列表。
-        
-        约束：
-        - 只在 sort_by 为 "latest" / "oldest" 时使用
-        - 游标格式: "<ISO8601时间>_<id>"，例如 "2025-01-27T12:00:00Z_123"
-        """
-        from app.utils.time_utils import parse_iso_utc, format_iso_utc
-        from sqlalchemy import and_
-        
-        # 1. 仅对时间排序场景启用，其他排序请用 offset/limit
-        if sort_by not in ("latest", "oldest"):
-            raise ValueError("get_tasks_cursor 仅支持 sort_by=latest/oldest")
-        
-        # 获取当前UTC时间（用于过滤过期任务）
-        from app.utils.time_utils import get_utc_time
-        now_utc = get_utc_time()
-        
-        # 如果指定了 expert_creator_id，不过滤状态和截止日期（显示所有状态的活动）
-        if expert_creator_id:
-            query = (
-                select(models.Task)
-                .options(selectinload(models.Task.poster))
-            )
-        else:
-            query = (
-                select(models.Task)
-                .options(selectinload(models.Task.poster))
-                .where(
-                    or_(
-                        models.Task.status == "open",
-                        models.Task.status == "taken"
-                    )
-                )
-                .where(
-                    or_(
-                        models.Task.deadline > now_utc,  # 有截止日期且未过期
-                        models.Task.deadline.is_(None)  # 灵活模式（无截止日期）
-                    )
-                )
-            )
-        
-        # 内容过滤：公开列表只显示通过审核的任务（is_visible == True）
-        # 达人查看自己创建的任务时不过滤（需要看到被隐藏的内容）
-        if not expert_creator_id:
-            query = query.where(models.Task.is_visible == True)
+        使用游标（keyset）分页获取任务列表，筛选条件和排序与 get_tasks_with_total 一致。
 
-        # 筛选条件：和 /tasks 保持一致
-        if task_type and task_type not in ["全部类型", "全部", "all"]:
-            query = query.where(models.Task.task_type == task_type)
+        - 支持除距离排序外的所有排序（含关键词相关性、奖励、截止日期）
+        - 游标为 app.utils.keyset_pagination 的签名游标；空字符串表示第一页
+        - 游标不合法（篡改 / 换了筛选条件）抛 InvalidCursor
 
-        if location and location not in ["全部城市", "全部", "all"]:
-            if location.lower() == 'other':
-                # "Other" 筛选：排除所有预定义城市和 Online（支持中英文地址）
-                from sqlalchemy import not_
-                from app.utils.city_filter_utils import build_other_exclusion_filter
-                exclusion_expr = build_other_exclusion_filter(models.Task.location)
-                if exclusion_expr is not None:
-                    query = query.where(not_(exclusion_expr))
-            elif location.lower() == 'online':
-                query = query.where(models.Task.location.ilike("%online%"))
-            else:
-                # 优先走 city_canonical 索引等值；canonicalize 失败时回退 ILIKE 兼容罕见城市
-                from app.utils.city_filter_utils import (
-                    build_city_location_filter,
-                    resolve_city_canonical,
-                )
-                canonical = resolve_city_canonical(location)
-                if canonical:
-                    query = query.where(models.Task.city_canonical == canonical)
-                else:
-                    city_expr = build_city_location_filter(models.Task.location, location)
-                    if city_expr is not None:
-                        query = query.where(city_expr)
-        
-        if keyword:
-            keyword = keyword.strip()
-            from app.utils.search_expander import build_keyword_filter
-            keyword_expr = build_keyword_filter(
-                columns=[
-                    models.Task.title, models.Task.description,
-                    models.Task.title_zh, models.Task.title_en,
-                    models.Task.description_zh, models.Task.description_en,
-                    models.Task.task_type, models.Task.location,
-                ],
-                keyword=keyword,
-                use_similarity=True,
-            )
-            if keyword_expr is not None:
-                query = query.where(keyword_expr)
-        
-        # 达人创建者筛选
-        if expert_creator_id:
-            query = query.where(models.Task.expert_creator_id == expert_creator_id)
-        
-        # 多人任务筛选
-        if is_multi_participant is not None:
-            query = query.where(models.Task.is_multi_participant == is_multi_participant)
-        
-        # 活动关联筛选
-        if parent_activity_id is not None:
-            query = query.where(models.Task.parent_activity_id == parent_activity_id)
-        
-        # 2. 应用游标条件（基于 created_at + id）
-        if cursor:
-            try:
-                ts, id_str = cursor.split("_", 1)
-                cursor_time = parse_iso_utc(ts.replace("Z", "+00:00"))
-                cursor_id = int(id_str)
-                
-                if sort_by == "latest":
-                    # 向后翻页：更旧的数据
-                    query = query.where(
-                        or_(
-                            models.Task.created_at < cursor_time,
-                            and_(
-                                models.Task.created_at == cursor_time,
-                                models.Task.id < cursor_id,
-                            ),
-                        )
-                    )
-                else:
-                    # sort_by == "oldest"，向后翻页：更"新"的数据
-                    query = query.where(
-                        or_(
-                            models.Task.created_at > cursor_time,
-                            and_(
-                                models.Task.created_at == cursor_time,
-                                models.Task.id > cursor_id,
-                            ),
-                        )
-                    )
-            except Exception as e:
-                logger.warning("Invalid cursor for tasks: %s, error: %s", cursor, e)
-        
-        # 3. 排序（必须与游标条件一致）
-        if sort_by == "latest":
-            query = query.order_by(
-                models.Task.created_at.desc(), models.Task.id.desc()
-            )
-        else:  # oldest
-            query = query.order_by(
-                models.Task.created_at.asc(), models.Task.id.asc()
-            )
-        
-        # 4. 查询 limit + 1 条，用于判断是否有更多
-        result = await db.execute(query.limit(limit + 1))
-        tasks = list(result.scalars().all())
-        
-        has_more = len(tasks) > limit
-        if has_more:
-            tasks = tasks[:limit]
-        
-        # 5. 生成下一页游标
-        next_cursor = None
-        if has_more and tasks:
-            last = tasks[-1]
-            next_cursor = f"{format_iso_utc(last.created_at)}_{last.id}"
-        
-        return tasks, next_cursor
+        Returns:
+            (任务列表, 下一页游标；没有更多时为 None)
+        """
+        if sort_by in ("distance", "nearby"):
+            raise ValueError("get_tasks_cursor 不支持距离排序")
+
+        scope = AsyncTaskCRUD._task_cursor_scope(
+            sort_by, task_type, location, status, keyword,
+            expert_creator_id, is_multi_participant, parent_activity_id,
+        )
+        after: Optional[CursorState] = decode_cursor(cursor, scope) if cursor else None
+        # "新任务优先"权重按第一页的时刻计算，翻页期间顺序不变
+        as_of = after.param("as_of", get_utc_time()) if after else get_utc_time()
+
+        query, _ = AsyncTaskCRUD._task_list_base_query(
+            get_utc_time(),
+            task_type=task_type,
+            location=location,
+            status=status,
+            keyword=keyword,
+            expert_creator_id=expert_creator_id,
+            is_multi_participant=is_multi_participant,
+            parent_activity_id=parent_activity_id,
+        )
+        page = await paginate(
+            db,
+            query.options(selectinload(models.Task.poster)),
+            AsyncTaskCRUD._task_sort_keys(sort_by, keyword, as_of),
+            limit,
+            scope=scope,
+            after=after,
+            params={"as_of": as_of},
+        )
+        return page.items, page.next_cursor
 
     @staticmethod
     async def get_user_tasks(
@@ -3,6 +3,7 @@
 展示如何使用异步数据库操作
 """
 
+import asyncio
 import json
 import logging
 from typing import List, Optional
@@ -16,9 +17,11 @@ from sqlalchemy import select, and_, func, update
 from app import async_crud, models, schemas
 from app.database import check_database_health, get_pool_status
 from app.deps import get_async_db_dependency
+from app.principal_cache import Principal
 from app.csrf import csrf_cookie_bearer
 from app.security import cookie_bearer
 from app.rate_limiting import rate_limit
+from app.utils.keyset_pagination import InvalidCursor
 from app.utils.time_utils import format_iso_utc
 from app.content_filter.filter_service import check_content, create_review, create_mask_record
 
@@ -33,14 +36,15 @@ async def get_current_user_secure_async_csrf(
     request: Request,
     db: AsyncSession = Depends(get_async_db_dependency),
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(csrf_cookie_bearer),
-) -> models.User:
+) -> Principal:
     """CSRF保护的安全用户认证（异步版本）"""
     # 首先尝试使用会话认证
     from app.secure_auth import validate_session
+    from app.principal_cache import get_principal
 
-    session = validate_session(request)
+    session = await asyncio.to_thread(validate_session, request)
     if session:
-        user = await async_crud.async_user_crud.get_user_by_id(db, session.user_id)
+        user = await get_principal(db, session.user_id)
         if user:
             # 检查用户状态
             if hasattr(user, "is_suspended") and user.is_suspended:
@@ -129,23 +133,27 @@ async def get_tasks(
     获取任务列表（异步版本）
     
     分页策略：
-    - 时间排序（latest/oldest）且提供了 cursor：使用游标分页
+    - 提供了 cursor（空字符串表示第一页）且不是距离排序：使用游标（keyset）分页
     - 其他情况：使用 offset/limit + total
     """
-    # 时间排序：用游标分页
-    if sort_by in ("latest", "oldest") and cursor is not None:
-        tasks, next_cursor = await async_crud.async_task_crud.get_tasks_cursor(
-            db=db,
-            cursor=cursor,
-            limit=limit,
-            task_type=task_type,
-            location=location,
-            keyword=keyword,
-            sort_by=sort_by,
-            expert_creator_id=expert_creator_id,
-            is_multi_participant=is_multi_participant,
-            parent_activity_id=parent_activity_id,
-        )
+    # 非距离排序：用游标分页
+    if cursor is not None and sort_by not in ("distance", "nearby"):
+        try:
+            tasks, next_cursor = await async_crud.async_task_crud.get_tasks_cursor(
+                db=db,
+                cursor=cursor,
+                limit=limit,
+                task_type=task_type,
+                location=location,
+                keyword=keyword,
+                sort_by=sort_by,
+                expert_creator_id=expert_creator_id,
+                is_multi_participant=is_multi_participant,
+                parent_activity_id=parent_activity_id,
+                status=status,
+            )
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="无效的分页游标")
         
         # 任务双语标题直接从任务表列读取（title_zh, title_en）
         # 批量获取发布者会员等级（用于「会员发布」角标）
@@ -533,13 +541,8 @@ async def get_task_by_id(
 
     # view_count: Redis 累加，由 sync_task_view_counts 定时同步到 DB
     try:
-        from app.redis_cache import get_redis_client
-        _rc = get_redis_client()
-        if _rc:
-            _rk = f"task:view_count:{task_id}"
-            _rc.incr(_rk)
-            _rc.expire(_rk, 7 * 24 * 3600)
-        else:
+        from app.services.view_counts import get_view_count_overlay
+        if await get_view_count_overlay().aincr("task", task_id) is None:
             def _bg_view_count(t_id: int):
                 from app.database import SessionLocal
                 bg_db = SessionLocal()
@@ -7,6 +7,7 @@ import json
 import logging
 from functools import wraps
 from typing import Any, Callable, Optional
+from app.redis_async import async_redis_cache
 from app.redis_cache import get_redis_client
 
 logger = logging.getLogger(__name__)
@@ -35,6 +36,20 @@ def _convert_to_serializable(obj: Any) -> Any:
     return obj
 
 
+def _build_cache_key(key_prefix: str, func: Callable, kwargs: dict) -> str:
+    """按函数名和参数生成缓存键（忽略 request/db，current_user 只取 id）"""
+    cache_params = {}
+    for k, v in kwargs.items():
+        if k in ('request', 'db') or k.startswith('_'):
+            continue
+        if k == 'current_user':
+            cache_params['_uid'] = getattr(v, 'id', None) if v else None
+            continue
+        cache_params[k] = v
+    params_str = json.dumps(cache_params, sort_keys=True, default=str)
+    return f"{key_prefix}:{func.__name__}:{hashlib.md5(params_str.encode()).hexdigest()}"
+
+
 def cache_response(ttl: int = 300, key_prefix: str = "cache"):
     """
     API响应缓存装饰器
@@ -51,24 +66,15 @@ def cache_response(ttl: int = 300, key_prefix: str = "cache"):
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            redis_client = get_redis_client()
-            if not redis_client:
+            # async 路由使用异步客户端，缓存读写不阻塞事件循环
+            if async_redis_cache.client() is None:
                 return await func(*args, **kwargs)
             
             try:
-                cache_params = {}
-                for k, v in kwargs.items():
-                    if k in ('request', 'db') or k.startswith('_'):
-                        continue
-                    if k == 'current_user':
-                        cache_params['_uid'] = getattr(v, 'id', None) if v else None
-                        continue
-                    cache_params[k] = v
-                params_str = json.dumps(cache_params, sort_keys=True, default=str)
-                cache_key = f"{key_prefix}:{func.__name__}:{hashlib.md5(params_str.encode()).hexdigest()}"
+                cache_key = _build_cache_key(key_prefix, func, kwargs)
                 
                 # 尝试从缓存获取
-                cached = redis_client.get(cache_key)
+                cached = await async_redis_cache.get_raw(cache_key)
                 if cached:
                     try:
                         cached_data = json.loads(cached)
@@ -76,32 +82,33 @@ def cache_response(ttl: int = 300, key_prefix: str = "cache"):
                         if isinstance(cached_data, str):
                             # 旧格式的缓存（字符串），清除它
                             logger.warning(f"检测到旧格式缓存（字符串），已清除: {cache_key}")
-                            redis_client.delete(cache_key)
+                            await async_redis_cache.delete(cache_key)
                         else:
                             logger.debug(f"缓存命中: {cache_key}")
                             return cached_data
                     except json.JSONDecodeError:
                         logger.warning(f"缓存数据格式错误，已清除: {cache_key}")
-                        redis_client.delete(cache_key)
-                
-                # 执行函数
-                result = await func(*args, **kwargs)
-                
-                # 存储到缓存（只缓存可序列化的结果）
-                try:
-                    # 将 Pydantic 模型转换为字典
-                    serializable_result = _convert_to_serializable(result)
-                    result_str = json.dumps(serializable_result, default=str)
-                    redis_client.setex(cache_key, ttl, result_str)
-                    logger.debug(f"缓存已设置: {cache_key}, TTL: {ttl}秒")
-                except (TypeError, ValueError) as e:
-                    logger.warning(f"无法缓存结果（不可序列化）: {cache_key}, 错误: {e}")
-                
-                return result
+                        await async_redis_cache.delete(cache_key)
             except Exception as e:
                 logger.error(f"缓存操作失败: {e}", exc_info=True)
                 # 缓存失败不影响主功能，直接执行函数
                 return await func(*args, **kwargs)
+            
+            # 执行函数（只执行一次：缓存写入失败不会重复执行）
+            result = await func(*args, **kwargs)
+            
+            # 存储到缓存（只缓存可序列化的结果）
+            try:
+                # 将 Pydantic 模型转换为字典
+                serializable_result = _convert_to_serializable(result)
+                result_str = json.dumps(serializable_result, default=str)
+                # 以 bytes 原样写入，与同步路径写入的 JSON 文本一致（由 get_raw + json.loads 读取）
+                await async_redis_cache.setex(cache_key, ttl, result_str.encode("utf-8"))
+                logger.debug(f"缓存已设置: {cache_key}, TTL: {ttl}秒")
+            except (TypeError, ValueError) as e:
+                logger.warning(f"无法缓存结果（不可序列化）: {cache_key}, 错误: {e}")
+            
+            return result
         
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
@@ -110,16 +117,7 @@ def cache_response(ttl: int = 300, key_prefix: str = "cache"):
                 return func(*args, **kwargs)
             
             try:
-                cache_params = {}
-                for k, v in kwargs.items():
-                    if k in ('request', 'db') or k.startswith('_'):
-                        continue
-                    if k == 'current_user':
-                        cache_params['_uid'] = getattr(v, 'id', None) if v else None
-                        continue
-                    cache_params[k] = v
-                params_str = json.dumps(cache_params, sort_keys=True, default=str)
-                cache_key = f"{key_prefix}:{func.__name__}:{hashlib.md5(params_str.encode()).hexdigest()}"
+                cache_key = _build_cache_key(key_prefix, func, kwargs)
                 
                 # 尝试从缓存获取
                 cached = redis_client.get(cache_key)
@@ -198,3 +196,16 @@ def clear_all_cache(key_prefix: str = "cache"):
         key_prefix: 缓存键前缀
     """
     invalidate_cache(f"{key_prefix}:*")
+
+
+async def invalidate_cache_async(pattern: str) -> int:
+    """
+    使缓存失效（异步版本，供 async 路由使用）
+    
+    Usage:
+        await invalidate_cache_async("cache:get_tasks:*")
+    """
+    deleted = await async_redis_cache.delete_pattern(pattern)
+    if deleted > 0:
+        logger.info(f"已清除缓存: {deleted} 个键匹配模式 {pattern}")
+    return deleted
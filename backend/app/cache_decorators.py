@@ -3,6 +3,7 @@
 使用 orjson 进行高性能序列化，支持版本号命名空间避免通配符删除
 """
 import logging
+import time
 from functools import wraps
 from typing import Callable, Any, Optional
 import orjson
@@ -17,6 +18,14 @@ logger = logging.getLogger(__name__)
 CACHE_VERSION = "v4"
 
 
+def _record_cache_latency(cache_name: str, duration: float):
+    try:
+        from app.performance_metrics import performance_metrics
+        performance_metrics.record_cache(cache_name, duration)
+    except Exception:
+        pass
+
+
 def cache_task_detail_sync(ttl: int = 300):
     """同步函数缓存装饰器 - 只缓存 Pydantic model
     
@@ -170,30 +179,22 @@ def cache_task_detail_async(ttl: int = 300):
                     task_id = args[0]
                 return await func(*args, **kwargs)
             
-            # 使用 redis>=4 的 redis.asyncio 接口（推荐）
-            # ⚠️ 注意：aioredis 已并入 redis-py，使用 redis>=4 的 redis.asyncio
-            try:
-                import redis.asyncio as aioredis
-                from app.config import get_settings
-                
-                settings = get_settings()
-                redis_url = settings.REDIS_URL or f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
-            except Exception as e:
-                logger.warning(f"获取 Redis 配置失败: {e}")
-                redis_url = None
+            # 共享的异步连接池（redis.asyncio），不再每次请求新建连接
+            from app.redis_async import get_async_redis_client
+            redis_client = get_async_redis_client()
             
             cache_key = f"task:{CACHE_VERSION}:detail:{task_id}"
             
-            if redis_url:
+            if redis_client:
                 try:
-                    # 使用上下文管理器确保连接正确关闭
-                    async with aioredis.from_url(redis_url, decode_responses=False) as redis_client:
-                        # 异步获取缓存
-                        cached = await redis_client.get(cache_key)
-                        if cached:
-                            cached_dict = orjson.loads(cached)
-                            from app import schemas
-                            return schemas.TaskOut(**cached_dict)
+                    # 异步获取缓存
+                    started = time.perf_counter()
+                    cached = await redis_client.get(cache_key)
+                    _record_cache_latency("task_detail", time.perf_counter() - started)
+                    if cached:
+                        cached_dict = orjson.loads(cached)
+                        from app import schemas
+                        return schemas.TaskOut(**cached_dict)
                 except Exception as e:
                     logger.warning(f"缓存反序列化失败: {e}")
             
@@ -266,14 +267,12 @@ def cache_task_detail_async(ttl: int = 300):
                             else:
                                 cache_data = result
                     
-                    # 使用上下文管理器重新创建客户端用于写入
-                    async with aioredis.from_url(redis_url, decode_responses=False) as redis_client:
-                        # 异步写入缓存
-                        await redis_client.setex(
-                            cache_key,
-                            ttl,
-                            orjson.dumps(cache_data)
-                        )
+                    # 异步写入缓存
+                    await redis_client.setex(
+                        cache_key,
+                        ttl,
+                        orjson.dumps(cache_data)
+                    )
                 except Exception as e:
                     logger.warning(f"缓存写入失败: {e}")
             
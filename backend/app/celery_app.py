@@ -258,6 +258,18 @@ celery_app.conf.beat_schedule = {
         'schedule': 300.0,  # 5分钟
     },
     
+    # 重算论坛热门排行（时间衰减）- 每10分钟执行一次
+    'rescore-forum-hot-ranking': {
+        'task': 'app.celery_tasks.rescore_forum_hot_ranking_task',
+        'schedule': 600.0,  # 10分钟
+    },
+    
+    # 合并论坛作者计数桶（排行榜预聚合）- 每天凌晨3点30分
+    'compact-forum-author-stats': {
+        'task': 'app.celery_tasks.compact_forum_author_stats_task',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    
     # 同步任务浏览数 - 每5分钟执行一次
     'sync-task-view-counts': {
         'task': 'app.celery_tasks.sync_task_view_counts_task',
@@ -277,6 +289,12 @@ celery_app.conf.beat_schedule = {
         'task': 'app.recommendation_tasks.update_popular_tasks_task',
         'schedule': 1800.0,  # 30分钟
     },
+
+    # 预计算周活跃用户推荐 - 每1小时按分片分发到各 worker
+    'precompute-recommendations': {
+        'task': 'app.recommendation_tasks.precompute_recommendations_batch_task',
+        'schedule': 3600.0,  # 1小时
+    },
     
     # ========== 低频任务（每10分钟）==========
     
@@ -519,198 +519,101 @@ if CELERY_AVAILABLE:
     )
     def sync_forum_view_counts_task(self):
         """同步论坛帖子浏览数从 Redis 到数据库 - Celery任务包装（每5分钟执行）"""
-        logger.info("🔄 开始执行同步论坛浏览量任务")
+        def _refresh_hot_ranking(post_ids):
+            # 浏览数变化后刷新热门排行分数（批量 UPDATE 不触发 ORM 钩子）
+            from app.services.forum_hot_ranking import get_forum_hot_ranking
+            get_forum_hot_ranking().refresh_posts(post_ids)
+
+        return _sync_view_counts_generic(
+            entity="forum_post",
+            lock_key='forum:sync_view_counts:lock',
+            self_task=self,
+            task_name='sync_forum_view_counts_task',
+            on_synced=_refresh_hot_ranking,
+        )
+
+    @celery_app.task(
+        name='app.celery_tasks.rescore_forum_hot_ranking_task',
+        bind=True,
+        max_retries=1,
+        default_retry_delay=120
+    )
+    def rescore_forum_hot_ranking_task(self):
+        """重算论坛热门排行头部分数（时间衰减）- Celery任务包装（每10分钟执行）"""
         start_time = time.time()
-        task_name = 'sync_forum_view_counts_task'
-        lock_key = 'forum:sync_view_counts:lock'
-        
-        # 获取分布式锁，防止多实例重复执行
-        if not get_redis_distributed_lock(lock_key, lock_ttl=600):  # 锁10分钟
-            logger.warning("⚠️ 同步论坛浏览数任务已在其他实例执行，跳过本次执行")
+        task_name = 'rescore_forum_hot_ranking_task'
+        lock_key = 'forum:hot_ranking:rescore:lock'
+
+        if not get_redis_distributed_lock(lock_key, lock_ttl=600):
+            logger.warning("⚠️ 论坛热门排行重算任务已在其他实例执行，跳过本次执行")
             return {"status": "skipped", "message": "Task already running in another instance"}
-        
+
         try:
-            from app.redis_cache import get_redis_client
-            from app.database import SessionLocal
-            from app.models import ForumPost
-            from sqlalchemy import update
-            
-            redis_client = get_redis_client()
-            if not redis_client:
-                logger.warning("Redis 不可用，无法同步论坛浏览数")
-                return {"status": "skipped", "message": "Redis not available"}
-            
-            db = SessionLocal()
-            try:
-                # 获取所有论坛浏览数的 Redis key（使用 SCAN 替代 KEYS）
-                from app.redis_utils import scan_keys
-                pattern = "forum:post:view_count:*"
-                keys = scan_keys(redis_client, pattern)
-                
-                if not keys:
-                    logger.info("ℹ️ 没有需要同步的论坛浏览数（Redis 中没有 forum:post:view_count:* keys）")
-                    return {"status": "success", "message": "No view counts to sync", "synced_count": 0}
-                
-                synced_count = 0
-                failed_count = 0
-                synced_keys = []  # 记录成功同步的 keys，用于后续删除
-                
-                for key in keys:
-                    try:
-                        # 处理 bytes 类型的 key（Redis 二进制模式）
-                        if isinstance(key, bytes):
-                            key_str = key.decode('utf-8')
-                        else:
-                            key_str = str(key)
-                        
-                        # 从 key 中提取 post_id
-                        post_id = int(key_str.split(":")[-1])
-                        
-                        # 获取 Redis 中的增量
-                        redis_increment = redis_client.get(key)
-                        if redis_increment:
-                            # 处理 bytes 类型的值
-                            if isinstance(redis_increment, bytes):
-                                increment = int(redis_increment.decode('utf-8'))
-                            else:
-                                increment = int(redis_increment)
-                            
-                            if increment > 0:
-                                # 更新数据库中的浏览数
-                                db.execute(
-                                    update(ForumPost)
-                                    .where(ForumPost.id == post_id)
-                                    .values(view_count=ForumPost.view_count + increment)
-                                )
-                                synced_count += 1
-                                synced_keys.append(key)  # 记录成功同步的 key
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"处理浏览数 key {key} 时出错: {e}")
-                        failed_count += 1
-                        continue
-                    except Exception as e:
-                        logger.error(f"同步帖子 {key} 浏览数失败: {e}")
-                        failed_count += 1
-                        continue
-                
-                # 先提交数据库事务
-                db.commit()
-                
-                # 数据库提交成功后，删除已同步的 Redis keys
-                deleted_count = 0
-                for key in synced_keys:
-                    try:
-                        redis_client.delete(key)
-                        deleted_count += 1
-                    except Exception as e:
-                        logger.warning(f"删除 Redis key {key} 失败: {e}")
-                        # 继续处理其他 key
-                
-                duration = time.time() - start_time
-                if failed_count > 0:
-                    logger.warning(f"✅ 同步论坛浏览数完成，同步了 {synced_count} 个帖子，失败 {failed_count} 个 (耗时: {duration:.2f}秒)")
-                else:
-                    logger.info(f"✅ 同步论坛浏览数完成，同步了 {synced_count} 个帖子 (耗时: {duration:.2f}秒)")
-                _record_task_metrics(task_name, "success", duration)
-                return {
-                    "status": "success", 
-                    "message": f"Synced {synced_count} post view counts", 
-                    "synced_count": synced_count,
-                    "failed_count": failed_count,
-                    "deleted_keys": deleted_count
-                }
-            finally:
-                db.close()
-                # 释放分布式锁
-                release_redis_distributed_lock(lock_key)
+            from app.services.forum_hot_ranking import get_forum_hot_ranking
+            rescored = get_forum_hot_ranking().rescore()
+            duration = time.time() - start_time
+            logger.info(f"论坛热门排行重算完成，{rescored} 个帖子 (耗时: {duration:.2f}秒)")
+            _record_task_metrics(task_name, "success", duration)
+            return {"status": "success", "rescored": rescored}
         except Exception as e:
             duration = time.time() - start_time
-            logger.error(f"同步论坛浏览数失败: {e}", exc_info=True)
+            logger.error(f"论坛热门排行重算失败: {e}", exc_info=True)
             _record_task_metrics(task_name, "error", duration)
-            # 释放分布式锁
-            release_redis_distributed_lock(lock_key)
             if self.request.retries < self.max_retries:
-                logger.info(f"任务将重试 ({self.request.retries + 1}/{self.max_retries})")
                 raise self.retry(exc=e)
             raise
+        finally:
+            release_redis_distributed_lock(lock_key)
 
     @celery_app.task(
-        name='app.celery_tasks.sync_task_view_counts_task',
+        name='app.celery_tasks.compact_forum_author_stats_task',
         bind=True,
         max_retries=2,
-        default_retry_delay=300
+        default_retry_delay=600
     )
-    def sync_task_view_counts_task(self):
-        """同步任务浏览数从 Redis 到数据库 - Celery任务包装（每5分钟执行）"""
-        logger.info("🔄 开始执行同步任务浏览量任务")
+    def compact_forum_author_stats_task(self):
+        """合并论坛作者计数桶（超出排行周期的日桶折叠进汇总桶）- Celery任务包装（每天执行）"""
         start_time = time.time()
-        task_name = 'sync_task_view_counts_task'
-        lock_key = 'task:sync_view_counts:lock'
+        task_name = 'compact_forum_author_stats_task'
+        lock_key = 'forum:author_stats:compact:lock'
 
-        if not get_redis_distributed_lock(lock_key, lock_ttl=600):
-            logger.warning("⚠️ 同步任务浏览数已在其他实例执行，跳过")
-            return {"status": "skipped"}
+        if not get_redis_distributed_lock(lock_key, lock_ttl=1800):
+            logger.warning("⚠️ 论坛作者计数桶合并任务已在其他实例执行，跳过本次执行")
+            return {"status": "skipped", "message": "Task already running in another instance"}
 
+        db = SessionLocal()
         try:
-            from app.redis_cache import get_redis_client
-            from app.database import SessionLocal
-            from app.models import Task
-            from sqlalchemy import update
-
-            redis_client = get_redis_client()
-            if not redis_client:
-                return {"status": "skipped", "message": "Redis not available"}
-
-            db = SessionLocal()
-            try:
-                from app.redis_utils import scan_keys
-                keys = scan_keys(redis_client, "task:view_count:*")
-                if not keys:
-                    return {"status": "success", "synced_count": 0}
-
-                synced_count = 0
-                synced_keys = []
-                for key in keys:
-                    try:
-                        key_str = key.decode('utf-8') if isinstance(key, bytes) else str(key)
-                        task_id = int(key_str.split(":")[-1])
-                        raw = redis_client.get(key)
-                        if raw:
-                            increment = int(raw.decode('utf-8') if isinstance(raw, bytes) else raw)
-                            if increment > 0:
-                                db.execute(
-                                    update(Task)
-                                    .where(Task.id == task_id)
-                                    .values(view_count=Task.view_count + increment)
-                                )
-                                synced_count += 1
-                                synced_keys.append(key)
-                    except Exception as e:
-                        logger.warning(f"同步任务浏览数 key {key} 失败: {e}")
-
-                db.commit()
-
-                for key in synced_keys:
-                    try:
-                        redis_client.delete(key)
-                    except Exception:
-                        pass
-
-                duration = time.time() - start_time
-                logger.info(f"✅ 同步任务浏览数完成，同步了 {synced_count} 个任务 (耗时: {duration:.2f}秒)")
-                _record_task_metrics(task_name, "success", duration)
-                return {"status": "success", "synced_count": synced_count}
-            finally:
-                db.close()
-                release_redis_distributed_lock(lock_key)
+            from app.services.forum_author_stats import compact
+            compacted = compact(db)
+            duration = time.time() - start_time
+            _record_task_metrics(task_name, "success", duration)
+            return {"status": "success", "compacted": compacted}
         except Exception as e:
+            db.rollback()
             duration = time.time() - start_time
-            logger.error(f"同步任务浏览数失败: {e}", exc_info=True)
+            logger.error(f"论坛作者计数桶合并失败: {e}", exc_info=True)
             _record_task_metrics(task_name, "error", duration)
-            release_redis_distributed_lock(lock_key)
             if self.request.retries < self.max_retries:
                 raise self.retry(exc=e)
             raise
+        finally:
+            db.close()
+            release_redis_distributed_lock(lock_key)
+
+    @celery_app.task(
+        name='app.celery_tasks.sync_task_view_counts_task',
+        bind=True,
+        max_retries=2,
+        default_retry_delay=300
+    )
+    def sync_task_view_counts_task(self):
+        """同步任务浏览数从 Redis 到数据库 - Celery任务包装（每5分钟执行）"""
+        return _sync_view_counts_generic(
+            entity="task",
+            lock_key='task:sync_view_counts:lock',
+            self_task=self,
+            task_name='sync_task_view_counts_task',
+        )
 
     @celery_app.task(
         name='app.celery_tasks.sync_leaderboard_view_counts_task',
@@ -720,120 +623,12 @@ if CELERY_AVAILABLE:
     )
     def sync_leaderboard_view_counts_task(self):
         """同步榜单浏览数从 Redis 到数据库 - Celery任务包装（每5分钟执行）"""
-        logger.info("🔄 开始执行同步榜单浏览量任务")
-        start_time = time.time()
-        task_name = 'sync_leaderboard_view_counts_task'
-        lock_key = 'leaderboard:sync_view_counts:lock'
-        
-        # 获取分布式锁，防止多实例重复执行
-        if not get_redis_distributed_lock(lock_key, lock_ttl=600):  # 锁10分钟
-            logger.warning("⚠️ 同步榜单浏览数任务已在其他实例执行，跳过本次执行")
-            return {"status": "skipped", "message": "Task already running in another instance"}
-        
-        try:
-            from app.redis_cache import get_redis_client
-            from app.database import SessionLocal
-            from app.models import CustomLeaderboard
-            from sqlalchemy import update
-            
-            redis_client = get_redis_client()
-            if not redis_client:
-                logger.warning("Redis 不可用，无法同步榜单浏览数")
-                return {"status": "skipped", "message": "Redis not available"}
-            
-            db = SessionLocal()
-            try:
-                # 获取所有榜单浏览数的 Redis key（使用 SCAN 替代 KEYS）
-                from app.redis_utils import scan_keys
-                pattern = "leaderboard:view_count:*"
-                keys = scan_keys(redis_client, pattern)
-                
-                if not keys:
-                    logger.info("ℹ️ 没有需要同步的榜单浏览数（Redis 中没有 leaderboard:view_count:* keys）")
-                    return {"status": "success", "message": "No view counts to sync", "synced_count": 0}
-                
-                synced_count = 0
-                failed_count = 0
-                synced_keys = []  # 记录成功同步的 keys，用于后续删除
-                
-                for key in keys:
-                    try:
-                        # 处理 bytes 类型的 key（Redis 二进制模式）
-                        if isinstance(key, bytes):
-                            key_str = key.decode('utf-8')
-                        else:
-                            key_str = str(key)
-                        
-                        # 从 key 中提取 leaderboard_id
-                        leaderboard_id = int(key_str.split(":")[-1])
-                        
-                        # 获取 Redis 中的增量
-                        redis_increment = redis_client.get(key)
-                        if redis_increment:
-                            # 处理 bytes 类型的值
-                            if isinstance(redis_increment, bytes):
-                                increment = int(redis_increment.decode('utf-8'))
-                            else:
-                                increment = int(redis_increment)
-                            
-                            if increment > 0:
-                                # 更新数据库中的浏览数
-                                db.execute(
-                                    update(CustomLeaderboard)
-                                    .where(CustomLeaderboard.id == leaderboard_id)
-                                    .values(view_count=CustomLeaderboard.view_count + increment)
-                                )
-                                synced_count += 1
-                                synced_keys.append(key)  # 记录成功同步的 key
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"处理榜单浏览数 key {key} 时出错: {e}")
-                        failed_count += 1
-                        continue
-                    except Exception as e:
-                        logger.error(f"同步榜单 {key} 浏览数失败: {e}")
-                        failed_count += 1
-                        continue
-                
-                # 先提交数据库事务
-                db.commit()
-                
-                # 数据库提交成功后，删除已同步的 Redis keys
-                deleted_count = 0
-                for key in synced_keys:
-                    try:
-                        redis_client.delete(key)
-                        deleted_count += 1
-                    except Exception as e:
-                        logger.warning(f"删除 Redis key {key} 失败: {e}")
-                        # 继续处理其他 key
-                
-                duration = time.time() - start_time
-                if failed_count > 0:
-                    logger.warning(f"✅ 同步榜单浏览数完成，同步了 {synced_count} 个榜单，失败 {failed_count} 个 (耗时: {duration:.2f}秒)")
-                else:
-                    logger.info(f"✅ 同步榜单浏览数完成，同步了 {synced_count} 个榜单 (耗时: {duration:.2f}秒)")
-                _record_task_metrics(task_name, "success", duration)
-                return {
-                    "status": "success", 
-                    "message": f"Synced {synced_count} leaderboard view counts", 
-                    "synced_count": synced_count,
-                    "failed_count": failed_count,
-                    "deleted_keys": deleted_count
-                }
-            finally:
-                db.close()
-                # 释放分布式锁
-                release_redis_distributed_lock(lock_key)
-        except Exception as e:
-            duration = time.time() - start_time
-            logger.error(f"同步榜单浏览数任务失败: {e}", exc_info=True)
-            _record_task_metrics(task_name, "error", duration)
-            # 释放分布式锁
-            release_redis_distributed_lock(lock_key)
-            if self.request.retries < self.max_retries:
-                logger.info(f"任务将重试 ({self.request.retries + 1}/{self.max_retries})")
-                raise self.retry(exc=e)
-            raise
+        return _sync_view_counts_generic(
+            entity="leaderboard",
+            lock_key='leaderboard:sync_view_counts:lock',
+            self_task=self,
+            task_name='sync_leaderboard_view_counts_task',
+        )
 
     @celery_app.task(
         name='app.celery_tasks.check_expired_vip_subscriptions_task',
@@ -1257,74 +1052,33 @@ if CELERY_AVAILABLE:
     # ═══════════════════════════════════════════════════════════════════
     # 通用 Redis → DB 浏览数同步辅助函数（DECRBY 模式，防数据丢失）
     # ═══════════════════════════════════════════════════════════════════
-    def _sync_view_counts_generic(model_class, key_pattern: str, entity_name: str, lock_key: str, self_task):
+    def _sync_view_counts_generic(entity: str, lock_key: str, self_task, task_name: str = None, on_synced=None):
         """
-        通用浏览数同步：Redis 增量 → DB view_count，使用 DECRBY 而非 DELETE。
+        通用浏览数同步：Redis 增量哈希 → DB view_count（见 app.services.view_counts）。
         """
         if not get_redis_distributed_lock(lock_key, lock_ttl=600):
             return {"status": "skipped", "message": "Task already running"}
 
         start_time = time.time()
-        task_name = f'sync_{entity_name}_view_counts_task'
+        task_name = task_name or f'sync_{entity}_view_counts_task'
         try:
-            from app.redis_cache import get_redis_client
-            from app.redis_utils import scan_keys
-            from sqlalchemy import update
-
-            redis_client = get_redis_client()
-            if not redis_client:
-                return {"status": "skipped", "message": "Redis not available"}
-
-            keys = scan_keys(redis_client, key_pattern)
-            if not keys:
-                return {"status": "success", "synced_count": 0}
+            from app.services.view_counts import get_view_count_overlay
 
             db = SessionLocal()
             try:
-                synced_count = 0
-                increments = []
-                for key in keys:
-                    try:
-                        key_str = key.decode('utf-8') if isinstance(key, bytes) else str(key)
-                        entity_id = int(key_str.split(":")[-1])
-                        raw = redis_client.get(key)
-                        if raw:
-                            increment = int(raw.decode('utf-8') if isinstance(raw, bytes) else raw)
-                            if increment > 0:
-                                increments.append((key, entity_id, increment))
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"处理{entity_name}浏览数 key {key} 时出错: {e}")
-                        continue
-
-                for key, entity_id, increment in increments:
-                    db.execute(
-                        update(model_class)
-                        .where(model_class.id == entity_id)
-                        .values(view_count=model_class.view_count + increment)
-                    )
-                    synced_count += 1
-
-                db.commit()
-
-                # DECRBY 减去已同步增量，剩余 <=0 则删 key
-                for key, entity_id, increment in increments:
-                    try:
-                        remaining = redis_client.decrby(key, increment)
-                        if remaining is not None and remaining <= 0:
-                            redis_client.delete(key)
-                    except Exception:
-                        pass
-
-                duration = time.time() - start_time
-                _record_task_metrics(task_name, "success", duration)
-                if synced_count > 0:
-                    logger.info(f"同步{entity_name}浏览数完成，同步了 {synced_count} 个 (耗时: {duration:.2f}秒)")
-                return {"status": "success", "synced_count": synced_count}
+                synced_count = get_view_count_overlay().flush(entity, db, on_synced=on_synced)
+            except Exception:
+                db.rollback()
+                raise
             finally:
                 db.close()
+
+            duration = time.time() - start_time
+            _record_task_metrics(task_name, "success", duration)
+            return {"status": "success", "synced_count": synced_count}
         except Exception as e:
             duration = time.time() - start_time
-            logger.error(f"同步{entity_name}浏览数失败: {e}", exc_info=True)
+            logger.error(f"同步{entity}浏览数失败: {e}", exc_info=True)
             _record_task_metrics(task_name, "error", duration)
             if self_task.request.retries < self_task.max_retries:
                 raise self_task.retry(exc=e)
@@ -1440,11 +1194,8 @@ if CELERY_AVAILABLE:
     @celery_app.task(name='app.celery_tasks.sync_activity_view_counts_task', bind=True, max_retries=2, default_retry_delay=300)
     def sync_activity_view_counts_task(self):
         """同步活动浏览数从 Redis 到数据库 - 每5分钟"""
-        from app.models import Activity
         return _sync_view_counts_generic(
-            model_class=Activity,
-            key_pattern="activity:view_count:*",
-            entity_name="activity",
+            entity="activity",
             lock_key='activity:sync_view_counts:lock',
             self_task=self,
         )
@@ -1453,11 +1204,8 @@ if CELERY_AVAILABLE:
     @celery_app.task(name='app.celery_tasks.sync_forum_category_view_counts_task', bind=True, max_retries=2, default_retry_delay=300)
     def sync_forum_category_view_counts_task(self):
         """同步论坛分类浏览数从 Redis 到数据库 - 每5分钟"""
-        from app.models import ForumCategory
         return _sync_view_counts_generic(
-            model_class=ForumCategory,
-            key_pattern="forum:category:view_count:*",
-            entity_name="forum_category",
+            entity="forum_category",
             lock_key='forum_category:sync_view_counts:lock',
             self_task=self,
         )
@@ -1466,11 +1214,8 @@ if CELERY_AVAILABLE:
     @celery_app.task(name='app.celery_tasks.sync_flea_market_view_counts_task', bind=True, max_retries=2, default_retry_delay=300)
     def sync_flea_market_view_counts_task(self):
         """同步跳蚤市场浏览数从 Redis 到数据库 - 每5分钟"""
-        from app.models import FleaMarketItem
         return _sync_view_counts_generic(
-            model_class=FleaMarketItem,
-            key_pattern="flea_market:view_count:*",
-            entity_name="flea_market",
+            entity="flea_market",
             lock_key='flea_market:sync_view_counts:lock',
             self_task=self,
         )
@@ -1479,11 +1224,8 @@ if CELERY_AVAILABLE:
     @celery_app.task(name='app.celery_tasks.sync_service_view_counts_task', bind=True, max_retries=2, default_retry_delay=300)
     def sync_service_view_counts_task(self):
         """同步服务浏览数从 Redis 到数据库 - 每5分钟"""
-        from app.models import TaskExpertService
         return _sync_view_counts_generic(
-            model_class=TaskExpertService,
-            key_pattern="service:view_count:*",
-            entity_name="service",
+            entity="service",
             lock_key='service:sync_view_counts:lock',
             self_task=self,
         )
@@ -78,7 +78,8 @@ class CleanupTasks:
         self.last_flea_cleanup_date = None
         self.last_forum_cleanup_date = None  # 已删除帖子文件：同日一次
         self.last_orphan_files_cleanup_date = None  # 孤立文件：同日一次
-        self.last_orphan_entity_cleanup_date = None  # 孤儿实体目录：同日一次（与 orphan_files 独立）
+        self.last_orphan_entity_cleanup_date = None  # 孤儿实体目录全量扫描：每 N 天一次（与 orphan_files 独立）
+        self.storage_manifest_cursor = 0  # 存储清单抽样对账游标
         self.last_old_format_cleanup_date = None  # 旧格式图：同日一次（与 orphan_files 独立）
     
     async def start_cleanup_tasks(self):
@@ -120,7 +121,9 @@ class CleanupTasks:
             await self._cleanup_deleted_forum_posts_files()
             # 清理孤立文件（每周检查一次）
             await self._cleanup_orphan_files()
-            # 清理不存在实体的图片文件夹（每周检查一次）
+            # 按存储清单增量清理已删除实体的文件（每轮执行，只处理新标记的孤儿）
+            await self._cleanup_storage_manifest_orphans()
+            # 清理不存在实体的图片文件夹（全量扫描兜底，清单之外的历史文件，每周检查一次）
             await self._cleanup_orphan_entity_images()
             # 清理空目录（释放 inode，减轻小卷压力）
             await self._cleanup_empty_dirs()
@@ -359,23 +362,23 @@ class CleanupTasks:
                     max_files_per_run = _env_int("CLEANUP_MAX_FILES_TEMP", 1000) * (2 if is_low else 1)
                     cutoff_time = get_utc_time() - timedelta(hours=temp_hours)
                     
-                    # 清理任务临时图片：列出所有临时文件及其元数据
+                    # 清理任务临时图片：分页列出临时文件及其元数据（每页在线程中获取，不阻塞事件循环）
                     try:
-                        all_files_metadata = storage.list_files_with_metadata(ImageCategory.TASK.value)
-                        temp_files_to_delete = []  # [(last_modified, file_key)]
+                        temp_files_to_delete = []  # [(last_modified, file_key, size)]
                         
-                        for file_meta in all_files_metadata:
-                            file_key = file_meta['key']
-                            if '/temp_' in file_key:
+                        async for page in storage.alist_files_with_metadata(ImageCategory.TASK.value):
+                            for file_meta in page:
+                                file_key = file_meta['key']
+                                if '/temp_' not in file_key:
+                                    continue
                                 # 检查文件年龄
                                 last_modified = file_meta['last_modified']
                                 # boto3 返回的是 datetime 对象（可能是 timezone-aware）
                                 # 需要转换为 UTC 时间进行比较
                                 if hasattr(last_modified, 'replace'):
-                                    # datetime 对象，确保是 UTC
+                                    from datetime import timezone
                                     if last_modified.tzinfo is None:
                                         # 如果没有时区信息，假设是 UTC
-                                        from datetime import timezone
                                         last_modified = last_modified.replace(tzinfo=timezone.utc)
                                     else:
                                         # 转换为 UTC
@@ -388,7 +391,7 @@ class CleanupTasks:
                                         continue
                                 
                                 if last_modified < cutoff_time:
-                                    temp_files_to_delete.append((last_modified, file_key))
+                                    temp_files_to_delete.append((last_modified, file_key, file_meta.get('size') or 0))
                         
                         # 按时间排序，优先删除最旧的
                         temp_files_to_delete.sort(key=lambda x: x[0])
@@ -396,49 +399,15 @@ class CleanupTasks:
                         # 限制本次处理的文件数量
                         temp_files_to_delete = temp_files_to_delete[:max_files_per_run]
                         
-                        # 删除文件
-                        for _, file_key in temp_files_to_delete:
-                            try:
-                                # 获取文件大小（用于统计）
-                                file_size = storage.get_file_size(file_key) or 0
-                                if storage.delete(file_key):
-                                    cleaned_count += 1
-                                    cloud_cleaned_count += 1
-                                    cloud_bytes_freed += file_size
-                                    if cleaned_count % 100 == 0:
-                                        logger.debug(f"已清理 {cleaned_count} 个临时图片（云存储）...")
-                            except Exception as e:
-                                logger.warning(f"删除临时图片失败（云存储）{file_key}: {e}")
-                        
-                        # 清理空的临时目录（通过检查是否还有文件）
-                        if cleaned_count > 0:
-                            # 重新列出文件，检查哪些临时目录已为空
-                            remaining_files = storage.list_files(ImageCategory.TASK.value)
-                            temp_user_ids = set()
-                            for file_key in remaining_files:
-                                if '/temp_' in file_key:
-                                    parts = file_key.split('/temp_')
-                                    if len(parts) > 1:
-                                        user_id = parts[1].split('/')[0]
-                                        temp_user_ids.add(user_id)
-                            
-                            # 找出已清空的临时目录并删除
-                            all_temp_user_ids = set()
-                            for file_meta in all_files_metadata:
-                                file_key = file_meta['key']
-                                if '/temp_' in file_key:
-                                    parts = file_key.split('/temp_')
-                                    if len(parts) > 1:
-                                        user_id = parts[1].split('/')[0]
-                                        all_temp_user_ids.add(user_id)
-                            
-                            # 删除已清空的临时目录
-                            for user_id in all_temp_user_ids:
-                                if user_id not in temp_user_ids:
-                                    # 临时目录已为空，删除它
-                                    temp_dir = f"{ImageCategory.TASK.value}/temp_{user_id}"
-                                    storage.delete_directory(temp_dir)
-                                    logger.debug(f"删除空的临时目录（云存储）: {temp_dir}")
+                        # 批量删除（DeleteObjects 每次最多 1000 个；S3 无真实目录，对象删完前缀即消失）
+                        if temp_files_to_delete:
+                            deleted = await asyncio.to_thread(
+                                storage.delete_many, [file_key for _, file_key, _ in temp_files_to_delete]
+                            )
+                            cleaned_count += deleted
+                            cloud_cleaned_count += deleted
+                            if deleted == len(temp_files_to_delete):
+                                cloud_bytes_freed += sum(size for _, _, size in temp_files_to_delete)
                     except Exception as e:
                         logger.warning(f"清理云存储临时图片失败: {e}")
                     
@@ -989,10 +958,53 @@ class CleanupTasks:
         finally:
             release_redis_distributed_lock(lock_key)
 
+    async def _cleanup_storage_manifest_orphans(self):
+        """按存储清单增量清理：删除已标记孤儿的实体目录，并抽样对账一段清单，使用分布式锁"""
+        from app.services.storage_manifest import get_storage_manifest
+
+        manifest = get_storage_manifest()
+        if not manifest.enabled:
+            return
+
+        lock_key = "scheduled_task:cleanup_storage_manifest:lock"
+        lock_ttl = 1800  # 30分钟
+
+        if not get_redis_distributed_lock(lock_key, lock_ttl):
+            logger.debug("存储清单孤儿清理：其他实例正在执行，跳过")
+            return
+
+        try:
+            from app.services.storage_backend import get_default_storage
+
+            storage = get_default_storage()
+            limit = _env_int("CLEANUP_MANIFEST_BATCH", 500)
+            sample_size = _env_int("CLEANUP_MANIFEST_SAMPLE_SIZE", 1000)
+
+            # 先抽样标记（覆盖绕过 ORM 的批量删除），再统一删除过了宽限期的孤儿
+            marked, self.storage_manifest_cursor = await asyncio.to_thread(
+                manifest.sample_reconcile, self.storage_manifest_cursor, sample_size
+            )
+            removed = await asyncio.to_thread(manifest.reconcile_orphans, storage, limit)
+
+            if marked or removed:
+                logger.info(f"存储清单清理：抽样新标记 {marked} 个孤儿对象，删除 {removed} 个目录/临时对象")
+            else:
+                logger.debug("存储清单清理：未发现孤儿对象")
+        except Exception as e:
+            logger.error(f"存储清单孤儿清理失败: {e}", exc_info=True)
+        finally:
+            release_redis_distributed_lock(lock_key)
+
     async def _cleanup_orphan_entity_images(self):
-        """清理不存在实体的图片文件夹（竞品、商品、任务），同日只跑一次，使用分布式锁"""
+        """
+        全量扫描清理不存在实体的图片文件夹（竞品、商品、任务），使用分布式锁
+
+        新上传由存储清单增量清理（_cleanup_storage_manifest_orphans），
+        这里只兜底清单之外的历史文件，默认每 7 天跑一次（CLEANUP_ORPHAN_ENTITY_FULL_SCAN_DAYS）。
+        """
         today = get_utc_time().date()
-        if self.last_orphan_entity_cleanup_date == today:
+        scan_days = max(1, _env_int("CLEANUP_ORPHAN_ENTITY_FULL_SCAN_DAYS", 7))
+        if self.last_orphan_entity_cleanup_date and (today - self.last_orphan_entity_cleanup_date).days < scan_days:
             return
 
         lock_key = "scheduled_task:cleanup_orphan_entity_images:lock"
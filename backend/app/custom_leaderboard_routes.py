@@ -3,6 +3,7 @@
 实现用户驱动的动态排行榜系统
 """
 
+import asyncio
 import json
 import math
 import os
@@ -17,6 +18,7 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from typing import Optional, List
 from app.deps import get_async_db_dependency
+from app.principal_cache import Principal
 from app import models, schemas
 from app.utils.time_utils import get_utc_time
 from app.rate_limiting import rate_limit
@@ -33,14 +35,15 @@ router = APIRouter(prefix="/api/custom-leaderboards", tags=["Custom Leaderboards
 async def get_current_user_secure_async_csrf(
     request: Request,
     db: AsyncSession = Depends(get_async_db_dependency),
-) -> models.User:
+) -> Principal:
     """CSRF保护的安全用户认证（异步版本）"""
     from app.secure_auth import validate_session
+    from app.principal_cache import get_principal
     
-    session = validate_session(request)
+    session = await asyncio.to_thread(validate_session, request)
     if session:
         from app import async_crud
-        user = await async_crud.async_user_crud.get_user_by_id(db, session.user_id)
+        user = await get_principal(db, session.user_id)
         if user:
             if hasattr(user, "is_suspended") and user.is_suspended:
                 raise HTTPException(
@@ -930,27 +933,12 @@ async def get_leaderboards(
     _applicant_ids = [lb.applicant_id for lb in leaderboards if lb.applicant_id]
     _badge_cache = await preload_badge_cache(db, _applicant_ids)
 
+    from app.services.view_counts import get_view_count_overlay
+    view_counts = await get_view_count_overlay().overlay("leaderboard", leaderboards)
+
     leaderboard_items = []
     for leaderboard in leaderboards:
-        # 计算浏览量
-        try:
-            from app.redis_cache import get_redis_client
-            redis_client = get_redis_client()
-
-            if redis_client:
-                redis_key = f"leaderboard:view_count:{leaderboard.id}"
-                redis_view_count = int(redis_client.get(redis_key) or 0)
-                if redis_view_count > 0:
-                    display_view_count = leaderboard.view_count + redis_view_count
-                else:
-                    display_view_count = leaderboard.view_count
-            else:
-                display_view_count = leaderboard.view_count
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.debug(f"Redis view count query failed, using DB values: {e}")
-            display_view_count = leaderboard.view_count
+        display_view_count = view_counts.get(leaderboard.id, leaderboard.view_count)
 
         # 构建申请者信息
         applicant_info = None
@@ -1012,47 +1000,21 @@ async def get_leaderboard_detail(
         )
     
     # 增加浏览次数
-    # 优化方案：使用 Redis 累加，定时批量落库（由 Celery 任务处理）
-    # 当前实现：如果 Redis 可用则使用 Redis，否则直接更新数据库
-    redis_view_count = 0
-    try:
-        from app.redis_cache import get_redis_client
-        redis_client = get_redis_client()
-        
-        if redis_client:
-            # 使用 Redis 累加浏览数（存储增量）
-            redis_key = f"leaderboard:view_count:{leaderboard_id}"
-            # incr 返回增加后的值（如果 key 不存在则创建并设置为1）
-            redis_client.incr(redis_key)
-            # 获取 Redis 中的总值（包括本次增加的1）
-            redis_view_count = int(redis_client.get(redis_key) or 0)
-            # 设置过期时间（7天），防止 key 无限增长
-            redis_client.expire(redis_key, 7 * 24 * 3600)
-            # 注意：Redis 中的增量会由后台任务定期同步到数据库
-            # 这里不更新数据库，减少数据库写入压力
-        else:
-            # Redis 不可用，直接更新数据库
-            leaderboard.view_count += 1
-            await db.flush()
-    except Exception as e:
-        # Redis 操作失败，回退到直接更新数据库
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.debug(f"Redis view count increment failed, falling back to DB: {e}")
+    # Redis 哈希累加增量，定时批量落库；Redis 不可用则直接更新数据库
+    from app.services.view_counts import get_view_count_overlay
+    redis_view_count = await get_view_count_overlay().aincr("leaderboard", leaderboard_id)
+    if redis_view_count is None:
         leaderboard.view_count += 1
         await db.flush()
     
     await db.commit()
     
     # 刷新对象以获取最新的 view_count（如果直接更新了数据库）
-    if redis_view_count == 0:
+    if redis_view_count is None:
         await db.refresh(leaderboard)
     
     # 计算返回给用户的浏览量（数据库值 + Redis中的增量）
-    display_view_count = leaderboard.view_count
-    if redis_view_count > 0:
-        # 如果使用了 Redis，返回数据库值 + Redis 中的增量
-        display_view_count = leaderboard.view_count + redis_view_count
+    display_view_count = leaderboard.view_count + (redis_view_count or 0)
     
     # 构建申请者信息
     from app.forum_routes import build_user_info, preload_badge_cache
@@ -118,6 +118,10 @@ SessionLocal = sessionmaker(
     expire_on_commit=False  # 提高性能，避免不必要的session刷新
 )
 
+# 每请求 SQL 剖析（N+1 检测、路由查询预算），同步 / 异步引擎都注册
+from app.observability.query_profiler import install_query_profiler
+install_query_profiler(sync_engine, async_engine.sync_engine if async_engine is not None else None)
+
 # ⚠️ 弃用警告：SessionLocal (同步数据库) 已标记为弃用
 # 请在新代码中使用 AsyncSessionLocal (异步数据库)
 # 老接口将逐步迁移到异步模式
@@ -1,4 +1,5 @@
 from typing import Optional
+import asyncio
 import logging
 
 from fastapi import Depends, Header, HTTPException, Request, status
@@ -27,6 +28,7 @@ from app.csrf import (
     sync_cookie_bearer_readonly,
 )
 from app.utils.time_utils import get_utc_time
+from app.principal_cache import Principal, get_principal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/secure-auth/login")
 
@@ -456,37 +458,47 @@ def get_current_user_secure_sync_csrf(
 
 
 # CSRF保护的异步认证依赖（用于 async 路由迁移）
+def _reject_inactive_principal(request: Request, user_id: str, user) -> None:
+    """被暂停 / 封禁的用户拒绝访问"""
+    if getattr(user, "is_suspended", None):
+        client_ip = get_client_ip(request)
+        log_security_event(
+            "SUSPENDED_USER_ACCESS", user_id, client_ip, "被暂停用户尝试访问"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="账户已被暂停"
+        )
+
+    if getattr(user, "is_banned", None):
+        client_ip = get_client_ip(request)
+        log_security_event(
+            "BANNED_USER_ACCESS", user_id, client_ip, "被封禁用户尝试访问"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="账户已被封禁"
+        )
+
+
 async def get_current_user_secure_async_csrf(
     request: Request,
     db: AsyncSession = Depends(get_async_db_dependency),
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(csrf_cookie_bearer),
-) -> models.User:
-    """CSRF保护的安全用户认证（异步版本）"""
+) -> Principal:
+    """
+    CSRF保护的安全用户认证（异步版本）
+
+    返回 principal 快照（User 标量列，进程内 + Redis 缓存），大多数请求不再查库；
+    需要完整 ORM User 时使用 `await current_user.load_user(db)`。
+    """
     from app.secure_auth import validate_session
 
-    session = validate_session(request)
+    # 会话校验包含同步 Redis 读写，放到线程中执行，避免阻塞事件循环
+    session = await asyncio.to_thread(validate_session, request)
     if session:
         user_id = session.user_id
-        user = await async_crud.async_user_crud.get_user_by_id(db, user_id)
+        user = await get_principal(db, user_id)
         if user:
-            if hasattr(user, "is_suspended") and user.is_suspended:
-                client_ip = get_client_ip(request)
-                log_security_event(
-                    "SUSPENDED_USER_ACCESS", user_id, client_ip, "被暂停用户尝试访问"
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN, detail="账户已被暂停"
-                )
-
-            if hasattr(user, "is_banned") and user.is_banned:
-                client_ip = get_client_ip(request)
-                log_security_event(
-                    "BANNED_USER_ACCESS", user_id, client_ip, "被封禁用户尝试访问"
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN, detail="账户已被封禁"
-                )
-
+            _reject_inactive_principal(request, user_id, user)
             return user
     else:
         x_session_id = request.headers.get("X-Session-ID")
@@ -515,7 +527,7 @@ async def get_current_user_secure_async_csrf(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="无效的token"
             )
 
-        user = await async_crud.async_user_crud.get_user_by_id(db, user_id)
+        user = await get_principal(db, user_id)
         if not user:
             client_ip = get_client_ip(request)
             log_security_event(
@@ -525,24 +537,7 @@ async def get_current_user_secure_async_csrf(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="用户不存在"
             )
 
-        if hasattr(user, "is_suspended") and user.is_suspended:
-            client_ip = get_client_ip(request)
-            log_security_event(
-                "SUSPENDED_USER_ACCESS", user_id, client_ip, "被暂停用户尝试访问"
-            )
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail="账户已被暂停"
-            )
-
-        if hasattr(user, "is_banned") and user.is_banned:
-            client_ip = get_client_ip(request)
-            log_security_event(
-                "BANNED_USER_ACCESS", user_id, client_ip, "被封禁用户尝试访问"
-            )
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail="账户已被封禁"
-            )
-
+        _reject_inactive_principal(request, user_id, user)
         return user
 
     except HTTPException:
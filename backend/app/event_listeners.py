@@ -1,13 +1,17 @@
-"""SQLAlchemy 事件钩子：自动维护 city_canonical 列。
+"""SQLAlchemy 事件钩子：让派生数据随业务写入自动保持一致。
 
-监听 Task / TaskExpertService / Expert / Activity 四表的 before_insert + before_update，
-在 location 字段变化时自动重算 city_canonical（由 resolve_city_canonical 规范化）。
+派生数据包括 city_canonical 列、principal / 任务卡片缓存、论坛热门排行与作者计数桶、
+推荐候选索引与偏好向量、关注时间线、存储清单的孤儿标记；各钩子的细节见对应函数。
 
-为什么用事件钩子而不是在每个 endpoint 显式赋值：
-- 任务 / 服务 / 达人团队的 create/update 路径分散在 ~10 个 router 文件，
-  显式赋值容易漏写、形成数据漂移。
+为什么用事件钩子而不是在每个 endpoint 显式维护：
+- 写入路径分散在 ~10 个 router 文件，显式维护容易漏写、形成数据漂移。
 - 钩子集中，覆盖所有 SQLAlchemy 写入路径（含管理后台、后端脚本）。
-- resolve_city_canonical 自带 lru_cache，无性能负担。
+
+共同约定：
+- 必须与业务写入同事务的数据（列值、计数桶、孤儿标记）在 flush 时直接写入。
+- 外部副作用（Redis、本进程索引）在 flush 时记入 session.info，commit 后经 _run_after_commit 执行、
+  回滚时丢弃；事件循环里提交时放到线程池执行，不阻塞请求，失败只记录日志。
+- 绕过 ORM 对象的 Core update / delete 不触发 mapper 钩子，需要时用 do_orm_execute 或对账兜底。
 
 注：仅在 import 时注册一次。`app/models.py` 末尾 `import app.event_listeners`
 触发，这样任何加载 models 的代码（FastAPI / Celery worker / 一次性脚本 /
@@ -15,11 +19,67 @@ migration runner）都会自动获得钩子。main.py 也显式 import 一次作
 文档（无副作用，sys.modules 缓存避免重复执行）。
 """
 
-from sqlalchemy import event
+import asyncio
+import logging
+from typing import Any, Callable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression
 
 from app import models
-from app.models_expert import Expert
+from app.models_expert import Expert, ExpertFollow
+from app.principal_cache import get_principal_cache
+from app.recommendation.cache import VERSIONED_CACHE_ENABLED, record_pool_changes
+from app.recommendation.candidate_index import (
+    CANDIDATE_INDEX_ENABLED,
+    INDEX_COLUMNS,
+    apply_task_changes,
+    pool_changes,
+    task_values,
+)
+from app.recommendation.preference_store import (
+    PREFERENCE_VECTOR_ENABLED,
+    PreferenceEvent,
+    record_preference_events,
+)
+from app.services import forum_author_stats
+from app.services.forum_author_stats import FORUM_AUTHOR_STATS_ENABLED
+from app.services.follow_timeline import (
+    FOLLOW_TIMELINE_ENABLED,
+    TIMELINE_SOURCES,
+    get_follow_timeline,
+    timeline_entry,
+)
+from app.services.forum_hot_ranking import get_forum_hot_ranking, score_for_post
+from app.services.storage_manifest import ENTITY_KEYS, STORAGE_MANIFEST_ENABLED, mark_entity_deleted
+from app.services.task_cards import TASK_CARD_FIELDS, invalidate_task_cards
 from app.utils.city_filter_utils import resolve_city_canonical
+from app.utils.time_utils import get_utc_time
+
+logger = logging.getLogger(__name__)
+
+
+def _log_after_commit_failure(fn: Callable, future) -> None:
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.error(f"commit 后的写入失败 {getattr(fn, '__qualname__', fn)}: {exc}", exc_info=exc)
+
+
+def _run_after_commit(fn: Callable, *args: Any) -> None:
+    """commit 后执行副作用：事件循环里提交时放到线程池（不阻塞请求），否则直接执行；失败只记录日志"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.error(f"commit 后的写入失败 {getattr(fn, '__qualname__', fn)}: {e}", exc_info=True)
+        return
+    loop.run_in_executor(None, fn, *args).add_done_callback(lambda future: _log_after_commit_failure(fn, future))
 
 
 def _sync_city_canonical(target, attr_name: str = "location") -> None:
@@ -44,6 +104,361 @@ def _on_activity_insert_or_update(_mapper, _connection, target):
     _sync_city_canonical(target)
 
 
+# User 写入失效认证用的 principal 缓存：flush 时只失效本进程 LRU（不访问 Redis，AsyncSession 下
+# 不阻塞事件循环），commit 后再失效一次并删除 Redis，避免并发请求在提交前把旧值重新写回缓存
+_PRINCIPAL_INVALIDATE_KEY = "principal_invalidate"
+
+
+def _queue_principal_invalidate(session, user_ids) -> None:
+    user_ids = {str(user_id) for user_id in user_ids}
+    get_principal_cache().invalidate_local(*user_ids)
+    if session is not None:
+        session.info.setdefault(_PRINCIPAL_INVALIDATE_KEY, set()).update(user_ids)
+
+
+def _on_user_write(_mapper, _connection, target):
+    _queue_principal_invalidate(object_session(target), [target.id])
+
+
+def _bulk_user_ids(statement):
+    """从 `update(User)` / `delete(User)` 的 WHERE 里取出 users.id 的等值 / IN 条件；取不到时返回 None"""
+    user_ids = set()
+    for node in visitors.iterate(statement.whereclause) if statement.whereclause is not None else ():
+        if not isinstance(node, BinaryExpression) or not models.User.__table__.c.id.shares_lineage(node.left):
+            continue
+        value = getattr(node.right, "effective_value", None)
+        if node.operator is operators.eq and value is not None:
+            user_ids.add(value)
+        elif node.operator is operators.in_op and value:
+            user_ids.update(value)
+    return user_ids or None
+
+
+def _on_do_orm_execute_users(orm_execute_state):
+    # 绕过 ORM 对象的 `update(models.User)` / `delete(models.User)`（写 stripe_customer_id 等）不触发 after_update
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    statement = orm_execute_state.statement
+    table = getattr(statement, "table", None)
+    if table is None or table.name != models.User.__tablename__:
+        return
+    user_ids = _bulk_user_ids(statement)
+    if user_ids is None:
+        # 条件里没有用户 ID（按其他列批量更新）：只能清空本进程缓存，其余进程和 Redis 依赖 TTL
+        get_principal_cache().clear_local()
+        return
+    _queue_principal_invalidate(orm_execute_state.session, user_ids)
+
+
+def _on_session_after_commit(session):
+    user_ids = session.info.pop(_PRINCIPAL_INVALIDATE_KEY, None)
+    if not user_ids:
+        return
+    cache = get_principal_cache()
+    cache.invalidate_local(*user_ids)
+    _run_after_commit(cache.invalidate, *user_ids)
+
+
+def _on_session_after_rollback(session):
+    session.info.pop(_PRINCIPAL_INVALIDATE_KEY, None)
+
+
+# ForumPost 在 flush 时按当前计数算出热度分数，commit 后写入论坛热门排行（Redis 有序集合）
+_FORUM_HOT_UPDATES_KEY = "forum_hot_updates"
+
+# 影响热度或可见性的列；只改标题 / 内容等不更新排行
+_FORUM_HOT_ATTRS = (
+    "like_count", "favorite_count", "reply_count", "view_count", "last_reply_at",
+    "is_deleted", "is_visible", "category_id",
+)
+
+
+def _queue_forum_hot_update(target, score) -> None:
+    session = object_session(target)
+    if session is None:
+        return
+    history = inspect(target).attrs.category_id.history
+    old_category_id = history.deleted[0] if history.deleted else target.category_id
+    updates = session.info.setdefault(_FORUM_HOT_UPDATES_KEY, {})
+    if target.id in updates:
+        # 同一事务多次 flush：保留最早的原板块
+        old_category_id = updates[target.id][2]
+    updates[target.id] = (target.id, target.category_id, old_category_id, score)
+
+
+def _on_forum_post_insert(_mapper, _connection, target):
+    _queue_forum_hot_update(target, score_for_post(target))
+
+
+def _on_forum_post_update(_mapper, _connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _FORUM_HOT_ATTRS):
+        _queue_forum_hot_update(target, score_for_post(target))
+
+
+def _on_forum_post_delete(_mapper, _connection, target):
+    _queue_forum_hot_update(target, None)
+
+
+def _on_session_after_commit_forum(session):
+    updates = session.info.pop(_FORUM_HOT_UPDATES_KEY, None)
+    if not updates:
+        return
+    _run_after_commit(get_forum_hot_ranking().apply_updates, list(updates.values()))
+
+
+def _on_session_after_rollback_forum(session):
+    session.info.pop(_FORUM_HOT_UPDATES_KEY, None)
+
+
+# Task 的推荐卡片列变化时记下任务 ID，commit 后删除 Redis 中的任务卡片
+_TASK_CARD_INVALIDATE_KEY = "task_card_invalidate"
+
+
+def _queue_task_card_invalidate(_mapper, _connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_TASK_CARD_INVALIDATE_KEY, set()).add(target.id)
+
+
+def _on_task_card_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in TASK_CARD_FIELDS):
+        _queue_task_card_invalidate(mapper, connection, target)
+
+
+def _on_session_after_commit_task_cards(session):
+    task_ids = session.info.pop(_TASK_CARD_INVALIDATE_KEY, None)
+    if not task_ids:
+        return
+    _run_after_commit(invalidate_task_cards, list(task_ids))
+
+
+def _on_session_after_rollback_task_cards(session):
+    session.info.pop(_TASK_CARD_INVALIDATE_KEY, None)
+
+
+# Task 的候选索引列变化：commit 后同步本进程的推荐候选索引，并把新增 / 关闭的任务记入
+# 候选池变更日志（Redis）；两者各自按开关启用，任一开启即注册
+_CANDIDATE_INDEX_KEY = "candidate_index_changes"
+
+
+def _queue_candidate_index(target, removed: bool = False, inserted: bool = False) -> None:
+    session = object_session(target)
+    if session is None:
+        return
+    changes = session.info.setdefault(_CANDIDATE_INDEX_KEY, {})
+    state = inspect(target)
+    if removed:
+        changes[target.id] = None
+    elif inserted:
+        # 插入时未赋值的列（无默认值）在 flush 后处于未加载状态，其值即 NULL
+        changes[target.id] = {name: state.dict.get(name) for name in INDEX_COLUMNS}
+    elif state.unloaded.intersection(INDEX_COLUMNS):
+        # flush 中不能再加载未加载的列：交给索引按 updated_at 的增量同步
+        changes.pop(target.id, None)
+    else:
+        # 同一事务内多次 flush 只保留最后一次的值
+        changes[target.id] = task_values(target)
+
+
+def _on_task_candidate_insert(_mapper, _connection, target):
+    _queue_candidate_index(target, inserted=True)
+
+
+def _on_task_candidate_update(_mapper, _connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in INDEX_COLUMNS):
+        _queue_candidate_index(target)
+
+
+def _on_task_candidate_delete(_mapper, _connection, target):
+    _queue_candidate_index(target, removed=True)
+
+
+def _on_session_after_commit_candidate_index(session):
+    changes = session.info.pop(_CANDIDATE_INDEX_KEY, None)
+    if not changes:
+        return
+    upserts = [values for values in changes.values() if values is not None]
+    removed = [task_id for task_id, values in changes.items() if values is None]
+    if CANDIDATE_INDEX_ENABLED:
+        apply_task_changes(upserts, removed)
+    if not VERSIONED_CACHE_ENABLED:
+        return
+    # 候选池版本 + 变更日志（Redis）：版本化推荐缓存据此只对变更任务打分
+    _run_after_commit(record_pool_changes, *pool_changes(upserts, removed))
+
+
+def _on_session_after_rollback_candidate_index(session):
+    session.info.pop(_CANDIDATE_INDEX_KEY, None)
+
+
+# TaskHistory 插入后记下（用户, 任务, 时间），commit 后增量更新该用户的推荐偏好向量
+_PREFERENCE_EVENTS_KEY = "preference_events"
+
+
+def _on_task_history_insert(_mapper, _connection, target):
+    if target.user_id is None or target.task_id is None:
+        return
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PREFERENCE_EVENTS_KEY, []).append(
+            PreferenceEvent(target.user_id, target.task_id, "history", target.timestamp or get_utc_time())
+        )
+
+
+def _on_session_after_commit_preferences(session):
+    events = session.info.pop(_PREFERENCE_EVENTS_KEY, None)
+    if not events:
+        return
+    _run_after_commit(record_preference_events, events)
+
+
+def _on_session_after_rollback_preferences(session):
+    session.info.pop(_PREFERENCE_EVENTS_KEY, None)
+
+
+# ForumPost / ForumReply 的计数或可见性变化累加到作者每日计数桶，after_flush 里与业务写入同事务 upsert
+_FORUM_AUTHOR_STATS_KEY = "forum_author_stat_deltas"
+
+# 影响作者计数桶的列
+_POST_STAT_ATTRS = (
+    "author_id", "created_at", "category_id", "like_count", "favorite_count", "is_deleted", "is_visible",
+)
+_REPLY_STAT_ATTRS = ("author_id", "created_at", "like_count", "is_deleted")
+
+
+def _stat_values(target, attrs, old: bool = False) -> dict:
+    """当前值，或 old=True 时本次 flush 前的值"""
+    state = inspect(target)
+    values = {}
+    for name in attrs:
+        history = state.attrs[name].history
+        values[name] = history.deleted[0] if old and history.deleted else getattr(target, name)
+    return values
+
+
+def _queue_author_stats(target, new: dict, old: dict) -> None:
+    session = object_session(target)
+    if session is None:
+        return
+    deltas = session.info.setdefault(_FORUM_AUTHOR_STATS_KEY, {})
+    forum_author_stats.merge_deltas(deltas, new, old)
+
+
+def _make_author_stats_listeners(attrs, contribution):
+    def _on_insert(_mapper, _connection, target):
+        _queue_author_stats(target, contribution(_stat_values(target, attrs)), {})
+
+    def _on_update(_mapper, _connection, target):
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in attrs):
+            _queue_author_stats(
+                target,
+                contribution(_stat_values(target, attrs)),
+                contribution(_stat_values(target, attrs, old=True)),
+            )
+
+    def _on_delete(_mapper, _connection, target):
+        _queue_author_stats(target, {}, contribution(_stat_values(target, attrs, old=True)))
+
+    return {"after_insert": _on_insert, "after_update": _on_update, "after_delete": _on_delete}
+
+
+_author_stats_listeners = {
+    "ForumPost": _make_author_stats_listeners(_POST_STAT_ATTRS, forum_author_stats.post_contribution),
+    "ForumReply": _make_author_stats_listeners(_REPLY_STAT_ATTRS, forum_author_stats.reply_contribution),
+}
+
+
+def _on_session_after_flush_author_stats(session, _flush_context):
+    deltas = session.info.pop(_FORUM_AUTHOR_STATS_KEY, None)
+    if deltas:
+        forum_author_stats.apply_deltas(session.connection(), deltas)
+
+
+def _on_session_after_rollback_author_stats(session):
+    session.info.pop(_FORUM_AUTHOR_STATS_KEY, None)
+
+
+# 关注 Feed 内容插入后 commit 时推入粉丝的时间线；关注关系变化时删除关注者的时间线
+_FOLLOW_TIMELINE_ENTRIES_KEY = "follow_timeline_entries"
+_FOLLOW_TIMELINE_INVALIDATE_KEY = "follow_timeline_invalidate"
+
+
+def _queue_follow_timeline_entry(target, source) -> None:
+    session = object_session(target)
+    if session is None:
+        return
+    # 只用已加载的列，避免在 flush 里触发懒加载
+    entry = timeline_entry(source, inspect(target).dict, target.id)
+    if entry is not None:
+        session.info.setdefault(_FOLLOW_TIMELINE_ENTRIES_KEY, {})[entry.member] = entry
+
+
+def _make_follow_timeline_listeners(source):
+    def _on_insert(_mapper, _connection, target):
+        _queue_follow_timeline_entry(target, source)
+
+    def _on_update(_mapper, _connection, target):
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in source.watch):
+            _queue_follow_timeline_entry(target, source)
+
+    listeners = {"after_insert": _on_insert}
+    if source.watch:
+        listeners["after_update"] = _on_update
+    return listeners
+
+
+_follow_timeline_listeners = {
+    model_name: _make_follow_timeline_listeners(source) for model_name, source in TIMELINE_SOURCES.items()
+}
+
+
+def _make_follow_change_listener(user_attr: str):
+    def _on_follow_change(_mapper, _connection, target):
+        session = object_session(target)
+        user_id = inspect(target).dict.get(user_attr)
+        if session is not None and user_id:
+            session.info.setdefault(_FOLLOW_TIMELINE_INVALIDATE_KEY, set()).add(user_id)
+    return _on_follow_change
+
+
+_on_user_follow_change = _make_follow_change_listener("follower_id")
+_on_expert_follow_change = _make_follow_change_listener("user_id")
+
+
+def _on_session_after_commit_follow_timeline(session):
+    entries = session.info.pop(_FOLLOW_TIMELINE_ENTRIES_KEY, None)
+    user_ids = session.info.pop(_FOLLOW_TIMELINE_INVALIDATE_KEY, None)
+    if not entries and not user_ids:
+        return
+    _run_after_commit(get_follow_timeline().dispatch, list((entries or {}).values()), list(user_ids or ()))
+
+
+def _on_session_after_rollback_follow_timeline(session):
+    session.info.pop(_FOLLOW_TIMELINE_ENTRIES_KEY, None)
+    session.info.pop(_FOLLOW_TIMELINE_INVALIDATE_KEY, None)
+
+
+# 存储清单登记的实体删除时，在同一事务里把其 storage_objects 行标记为孤儿
+def _make_storage_orphan_listener(entity_type: str, key_name: str):
+    def _on_entity_delete(_mapper, connection, target):
+        entity_id = getattr(target, key_name, None)
+        if entity_id is not None:
+            mark_entity_deleted(connection, entity_type, entity_id)
+    return _on_entity_delete
+
+
+# 每个实体类型一个监听函数；模块级保存引用，保证重复 register() 时是同一对象（SQLAlchemy 去重）
+_storage_orphan_listeners = {
+    entity_type: (model_name, _make_storage_orphan_listener(entity_type, key_name))
+    for entity_type, (model_name, key_name, _) in ENTITY_KEYS.items()
+}
+
+
 def register() -> None:
     """注册所有事件监听。idempotent — 重复调用 SQLAlchemy 会去重。"""
     event.listen(models.Task, "before_insert", _on_task_insert_or_update)
@@ -54,6 +469,49 @@ def register() -> None:
     event.listen(Expert, "before_update", _on_expert_insert_or_update)
     event.listen(models.Activity, "before_insert", _on_activity_insert_or_update)
     event.listen(models.Activity, "before_update", _on_activity_insert_or_update)
+    event.listen(models.User, "after_update", _on_user_write)
+    event.listen(models.User, "after_delete", _on_user_write)
+    event.listen(Session, "do_orm_execute", _on_do_orm_execute_users)
+    event.listen(Session, "after_commit", _on_session_after_commit)
+    event.listen(Session, "after_rollback", _on_session_after_rollback)
+    event.listen(models.ForumPost, "after_insert", _on_forum_post_insert)
+    event.listen(models.ForumPost, "after_update", _on_forum_post_update)
+    event.listen(models.ForumPost, "after_delete", _on_forum_post_delete)
+    event.listen(Session, "after_commit", _on_session_after_commit_forum)
+    event.listen(Session, "after_rollback", _on_session_after_rollback_forum)
+    event.listen(models.Task, "after_update", _on_task_card_update)
+    event.listen(models.Task, "after_delete", _queue_task_card_invalidate)
+    event.listen(Session, "after_commit", _on_session_after_commit_task_cards)
+    event.listen(Session, "after_rollback", _on_session_after_rollback_task_cards)
+    if CANDIDATE_INDEX_ENABLED or VERSIONED_CACHE_ENABLED:
+        # 版本化推荐缓存只依赖变更日志，不要求开启候选索引
+        event.listen(models.Task, "after_insert", _on_task_candidate_insert)
+        event.listen(models.Task, "after_update", _on_task_candidate_update)
+        event.listen(models.Task, "after_delete", _on_task_candidate_delete)
+        event.listen(Session, "after_commit", _on_session_after_commit_candidate_index)
+        event.listen(Session, "after_rollback", _on_session_after_rollback_candidate_index)
+    if PREFERENCE_VECTOR_ENABLED:
+        event.listen(models.TaskHistory, "after_insert", _on_task_history_insert)
+        event.listen(Session, "after_commit", _on_session_after_commit_preferences)
+        event.listen(Session, "after_rollback", _on_session_after_rollback_preferences)
+    if FORUM_AUTHOR_STATS_ENABLED:
+        for model_name, listeners in _author_stats_listeners.items():
+            for event_name, listener in listeners.items():
+                event.listen(getattr(models, model_name), event_name, listener)
+        event.listen(Session, "after_flush", _on_session_after_flush_author_stats)
+        event.listen(Session, "after_rollback", _on_session_after_rollback_author_stats)
+    if FOLLOW_TIMELINE_ENABLED:
+        for model_name, listeners in _follow_timeline_listeners.items():
+            for event_name, listener in listeners.items():
+                event.listen(getattr(models, model_name), event_name, listener)
+        for follow_model, listener in ((models.UserFollow, _on_user_follow_change), (ExpertFollow, _on_expert_follow_change)):
+            event.listen(follow_model, "after_insert", listener)
+            event.listen(follow_model, "after_delete", listener)
+        event.listen(Session, "after_commit", _on_session_after_commit_follow_timeline)
+        event.listen(Session, "after_rollback", _on_session_after_rollback_follow_timeline)
+    if STORAGE_MANIFEST_ENABLED:
+        for model_name, listener in _storage_orphan_listeners.values():
+            event.listen(getattr(models, model_name), "after_delete", listener)
 
 
 # 模块导入时即注册（main.py 启动时一次性 import 触发）
@@ -4,7 +4,9 @@
 """
 
 import logging
-from typing import Optional, Tuple
+import os
+import tempfile
+from typing import BinaryIO, Optional, Tuple
 from fastapi import UploadFile, HTTPException
 from io import BytesIO
 
@@ -13,6 +15,155 @@ logger = logging.getLogger(__name__)
 # 分块大小：1MB
 CHUNK_SIZE = 1024 * 1024
 
+# 落盘阈值：超过该大小的上传内容溢出到磁盘临时文件，内存占用保持恒定
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# 保留的文件头字节数（用于 magic bytes 类型检测）
+MAGIC_HEAD_SIZE = 64
+
+
+class SpooledUpload:
+    """
+    已落盘（或小文件留在内存）的上传内容
+
+    只保存文件对象、总大小和文件头，不持有完整 bytes，
+    下游按需以流的方式读取（rewind() 后传给 Pillow / 存储后端）。
+    """
+
+    __slots__ = ("file", "size", "head", "filename", "content_type", "_owned")
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        size: int,
+        head: bytes,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+        owned: bool = True,
+    ):
+        self.file = file
+        self.size = size
+        self.head = head
+        self.filename = filename
+        self.content_type = content_type
+        self._owned = owned
+
+    def rewind(self) -> BinaryIO:
+        """将文件指针移回开头并返回文件对象"""
+        self.file.seek(0)
+        return self.file
+
+    def read_bytes(self) -> bytes:
+        """读取完整内容（仅供仍需要 bytes 的旧接口使用）"""
+        return self.rewind().read()
+
+    def close(self) -> None:
+        # UploadFile 自带的临时文件由框架负责关闭
+        if self._owned:
+            try:
+                self.file.close()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _declared_size(file: UploadFile) -> Optional[int]:
+    """从 UploadFile.size 或 Content-Length 头获取声明的文件大小"""
+    if hasattr(file, 'size') and file.size:
+        return file.size
+    if hasattr(file, 'headers') and file.headers is not None:
+        content_length_header = file.headers.get('content-length')
+        if content_length_header:
+            try:
+                return int(content_length_header)
+            except ValueError:
+                pass
+    return None
+
+
+def _raise_too_large(max_size: int) -> None:
+    size_mb = max_size / (1024 * 1024)
+    raise HTTPException(
+        status_code=413,
+        detail=f"文件大小不能超过 {size_mb:.1f}MB"
+    )
+
+
+async def spool_upload(
+    file: UploadFile,
+    max_size: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_memory: int = SPOOL_MAX_MEMORY,
+) -> SpooledUpload:
+    """
+    以恒定内存获取上传内容
+
+    Starlette 的 UploadFile 本身已是 SpooledTemporaryFile（超过 1MB 落盘），
+    若底层文件可 seek 则直接复用，只测量大小并读取文件头，不复制内容；
+    否则分块写入新的 SpooledTemporaryFile，边写边检查大小上限。
+
+    Args:
+        file: 上传的文件对象
+        max_size: 最大文件大小（字节），None 表示不在此处检查
+        chunk_size: 分块大小
+        max_memory: 留在内存中的最大字节数，超过后溢出到磁盘
+
+    Raises:
+        HTTPException: 文件超过最大大小（413）或读取失败（500）
+    """
+    declared = _declared_size(file)
+    if max_size is not None and declared and declared > max_size:
+        _raise_too_large(max_size)
+
+    filename = getattr(file, 'filename', None)
+    content_type = getattr(file, 'content_type', None)
+
+    try:
+        raw = getattr(file, 'file', None)
+        if raw is not None and raw.seekable():
+            raw.seek(0, os.SEEK_END)
+            size = raw.tell()
+            if max_size is not None and size > max_size:
+                _raise_too_large(max_size)
+            raw.seek(0)
+            head = raw.read(MAGIC_HEAD_SIZE)
+            raw.seek(0)
+            return SpooledUpload(raw, size, head, filename, content_type, owned=False)
+
+        spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        size = 0
+        head = b''
+        try:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    _raise_too_large(max_size)
+                if len(head) < MAGIC_HEAD_SIZE:
+                    head += chunk[:MAGIC_HEAD_SIZE - len(head)]
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        spool.seek(0)
+        return SpooledUpload(spool, size, head, filename, content_type)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"流式读取文件失败: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="读取文件失败，请重试"
+        )
+
 
 async def read_file_streaming(
     file: UploadFile,
@@ -36,25 +187,10 @@ async def read_file_streaming(
     file_size = 0
     chunks = []
     
-    # 首先尝试从Content-Length头获取文件大小（如果可用）
-    content_length = None
-    if hasattr(file, 'size') and file.size:
-        content_length = file.size
-    elif hasattr(file, 'headers'):
-        content_length_header = file.headers.get('content-length')
-        if content_length_header:
-            try:
-                content_length = int(content_length_header)
-            except ValueError:
-                pass
-    
-    # 如果知道文件大小，提前检查
+    # 如果知道文件大小（UploadFile.size / Content-Length），提前检查
+    content_length = _declared_size(file)
     if content_length and content_length > max_size:
-        size_mb = max_size / (1024 * 1024)
-        raise HTTPException(
-            status_code=413,
-            detail=f"文件大小不能超过 {size_mb:.1f}MB"
-        )
+        _raise_too_large(max_size)
     
     # 流式读取文件
     try:
@@ -79,9 +215,7 @@ async def read_file_streaming(
             
             chunks.append(chunk)
             
-            # 如果已经读取了足够的内容用于类型检测，可以提前停止
-            # 但为了完整性，我们继续读取整个文件
-            # 对于非常大的文件，可以考虑使用临时文件而不是内存
+            # 需要恒定内存时请改用 spool_upload（落盘而不是拼接 bytes）
     
     except HTTPException:
         raise
@@ -119,23 +253,9 @@ async def read_file_with_size_check(
     """
     # 提前检查文件大小（如果可能）
     if early_size_check:
-        content_length = None
-        if hasattr(file, 'size') and file.size:
-            content_length = file.size
-        elif hasattr(file, 'headers'):
-            content_length_header = file.headers.get('content-length')
-            if content_length_header:
-                try:
-                    content_length = int(content_length_header)
-                except ValueError:
-                    pass
-        
+        content_length = _declared_size(file)
         if content_length and content_length > max_size:
-            size_mb = max_size / (1024 * 1024)
-            raise HTTPException(
-                status_code=413,
-                detail=f"文件大小不能超过 {size_mb:.1f}MB"
-            )
+            _raise_too_large(max_size)
     
     # 对于小文件（< 1MB），直接读取可能更快
     # 对于大文件，使用流式读取
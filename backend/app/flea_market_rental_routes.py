@@ -3,6 +3,7 @@
 实现租赁申请、审批、归还等生命周期管理
 """
 
+import asyncio
 import json
 import logging
 from decimal import Decimal
@@ -23,6 +24,7 @@ from sqlalchemy import select, update, and_, func
 
 from app import models, schemas
 from app.deps import get_async_db_dependency
+from app.principal_cache import Principal
 from app.async_routers import get_current_user_optional
 from app.id_generator import format_flea_market_id, parse_flea_market_id
 from app.utils.time_utils import get_utc_time, format_iso_utc
@@ -48,14 +50,15 @@ rental_router = APIRouter(prefix="/api/flea-market", tags=["跳蚤市场-租赁"
 async def get_current_user_secure_async_csrf(
     request: Request,
     db: AsyncSession = Depends(get_async_db_dependency),
-) -> models.User:
+) -> Principal:
     """CSRF保护的安全用户认证（异步版本）"""
     from app.secure_auth import validate_session
+    from app.principal_cache import get_principal
 
-    session = validate_session(request)
+    session = await asyncio.to_thread(validate_session, request)
     if session:
         from app import async_crud
-        user = await async_crud.async_user_crud.get_user_by_id(db, session.user_id)
+        user = await get_principal(db, session.user_id)
         if user:
             if hasattr(user, "is_suspended") and user.is_suspended:
                 raise HTTPException(
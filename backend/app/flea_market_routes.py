@@ -4,6 +4,7 @@
 """
 
 import json
+import asyncio
 import logging
 import os
 import uuid
@@ -35,8 +36,18 @@ from app import models, schemas
 from app.consultation import error_codes
 from app.consultation.helpers import create_placeholder_task
 from app.deps import get_async_db_dependency
+from app.principal_cache import Principal
 from app.async_routers import get_current_user_optional
 from app.error_handlers import raise_http_error_with_code
+from app.utils.keyset_pagination import (
+    InvalidCursor,
+    SortKey,
+    apply_ordering,
+    count_cache_key,
+    count_rows,
+    decode_cursor,
+    paginate,
+)
 
 # 管理员认证函数（从forum_routes复制，因为flea_market也需要）
 async def get_current_admin_async(
@@ -259,14 +270,15 @@ def delete_flea_market_temp_images(user_id: Optional[str] = None):
 async def get_current_user_secure_async_csrf(
     request: Request,
     db: AsyncSession = Depends(get_async_db_dependency),
-) -> models.User:
+) -> Principal:
     """CSRF保护的安全用户认证（异步版本）"""
     from app.secure_auth import validate_session
+    from app.principal_cache import get_principal
     
-    session = validate_session(request)
+    session = await asyncio.to_thread(validate_session, request)
     if session:
         from app import async_crud
-        user = await async_crud.async_user_crud.get_user_by_id(db, session.user_id)
+        user = await get_principal(db, session.user_id)
         if user:
             if hasattr(user, "is_suspended") and user.is_suspended:
                 raise HTTPException(
@@ -307,18 +319,32 @@ async def get_flea_market_items(
     status_filter: Optional[str] = Query("active", alias="status", pattern="^(active|sold)$"),
     seller_id: Optional[str] = Query(None, description="卖家ID，用于筛选特定卖家的商品"),
     listing_type: Optional[str] = Query(None, description="商品类型: sale, rental"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 nextCursor（传入后忽略 page）"),
     current_user: Optional[models.User] = Depends(get_current_user_optional),
     db: AsyncSession = Depends(get_async_db_dependency),
 ):
-    """获取商品列表（分页、搜索、筛选）- 带Redis缓存"""
+    """获取商品列表（分页、搜索、筛选）- 带Redis缓存
+
+    分页：第一页或传入 cursor 时按 (相关性, refreshed_at, id) 键集分页，响应带 nextCursor；
+    只传 page > 1 的旧客户端仍走 offset 分页。总数按筛选条件缓存。
+    """
+    # 安全：公共接口只允许查看 active 状态的商品
+    # 但当 seller_id 存在时，允许卖家查看自己的 sold 商品（对齐iOS MyPostsViewModel）
+    if not seller_id:
+        status_filter = "active"
+
+    cursor_scope = json.dumps(
+        ["flea_market_items", category, (keyword or "").strip(), status_filter, seller_id, listing_type],
+        ensure_ascii=False,
+    )
     try:
-        # 安全：公共接口只允许查看 active 状态的商品
-        # 但当 seller_id 存在时，允许卖家查看自己的 sold 商品（对齐iOS MyPostsViewModel）
-        if not seller_id:
-            status_filter = "active"
-        
-        # 尝试从缓存获取（如果有seller_id筛选或用户已登录，不使用缓存）
-        if not seller_id and not current_user:
+        after = decode_cursor(cursor, cursor_scope) if cursor else None
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+
+    try:
+        # 尝试从缓存获取（如果有seller_id筛选、用户已登录或按游标翻页，不使用缓存）
+        if not seller_id and not current_user and after is None:
             from app.redis_cache import redis_cache
             cache_key = get_cache_key_for_items(page, pageSize, category, keyword, status_filter)
             cached_result = redis_cache.get(cache_key)
@@ -383,7 +409,10 @@ async def get_flea_market_items(
             )
             if keyword_expr is not None:
                 query = query.where(keyword_expr)
-            # 按相关性排序：标题匹配优先，其次描述、地点、分类
+
+        # 排序：按refreshed_at DESC, id DESC；有关键词时先按相关性（标题匹配优先，其次描述、地点、分类）
+        sort_keys = [SortKey(models.FleaMarketItem.refreshed_at), SortKey(models.FleaMarketItem.id)]
+        if keyword:
             from app.utils.search_expander import build_relevance_score
             relevance = build_relevance_score(
                 weighted_columns=[
@@ -394,30 +423,29 @@ async def get_flea_market_items(
                 ],
                 keyword=keyword.strip(),
             )
-            query = query.order_by(
-                relevance.desc(),
-                models.FleaMarketItem.refreshed_at.desc(),
-                models.FleaMarketItem.id.desc(),
-            )
-        else:
-            # 排序：按refreshed_at DESC, id DESC
-            query = query.order_by(
-                models.FleaMarketItem.refreshed_at.desc(),
-                models.FleaMarketItem.id.desc()
-            )
-        
-        # 计算总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
-        
-        # 分页
+            sort_keys.insert(0, SortKey(relevance))
+
+        # 计算总数（按筛选条件缓存）
+        total = await count_rows(
+            db, query, mode="cached",
+            cache_key=count_cache_key(
+                "flea_market_items", category=category, keyword=keyword, status=status_filter,
+                seller_id=seller_id, listing_type=listing_type,
+            ),
+        )
+
+        # 分页：第一页 / 游标翻页走键集，只传 page 的深页兼容 offset
         skip = (page - 1) * pageSize
-        query = query.offset(skip).limit(pageSize)
-        
-        # 执行查询
-        result = await db.execute(query)
-        items = result.scalars().all()
+        next_cursor = None
+        if after is not None or page == 1:
+            keyset_page = await paginate(db, query, sort_keys, pageSize, scope=cursor_scope, after=after)
+            items = keyset_page.items
+            has_more = keyset_page.has_more
+            next_cursor = keyset_page.next_cursor
+        else:
+            result = await db.execute(apply_ordering(query, sort_keys).offset(skip).limit(pageSize))
+            items = result.scalars().all()
+            has_more = skip + len(items) < total
         
         # 批量获取卖家信息（昵称、头像、会员等级）
         seller_ids = list({item.seller_id for item in items})
@@ -455,6 +483,10 @@ async def get_flea_market_items(
             for row in fav_result.all():
                 favorite_counts_map[row[0]] = row[1]
 
+        # 一次 HMGET 叠加未落库的浏览数增量
+        from app.services.view_counts import get_view_count_overlay
+        view_counts = await get_view_count_overlay().overlay("flea_market", items)
+
         # 批量查询当前用户的收藏状态
         user_favorited_ids = set()
         if current_user and item_ids:
@@ -502,7 +534,7 @@ async def get_flea_market_items(
                 seller_avatar=seller_avatars.get(item.seller_id),
                 seller_user_level=seller_levels.get(item.seller_id),
                 seller_displayed_badge=_badge_cache.get(item.seller_id),
-                view_count=item.view_count or 0,
+                view_count=view_counts.get(item.id, item.view_count or 0),
                 favorite_count=favorite_count,
                 is_favorited=item.id in user_favorited_ids,
                 refreshed_at=format_iso_utc(item.refreshed_at),
@@ -520,7 +552,8 @@ async def get_flea_market_items(
             page=page,
             pageSize=pageSize,
             total=total,
-            hasMore=skip + len(processed_items) < total
+            hasMore=has_more,
+            nextCursor=next_cursor,
         )
 
         # Record search behavior
@@ -593,14 +626,12 @@ async def get_flea_market_item(
             )
 
         # 自动增加浏览量（Redis 累加，定时同步到 DB）
+        pending_view_count = 0
         try:
-            from app.redis_cache import get_redis_client
-            _rc = get_redis_client()
-            if _rc:
-                _rk = f"flea_market:view_count:{db_id}"
-                _rc.incr(_rk)
-                _rc.expire(_rk, 7 * 24 * 3600)
-            else:
+            from app.services.view_counts import get_view_count_overlay
+            pending_view_count = await get_view_count_overlay().aincr("flea_market", db_id)
+            if pending_view_count is None:
+                pending_view_count = 0
                 await db.execute(
                     update(models.FleaMarketItem)
                     .where(models.FleaMarketItem.id == db_id)
@@ -829,7 +860,7 @@ async def get_flea_market_item(
             seller_user_level=seller_user_level,
             seller_displayed_badge=_badge_cache.get(item.seller_id),
             seller_is_active=seller_is_active,
-            view_count=item.view_count or 0,
+            view_count=(item.view_count or 0) + pending_view_count,
             favorite_count=favorite_count,
             is_favorited=is_favorited,
             refreshed_at=format_iso_utc(item.refreshed_at),
@@ -889,9 +920,7 @@ async def upload_flea_market_image(
     try:
         # 导入图片上传服务
         from app.services import ImageCategory, get_image_upload_service
-        
-        # 读取文件内容
-        content = await image.read()
+        from app.file_stream_utils import spool_upload
         
         # 确定存储目录
         db_id = None
@@ -924,16 +953,19 @@ async def upload_flea_market_image(
                 )
             is_temp = False
         
-        # 使用图片上传服务
+        # 落盘读取文件内容（恒定内存）后流式上传
+        spooled = await spool_upload(image)
         service = get_image_upload_service()
-        result = service.upload(
-            content=content,
-            category=ImageCategory.FLEA_MARKET,
-            resource_id=str(db_id) if db_id else None,
-            user_id=current_user.id,
-            filename=image.filename,
-            is_temp=is_temp
-        )
+        with spooled:
+            result = await asyncio.to_thread(
+                service.upload_stream,
+                spooled.rewind(),
+                category=ImageCategory.FLEA_MARKET,
+                resource_id=str(db_id) if db_id else None,
+                user_id=current_user.id,
+                filename=image.filename,
+                is_temp=is_temp
+            )
         
         if not result.success:
             raise HTTPException(
@@ -5,9 +5,9 @@
 
 import logging
 from datetime import timedelta
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select, desc, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -15,6 +15,7 @@ from app import models
 from app.models_expert import Expert, ExpertFollow
 from app.deps import get_current_user_secure, get_async_db_dependency
 from app.discovery_routes import _first_image, _parse_images
+from app.services.follow_timeline import decode_cursor, encode_cursor, get_follow_timeline, to_score
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +60,7 @@ def _pick_identity(
 async def get_follow_feed(
     page: int = Query(1, ge=1, le=50, description="页码"),
     page_size: int = Query(20, ge=1, le=50, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（传入后忽略 page）"),
     current_user: models.User = Depends(get_current_user_secure),
     db: AsyncSession = Depends(get_async_db_dependency),
 ):
@@ -70,6 +72,9 @@ async def get_follow_feed(
     关注维度：
     - UserFollow → 关注个人用户，feed 展示该用户的个人动态
     - ExpertFollow → 关注达人团队，feed 展示该团队的服务/活动/团队身份发帖
+
+    分页：第一页或传入 cursor 时从时间线存储（services.follow_timeline）按游标读取，
+    响应里的 next_cursor 用于请求下一页；只传 page > 1 的旧客户端仍走合并分页。
     """
     # 1a. 获取关注的用户 ID（最近关注的 200 个）
     following_result = await db.execute(
@@ -90,7 +95,14 @@ async def get_follow_feed(
     following_expert_ids = [row[0] for row in expert_follow_result.all()]
 
     if not following_ids and not following_expert_ids:
-        return {"items": [], "page": page, "has_more": False}
+        return {"items": [], "page": page, "has_more": False, "next_cursor": None}
+
+    if cursor is not None or page == 1:
+        timeline_page = await _follow_feed_from_timeline(
+            db, current_user, following_ids, following_expert_ids, cursor, page_size
+        )
+        if timeline_page is not None:
+            return {"page": page, **timeline_page}
 
     offset = (page - 1) * page_size
     fetch_limit = offset + page_size
@@ -130,13 +142,140 @@ async def get_follow_feed(
         "items": page_items,
         "page": page,
         "has_more": len(all_items) > offset + page_size,
+        "next_cursor": None,
+    }
+
+
+# ==================== 时间线存储 ====================
+
+# 一页内因条目失效（删除 / 隐藏 / 过期）而继续向后读取的最多轮数
+_TIMELINE_MAX_ROUNDS = 3
+
+# 时间线重建时每种内容读取的条数
+_TIMELINE_REBUILD_PER_TYPE = 100
+
+
+def _timeline_fetchers(following_ids: List[str], following_expert_ids: List[str], current_user) -> dict:
+    """条目 ID 前缀 -> (名称, 获取函数(db, limit, ids))"""
+    return {
+        "task": ("tasks", lambda db, limit, ids=None: _fetch_followed_tasks(db, following_ids, limit, ids=ids)),
+        "post": ("forum_posts", lambda db, limit, ids=None: _fetch_followed_forum_posts(
+            db, following_ids, following_expert_ids, limit, ids=ids)),
+        "product": ("flea_market", lambda db, limit, ids=None: _fetch_followed_flea_market(
+            db, following_ids, limit, ids=ids)),
+        "service": ("services", lambda db, limit, ids=None: _fetch_followed_services(
+            db, following_ids, following_expert_ids, limit, ids=ids)),
+        "activity": ("activities", lambda db, limit, ids=None: _fetch_followed_activities(
+            db, following_ids, following_expert_ids, limit, ids=ids)),
+        "completion": ("completions", lambda db, limit, ids=None: _fetch_followed_completions(
+            db, following_ids, limit, ids=ids)),
+        "creview": ("competitor_reviews", lambda db, limit, ids=None: _fetch_followed_competitor_reviews(
+            db, following_ids, limit, current_user, ids=ids)),
+        "sreview": ("service_reviews", lambda db, limit, ids=None: _fetch_followed_service_reviews(
+            db, following_ids, limit, ids=ids)),
+        "ranking": ("rankings", lambda db, limit, ids=None: _fetch_followed_rankings(
+            db, following_ids, limit, ids=ids)),
+    }
+
+
+async def _hydrate_timeline_refs(db: AsyncSession, fetchers: dict, members: List[str]) -> dict:
+    """按前缀分组，只对这一页的条目回表；返回 成员 -> feed 条目（已失效的条目不在结果里）"""
+    grouped: dict = {}
+    for member in members:
+        prefix, _, raw_id = member.rpartition("_")
+        if prefix in fetchers and raw_id.isdigit():
+            grouped.setdefault(prefix, []).append(int(raw_id))
+    hydrated = {}
+    for prefix, ids in grouped.items():
+        name, fetch = fetchers[prefix]
+        try:
+            for item in await fetch(db, len(ids), ids=ids):
+                hydrated[item["id"]] = item
+        except Exception as e:
+            logger.warning(f"Failed to hydrate followed {name} for follow feed: {e}")
+    return hydrated
+
+
+async def _rebuild_timeline(db: AsyncSession, user_id: str, fetchers: dict) -> List[dict]:
+    """从数据库读取各类内容的最新条目写入时间线；返回按时间倒序的条目"""
+    items: List[dict] = []
+    for name, fetch in fetchers.values():
+        try:
+            items.extend(await fetch(db, _TIMELINE_REBUILD_PER_TYPE))
+        except Exception as e:
+            logger.warning(f"Failed to fetch followed {name} for follow timeline: {e}")
+    refs = [(item["id"], to_score(item.get("created_at"))) for item in items]
+    await get_follow_timeline().fill(user_id, refs)
+    score_of = dict(refs)
+    items.sort(key=lambda item: (score_of[item["id"]], item["id"]), reverse=True)
+    return items
+
+
+async def _follow_feed_from_timeline(
+    db: AsyncSession,
+    current_user,
+    following_ids: List[str],
+    following_expert_ids: List[str],
+    cursor: Optional[str],
+    page_size: int,
+) -> Optional[dict]:
+    """
+    按游标从时间线读取一页；时间线不存在时从数据库重建并直接用重建结果分页
+
+    Returns:
+        {"items", "has_more", "next_cursor"}；时间线存储未启用返回 None（走合并分页）
+    """
+    timeline = get_follow_timeline()
+    if not timeline.enabled:
+        return None
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的游标")
+
+    fetchers = _timeline_fetchers(following_ids, following_expert_ids, current_user)
+    owners = [("user", uid) for uid in following_ids] + [("expert", eid) for eid in following_expert_ids]
+
+    items: List[dict] = []
+    has_more = False
+    for _ in range(_TIMELINE_MAX_ROUNDS):
+        need = page_size - len(items)
+        refs = await timeline.read(current_user.id, owners, after, need + 1)
+        if refs is None:
+            rebuilt = await _rebuild_timeline(db, current_user.id, fetchers)
+            if after is not None:
+                rebuilt = [
+                    item for item in rebuilt
+                    if (to_score(item.get("created_at")), item["id"]) < (after[1], after[0])
+                ]
+            items.extend(rebuilt[:need])
+            has_more = len(rebuilt) > need
+            if items:
+                after = (items[-1]["id"], to_score(items[-1].get("created_at")))
+            break
+
+        has_more = len(refs) > need
+        hydrated = await _hydrate_timeline_refs(db, fetchers, [member for member, _ in refs[:need]])
+        for ref in refs[:need]:
+            after = ref
+            if ref[0] in hydrated:
+                items.append(hydrated[ref[0]])
+        if len(items) >= page_size or not has_more:
+            break
+
+    return {
+        "items": items,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(after) if has_more and after is not None else None,
     }
 
 
 # ==================== 数据获取函数 ====================
 
 
-async def _fetch_followed_tasks(db: AsyncSession, following_ids: List[str], limit: int) -> list:
+async def _fetch_followed_tasks(
+    db: AsyncSession, following_ids: List[str], limit: int, ids: Optional[List[int]] = None
+) -> list:
     """获取关注用户的任务（30天内）"""
     from sqlalchemy import func
     from app.utils.time_utils import get_utc_time
@@ -186,6 +325,8 @@ async def _fetch_followed_tasks(db: AsyncSession, following_ids: List[str], limi
         .order_by(desc(models.Task.created_at))
         .limit(limit)
     )
+    if ids is not None:
+        query = query.where(models.Task.id.in_(ids))
 
     result = await db.execute(query)
     rows = result.all()
@@ -240,6 +381,7 @@ async def _fetch_followed_forum_posts(
     following_ids: List[str],
     following_expert_ids: List[str],
     limit: int,
+    ids: Optional[List[int]] = None,
 ) -> list:
     """获取关注用户或关注达人团队的论坛帖子（30天内）
 
@@ -304,6 +446,8 @@ async def _fetch_followed_forum_posts(
         .order_by(desc(models.ForumPost.created_at))
         .limit(limit)
     )
+    if ids is not None:
+        query = query.where(models.ForumPost.id.in_(ids))
 
     result = await db.execute(query)
     rows = result.all()
@@ -356,7 +500,9 @@ async def _fetch_followed_forum_posts(
     return items
 
 
-async def _fetch_followed_flea_market(db: AsyncSession, following_ids: List[str], limit: int) -> list:
+async def _fetch_followed_flea_market(
+    db: AsyncSession, following_ids: List[str], limit: int, ids: Optional[List[int]] = None
+) -> list:
     """获取关注用户的跳蚤市场商品（30天内）"""
     from app.utils.time_utils import get_utc_time
 
@@ -389,6 +535,8 @@ async def _fetch_followed_flea_market(db: AsyncSession, following_ids: List[str]
         .order_by(desc(models.FleaMarketItem.created_at))
         .limit(limit)
     )
+    if ids is not None:
+        query = query.where(models.FleaMarketItem.id.in_(ids))
 
     result = await db.execute(query)
     rows = result.all()
@@ -436,6 +584,7 @@ async def _fetch_followed_services(
     following_ids: List[str],
     following_expert_ids: List[str],
     limit: int,
+    ids: Optional[List[int]] = None,
 ) -> list:
     """获取关注对象发布的达人服务（无时间限制，服务长期有效）
 
@@ -521,6 +670,8 @@ async def _fetch_followed_services(
         .order_by(desc(models.TaskExpertService.created_at))
         .limit(limit)
     )
+    if ids is not None:
+        query = query.where(models.TaskExpertService.id.in_(ids))
 
     result = await db.execute(query)
     rows = result.all()
@@ -574,6 +725,7 @@ async def _fetch_followed_activities(
     following_ids: List[str],
     following_expert_ids: List[str],
     limit: int,
+    ids: Optional[List[int]] = None,
 ) -> list:
     """获取关注对象创建的活动（无时间限制，open 状态未过期）
 
@@ -677,6 +829,8 @@ async def _fetch_followed_activities(
         .order_by(desc(models.Activity.created_at))
         .limit(limit)
     )
+    if ids is not None:
+        query = query.where(models.Activity.id.in_(ids))
 
     result = await db.execute(query)
     rows = result.all()
@@ -738,7 +892,9 @@ async def _fetch_followed_activities(
     return items
 
 
-async def _fetch_followed_completions(db: AsyncSession, following_ids: List[str], limit: int) -> list:
+async def _fetch_followed_completions(
+    db: AsyncSession, following_ids: List[str], limit: int, ids: Optional[List[int]] = None
+) -> list:
     """获取关注用户的任务完成记录（30天内）"""
     from app.utils.time_utils import get_utc_time
 
@@ -768,6 +924,8 @@ async def _fetch_followed_completions(db: AsyncSession, following_ids: List[str]
         .order_by(desc(models.TaskHistory.timestamp))
         .limit(limit)
     )
+    if ids is not None:
+        query = query.where(models.TaskHistory.id.in_(ids))
 
     result = await db.execute(query)
     rows = result.all()
@@ -811,7 +969,7 @@ async def _fetch_followed_completions(db: AsyncSession, following_ids: List[str]
 
 
 async def _fetch_followed_competitor_reviews(
-    db: AsyncSession, following_ids: List[str], limit: int, current_user=None
+    db: AsyncSession, following_ids: List[str], limit: int, current_user=None, ids: Optional[List[int]] = None
 ) -> list:
     """获取关注用户的竞品评价（30天内有留言的排行榜投票）"""
     from app.utils.time_utils import get_utc_time
@@ -853,6 +1011,8 @@ async def _fetch_followed_competitor_reviews(
         .order_by(desc(models.LeaderboardVote.created_at))
         .limit(limit)
     )
+    if ids is not None:
+        query = query.where(models.LeaderboardVote.id.in_(ids))
     result = await db.execute(query)
     rows = result.all()
 
@@ -921,7 +1081,7 @@ async def _fetch_followed_competitor_reviews(
 
 
 async def _fetch_followed_service_reviews(
-    db: AsyncSession, following_ids: List[str], limit: int
+    db: AsyncSession, following_ids: List[str], limit: int, ids: Optional[List[int]] = None
 ) -> list:
     """获取关注用户的达人服务评价（30天内）"""
     from app.utils.time_utils import get_utc_time
@@ -970,6 +1130,8 @@ async def _fetch_followed_service_reviews(
         .order_by(desc(models.Review.created_at))
         .limit(limit)
     )
+    if ids is not None:
+        query = query.where(models.Review.id.in_(ids))
     result = await db.execute(query)
     rows = result.all()
     items = []
@@ -1034,7 +1196,7 @@ async def _fetch_followed_service_reviews(
 
 
 async def _fetch_followed_rankings(
-    db: AsyncSession, following_ids: List[str], limit: int
+    db: AsyncSession, following_ids: List[str], limit: int, ids: Optional[List[int]] = None
 ) -> list:
     """获取关注用户申请的排行榜（无时间限制，含 TOP 3）"""
 
@@ -1064,6 +1226,8 @@ async def _fetch_followed_rankings(
         .order_by(desc(models.CustomLeaderboard.created_at))
         .limit(limit)
     )
+    if ids is not None:
+        query = query.where(models.CustomLeaderboard.id.in_(ids))
     result = await db.execute(query)
     rows = result.all()
 
@@ -22,6 +22,7 @@ appropriate app/routes/forum_*_routes.py.
 See docs/superpowers/specs/2026-04-26-forum-routes-split-design.md
 """
 
+import asyncio
 from typing import List, Optional
 from datetime import datetime, timezone, timedelta
 import json
@@ -36,6 +37,7 @@ from sqlalchemy.orm.attributes import NO_VALUE
 
 from app import models, schemas
 from app.deps import get_async_db_dependency
+from app.principal_cache import Principal
 
 logger = logging.getLogger(__name__)
 
@@ -195,12 +197,9 @@ async def check_and_trigger_risk_control(
                 )
                 post = post_result.scalar_one_or_none()
                 if post and not post.is_deleted:
-                    # 更新帖子可见性
-                    await db.execute(
-                        update(models.ForumPost)
-                        .where(models.ForumPost.id == target_id)
-                        .values(is_visible=False)
-                    )
+                    # 更新帖子可见性（ORM 写入，flush 时触发作者计数桶等 after_update 钩子）
+                    post.is_visible = False
+                    await db.flush()
                     # 更新板块统计
                     await update_category_stats(post.category_id, db)
             else:  # reply
@@ -210,12 +209,8 @@ async def check_and_trigger_risk_control(
                 )
                 reply = reply_result.scalar_one_or_none()
                 if reply and not reply.is_deleted:
-                    # 更新回复可见性
-                    await db.execute(
-                        update(models.ForumReply)
-                        .where(models.ForumReply.id == target_id)
-                        .values(is_visible=False)
-                    )
+                    # 更新回复可见性（ORM 写入，触发 after_update 钩子）
+                    reply.is_visible = False
                     # 更新帖子统计
                     post_result = await db.execute(
                         select(models.ForumPost).where(models.ForumPost.id == reply.post_id)
@@ -242,12 +237,9 @@ async def check_and_trigger_risk_control(
                 )
                 post = post_result.scalar_one_or_none()
                 if post and post.is_visible and not post.is_deleted:
-                    # 更新帖子删除状态
-                    await db.execute(
-                        update(models.ForumPost)
-                        .where(models.ForumPost.id == target_id)
-                        .values(is_deleted=True)
-                    )
+                    # 更新帖子删除状态（ORM 写入，flush 时触发作者计数桶等 after_update 钩子）
+                    post.is_deleted = True
+                    await db.flush()
                     # 更新板块统计
                     await update_category_stats(post.category_id, db)
             else:  # reply
@@ -257,12 +249,9 @@ async def check_and_trigger_risk_control(
                 )
                 reply = reply_result.scalar_one_or_none()
                 if reply and reply.is_visible and not reply.is_deleted:
-                    # 更新回复删除状态
-                    await db.execute(
-                        update(models.ForumReply)
-                        .where(models.ForumReply.id == target_id)
-                        .values(is_deleted=True)
-                    )
+                    # 更新回复删除状态（ORM 写入，触发 after_update 钩子）
+                    reply.is_deleted = True
+                    await db.flush()
                     # 更新帖子统计
                     post_result = await db.execute(
                         select(models.ForumPost).where(models.ForumPost.id == reply.post_id)
@@ -312,14 +301,15 @@ async def check_and_trigger_risk_control(
 async def get_current_user_secure_async_csrf(
     request: Request,
     db: AsyncSession = Depends(get_async_db_dependency),
-) -> models.User:
+) -> Principal:
     """CSRF保护的安全用户认证（异步版本）"""
     from app.secure_auth import validate_session
+    from app.principal_cache import get_principal
     
-    session = validate_session(request)
+    session = await asyncio.to_thread(validate_session, request)
     if session:
         from app import async_crud
-        user = await async_crud.async_user_crud.get_user_by_id(db, session.user_id)
+        user = await get_principal(db, session.user_id)
         if user:
             if hasattr(user, "is_suspended") and user.is_suspended:
                 raise HTTPException(
@@ -1150,17 +1140,9 @@ async def get_post_with_permissions(
 
 async def get_post_display_view_count(post_id: int, db_view_count: int) -> int:
     """获取帖子的显示浏览量（数据库值 + Redis增量）"""
-    try:
-        from app.redis_cache import get_redis_client
-        redis_client = get_redis_client()
-        if redis_client:
-            redis_key = f"forum:post:view_count:{post_id}"
-            redis_view_count = int(redis_client.get(redis_key) or 0)
-            if redis_view_count > 0:
-                return db_view_count + redis_view_count
-    except Exception as e:
-        logger.debug(f"Redis view count query failed for post {post_id}: {e}")
-    return db_view_count
+    from app.services.view_counts import get_view_count_overlay
+    pending = await get_view_count_overlay().apending_many("forum_post", [post_id])
+    return db_view_count + pending.get(post_id, 0)
 
 
 async def _batch_get_user_liked_favorited_posts(
@@ -1213,26 +1195,13 @@ async def _batch_get_post_display_view_counts(
     posts: list,
 ) -> dict[int, int]:
     """
-    批量获取帖子的显示浏览量（数据库值 + Redis 增量），避免多次 Redis 调用。
+    批量获取帖子的显示浏览量（数据库值 + Redis 增量），一次 HMGET，避免多次 Redis 调用。
     返回 {post_id: display_count}
     """
     if not posts:
         return {}
-
-    result = {p.id: (p.view_count or 0) for p in posts}
-    try:
-        from app.redis_cache import get_redis_client
-        redis_client = get_redis_client()
-        if redis_client:
-            keys = [f"forum:post:view_count:{p.id}" for p in posts]
-            redis_values = redis_client.mget(keys)
-            for post, val in zip(posts, redis_values or []):
-                redis_count = int(val or 0)
-                if redis_count > 0:
-                    result[post.id] = (post.view_count or 0) + redis_count
-    except Exception as e:
-        logger.debug(f"Redis MGET for view counts failed: {e}")
-    return result
+    from app.services.view_counts import get_view_count_overlay
+    return await get_view_count_overlay().overlay("forum_post", posts)
 
 
 async def _batch_get_category_post_counts_and_latest_posts(
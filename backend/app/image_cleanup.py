@@ -170,22 +170,14 @@ def delete_forum_post_files(post_id: int, image_urls: Optional[List[str]] = None
             if storage:
                 try:
                     from app.services.image_upload_service import ImageCategory
-                    # 删除帖子图片目录
-                    img_dir = f"{ImageCategory.FORUM_POST.value}/{post_id}"
-                    files = storage.list_files(img_dir)
-                    for file_key in files:
-                        if storage.delete(file_key):
-                            deleted_count += 1
-                    if files:
-                        storage.delete_directory(img_dir)
-                    # 删除帖子文件目录
-                    file_dir = f"{ImageCategory.FORUM_POST_FILE.value}/{post_id}"
-                    files = storage.list_files(file_dir)
-                    for file_key in files:
-                        if storage.delete(file_key):
-                            deleted_count += 1
-                    if files:
-                        storage.delete_directory(file_dir)
+                    # 删除帖子图片目录和文件目录（列出后批量删除）
+                    for dir_path in (
+                        f"{ImageCategory.FORUM_POST.value}/{post_id}",
+                        f"{ImageCategory.FORUM_POST_FILE.value}/{post_id}",
+                    ):
+                        files = storage.list_files(dir_path)
+                        if files:
+                            deleted_count += storage.delete_many(files)
                     if deleted_count > 0:
                         logger.info(f"删除帖子 {post_id} 的 {deleted_count} 个文件（云存储）")
                     return deleted_count
@@ -230,17 +222,19 @@ def delete_service_images(expert_id: str, service_id: int, image_urls: Optional[
             if storage:
                 try:
                     from app.services.image_upload_service import ImageCategory
+                    paths = []
                     for url in image_urls:
                         if not url:
                             continue
                         filename = extract_filename_from_url(url)
                         if filename:
-                            path = f"{ImageCategory.SERVICE_IMAGE.value}/{expert_id}/{filename}"
-                            if storage.delete(path):
-                                deleted_count += 1
-                                logger.info(f"删除服务 {service_id} 的图片（云存储）: {filename}")
-                            else:
-                                logger.warning(f"删除服务 {service_id} 的图片失败（云存储）: {filename}")
+                            paths.append(f"{ImageCategory.SERVICE_IMAGE.value}/{expert_id}/{filename}")
+                    if paths:
+                        deleted_count += storage.delete_many(paths)
+                        if deleted_count < len(paths):
+                            logger.warning(f"删除服务 {service_id} 的图片部分失败（云存储）: {deleted_count}/{len(paths)}")
+                        else:
+                            logger.info(f"删除服务 {service_id} 的 {deleted_count} 张图片（云存储）")
                 except Exception as e:
                     logger.warning(f"使用云存储删除服务图片失败 {service_id}: {e}")
         
@@ -293,18 +287,11 @@ def delete_task_images(task_id: int, include_private: bool = True):
                 try:
                     from app.services.image_upload_service import ImageCategory
                     dir_path = f"{ImageCategory.TASK.value}/{task_id}"
-                    # 列出目录中的所有文件
+                    # 列出目录中的所有文件，一次批量删除
                     files = storage.list_files(dir_path)
-                    for file_key in files:
-                        # file_key 是完整路径，需要提取文件名
-                        if storage.delete(file_key):
-                            deleted_count += 1
-                            logger.info(f"删除任务 {task_id} 的公开图片（云存储）: {file_key}")
-                    
-                    # 删除整个目录（如果为空会自动处理）
                     if files:
-                        storage.delete_directory(dir_path)
-                        logger.info(f"删除任务 {task_id} 的公开图片目录（云存储）")
+                        deleted_count += storage.delete_many(files)
+                        logger.info(f"删除任务 {task_id} 的 {deleted_count} 张公开图片（云存储）")
                 except Exception as e:
                     logger.warning(f"使用云存储删除任务公开图片失败 {task_id}: {e}")
         
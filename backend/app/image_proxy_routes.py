@@ -6,14 +6,30 @@
   通常在同一套 Cloudflare/配置下，CDN 可能只对 www 或同域返回了 Access-Control-Allow-Origin。
 - Flutter Web 部署在 app.link2ur.com，是另一个 Origin。若 CDN 未配置允许 app.link2ur.com，
   浏览器就会拦截跨域请求。所以通过本代理由后端拉取 cdn/www 资源并带上 CORS 头返回。
+
+实现要点：
+- 异步路由 + 进程级 httpx.AsyncClient 连接池，不再占用线程池、每次新建连接
+- 上游响应边读边写给客户端（流式），读取过程中强制执行大小上限
+- 本地磁盘 LRU 缓存（按 URL 索引），新鲜期内直接命中；过期后带
+  If-None-Match / If-Modified-Since 向上游重新验证，304 时复用本地副本；
+  缓存的目录扫描、元数据读写和正文写入都放到线程里执行，不阻塞事件循环
 """
+import asyncio
+import hashlib
+import json
 import logging
+import os
+import tempfile
+import threading
+import time
 import urllib.parse
-from typing import Optional
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional
 
-import requests
+import httpx
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from app.config import Config
 
@@ -46,6 +62,242 @@ PROXY_TIMEOUT = 15
 # 最大响应体（20MB，兼顾图片和文件）
 MAX_BODY_BYTES = 20 * 1024 * 1024
 
+# 流式读取块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 本地磁盘缓存：目录、容量上限、免验证新鲜期（秒）
+PROXY_CACHE_DIR = os.getenv(
+    "RESOURCE_PROXY_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "link2ur_resource_proxy"),
+)
+PROXY_CACHE_MAX_BYTES = int(os.getenv("RESOURCE_PROXY_CACHE_MAX_MB", "256")) * 1024 * 1024
+PROXY_CACHE_FRESH_SECONDS = int(os.getenv("RESOURCE_PROXY_CACHE_FRESH_SECONDS", "300"))
+
+_USER_AGENT = "Link2Ur-ResourceProxy/1.0"
+
+
+class _CacheEntry:
+    """磁盘缓存条目元数据（正文存放在同名 .bin 文件中）"""
+
+    __slots__ = ("key", "content_type", "etag", "last_modified", "size", "stored_at")
+
+    def __init__(
+        self,
+        key: str,
+        content_type: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        size: int,
+        stored_at: float,
+    ):
+        self.key = key
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.stored_at = stored_at
+
+    def to_dict(self) -> Dict:
+        return {
+            "content_type": self.content_type,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "size": self.size,
+            "stored_at": self.stored_at,
+        }
+
+
+class ResourceDiskCache:
+    """
+    有容量上限的本地磁盘 LRU 缓存，按 URL 的 sha256 作为文件名。
+
+    多个 worker 进程可共享同一目录：写入先落临时文件再 os.replace 原子替换，
+    本进程索引未命中时会回退读取磁盘上的元数据文件。
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def body_path(self, entry: _CacheEntry) -> str:
+        return self._body_path(entry.key)
+
+    def _read_meta(self, key: str) -> Optional[_CacheEntry]:
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return _CacheEntry(
+                key=key,
+                content_type=data["content_type"],
+                etag=data.get("etag"),
+                last_modified=data.get("last_modified"),
+                size=int(data["size"]),
+                stored_at=float(data["stored_at"]),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _ensure_loaded(self) -> None:
+        """首次使用时从磁盘重建索引（按 mtime 排序近似 LRU 顺序）"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            metas = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    path = os.path.join(self.directory, name)
+                    metas.append((os.path.getmtime(path), name[:-5]))
+        except OSError as e:
+            logger.warning("resource_proxy cache dir unavailable: %s", e)
+            return
+        for _, key in sorted(metas):
+            entry = self._read_meta(key)
+            if entry and os.path.exists(self._body_path(key)):
+                self._index[key] = entry
+                self._total_bytes += entry.size
+        self._evict_locked()
+
+    def get(self, url: str) -> Optional[_CacheEntry]:
+        key = self.key_for(url)
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._index.get(key)
+            if entry is None:
+                # 可能由其他 worker 写入
+                entry = self._read_meta(key)
+                if entry is None:
+                    return None
+                self._index[key] = entry
+                self._total_bytes += entry.size
+            if not os.path.exists(self._body_path(key)):
+                self._drop_locked(key)
+                return None
+            self._index.move_to_end(key)
+            return entry
+
+    def new_temp_path(self) -> str:
+        with self._lock:
+            self._ensure_loaded()
+        return os.path.join(self.directory, f".tmp-{uuid.uuid4().hex}")
+
+    def commit(
+        self,
+        url: str,
+        temp_path: str,
+        content_type: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        size: int,
+    ) -> None:
+        """将已写完的临时文件登记为缓存条目"""
+        if size > self.max_bytes:
+            self.discard(temp_path)
+            return
+        key = self.key_for(url)
+        entry = _CacheEntry(key, content_type, etag, last_modified, size, time.time())
+        try:
+            os.replace(temp_path, self._body_path(key))
+            self._write_meta(entry)
+        except OSError as e:
+            logger.warning("resource_proxy cache commit failed: %s", e)
+            self.discard(temp_path)
+            return
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old.size
+            self._index[key] = entry
+            self._total_bytes += size
+            self._evict_locked()
+
+    def touch(self, entry: _CacheEntry) -> None:
+        """上游 304 后刷新新鲜期"""
+        entry.stored_at = time.time()
+        try:
+            self._write_meta(entry)
+        except OSError:
+            pass
+
+    def discard(self, temp_path: str) -> None:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+    def _write_meta(self, entry: _CacheEntry) -> None:
+        tmp = f"{self._meta_path(entry.key)}.{uuid.uuid4().hex}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry.to_dict(), f)
+        os.replace(tmp, self._meta_path(entry.key))
+
+    def _drop_locked(self, key: str) -> None:
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+        for path in (self._body_path(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict_locked(self) -> None:
+        while self._total_bytes > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._drop_locked(key)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+_cache = ResourceDiskCache(PROXY_CACHE_DIR, PROXY_CACHE_MAX_BYTES)
+
+# 进程级 HTTP 连接池（懒加载，应用关闭时由 close_resource_proxy_client 释放）
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(PROXY_TIMEOUT, connect=5.0),
+            follow_redirects=True,
+            headers={"User-Agent": _USER_AGENT, "Accept": "*/*"},
+            limits=httpx.Limits(
+                max_connections=50,
+                max_keepalive_connections=20,
+                keepalive_expiry=60,
+            ),
+        )
+    return _http_client
+
+
+async def close_resource_proxy_client() -> None:
+    """关闭资源代理连接池（应用关闭时调用）"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
 
 def _get_origin(request: Request) -> Optional[str]:
     """从请求取 Origin，且必须在 ALLOWED_ORIGINS 内（由上层 CORS 中间件保证）。"""
@@ -59,13 +311,14 @@ def _get_origin(request: Request) -> Optional[str]:
     return origin
 
 
-def _proxy_resource(request: Request, url: str) -> Response:
-    """通用资源代理：仅允许自家域名，返回带 CORS 的响应。"""
+def _validate_url(url: str) -> str:
+    """校验代理目标 URL，返回去除首尾空白后的 URL"""
     if not url or not url.strip():
         raise HTTPException(status_code=400, detail="Missing url parameter")
 
+    url = url.strip()
     try:
-        parsed = urllib.parse.urlparse(url.strip())
+        parsed = urllib.parse.urlparse(url)
     except Exception as e:
         logger.warning("resource_proxy invalid url: %s", e)
         raise HTTPException(status_code=400, detail="Invalid url") from e
@@ -81,59 +334,148 @@ def _proxy_resource(request: Request, url: str) -> Response:
     if parsed.scheme not in ("http", "https"):
         raise HTTPException(status_code=400, detail="Invalid scheme")
 
+    return url
+
+
+def _response_headers(request: Request, content_type: str, etag: Optional[str]) -> Dict[str, str]:
+    headers = {
+        "Content-Type": content_type or "application/octet-stream",
+        "Cache-Control": "public, max-age=86400",
+    }
+    if etag:
+        headers["ETag"] = etag
+    origin = _get_origin(request)
+    if origin:
+        headers["Access-Control-Allow-Origin"] = origin
+    return headers
+
+
+def _cached_response(request: Request, entry: _CacheEntry) -> Response:
+    headers = _response_headers(request, entry.content_type, entry.etag)
+    if entry.etag and request.headers.get("If-None-Match") == entry.etag:
+        headers.pop("Content-Type", None)
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        _cache.body_path(entry),
+        media_type=entry.content_type or None,
+        headers=headers,
+    )
+
+
+async def _stream_and_cache(url: str, upstream: httpx.Response, content_type: str) -> AsyncIterator[bytes]:
+    """边读上游边输出，同时写入缓存临时文件；超过大小上限时中断连接并丢弃缓存"""
+    temp_path = await asyncio.to_thread(_cache.new_temp_path)
+    received = 0
+    completed = False
     try:
-        r = requests.get(
-            url,
-            timeout=PROXY_TIMEOUT,
-            stream=True,
-            headers={
-                "User-Agent": "Link2Ur-ResourceProxy/1.0",
-                "Accept": "*/*",
-            },
-        )
-        r.raise_for_status()
-    except requests.exceptions.Timeout:
+        try:
+            sink = await asyncio.to_thread(open, temp_path, "wb")
+        except OSError as e:
+            logger.debug("resource_proxy cache disabled for this request: %s", e)
+            sink = None
+        try:
+            async for chunk in upstream.aiter_bytes(STREAM_CHUNK_SIZE):
+                received += len(chunk)
+                if received > MAX_BODY_BYTES:
+                    # 响应头已发出，只能中断连接
+                    logger.warning("resource_proxy body exceeded limit url=%s", url[:80])
+                    raise RuntimeError("Resource too large")
+                if sink is not None:
+                    await asyncio.to_thread(sink.write, chunk)
+                yield chunk
+            completed = True
+        finally:
+            if sink is not None:
+                await asyncio.to_thread(sink.close)
+    finally:
+        await upstream.aclose()
+        if completed and sink is not None:
+            await asyncio.to_thread(
+                _cache.commit,
+                url,
+                temp_path,
+                content_type,
+                upstream.headers.get("ETag"),
+                upstream.headers.get("Last-Modified"),
+                received,
+            )
+        else:
+            await asyncio.to_thread(_cache.discard, temp_path)
+
+
+async def _proxy_resource(request: Request, url: str) -> Response:
+    """通用资源代理：仅允许自家域名，返回带 CORS 的响应。"""
+    url = _validate_url(url)
+
+    entry = await asyncio.to_thread(_cache.get, url)
+    if entry is not None and time.time() - entry.stored_at < PROXY_CACHE_FRESH_SECONDS:
+        return _cached_response(request, entry)
+
+    upstream_headers = {}
+    if entry is not None:
+        if entry.etag:
+            upstream_headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            upstream_headers["If-Modified-Since"] = entry.last_modified
+
+    client = _get_http_client()
+    try:
+        r = await client.send(client.build_request("GET", url, headers=upstream_headers), stream=True)
+    except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Upstream timeout") from None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.warning("resource_proxy upstream error url=%s: %s", url[:80], e)
         raise HTTPException(status_code=502, detail="Upstream error") from None
 
+    if r.url.host not in ALLOWED_HOSTS:
+        await r.aclose()
+        logger.warning("resource_proxy redirected to disallowed host: %s", r.url.host)
+        raise HTTPException(status_code=403, detail="Host not allowed")
+
+    if r.status_code == 304 and entry is not None:
+        await r.aclose()
+        await asyncio.to_thread(_cache.touch, entry)
+        return _cached_response(request, entry)
+
+    if r.status_code >= 400:
+        await r.aclose()
+        logger.warning("resource_proxy upstream error url=%s: status=%s", url[:80], r.status_code)
+        raise HTTPException(status_code=502, detail="Upstream error")
+
     content_type = (r.headers.get("Content-Type") or "").split(";")[0].strip().lower()
     if not content_type or not any(content_type.startswith(p) for p in ALLOWED_CONTENT_TYPE_PREFIXES):
         # 只代理允许的类型，避免滥用
+        await r.aclose()
         raise HTTPException(status_code=400, detail="Content type not allowed")
 
     content_length = r.headers.get("Content-Length")
-    if content_length and int(content_length) > MAX_BODY_BYTES:
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+        await r.aclose()
         raise HTTPException(status_code=413, detail="Resource too large")
 
-    body = r.content
-    if len(body) > MAX_BODY_BYTES:
-        raise HTTPException(status_code=413, detail="Resource too large")
-
-    origin = _get_origin(request)
-    headers = {
-        "Content-Type": content_type or "application/octet-stream",
-        "Cache-Control": "public, max-age=86400",
-    }
-    if origin:
-        headers["Access-Control-Allow-Origin"] = origin
+    headers = _response_headers(request, content_type, r.headers.get("ETag"))
+    if content_length and content_length.isdigit() and not r.headers.get("Content-Encoding"):
+        headers["Content-Length"] = content_length
 
-    return Response(content=body, media_type=content_type or None, headers=headers)
+    return StreamingResponse(
+        _stream_and_cache(url, r, content_type),
+        media_type=content_type or None,
+        headers=headers,
+    )
 
 
 @router.get("/proxy/resource")
-def proxy_resource_route(request: Request, url: str) -> Response:
+async def proxy_resource_route(request: Request, url: str) -> Response:
     """
     代理图片与文件请求，解决 Web 端从 app.link2ur.com 加载 cdn/www 资源时的 CORS 问题。
     仅允许指向 link2ur 自家域名的 URL，且仅允许图片和常见文件类型。
     """
-    return _proxy_resource(request, url)
+    return await _proxy_resource(request, url)
 
 
 @router.get("/proxy/image")
-def proxy_image(request: Request, url: str) -> Response:
+async def proxy_image(request: Request, url: str) -> Response:
     """
     兼容旧接口：仅代理图片。新调用请使用 /proxy/resource（支持图片+文件）。
     """
-    return _proxy_resource(request, url)
+    return await _proxy_resource(request, url)
@@ -1130,6 +1130,44 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"⚠️  BehaviorCollector 启动失败: {e}")
 
+    # 启动延迟直方图发布（跨 worker 汇总分位数）
+    try:
+        from app.observability.latency_histogram import latency_registry
+        latency_registry.start_publisher()
+    except Exception as e:
+        logger.warning(f"⚠️  延迟直方图发布线程启动失败: {e}")
+
+    # 事件循环卡顿监控；采样剖析器默认关闭，可由管理员接口按 worker 开启
+    try:
+        from app.observability.sampling_profiler import (
+            LOOP_LAG_MONITOR_ENABLED,
+            SAMPLING_PROFILER_AUTOSTART,
+            loop_lag_monitor,
+            stack_sampler,
+        )
+        if LOOP_LAG_MONITOR_ENABLED:
+            loop_lag_monitor.start()
+        if SAMPLING_PROFILER_AUTOSTART:
+            stack_sampler.start()
+    except Exception as e:
+        logger.warning(f"⚠️  事件循环监控 / 采样剖析器启动失败: {e}")
+
+    # 事件循环阻塞检测：按 Task step 计时，把 async 路由里的同步调用归到路由和调用点
+    try:
+        from app.observability.loop_blocking import LOOP_BLOCKING_DETECTOR_ENABLED, loop_blocking_detector
+        if LOOP_BLOCKING_DETECTOR_ENABLED:
+            loop_blocking_detector.install()
+    except Exception as e:
+        logger.warning(f"⚠️  事件循环阻塞检测启用失败: {e}")
+
+    # 启动用户任务交互写回日志
+    try:
+        from app.services.interaction_log import get_interaction_log
+        get_interaction_log().start()
+        logger.info("✅ InteractionLog 已启动")
+    except Exception as e:
+        logger.warning(f"⚠️  InteractionLog 启动失败: {e}")
+
     # 启动定时任务调度器 - 优先使用 Celery，备用 TaskScheduler
     import threading
     import time
@@ -1698,6 +1736,33 @@ async def shutdown_event():
     except Exception as e:
         logger.warning(f"停止 BehaviorCollector 时出错: {e}")
 
+    try:
+        from app.observability.latency_histogram import latency_registry
+        latency_registry.stop_publisher()
+    except Exception as e:
+        logger.warning(f"停止延迟直方图发布线程时出错: {e}")
+
+    try:
+        from app.observability.sampling_profiler import loop_lag_monitor, stack_sampler
+        loop_lag_monitor.stop()
+        stack_sampler.stop()
+    except Exception as e:
+        logger.warning(f"停止事件循环监控 / 采样剖析器时出错: {e}")
+
+    try:
+        from app.observability.loop_blocking import blocking_offloader, loop_blocking_detector
+        loop_blocking_detector.uninstall()
+        blocking_offloader.shutdown()
+    except Exception as e:
+        logger.warning(f"停止事件循环阻塞检测时出错: {e}")
+
+    try:
+        from app.services.interaction_log import get_interaction_log
+        get_interaction_log().stop()
+        logger.info("已停止 InteractionLog")
+    except Exception as e:
+        logger.warning(f"停止 InteractionLog 时出错: {e}")
+
     # 1. 停止连接池监控任务
     try:
         from app.database import stop_pool_monitor
@@ -1753,6 +1818,27 @@ async def shutdown_event():
     except Exception as e:
         logger.warning(f"关闭 APNs 连接时出错: {e}")
 
+    # 5.1 关闭资源代理 HTTP 连接池
+    try:
+        from app.image_proxy_routes import close_resource_proxy_client
+        await close_resource_proxy_client()
+    except Exception as e:
+        logger.warning(f"关闭资源代理连接池时出错: {e}")
+
+    # 5.2 关闭图片处理进程池
+    try:
+        from app.services.image_executor import shutdown_image_executor
+        shutdown_image_executor(wait=False)
+    except Exception as e:
+        logger.warning(f"关闭图片处理进程池时出错: {e}")
+
+    # 5.3 关闭异步 Redis 连接池
+    try:
+        from app.redis_async import close_async_pools
+        await close_async_pools()
+    except Exception as e:
+        logger.warning(f"关闭异步 Redis 连接池时出错: {e}")
+
     # 6. 关闭数据库连接池（必须在事件循环还活着的时候做）
     try:
         from app.database import close_database_pools
@@ -2235,8 +2321,10 @@ async def websocket_chat(
                         
                         # 发送推送通知
                         try:
+                            from app.observability.loop_blocking import run_blocking
                             from app.push_notification_service import send_push_notification
-                            send_push_notification(
+                            await run_blocking(
+                                send_push_notification,
                                 db=db,
                                 user_id=msg["receiver_id"],
                                 title=None,  # 从模板生成
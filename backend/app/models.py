@@ -2864,6 +2864,27 @@ class ForumRiskControlLog(Base):
     )
 
 
+class ForumAuthorDailyStat(Base):
+    """论坛作者每日计数桶（发帖 / 被收藏 / 获赞排行榜的预聚合）
+
+    按内容创建日期（UTC）和帖子板块分桶，由事件钩子在发帖、点赞、收藏时增量维护；
+    超出排行榜最长周期的桶由定时任务合并到 day=1970-01-01 的汇总桶。
+    category_id 为 0 表示无板块（或回复获赞），排行榜读取时再按板块类型过滤。
+    """
+    __tablename__ = "forum_author_daily_stats"
+
+    author_id = Column(String(8), primary_key=True)
+    day = Column(Date, primary_key=True)
+    category_id = Column(Integer, primary_key=True, default=0)
+    post_count = Column(Integer, nullable=False, default=0, server_default=text('0'))  # 可见帖子数
+    favorite_count = Column(Integer, nullable=False, default=0, server_default=text('0'))  # 可见帖子被收藏数
+    like_count = Column(Integer, nullable=False, default=0, server_default=text('0'))  # 帖子 + 回复获赞数
+
+    __table_args__ = (
+        Index("idx_forum_author_daily_stats_day", day),
+    )
+
+
 # ==================== 自定义排行榜相关模型 ====================
 
 class CustomLeaderboard(Base):
@@ -3812,6 +3833,21 @@ class UserProfilePreference(Base):
     )
 
 
+class UserPreferenceVector(Base):
+    """用户偏好向量（推荐用，增量维护）
+
+    data 为紧凑 JSON：任务类型 / 地点 / 关键词 / 负反馈类型的衰减权重，以及价格的加权和。
+    权重以 updated_at 为衰减基准，读取时再按经过的时间做指数衰减；
+    交互写入和任务历史提交后由 app.recommendation.preference_store 增量更新，version 随每次写入递增。
+    """
+    __tablename__ = "user_preference_vectors"
+
+    user_id = Column(String(8), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1, server_default=text('1'))
+    data = Column(JSON, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=get_utc_time)  # 权重的衰减基准时间
+
+
 class UserReliability(Base):
     __tablename__ = "user_reliability"
 
@@ -3986,6 +4022,36 @@ class TrendingSnapshot(Base):
     updated_at = Column(DateTime(timezone=True), default=get_utc_time)
 
 
+class StorageObject(Base):
+    """存储清单：记录每个通过 ImageUploadService 上传的对象及其归属实体
+
+    实体删除时由事件钩子写入 orphaned_at，清理任务按 orphaned_at 增量删除对象，
+    不再需要全量加载实体 ID 并遍历目录树 / 列举 S3 前缀。
+    """
+    __tablename__ = "storage_objects"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    path = Column(String(512), nullable=False, unique=True)  # 存储后端相对路径
+    entity_type = Column(String(32), nullable=False)  # task / flea_market_item / banner ...
+    entity_id = Column(String(64), nullable=True)  # 临时上传为 NULL
+    owner_user_id = Column(String(8), nullable=True)  # 临时上传的用户
+    size = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=get_utc_time)
+    orphaned_at = Column(DateTime(timezone=True), nullable=True)  # 实体已删除，等待清理
+
+    __table_args__ = (
+        Index("ix_storage_objects_entity", "entity_type", "entity_id"),
+        Index(
+            "ix_storage_objects_orphaned_at", "orphaned_at",
+            postgresql_where=text("orphaned_at IS NOT NULL"),
+        ),
+        Index(
+            "ix_storage_objects_temp_created", "created_at",
+            postgresql_where=text("entity_id IS NULL"),
+        ),
+    )
+
+
 from app.wallet_models import WalletAccount, WalletTransaction  # noqa: F401, E402
 
 # 达人团队体系模型（独立文件，合并到同一 metadata）
@@ -1597,17 +1597,8 @@ def get_activity_detail(
                     user_task_has_negotiation = False
     
     # 记录浏览量（Redis 累加，定时同步到 DB）
-    try:
-        from app.redis_cache import get_redis_client
-        _rc = get_redis_client()
-        if _rc:
-            _rk = f"activity:view_count:{activity_id}"
-            _rc.incr(_rk)
-            _rc.expire(_rk, 7 * 24 * 3600)
-        else:
-            activity.view_count += 1
-            db.flush()
-    except Exception:
+    from app.services.view_counts import get_view_count_overlay
+    if get_view_count_overlay().incr("activity", activity_id) is None:
         activity.view_count += 1
         db.flush()
 
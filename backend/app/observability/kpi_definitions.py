@@ -2,7 +2,7 @@
 观测与回归 KPI 定义
 定义 RUM + APM 的关键性能指标和阈值
 """
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from app.utils.time_utils import get_utc_time, format_iso_utc
 
@@ -49,6 +49,16 @@ KPI_THRESHOLDS = {
     }
 }
 
+# KPI 端点名 → 路由模板（与 RequestLoggingMiddleware 记录的 "METHOD /path/{param}" 一致）
+KPI_ENDPOINT_ROUTES = {
+    "task_detail": ["GET /api/tasks/{task_id}"],
+    "task_list": ["GET /api/tasks"],
+    "user_profile": ["GET /api/users/profile/me", "GET /api/profile/me"],
+}
+
+# 样本数少于该值时不评估分位数（避免冷启动误报）
+KPI_MIN_SAMPLES = 20
+
 # 告警级别
 ALERT_LEVELS = {
     "critical": "critical",  # 严重：立即处理
@@ -101,3 +111,62 @@ def get_kpi_summary() -> Dict[str, Any]:
         "last_updated": format_iso_utc(get_utc_time())
     }
 
+
+def evaluate_latency_kpis(snapshot=None, min_samples: int = KPI_MIN_SAMPLES) -> Dict[str, Any]:
+    """
+    用实时延迟直方图评估 P95 类 KPI
+
+    - api_p95_latency：KPI_ENDPOINT_ROUTES 中的端点各自评估，其余路由逐个按 default 阈值评估
+    - database_metrics.query_p95：所有查询合并后的 P95
+
+    Args:
+        snapshot: {(kind, name): LatencyHistogram}，默认读取集群（Redis 汇总）快照
+        min_samples: 样本数不足的直方图跳过
+
+    Returns:
+        {"results": [check_kpi_threshold 结果 + samples], "exceeded": 超标数量}
+    """
+    from app.observability.latency_histogram import latency_registry, merged_histogram
+
+    if snapshot is None:
+        snapshot = latency_registry.cluster_snapshot()
+
+    results: List[Dict[str, Any]] = []
+
+    def _check(metric_name: str, hist, endpoint: str, threshold_key: Optional[str] = None):
+        if hist.count < min_samples:
+            return
+        result = check_kpi_threshold(metric_name, hist.quantile(0.95), threshold_key or endpoint)
+        result["endpoint"] = endpoint
+        result["samples"] = hist.count
+        results.append(result)
+
+    mapped_routes = set()
+    for endpoint, routes in KPI_ENDPOINT_ROUTES.items():
+        mapped_routes.update(routes)
+        _check("api_p95_latency", merged_histogram(snapshot, "endpoint", routes), endpoint)
+    for (kind, name), hist in snapshot.items():
+        if kind == "endpoint" and name not in mapped_routes:
+            _check("api_p95_latency", hist, name, "default")
+
+    db_thresholds = KPI_THRESHOLDS["database_metrics"]
+    query_hist = merged_histogram(snapshot, "query")
+    if query_hist.count >= min_samples:
+        p95 = query_hist.quantile(0.95)
+        threshold = db_thresholds["query_p95"]
+        results.append({
+            "metric": "database_metrics.query_p95",
+            "endpoint": "all_queries",
+            "value": p95,
+            "threshold": threshold,
+            "exceeded": p95 > threshold,
+            "level": (ALERT_LEVELS["critical"] if p95 > threshold * 1.5 else ALERT_LEVELS["warning"]) if p95 > threshold else ALERT_LEVELS["info"],
+            "samples": query_hist.count,
+            "timestamp": format_iso_utc(get_utc_time()),
+        })
+
+    return {
+        "results": results,
+        "exceeded": sum(1 for r in results if r["exceeded"]),
+        "evaluated_at": format_iso_utc(get_utc_time()),
+    }
@@ -0,0 +1,312 @@
+"""
+延迟直方图（DDSketch 风格）
+固定内存、可合并的对数分桶直方图，用于在线计算 p50 / p95 / p99。
+
+- 分桶：桶 i 覆盖 (γ^(i-1), γ^i]，γ = (1+α)/(1-α)，分位数的相对误差不超过 α（默认 1%）
+- 固定内存：桶数超过上限时把最低的桶合并进相邻桶（只影响最低分位的精度）
+- 可合并：两个直方图逐桶相加即可，用于跨线程 / 跨 worker 汇总
+- 无锁记录：LatencyRegistry 为每个线程维护独立分片，记录时只写本线程的分片，读取时合并
+- 跨 worker 汇总：publish 把本 worker 当前时间窗的快照写入 Redis 哈希（字段为 worker ID），
+  cluster_snapshot 读取当前和上一时间窗的所有 worker 快照并合并
+"""
+
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 相对误差
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# 每个直方图的最大桶数（α=1% 时 1024 个桶可覆盖约 9 个数量级）
+DEFAULT_MAX_BUCKETS = 1024
+# 小于该值的样本计入零桶（毫秒）
+MIN_TRACKED_VALUE = 1e-3
+
+# 跨 worker 汇总
+LATENCY_WINDOW_SECONDS = int(os.getenv("LATENCY_WINDOW_SECONDS", "300"))
+LATENCY_PUBLISH_INTERVAL = int(os.getenv("LATENCY_PUBLISH_INTERVAL", "15"))
+LATENCY_REDIS_PREFIX = "perf:latency:"
+
+REPORTED_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """对数分桶直方图，单位毫秒"""
+
+    __slots__ = ("alpha", "max_buckets", "_gamma_log", "buckets", "zero_count", "count", "sum", "max")
+
+    def __init__(self, alpha: float = DEFAULT_RELATIVE_ACCURACY, max_buckets: int = DEFAULT_MAX_BUCKETS):
+        self.alpha = alpha
+        self.max_buckets = max_buckets
+        self._gamma_log = math.log((1 + alpha) / (1 - alpha))
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms: float):
+        self.count += 1
+        self.sum += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+        if value_ms <= MIN_TRACKED_VALUE:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value_ms) / self._gamma_log)
+        buckets = self.buckets
+        buckets[index] = buckets.get(index, 0) + 1
+        if len(buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        """合并最低的桶，直到桶数回到上限"""
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - self.max_buckets
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.buckets[target] += self.buckets.pop(index)
+
+    def merge(self, other: "LatencyHistogram"):
+        if other.alpha != self.alpha:
+            raise ValueError("只能合并相对误差相同的直方图")
+        # list()：other 可能正被其他线程写入
+        for index, n in list(other.buckets.items()):
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """分位数估计（毫秒）；没有样本时返回 None"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # 桶的代表值：使相对误差对称的点
+                return min(2 * math.exp(index * self._gamma_log) / (1 + math.exp(self._gamma_log)), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        result = {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max, 3),
+        }
+        for q in REPORTED_QUANTILES:
+            value = self.quantile(q)
+            result[f"p{round(q * 100)}_ms"] = round(value, 3) if value is not None else None
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "a": self.alpha,
+            "b": {str(index): n for index, n in self.buckets.items()},
+            "z": self.zero_count,
+            "c": self.count,
+            "s": self.sum,
+            "m": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_buckets: int = DEFAULT_MAX_BUCKETS) -> "LatencyHistogram":
+        hist = cls(alpha=data["a"], max_buckets=max_buckets)
+        hist.buckets = {int(index): int(n) for index, n in data["b"].items()}
+        hist.zero_count = int(data["z"])
+        hist.count = int(data["c"])
+        hist.sum = float(data["s"])
+        hist.max = float(data["m"])
+        return hist
+
+
+# (类别, 名称)，类别如 endpoint / query / cache / api_call / db_query
+HistogramKey = Tuple[str, str]
+
+
+def _key_str(key: HistogramKey) -> str:
+    return f"{key[0]}|{key[1]}"
+
+
+def _parse_key(value: str) -> HistogramKey:
+    kind, _, name = value.partition("|")
+    return kind, name
+
+
+class LatencyRegistry:
+    """
+    按 (类别, 名称) 维护直方图
+
+    每个线程写自己的分片（threading.local），记录路径上没有锁；
+    只有线程首次记录时在锁内登记分片。读取时合并所有分片。
+    """
+
+    # 每个分片的最大 key 数（防止路径参数等高基数名称撑爆内存）
+    MAX_KEYS = 500
+
+    def __init__(self, window_seconds: int = LATENCY_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._local = threading.local()
+        self._shards: List[Dict[str, Any]] = []
+        self._shards_lock = threading.Lock()
+        self._publisher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _window_id(self, now: Optional[float] = None) -> int:
+        return int((now if now is not None else time.time()) // self.window_seconds)
+
+    def _shard(self) -> Dict[str, Any]:
+        shard = getattr(self._local, "shard", None)
+        window_id = self._window_id()
+        if shard is None:
+            shard = {"window": window_id, "hists": {}}
+            self._local.shard = shard
+            with self._shards_lock:
+                self._shards.append(shard)
+        elif shard["window"] != window_id:
+            # 新时间窗：替换直方图表（读取方可能仍持有旧表，不受影响）
+            shard["hists"] = {}
+            shard["window"] = window_id
+        return shard
+
+    def record(self, kind: str, name: str, duration_ms: float):
+        hists = self._shard()["hists"]
+        key = (kind, name)
+        hist = hists.get(key)
+        if hist is None:
+            if len(hists) >= self.MAX_KEYS:
+                key = (kind, "__other__")
+                hist = hists.get(key)
+            if hist is None:
+                hist = hists[key] = LatencyHistogram()
+        hist.record(duration_ms)
+
+    def local_snapshot(self) -> Dict[HistogramKey, LatencyHistogram]:
+        """合并本 worker 所有线程当前时间窗的直方图"""
+        window_id = self._window_id()
+        merged: Dict[HistogramKey, LatencyHistogram] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            if shard["window"] != window_id:
+                continue
+            for key, hist in list(shard["hists"].items()):
+                target = merged.get(key)
+                if target is None:
+                    target = merged[key] = LatencyHistogram(hist.alpha, hist.max_buckets)
+                target.merge(hist)
+        return merged
+
+    # ---- 跨 worker 汇总（Redis） ----
+
+    def publish(self, redis_client=None) -> bool:
+        """把本 worker 当前时间窗的快照写入 Redis"""
+        if redis_client is None:
+            from app.redis_cache import get_redis_client
+            redis_client = get_redis_client()
+        if not redis_client:
+            return False
+        snapshot = self.local_snapshot()
+        if not snapshot:
+            return False
+        key = f"{LATENCY_REDIS_PREFIX}{self._window_id()}"
+        payload = json.dumps({_key_str(k): h.to_dict() for k, h in snapshot.items()}, separators=(",", ":"))
+        try:
+            pipe = redis_client.pipeline()
+            pipe.hset(key, self.worker_id, payload)
+            pipe.expire(key, self.window_seconds * 3)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"发布延迟直方图失败: {e}")
+            return False
+
+    def cluster_snapshot(self, redis_client=None, windows: int = 2) -> Dict[HistogramKey, LatencyHistogram]:
+        """
+        合并所有 worker 最近 windows 个时间窗的直方图；Redis 不可用时退回本 worker 快照
+        """
+        if redis_client is None:
+            from app.redis_cache import get_redis_client
+            redis_client = get_redis_client()
+        if not redis_client:
+            return self.local_snapshot()
+        current = self._window_id()
+        merged: Dict[HistogramKey, LatencyHistogram] = {}
+        try:
+            for window_id in range(current - windows + 1, current + 1):
+                payloads = redis_client.hgetall(f"{LATENCY_REDIS_PREFIX}{window_id}") or {}
+                for payload in payloads.values():
+                    if isinstance(payload, bytes):
+                        payload = payload.decode("utf-8")
+                    for key_str, data in json.loads(payload).items():
+                        key = _parse_key(key_str)
+                        hist = LatencyHistogram.from_dict(data)
+                        target = merged.get(key)
+                        if target is None:
+                            merged[key] = hist
+                        else:
+                            target.merge(hist)
+        except Exception as e:
+            logger.warning(f"读取集群延迟直方图失败，使用本 worker 数据: {e}")
+            return self.local_snapshot()
+        return merged
+
+    def start_publisher(self, interval: int = LATENCY_PUBLISH_INTERVAL):
+        """后台线程定期发布快照"""
+        if self._publisher is not None:
+            return
+        self._stop_event.clear()
+
+        def _loop():
+            while not self._stop_event.wait(timeout=interval):
+                self.publish()
+
+        self._publisher = threading.Thread(target=_loop, daemon=True, name="latency-publisher")
+        self._publisher.start()
+
+    def stop_publisher(self):
+        if self._publisher is None:
+            return
+        self._stop_event.set()
+        self._publisher.join(timeout=5)
+        self._publisher = None
+        self.publish()
+
+
+def summarize(snapshot: Dict[HistogramKey, LatencyHistogram], kinds: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """按类别输出 {kind: {name: summary}}"""
+    wanted = set(kinds) if kinds is not None else None
+    result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for (kind, name), hist in snapshot.items():
+        if wanted is not None and kind not in wanted:
+            continue
+        result.setdefault(kind, {})[name] = hist.summary()
+    return result
+
+
+def merged_histogram(snapshot: Dict[HistogramKey, LatencyHistogram], kind: str, names: Optional[Iterable[str]] = None) -> LatencyHistogram:
+    """把某个类别下（可选指定名称）的直方图合并为一个"""
+    wanted = set(names) if names is not None else None
+    merged = LatencyHistogram()
+    for (k, name), hist in snapshot.items():
+        if k == kind and (wanted is None or name in wanted):
+            merged.merge(hist)
+    return merged
+
+
+# 全局实例
+latency_registry = LatencyRegistry()
@@ -0,0 +1,408 @@
+"""
+事件循环阻塞检测（async 路由里的同步调用）
+
+async 路由直接调用同步代码（同步 Redis 客户端、TranslationManager.translate、推送、requests 等）时，
+整个 worker 的事件循环在这段时间里停摆，表现为其他请求的 p99 抖动。这里按 Task 的每一步（step）计时，
+把超过阈值的停顿归到路由和调用点：
+
+- 计时：通过 loop.set_task_factory 给每个 Task 的协程套一层计时壳，send/throw 的耗时就是该 Task
+  这一步占用事件循环的时间。asyncio 的 slow_callback_duration 只在 debug 模式下打日志，
+  而 uvicorn[standard] 默认使用的 uvloop 的 Handle 是 C 实现、无法替换 _run，Task 工厂两种循环都支持
+- 调用栈：看门狗线程发现当前这一步超过阈值仍未结束时，抓取事件循环线程的调用栈，
+  取最内层的应用帧作为调用点
+- 归属：RequestLoggingMiddleware 在请求开始时 begin(request)，路由处理所在的子 Task 继承 contextvar，
+  结束时 finish(...) 汇总本请求占用循环的总时长（写入延迟直方图 kind=loop_busy）和超阈值的停顿
+- 卸载：run_blocking(func, ...) 在 LOOP_BLOCKING_OFFLOAD 打开时把已知的阻塞调用放到有界线程池执行，
+  关闭时原地调用（仍可被检测到），便于对比开关前后的 p99
+"""
+
+import asyncio
+import collections.abc
+import contextvars
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import types
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.observability.sampling_profiler import fold_stack, worker_id
+
+logger = logging.getLogger(__name__)
+
+LOOP_BLOCKING_DETECTOR_ENABLED = os.getenv("LOOP_BLOCKING_DETECTOR_ENABLED", "true").lower() == "true"
+LOOP_BLOCKING_THRESHOLD_MS = float(os.getenv("LOOP_BLOCKING_THRESHOLD_MS", "50"))
+LOOP_BLOCKING_OFFLOAD = os.getenv("LOOP_BLOCKING_OFFLOAD", "false").lower() == "true"
+LOOP_BLOCKING_OFFLOAD_WORKERS = int(os.getenv("LOOP_BLOCKING_OFFLOAD_WORKERS", "8"))
+# 每个 worker 允许的在途卸载调用数，超过时在事件循环侧排队等待
+LOOP_BLOCKING_OFFLOAD_MAX_PENDING = int(os.getenv("LOOP_BLOCKING_OFFLOAD_MAX_PENDING", "64"))
+
+_MAX_ROUTES = 500
+_MAX_CALL_SITES = 500
+_MAX_EVENTS = 200
+
+
+class _RequestStall:
+    """一个请求（含其派生的子 Task）占用事件循环的累计"""
+
+    __slots__ = ("scope", "method", "busy_ms", "max_step_ms", "slow_steps", "closed")
+
+    def __init__(self, scope: Dict[str, Any], method: str):
+        self.scope = scope
+        self.method = method
+        self.busy_ms = 0.0
+        self.max_step_ms = 0.0
+        self.slow_steps = 0
+        self.closed = False
+
+    @property
+    def route(self) -> str:
+        # 路由匹配发生在中间件之后，用到时再读 scope["route"]
+        route = self.scope.get("route")
+        return f"{self.method} {getattr(route, 'path', None) or 'unmatched'}"
+
+
+_current_request: contextvars.ContextVar[Optional[_RequestStall]] = contextvars.ContextVar(
+    "loop_blocking_request", default=None
+)
+
+
+class _TimedCoroutine(collections.abc.Coroutine):
+    """Task 协程的计时壳：每次 send/throw 即 Task 的一步"""
+
+    __slots__ = ("_coro", "_detector", "busy_ms", "__weakref__")
+
+    def __init__(self, coro, detector: "LoopBlockingDetector"):
+        self._coro = coro
+        self._detector = detector
+        self.busy_ms = 0.0
+
+    def send(self, value):
+        start = time.perf_counter()
+        self._detector._current = (start, self)
+        try:
+            return self._coro.send(value)
+        finally:
+            self._detector._step_done(self, start)
+
+    def throw(self, typ, val=None, tb=None):
+        start = time.perf_counter()
+        self._detector._current = (start, self)
+        try:
+            if val is None and tb is None:
+                return self._coro.throw(typ)
+            return self._coro.throw(typ, val, tb)
+        finally:
+            self._detector._step_done(self, start)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    def __getattr__(self, name):
+        # __qualname__ / cr_frame / cr_running 等交给原协程（Task repr、get_stack、anyio 都会读取）
+        return getattr(self._coro, name)
+
+    def __repr__(self):
+        return repr(self._coro)
+
+
+def _call_site(stack: List[str]) -> Optional[str]:
+    """最内层的应用帧（跳过本模块所在的 observability 包）"""
+    for label in reversed(stack):
+        if "(app/" in label and "(app/observability/" not in label:
+            return label
+    return None
+
+
+class LoopBlockingDetector:
+    """按 Task step 计时的事件循环阻塞检测器（每个 worker 一份）"""
+
+    def __init__(self, threshold_ms: float = LOOP_BLOCKING_THRESHOLD_MS):
+        self.threshold_ms = threshold_ms
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._previous_factory = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        # 正在执行的一步：(开始时间, 计时壳)；看门狗抓到的栈：(开始时间, 栈)
+        self._current: Optional[tuple] = None
+        self._captured: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self.routes: Dict[str, Dict[str, Any]] = {}
+        self.call_sites: Dict[str, Dict[str, Any]] = {}
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=_MAX_EVENTS)
+        self.steps = 0
+        self.stalls = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def installed(self) -> bool:
+        return self._loop is not None
+
+    # ---- 安装 ----
+
+    def install(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """必须在事件循环线程内调用；之后新建的 Task 才会被计时"""
+        if self.installed:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+        self._stop_event.clear()
+        self.started_at = time.time()
+        self._watchdog = threading.Thread(target=self._watch, daemon=True, name="loop-blocking-watchdog")
+        self._watchdog.start()
+        logger.info("事件循环阻塞检测已启用（阈值 %.0fms）", self.threshold_ms)
+
+    def uninstall(self):
+        if not self.installed:
+            return
+        self._stop_event.set()
+        if self._loop.get_task_factory() == self._task_factory:
+            self._loop.set_task_factory(self._previous_factory)
+        self._loop = None
+        self._previous_factory = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=2)
+            self._watchdog = None
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if type(coro) is types.CoroutineType:
+            coro = _TimedCoroutine(coro, self)
+        if self._previous_factory is not None:
+            return self._previous_factory(loop, coro, **kwargs)
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    # ---- 请求归属 ----
+
+    def begin(self, scope: Dict[str, Any], method: str) -> Optional[contextvars.Token]:
+        if not self.installed:
+            return None
+        return _current_request.set(_RequestStall(scope, method))
+
+    def finish(self, token: Optional[contextvars.Token]) -> Optional[_RequestStall]:
+        """结束本请求的统计：占用循环总时长写入直方图，按路由累计"""
+        if token is None:
+            return None
+        stall = _current_request.get()
+        _current_request.reset(token)
+        if stall is None:
+            return None
+        # 响应之后仍在运行的后台任务不再计入该请求
+        stall.closed = True
+        route = stall.route
+        try:
+            from app.observability.latency_histogram import latency_registry
+            latency_registry.record("loop_busy", route, stall.busy_ms)
+        except Exception:
+            pass
+        with self._lock:
+            stats = self._route_stats(route)
+            stats["requests"] += 1
+            stats["busy_ms"] += stall.busy_ms
+        return stall
+
+    def _route_stats(self, route: str) -> Dict[str, Any]:
+        stats = self.routes.get(route)
+        if stats is None:
+            if len(self.routes) >= _MAX_ROUTES:
+                route = "__other__"
+                stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = {
+                    "requests": 0, "busy_ms": 0.0, "stalls": 0, "stall_ms": 0.0, "max_ms": 0.0,
+                }
+        return stats
+
+    # ---- 计时 ----
+
+    def _step_done(self, timed: _TimedCoroutine, start: float):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._current = None
+        self.steps += 1
+        timed.busy_ms += elapsed_ms
+        stall = _current_request.get()
+        if stall is not None and not stall.closed:
+            stall.busy_ms += elapsed_ms
+            if elapsed_ms > stall.max_step_ms:
+                stall.max_step_ms = elapsed_ms
+        if elapsed_ms >= self.threshold_ms:
+            self._record_stall(timed, start, elapsed_ms, stall if stall is not None and not stall.closed else None)
+
+    def _record_stall(self, timed: _TimedCoroutine, start: float, elapsed_ms: float, stall: Optional[_RequestStall]):
+        captured, self._captured = self._captured, None
+        stack = captured[1] if captured is not None and captured[0] == start else []
+        coroutine = getattr(timed._coro, "__qualname__", None) or repr(timed._coro)
+        site = _call_site(stack) or coroutine
+        route = stall.route if stall is not None else None
+        if stall is not None:
+            stall.slow_steps += 1
+        task = asyncio.current_task()
+        event = {
+            "at": time.time(),
+            "blocked_ms": round(elapsed_ms, 1),
+            "route": route,
+            "task": task.get_name() if task is not None else None,
+            "coroutine": coroutine,
+            "task_busy_ms": round(timed.busy_ms, 1),
+            "call_site": site,
+            "stack": stack,
+        }
+        with self._lock:
+            self.stalls += 1
+            self.events.append(event)
+            if route is not None:
+                stats = self._route_stats(route)
+                stats["stalls"] += 1
+                stats["stall_ms"] += elapsed_ms
+                stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            key = site
+            site_stats = self.call_sites.get(key)
+            if site_stats is None:
+                if len(self.call_sites) >= _MAX_CALL_SITES:
+                    key = "__other__"
+                    site_stats = self.call_sites.get(key)
+                if site_stats is None:
+                    site_stats = self.call_sites[key] = {
+                        "count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": {}, "example_stack": stack,
+                    }
+            site_stats["count"] += 1
+            site_stats["total_ms"] += elapsed_ms
+            site_stats["max_ms"] = max(site_stats["max_ms"], elapsed_ms)
+            if stack and not site_stats["example_stack"]:
+                site_stats["example_stack"] = stack
+            if route is not None:
+                site_stats["routes"][route] = site_stats["routes"].get(route, 0) + 1
+        logger.warning("事件循环被 %s 阻塞 %.0fms（%s）", route or coroutine, elapsed_ms, site)
+
+    def _watch(self):
+        threshold = self.threshold_ms / 1000
+        captured_start = None
+        while not self._stop_event.wait(max(0.005, threshold / 4)):
+            current = self._current
+            if current is None or current[0] == captured_start:
+                continue
+            start = current[0]
+            if time.perf_counter() - start < threshold:
+                continue
+            # 这一步已超过阈值仍未结束：抓取循环线程此刻的调用栈
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = fold_stack(frame)
+            # 去掉事件循环和计时壳本身的帧，从 Task 的协程开始
+            for index in range(len(stack) - 1, -1, -1):
+                if "(app/observability/loop_blocking.py:" in stack[index]:
+                    stack = stack[index + 1:]
+                    break
+            captured_start = start
+            self._captured = (start, stack)
+
+    # ---- 报告 ----
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            routes = sorted(self.routes.items(), key=lambda item: -item[1]["stall_ms"])[:limit]
+            sites = sorted(self.call_sites.items(), key=lambda item: -item[1]["total_ms"])[:limit]
+            recent = list(self.events)[::-1][:limit]
+        return {
+            "worker": worker_id(),
+            "installed": self.installed,
+            "threshold_ms": self.threshold_ms,
+            "steps": self.steps,
+            "stalls": self.stalls,
+            "routes": [
+                {"route": route, "requests": s["requests"], "stalls": s["stalls"],
+                 "stall_ms": round(s["stall_ms"], 1), "max_ms": round(s["max_ms"], 1),
+                 "avg_busy_ms": round(s["busy_ms"] / s["requests"], 2) if s["requests"] else None}
+                for route, s in routes
+            ],
+            "call_sites": [
+                {"call_site": site, "count": s["count"], "total_ms": round(s["total_ms"], 1),
+                 "max_ms": round(s["max_ms"], 1), "routes": s["routes"], "example_stack": s["example_stack"]}
+                for site, s in sites
+            ],
+            "recent": recent,
+            "offload": blocking_offloader.get_status(),
+        }
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+            self.call_sites.clear()
+            self.events.clear()
+            self.steps = 0
+            self.stalls = 0
+
+
+class BlockingOffloader:
+    """已知阻塞调用的有界线程池"""
+
+    def __init__(self, enabled: bool = LOOP_BLOCKING_OFFLOAD, max_workers: int = LOOP_BLOCKING_OFFLOAD_WORKERS,
+                 max_pending: int = LOOP_BLOCKING_OFFLOAD_MAX_PENDING):
+        self.enabled = enabled
+        self.max_workers = max_workers
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # 信号量绑定所属事件循环，每个循环一个
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.stats = {"offloaded": 0, "inline": 0, "waited": 0, "failed": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="blocking_offload",
+                    )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        if not self.enabled:
+            self.stats["inline"] += 1
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_pending)
+        if semaphore.locked():
+            self.stats["waited"] += 1
+        async with semaphore:
+            self.stats["offloaded"] += 1
+            # 复制 contextvars（request_id、SQL 剖析归属）到线程池
+            call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+            try:
+                return await loop.run_in_executor(self._get_executor(), call)
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "max_workers": self.max_workers, "max_pending": self.max_pending, **self.stats}
+
+
+# 全局实例（每个 worker 进程一份）
+loop_blocking_detector = LoopBlockingDetector()
+blocking_offloader = BlockingOffloader()
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """在 async 路由里调用已知的阻塞函数：LOOP_BLOCKING_OFFLOAD 打开时放到有界线程池，否则原地执行"""
+    return await blocking_offloader.run(func, *args, **kwargs)
@@ -0,0 +1,313 @@
+"""
+SQL 查询剖析（per-request query profiler）
+基于 SQLAlchemy 引擎事件统计每个请求执行了多少条 SQL、哪些语句，用于发现 N+1 和超出查询预算的路由。
+
+- 指纹：去掉字面量 / 绑定参数 / 注释，IN 列表和多行 VALUES 折叠，相同形状的语句得到同一指纹
+- 归属：RequestLoggingMiddleware 在请求开始时 begin(request_id)，结束时 finish(...)；
+  同步引擎（线程池）和异步引擎（greenlet）都通过 contextvar 找到当前请求
+- N+1：同一指纹在一个请求内执行次数 >= QUERY_N_PLUS_ONE_THRESHOLD
+- 预算：每个路由的查询条数上限（QUERY_BUDGETS，未配置的用 QUERY_BUDGET_DEFAULT）
+- 导出：每条语句的耗时写入 metrics.record_database_query（按语句类型）和延迟直方图（按 语句类型 + 表）；
+  路由汇总、最近的违规请求、高频指纹由管理员调试接口读取
+"""
+
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER_ENABLED", "true").lower() == "true"
+QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "10"))
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "30"))
+
+# 路由模板（"METHOD /path"）→ 单请求查询条数上限
+QUERY_BUDGETS: Dict[str, int] = {
+    "GET /api/messages/tasks": 10,
+    "GET /api/discovery/feed": 20,
+    "GET /api/recommendations": 25,
+    "GET /api/tasks": 10,
+    "GET /api/tasks/{task_id}": 10,
+}
+
+# 保留的违规请求数 / 路由数 / 指纹数
+_MAX_RECENT_VIOLATIONS = 200
+_MAX_ROUTES = 500
+_MAX_FINGERPRINTS = 2000
+
+# ---- 指纹 ----
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):[A-Za-z_]\w*|\?")
+_NUMBER_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_RE = re.compile(r"(\((?:\?|\.\.\.)(?:\s*,\s*(?:\?|\.\.\.))*\))(?:\s*,\s*\((?:\?|\.\.\.)(?:\s*,\s*(?:\?|\.\.\.))*\))+")
+_SPACE_RE = re.compile(r"\s+")
+_TABLE_RE = re.compile(r"\b(?:from|into|update|join)\s+\"?([A-Za-z_][\w.]*)", re.I)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """把 SQL 归一化为指纹：字面量与参数替换为 ?，IN 列表与多行 VALUES 折叠"""
+    text = _COMMENT_RE.sub(" ", sql)
+    text = _STRING_RE.sub("?", text)
+    text = _PARAM_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("(...)", text)
+    text = _VALUES_RE.sub(r"\1, ...", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=4096)
+def statement_label(fp: str) -> str:
+    """语句类型 + 第一个表名，如 "SELECT tasks"（低基数，用于指标标签）"""
+    verb = fp.split(" ", 1)[0].upper() if fp else "OTHER"
+    if verb not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+        return verb[:16] or "OTHER"
+    match = _TABLE_RE.search(fp)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+# ---- 每请求统计 ----
+
+class RequestQueryProfile:
+    """一个请求内的查询统计"""
+
+    __slots__ = ("request_id", "started", "statements", "query_count", "total_ms", "closed")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        # 指纹 -> [次数, 总耗时 ms]
+        self.statements: Dict[str, List[float]] = {}
+        self.query_count = 0
+        self.total_ms = 0.0
+        self.closed = False
+
+    def add(self, fp: str, duration_ms: float):
+        entry = self.statements.get(fp)
+        if entry is None:
+            self.statements[fp] = [1, duration_ms]
+        else:
+            entry[0] += 1
+            entry[1] += duration_ms
+        self.query_count += 1
+        self.total_ms += duration_ms
+
+    def repeated(self, threshold: int) -> List[Dict[str, Any]]:
+        return [
+            {"fingerprint": fp, "count": int(n), "total_ms": round(ms, 2)}
+            for fp, (n, ms) in sorted(self.statements.items(), key=lambda item: -item[1][0])
+            if n >= threshold
+        ]
+
+
+_current_profile: contextvars.ContextVar[Optional[RequestQueryProfile]] = contextvars.ContextVar(
+    "query_profile", default=None
+)
+
+
+class QueryProfiler:
+    """汇总每个路由的查询统计，记录 N+1 / 超预算的请求"""
+
+    def __init__(
+        self,
+        n_plus_one_threshold: int = QUERY_N_PLUS_ONE_THRESHOLD,
+        default_budget: int = QUERY_BUDGET_DEFAULT,
+        budgets: Optional[Dict[str, int]] = None,
+    ):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.default_budget = default_budget
+        self.budgets = dict(QUERY_BUDGETS if budgets is None else budgets)
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._fingerprints: Dict[str, List[float]] = {}
+        self._recent_violations: Deque[Dict[str, Any]] = deque(maxlen=_MAX_RECENT_VIOLATIONS)
+
+    # ---- 请求生命周期 ----
+
+    def begin(self, request_id: str) -> Optional[contextvars.Token]:
+        if not QUERY_PROFILER_ENABLED:
+            return None
+        return _current_profile.set(RequestQueryProfile(request_id))
+
+    def finish(self, token: Optional[contextvars.Token], route: str) -> Optional[RequestQueryProfile]:
+        """结束当前请求的统计并汇总；返回该请求的 profile"""
+        if token is None:
+            return None
+        profile = _current_profile.get()
+        _current_profile.reset(token)
+        if profile is None:
+            return None
+        # 响应之后的后台任务仍在同一上下文里，不再计入该请求
+        profile.closed = True
+        self._aggregate(profile, route)
+        return profile
+
+    def budget_for(self, route: str) -> int:
+        return self.budgets.get(route, self.default_budget)
+
+    def _aggregate(self, profile: RequestQueryProfile, route: str):
+        budget = self.budget_for(route)
+        repeated = profile.repeated(self.n_plus_one_threshold)
+        over_budget = profile.query_count > budget
+
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                if len(self._routes) >= _MAX_ROUTES:
+                    route = "__other__"
+                    stats = self._routes.get(route)
+                if stats is None:
+                    stats = self._routes[route] = {
+                        "requests": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0,
+                        "over_budget": 0, "n_plus_one": 0,
+                    }
+            stats["requests"] += 1
+            stats["queries"] += profile.query_count
+            stats["max_queries"] = max(stats["max_queries"], profile.query_count)
+            stats["db_ms"] += profile.total_ms
+            stats["over_budget"] += int(over_budget)
+            stats["n_plus_one"] += int(bool(repeated))
+
+            for fp, (n, ms) in profile.statements.items():
+                entry = self._fingerprints.get(fp)
+                if entry is None:
+                    if len(self._fingerprints) >= _MAX_FINGERPRINTS:
+                        continue
+                    entry = self._fingerprints[fp] = [0, 0.0, 0]
+                entry[0] += n
+                entry[1] += ms
+                entry[2] = max(entry[2], n)
+
+            if over_budget or repeated:
+                self._recent_violations.append({
+                    "request_id": profile.request_id,
+                    "route": route,
+                    "queries": profile.query_count,
+                    "budget": budget,
+                    "db_ms": round(profile.total_ms, 2),
+                    "repeated_statements": repeated[:5],
+                    "at": time.time(),
+                })
+
+        if over_budget or repeated:
+            logger.warning(
+                "[%s] %s 执行了 %d 条 SQL（预算 %d）%s",
+                profile.request_id, route, profile.query_count, budget,
+                f"，疑似 N+1: {repeated[0]['fingerprint'][:200]} x{repeated[0]['count']}" if repeated else "",
+            )
+
+    # ---- 引擎事件 ----
+
+    def on_statement(self, statement: str, duration_ms: float):
+        fp = fingerprint(statement)
+        profile = _current_profile.get()
+        if profile is not None and not profile.closed:
+            profile.add(fp, duration_ms)
+        label = statement_label(fp)
+        _export(label, duration_ms)
+
+    # ---- 读取 ----
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            routes = {
+                route: {
+                    **stats,
+                    "avg_queries": round(stats["queries"] / stats["requests"], 2) if stats["requests"] else 0,
+                    "db_ms": round(stats["db_ms"], 2),
+                    "budget": self.budget_for(route),
+                }
+                for route, stats in self._routes.items()
+            }
+            fingerprints = sorted(self._fingerprints.items(), key=lambda item: -item[1][0])[:top]
+            violations = list(self._recent_violations)
+        return {
+            "enabled": QUERY_PROFILER_ENABLED,
+            "n_plus_one_threshold": self.n_plus_one_threshold,
+            "default_budget": self.default_budget,
+            "routes": dict(sorted(routes.items(), key=lambda item: -item[1]["avg_queries"])),
+            "top_fingerprints": [
+                {"fingerprint": fp, "count": int(n), "total_ms": round(ms, 2), "max_per_request": int(max_n)}
+                for fp, (n, ms, max_n) in fingerprints
+            ],
+            "recent_violations": violations[::-1],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._fingerprints.clear()
+            self._recent_violations.clear()
+
+
+def _export(label: str, duration_ms: float):
+    """写入 Prometheus 和延迟直方图（两者都是可选的）"""
+    global _record_database_query
+    if _record_database_query is None:
+        try:
+            from app.metrics import record_database_query
+            _record_database_query = record_database_query
+        except Exception:
+            _record_database_query = False
+    if _record_database_query:
+        try:
+            _record_database_query(label.split(" ", 1)[0].lower(), duration_ms / 1000)
+        except Exception:
+            pass
+    try:
+        from app.observability.latency_histogram import latency_registry
+        latency_registry.record("query", label, duration_ms)
+    except Exception:
+        pass
+
+
+_record_database_query: Any = None
+
+query_profiler = QueryProfiler()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_profiler_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_query_profiler_start")
+    if not starts:
+        return
+    duration_ms = (time.perf_counter() - starts.pop()) * 1000
+    try:
+        query_profiler.on_statement(statement, duration_ms)
+    except Exception as e:
+        logger.debug(f"记录 SQL 剖析数据失败: {e}")
+
+
+def _handle_error(exception_context):
+    # 执行失败时不会触发 after_cursor_execute，弹出开始时间避免栈错位
+    conn = exception_context.connection
+    if conn is not None:
+        starts = conn.info.get("_query_profiler_start")
+        if starts:
+            starts.pop()
+
+
+def install_query_profiler(*engines) -> None:
+    """为同步引擎（或 AsyncEngine.sync_engine）注册事件；None 会被跳过"""
+    if not QUERY_PROFILER_ENABLED:
+        return
+    from sqlalchemy import event
+
+    for engine in engines:
+        if engine is None or event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            continue
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
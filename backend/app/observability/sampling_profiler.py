@@ -0,0 +1,355 @@
+"""
+采样剖析器 + 事件循环卡顿监控（每个 worker 独立）
+
+StackSampler：后台线程按固定间隔读取 sys._current_frames()，把每个线程的调用栈折叠成
+"线程;外层函数;...;内层函数" 计数，输出可直接喂给 flamegraph.pl / speedscope 的 folded 文本。
+- 不用信号（ITIMER_PROF 只能投递到主线程，且会打断 gunicorn / uvicorn 的系统调用）
+- 只读取帧，不挂 sys.setprofile / settrace，被测代码零侵入；开销与线程数和采样频率成正比，
+  默认 20Hz，get_status 中报告采样线程自身耗时占比
+- 默认跳过停在 select / wait / sleep 等等待点上的栈（空闲线程），只看消耗 CPU 的路径
+- 可设定持续时间自动停止；栈种类超过上限时合并为 [truncated]
+
+LoopLagMonitor：事件循环里的心跳任务每 interval 醒来一次，醒来晚了多少就是循环延迟；
+独立的看门狗线程发现心跳超过阈值未更新时，抓取事件循环线程当前的调用栈和正在运行的 Task，
+记录是哪个协程阻塞了循环。延迟同时写入延迟直方图（kind=loop）。
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SAMPLING_PROFILER_AUTOSTART = os.getenv("SAMPLING_PROFILER_AUTOSTART", "false").lower() == "true"
+SAMPLING_PROFILER_INTERVAL_MS = float(os.getenv("SAMPLING_PROFILER_INTERVAL_MS", "50"))
+LOOP_LAG_MONITOR_ENABLED = os.getenv("LOOP_LAG_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "50"))
+
+# 采样间隔下限（毫秒），防止误设导致采样线程占满 GIL
+MIN_INTERVAL_MS = 5.0
+MAX_STACK_DEPTH = 64
+
+# 叶子帧停在这些 (文件名, 函数名) 上的栈视为空闲
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+    ("connection.py", "wait"),
+}
+_IDLE_FUNCTIONS = {"sleep", "select", "poll", "epoll", "wait", "acquire"}
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+_label_cache: Dict[Any, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _label_cache.get(code)
+    if label is None:
+        filename = code.co_filename
+        # 截短路径，避免绝对路径撑长火焰图
+        if "site-packages/" in filename:
+            filename = filename.rsplit("site-packages/", 1)[1]
+        elif "/app/" in filename:
+            filename = "app/" + filename.rsplit("/app/", 1)[1]
+        else:
+            filename = os.path.basename(filename)
+        label = f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+        if len(_label_cache) < 50_000:
+            _label_cache[code] = label
+    return label
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES or code.co_name in _IDLE_FUNCTIONS
+
+
+def fold_stack(frame, max_depth: int = MAX_STACK_DEPTH) -> List[str]:
+    """从叶子帧向上收集，返回 根 → 叶 的标签列表"""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class StackSampler:
+    """线程式栈采样器"""
+
+    MAX_STACKS = 20_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stacks: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.interval_ms = SAMPLING_PROFILER_INTERVAL_MS
+        self.include_idle = False
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.stop_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: Optional[float] = None, duration_seconds: Optional[float] = None,
+              include_idle: bool = False, reset: bool = False) -> bool:
+        """开始采样；已在运行时只更新参数。返回是否新启动"""
+        self.interval_ms = max(MIN_INTERVAL_MS, interval_ms or self.interval_ms)
+        self.include_idle = include_idle
+        self.stop_at = time.monotonic() + duration_seconds if duration_seconds else None
+        if reset:
+            self.reset()
+        if self.running:
+            return False
+        self._stop_event.clear()
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._thread = threading.Thread(target=self._run, daemon=True, name="stack-sampler")
+        self._thread.start()
+        logger.info("采样剖析器已启动（间隔 %.0fms）", self.interval_ms)
+        return True
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=2)
+        self._thread = None
+        logger.info("采样剖析器已停止（%d 次采样）", self.samples)
+
+    def reset(self):
+        with self._lock:
+            self._stacks = {}
+            self.samples = 0
+            self.sampling_seconds = 0.0
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop_event.wait(self.interval_ms / 1000):
+            if self.stop_at is not None and time.monotonic() >= self.stop_at:
+                break
+            started = time.perf_counter()
+            frames = sys._current_frames()
+            if any(ident not in names for ident in frames):
+                names = {t.ident: t.name for t in threading.enumerate()}
+            folded = []
+            for ident, frame in frames.items():
+                if ident == own_ident or (not self.include_idle and _is_idle(frame)):
+                    continue
+                folded.append(";".join([names.get(ident, f"thread-{ident}")] + fold_stack(frame)))
+            del frames
+            with self._lock:
+                for key in folded:
+                    if key not in self._stacks and len(self._stacks) >= self.MAX_STACKS:
+                        key = "[truncated]"
+                    self._stacks[key] = self._stacks.get(key, 0) + 1
+                self.samples += 1
+                self.sampling_seconds += time.perf_counter() - started
+        self.stopped_at = time.time()
+
+    def folded(self, limit: Optional[int] = None) -> str:
+        """flamegraph 折叠格式：每行 "栈 次数"，按次数降序"""
+        with self._lock:
+            items = sorted(self._stacks.items(), key=lambda item: -item[1])
+        if limit:
+            items = items[:limit]
+        return "\n".join(f"{stack} {count}" for stack, count in items) + ("\n" if items else "")
+
+    def top_functions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """按"自身"（叶子帧）样本数排序的热点函数"""
+        with self._lock:
+            items = list(self._stacks.items())
+            total = self.samples
+        self_counts: Dict[str, int] = {}
+        for stack, count in items:
+            leaf = stack.rsplit(";", 1)[-1]
+            self_counts[leaf] = self_counts.get(leaf, 0) + count
+        ranked = sorted(self_counts.items(), key=lambda item: -item[1])[:limit]
+        return [{"function": name, "samples": count, "share": round(count / total, 4) if total else 0}
+                for name, count in ranked]
+
+    def get_status(self) -> Dict[str, Any]:
+        elapsed = ((self.stopped_at or time.time()) - self.started_at) if self.started_at else 0
+        return {
+            "worker": worker_id(),
+            "running": self.running,
+            "interval_ms": self.interval_ms,
+            "include_idle": self.include_idle,
+            "samples": self.samples,
+            "distinct_stacks": len(self._stacks),
+            "started_at": self.started_at,
+            "elapsed_seconds": round(elapsed, 1),
+            # 采样线程自身耗时占墙钟时间的比例（持有 GIL 的时间上限）
+            "overhead_ratio": round(self.sampling_seconds / elapsed, 5) if elapsed else 0,
+        }
+
+
+class LoopLagMonitor:
+    """事件循环延迟监控 + 卡顿时抓取阻塞的协程"""
+
+    MAX_EVENTS = 200
+    MAX_COROUTINES = 500
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS, threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._beat = time.monotonic()
+        # 看门狗为当前这次卡顿抓到的事件（心跳恢复时补上总时长）
+        self._pending: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=self.MAX_EVENTS)
+        self.by_coroutine: Dict[str, Dict[str, Any]] = {}
+        self.ticks = 0
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """必须在事件循环线程内调用（记录循环线程 ID）"""
+        if self.running:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop_event.clear()
+        self._task = self._loop.create_task(self._heartbeat(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, daemon=True, name="loop-lag-watchdog")
+        self._watchdog.start()
+        logger.info("事件循环卡顿监控已启动（阈值 %.0fms）", self.threshold_ms)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=2)
+            self._watchdog = None
+
+    async def _heartbeat(self):
+        interval = self.interval_ms / 1000
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(interval)
+            lag_ms = max(0.0, (time.monotonic() - self._beat - interval) * 1000)
+            self._on_tick(lag_ms)
+
+    def _on_tick(self, lag_ms: float):
+        self.ticks += 1
+        if lag_ms > self.max_lag_ms:
+            self.max_lag_ms = lag_ms
+        try:
+            from app.observability.latency_histogram import latency_registry
+            latency_registry.record("loop", "lag", lag_ms)
+        except Exception:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if lag_ms < self.threshold_ms:
+            return
+        self.stalls += 1
+        event = pending or {"at": time.time(), "task": None, "coroutine": "unknown", "stack": []}
+        event["blocked_ms"] = round(lag_ms, 1)
+        self.events.append(event)
+        key = event["coroutine"]
+        stats = self.by_coroutine.get(key)
+        if stats is None:
+            if len(self.by_coroutine) >= self.MAX_COROUTINES:
+                key = "__other__"
+                stats = self.by_coroutine.get(key)
+            if stats is None:
+                stats = self.by_coroutine[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "example_stack": event["stack"]}
+        stats["count"] += 1
+        stats["total_ms"] += lag_ms
+        stats["max_ms"] = max(stats["max_ms"], lag_ms)
+        logger.warning("事件循环被阻塞 %.0fms：%s", lag_ms, key)
+
+    def _watch(self):
+        interval = self.interval_ms / 1000
+        threshold = self.threshold_ms / 1000
+        captured_beat = None
+        while not self._stop_event.wait(min(interval, threshold / 2)):
+            beat = self._beat
+            if beat == captured_beat or time.monotonic() - beat < interval + threshold:
+                continue
+            # 循环已超过阈值未处理心跳：抓取循环线程此刻在执行什么
+            captured_beat = beat
+            event = self.capture()
+            with self._lock:
+                self._pending = event
+
+    def capture(self) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        task = asyncio.current_task(self._loop) if self._loop is not None else None
+        coroutine = "unknown"
+        if task is not None:
+            coro = task.get_coro()
+            coroutine = getattr(coro, "__qualname__", None) or repr(coro)
+        elif frame is not None:
+            # 回调而非 Task（如 call_soon 的普通函数）：取最内层的应用帧
+            coroutine = fold_stack(frame)[-1]
+        return {
+            "at": time.time(),
+            "task": task.get_name() if task is not None else None,
+            "coroutine": coroutine,
+            "stack": fold_stack(frame) if frame is not None else [],
+        }
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        ranked = sorted(self.by_coroutine.items(), key=lambda item: -item[1]["total_ms"])[:limit]
+        return {
+            "worker": worker_id(),
+            "running": self.running,
+            "threshold_ms": self.threshold_ms,
+            "interval_ms": self.interval_ms,
+            "ticks": self.ticks,
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "by_coroutine": [
+                {"coroutine": name, "count": s["count"], "total_ms": round(s["total_ms"], 1),
+                 "max_ms": round(s["max_ms"], 1), "example_stack": s["example_stack"]}
+                for name, s in ranked
+            ],
+            "recent": list(self.events)[::-1][:limit],
+        }
+
+    def reset(self):
+        self.events.clear()
+        self.by_coroutine.clear()
+        self.ticks = 0
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+
+
+# 全局实例（每个 worker 进程一份）
+stack_sampler = StackSampler()
+loop_lag_monitor = LoopLagMonitor()
@@ -12,6 +12,7 @@ from datetime import datetime, timedelta
 from app.database import sync_engine, async_engine, ASYNC_AVAILABLE
 from app.redis_cache import get_redis_client
 from app.performance_middleware import performance_collector
+from app.observability.latency_histogram import latency_registry, summarize
 
 logger = logging.getLogger(__name__)
 
@@ -47,8 +48,9 @@ class PerformanceMetrics:
                     del store[key]
 
     def record_request(self, endpoint: str, method: str, duration: float, status_code: int):
-        """记录请求指标"""
+        """记录请求指标（duration 单位秒；endpoint 应为路由模板，避免路径参数造成高基数）"""
         key = f"{method} {endpoint}"
+        latency_registry.record("endpoint", key, duration * 1000)
         self.request_stats[key]["count"] += 1
         self.request_stats[key]["total_time"] += duration
         if status_code >= 400:
@@ -56,16 +58,22 @@ class PerformanceMetrics:
         self._evict_if_needed()
 
     def record_query(self, query_name: str, duration: float):
-        """记录查询指标"""
+        """记录查询指标（duration 单位秒）"""
+        latency_registry.record("query", query_name, duration * 1000)
         self.query_stats[query_name]["count"] += 1
         self.query_stats[query_name]["total_time"] += duration
 
+    def record_cache(self, cache_name: str, duration: float):
+        """记录缓存读取耗时（duration 单位秒）"""
+        latency_registry.record("cache", cache_name, duration * 1000)
+
     def record_error(self, error_type: str):
         """记录错误"""
         self.error_stats[error_type] += 1
     
     def get_request_stats(self) -> Dict[str, Any]:
-        """获取请求统计"""
+        """获取请求统计（分位数为本 worker 当前时间窗）"""
+        percentiles = summarize(latency_registry.local_snapshot(), kinds=("endpoint",)).get("endpoint", {})
         stats = {}
         for key, data in self.request_stats.items():
             count = data["count"]
@@ -75,12 +83,14 @@ class PerformanceMetrics:
                 "avg_time": total_time / count if count > 0 else 0,
                 "total_time": total_time,
                 "errors": data["errors"],
-                "error_rate": data["errors"] / count if count > 0 else 0
+                "error_rate": data["errors"] / count if count > 0 else 0,
+                "latency_ms": percentiles.get(key),
             }
         return stats
     
     def get_query_stats(self) -> Dict[str, Any]:
-        """获取查询统计"""
+        """获取查询统计（分位数为本 worker 当前时间窗）"""
+        percentiles = summarize(latency_registry.local_snapshot(), kinds=("query",)).get("query", {})
         stats = {}
         for key, data in self.query_stats.items():
             count = data["count"]
@@ -88,9 +98,23 @@ class PerformanceMetrics:
             stats[key] = {
                 "count": count,
                 "avg_time": total_time / count if count > 0 else 0,
-                "total_time": total_time
+                "total_time": total_time,
+                "latency_ms": percentiles.get(key),
             }
         return stats
+
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """所有 worker 最近两个时间窗合并后的 p50/p95/p99（Redis 不可用时为本 worker）"""
+        return summarize(latency_registry.cluster_snapshot(), kinds=("endpoint", "query", "cache"))
+
+    def get_kpi_evaluation(self) -> Dict[str, Any]:
+        """用实时分位数评估 KPI_THRESHOLDS"""
+        try:
+            from app.observability.kpi_definitions import evaluate_latency_kpis
+            return evaluate_latency_kpis(latency_registry.cluster_snapshot())
+        except Exception as e:
+            logger.error(f"评估 KPI 失败: {e}")
+            return {"error": str(e)}
     
     def get_error_stats(self) -> Dict[str, int]:
         """获取错误统计"""
@@ -157,12 +181,25 @@ class PerformanceMetrics:
             except AttributeError:
                 num_fds = None
             
-            return {
+            metrics = {
                 "cpu_percent": round(cpu_percent, 2),
                 "memory_mb": round(memory_mb, 2),
                 "num_fds": num_fds,
                 "threads": process.num_threads()
             }
+            # CPU 热点看 /api/admin/debug/profiler，循环阻塞详情看 /api/admin/debug/loop-lag、loop-blocking
+            try:
+                from app.observability.loop_blocking import loop_blocking_detector
+                from app.observability.sampling_profiler import loop_lag_monitor, stack_sampler
+                metrics["event_loop"] = {
+                    "stalls": loop_lag_monitor.stalls,
+                    "max_lag_ms": round(loop_lag_monitor.max_lag_ms, 1),
+                    "blocking_steps": loop_blocking_detector.stalls,
+                }
+                metrics["profiler_running"] = stack_sampler.running
+            except Exception:
+                pass
+            return metrics
         except ImportError:
             return {"error": "psutil not available"}
         except Exception as e:
@@ -176,6 +213,8 @@ class PerformanceMetrics:
             "requests": self.get_request_stats(),
             "queries": self.get_query_stats(),
             "errors": self.get_error_stats(),
+            "latency": self.get_latency_stats(),
+            "kpi": self.get_kpi_evaluation(),
             "database_pool": self.get_database_pool_stats(),
             "redis": self.get_redis_stats(),
             "system": self.get_system_metrics(),
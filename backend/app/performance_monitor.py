@@ -6,9 +6,11 @@ import time
 import logging
 from functools import wraps
 from typing import Callable, Any
-from collections import defaultdict
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
 
+from app.observability.latency_histogram import latency_registry, summarize
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,8 +18,8 @@ class PerformanceMonitor:
     """性能监控器"""
     
     def __init__(self):
-        self.metrics: list[dict] = []
-        self.max_metrics = 1000  # 最多保存1000条指标
+        self.max_metrics = 1000  # 最多保存1000条最近指标（明细）
+        self.metrics: deque[dict] = deque(maxlen=self.max_metrics)
         self.slow_threshold = 1000  # 慢查询阈值（毫秒）
     
     def record_metric(
@@ -36,11 +38,9 @@ class PerformanceMonitor:
             "metadata": metadata or {},
         }
         
+        # deque(maxlen) 自动淘汰最旧的明细；分位数走固定内存的直方图，不受明细条数限制
         self.metrics.append(metric)
-        
-        # 限制指标数量
-        if len(self.metrics) > self.max_metrics:
-            self.metrics.pop(0)
+        latency_registry.record(metric_type, name, duration_ms)
         
         # 记录慢查询
         if duration_ms > self.slow_threshold:
@@ -98,7 +98,7 @@ class PerformanceMonitor:
     
     def get_metrics(self, metric_type: str = None, limit: int = 100) -> list[dict]:
         """获取性能指标"""
-        metrics = self.metrics
+        metrics = list(self.metrics)
         if metric_type:
             metrics = [m for m in metrics if m["type"] == metric_type]
         return metrics[-limit:]
@@ -148,11 +148,13 @@ class PerformanceMonitor:
             "average_durations": averages,
             "slow_queries_count": slow_count,
             "slow_threshold_ms": self.slow_threshold,
+            # 本 worker 当前时间窗的 p50/p95/p99（按类型、名称）
+            "percentiles": summarize(latency_registry.local_snapshot(), kinds=by_type.keys()),
         }
     
     def clear(self):
-        """清除所有指标"""
-        self.metrics = []
+        """清除所有明细指标"""
+        self.metrics.clear()
 
 
 # 创建全局单例
@@ -0,0 +1,272 @@
+"""
+已认证用户（principal）缓存
+异步认证依赖每次请求都要读取用户的封禁 / 暂停状态，原先每次都查一次 Postgres。
+这里把 User 的标量列做成带 __slots__ 的快照，放在短 TTL 的进程内 LRU 中，Redis 作为二级缓存：
+
+- 进程内命中：无任何 I/O
+- Redis 命中：一次 GET（在线程中执行，不阻塞事件循环）
+- 都未命中：查一次数据库并回填两级缓存
+
+失效：
+- User 的 ORM 更新（封禁、暂停、资料修改）由 app.event_listeners 在 flush 时失效本进程缓存，
+  commit 后再失效一次并删除 Redis（事件循环里提交时放到线程池）；会话里执行的
+  `update(models.User).where(User.id == ...)`（如写 stripe_customer_id）同样按用户 ID 失效
+- invalidate_user_cache() 同时失效 principal
+- 其他进程的进程内缓存依赖短 TTL（PRINCIPAL_CACHE_LOCAL_TTL，默认 15 秒）收敛
+
+快照不含 hashed_password；关系属性（tasks_posted 等）在异步会话里本来就不能懒加载，
+确实需要 ORM 对象时使用 `await principal.load_user(db)`。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import DateTime
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_ENABLED = os.getenv("PRINCIPAL_CACHE_ENABLED", "true").lower() == "true"
+
+# 进程内缓存 TTL（秒）：决定其他进程感知封禁 / 资料修改的最长延迟
+PRINCIPAL_CACHE_LOCAL_TTL = float(os.getenv("PRINCIPAL_CACHE_LOCAL_TTL", "15"))
+
+# Redis 缓存 TTL（秒）
+PRINCIPAL_CACHE_REDIS_TTL = int(os.getenv("PRINCIPAL_CACHE_REDIS_TTL", "300"))
+
+# 进程内最多缓存的用户数
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+# 字段变化时递增版本，旧格式的 Redis 条目自然失效
+PRINCIPAL_KEY_PREFIX = "principal:v1:"
+
+# 不进入缓存的敏感列
+_EXCLUDED_COLUMNS = frozenset({"hashed_password"})
+
+PRINCIPAL_FIELDS: Tuple[str, ...] = tuple(
+    column.key for column in models.User.__table__.columns if column.key not in _EXCLUDED_COLUMNS
+)
+
+_DATETIME_FIELDS = frozenset(
+    column.key for column in models.User.__table__.columns
+    if isinstance(column.type, DateTime) and column.key not in _EXCLUDED_COLUMNS
+)
+
+
+class Principal:
+    """User 标量列的只读快照，可直接替代 ORM User 供路由读取字段"""
+
+    __slots__ = PRINCIPAL_FIELDS + ("_user",)
+
+    def __init__(self, **fields: Any):
+        for name in PRINCIPAL_FIELDS:
+            object.__setattr__(self, name, fields.get(name))
+        object.__setattr__(self, "_user", None)
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        principal = cls(**{name: getattr(user, name, None) for name in PRINCIPAL_FIELDS})
+        object.__setattr__(principal, "_user", user)
+        return principal
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Principal":
+        fields = dict(data)
+        for name in _DATETIME_FIELDS:
+            value = fields.get(name)
+            if isinstance(value, str):
+                fields[name] = datetime.fromisoformat(value)
+        return cls(**fields)
+
+    def clone(self) -> "Principal":
+        """复制快照（不带已加载的 ORM 对象）；缓存中的实例跨请求共享，交给请求前先复制"""
+        principal = Principal.__new__(Principal)
+        for name in PRINCIPAL_FIELDS:
+            object.__setattr__(principal, name, getattr(self, name))
+        object.__setattr__(principal, "_user", None)
+        return principal
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for name in PRINCIPAL_FIELDS:
+            value = getattr(self, name)
+            data[name] = value.isoformat() if isinstance(value, datetime) else value
+        return data
+
+    async def load_user(self, db) -> Optional[models.User]:
+        """按需加载完整 ORM User（同一请求内只查一次）"""
+        if self._user is None:
+            from app import async_crud
+            object.__setattr__(self, "_user", await async_crud.async_user_crud.get_user_by_id(db, self.id))
+        return self._user
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Principal 是只读快照，不能修改 {name}；请 await load_user(db) 后修改 ORM 对象")
+
+    def __getattr__(self, name: str) -> Any:
+        # 只有快照之外的属性（关系等）才会走到这里
+        raise AttributeError(
+            f"Principal 快照没有属性 {name}；需要完整 User 请使用 await principal.load_user(db)"
+        )
+
+    def __repr__(self) -> str:
+        return f"Principal(id={self.id!r}, name={self.name!r})"
+
+
+class PrincipalCache:
+    """进程内 LRU + Redis 的两级 principal 缓存"""
+
+    def __init__(
+        self,
+        local_ttl: float = PRINCIPAL_CACHE_LOCAL_TTL,
+        redis_ttl: int = PRINCIPAL_CACHE_REDIS_TTL,
+        max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES,
+        redis_client: Any = None,
+    ):
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.max_entries = max_entries
+        self._redis_client = redis_client
+        self._local: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def _redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        from app.redis_cache import get_redis_client
+        return get_redis_client()
+
+    # ==================== 进程内 LRU ====================
+
+    def _get_local(self, user_id: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                del self._local[user_id]
+                return None
+            self._local.move_to_end(user_id)
+            return principal
+
+    def _put_local(self, principal: Principal) -> None:
+        with self._lock:
+            self._local[principal.id] = (time.monotonic() + self.local_ttl, principal)
+            self._local.move_to_end(principal.id)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    # ==================== Redis ====================
+
+    def _get_redis(self, user_id: str) -> Optional[Principal]:
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            raw = client.get(f"{PRINCIPAL_KEY_PREFIX}{user_id}")
+            return Principal.from_dict(json.loads(raw)) if raw else None
+        except Exception as e:
+            logger.debug(f"读取 principal 缓存失败 {user_id}: {e}")
+            return None
+
+    def _put_redis(self, principal: Principal) -> None:
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            client.setex(
+                f"{PRINCIPAL_KEY_PREFIX}{principal.id}",
+                self.redis_ttl,
+                json.dumps(principal.to_dict(), separators=(",", ":")),
+            )
+        except Exception as e:
+            logger.debug(f"写入 principal 缓存失败 {principal.id}: {e}")
+
+    # ==================== 对外接口 ====================
+
+    async def get(self, db, user_id: str) -> Optional[Principal]:
+        """获取 principal：进程内 → Redis → 数据库；用户不存在返回 None（不缓存）"""
+        principal = self._get_local(user_id)
+        if principal is not None:
+            self.stats["local_hits"] += 1
+            return principal.clone()
+
+        principal = await asyncio.to_thread(self._get_redis, user_id)
+        if principal is not None:
+            self.stats["redis_hits"] += 1
+            self._put_local(principal)
+            return principal.clone()
+
+        self.stats["misses"] += 1
+        from app import async_crud
+        user = await async_crud.async_user_crud.get_user_by_id(db, user_id)
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        # 缓存里的快照不持有 ORM 对象（避免跨请求引用会话）
+        cached = principal.clone()
+        self._put_local(cached)
+        await asyncio.to_thread(self._put_redis, cached)
+        return principal
+
+    def invalidate(self, *user_ids: str) -> None:
+        """失效指定用户（本进程 LRU + 一次 Redis DELETE）"""
+        if not user_ids:
+            return
+        self.invalidate_local(*user_ids)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            client.delete(*(f"{PRINCIPAL_KEY_PREFIX}{user_id}" for user_id in user_ids))
+        except Exception as e:
+            logger.warning(f"删除 principal 缓存失败 {list(user_ids)}: {e}")
+
+    def invalidate_local(self, *user_ids: str) -> None:
+        """只失效本进程 LRU（不访问 Redis，可在 flush 中调用）"""
+        with self._lock:
+            for user_id in user_ids:
+                self._local.pop(user_id, None)
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+
+# 全局缓存实例（延迟初始化，线程安全）
+_principal_cache: Optional[PrincipalCache] = None
+_principal_cache_lock = threading.Lock()
+
+
+def get_principal_cache() -> PrincipalCache:
+    """获取 principal 缓存实例（线程安全）"""
+    global _principal_cache
+    if _principal_cache is None:
+        with _principal_cache_lock:
+            if _principal_cache is None:
+                _principal_cache = PrincipalCache()
+    return _principal_cache
+
+
+async def get_principal(db, user_id: str) -> Optional[Any]:
+    """认证依赖使用的入口；禁用缓存时直接返回 ORM User"""
+    if not PRINCIPAL_CACHE_ENABLED:
+        from app import async_crud
+        return await async_crud.async_user_crud.get_user_by_id(db, user_id)
+    return await get_principal_cache().get(db, user_id)
+
+
+def invalidate_principal(user_id: Optional[str]) -> None:
+    """用户封禁 / 暂停 / 资料修改后调用"""
+    if user_id:
+        get_principal_cache().invalidate(str(user_id))
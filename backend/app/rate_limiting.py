@@ -3,6 +3,7 @@
 使用Redis实现分布式速率限制
 """
 
+import asyncio
 import time
 import json
 from typing import Optional, Dict, Any
@@ -11,6 +12,7 @@ from fastapi.responses import JSONResponse
 import redis
 import logging
 from app.config import get_settings
+from app.redis_async import async_redis_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -108,6 +110,15 @@ class RateLimiter:
             # 未认证用户使用IP地址
             return f"rate_limit:{rate_type}:ip:{client_ip}"
     
+    async def _get_rate_limit_key_async(self, request: Request, rate_type: str) -> str:
+        """生成速率限制键（异步版本：会话解析会读 Redis，放到线程中执行）"""
+        client_ip = self._get_client_ip(request)
+        user_id = await asyncio.to_thread(self._get_user_id, request)
+        
+        if user_id:
+            return f"rate_limit:{rate_type}:user:{user_id}"
+        return f"rate_limit:{rate_type}:ip:{client_ip}"
+    
     def _is_rate_limited(self, key: str, limit: int, window: int) -> tuple[bool, Dict[str, Any]]:
         """检查是否超过速率限制"""
         if not self.redis_client:
@@ -150,6 +161,51 @@ class RateLimiter:
             # Redis失败时回退到内存存储
             return self._memory_rate_limit(key, limit, window)
     
+    async def _is_rate_limited_async(self, key: str, limit: int, window: int) -> tuple[bool, Dict[str, Any]]:
+        """检查是否超过速率限制（异步 pipeline，不阻塞事件循环）"""
+        pipe = async_redis_cache.pipeline() if self.redis_client else None
+        if pipe is None:
+            return self._memory_rate_limit(key, limit, window)
+        
+        try:
+            current_time = int(time.time())
+            window_start = current_time - window
+            
+            # 与同步版本相同的滑动窗口
+            pipe.zremrangebyscore(key, 0, window_start)
+            pipe.zcard(key)
+            pipe.zadd(key, {str(current_time): current_time})
+            pipe.expire(key, window)
+            results = await pipe.execute()
+            current_requests = results[1]
+            
+            return current_requests >= limit, {
+                "limit": limit,
+                "remaining": max(0, limit - current_requests - 1),
+                "reset_time": current_time + window,
+                "window": window
+            }
+        except Exception as e:
+            logger.error(f"Redis速率限制检查失败: {e}")
+            return self._memory_rate_limit(key, limit, window)
+    
+    async def _retry_after_async(self, key: str, window: int) -> int:
+        """根据窗口内最早的请求计算剩余等待时间（秒）"""
+        if self.redis_client:
+            pipe = async_redis_cache.pipeline(transaction=False)
+            if pipe is not None:
+                try:
+                    pipe.zrange(key, 0, 0, withscores=True)
+                    (earliest_request,) = await pipe.execute()
+                    if earliest_request:
+                        earliest_time = int(earliest_request[0][1])
+                        return max(1, (earliest_time + window) - int(time.time()))
+                except Exception as e:
+                    logger.debug("获取最早请求时间失败: %s", e)
+        elif key in getattr(self, '_memory_store', {}) and self._memory_store[key]:
+            return max(1, (min(self._memory_store[key]) + window) - int(time.time()))
+        return window
+    
     _MEMORY_STORE_MAX_KEYS = 10000
     _MEMORY_CLEANUP_INTERVAL = 300  # 5 minutes
 
@@ -219,27 +275,42 @@ class RateLimiter:
         if keys_to_delete:
             logger.debug("内存速率限制清理: 删除 %d 个过期条目, 剩余 %d 个", len(keys_to_delete), len(self._memory_store))
 
+    def _limit_exceeded(self, request: Request, rate_type: str, key: str, window: int, info: Dict[str, Any]) -> HTTPException:
+        """记录速率限制事件并构造 429 异常"""
+        client_ip = self._get_client_ip(request)
+        logger.warning(f"速率限制超出: {rate_type}, 键: {key}, IP: {client_ip}, 限制: {info['limit']}/{info['window']}秒")
+        
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={
+                "error": "速率限制超出",
+                "message": f"请求过于频繁，请{window}秒后再试",
+                "retry_after": window,
+                "limit": info["limit"],
+                "window": info["window"]
+            }
+        )
+    
     def check_rate_limit(self, request: Request, rate_type: str, limit: int, window: int) -> Dict[str, Any]:
         """检查速率限制"""
         key = self._get_rate_limit_key(request, rate_type)
         is_limited, info = self._is_rate_limited(key, limit, window)
         
         if is_limited:
-            # 记录速率限制事件到日志
-            client_ip = self._get_client_ip(request)
-            user_id = self._get_user_id(request)
-            logger.warning(f"速率限制超出: {rate_type}, 用户: {user_id}, IP: {client_ip}, 限制: {info['limit']}/{info['window']}秒")
-            
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail={
-                    "error": "速率限制超出",
-                    "message": f"请求过于频繁，请{window}秒后再试",
-                    "retry_after": window,
-                    "limit": info["limit"],
-                    "window": info["window"]
-                }
-            )
+            raise self._limit_exceeded(request, rate_type, key, window, info)
+        
+        return info
+    
+    async def check_rate_limit_async(
+        self, request: Request, rate_type: str, limit: int, window: int, key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """检查速率限制（异步版本，async 路由使用）"""
+        if key is None:
+            key = await self._get_rate_limit_key_async(request, rate_type)
+        is_limited, info = await self._is_rate_limited_async(key, limit, window)
+        
+        if is_limited:
+            raise self._limit_exceeded(request, rate_type, key, window, info)
         
         return info
 
@@ -348,55 +419,37 @@ def rate_limit(rate_type: str, limit: Optional[int] = None, window: Optional[int
                 actual_limit = limit or config["limit"]
                 actual_window = window or config["window"]
                 
-                # 检查速率限制
+                # 检查速率限制（异步 Redis，不阻塞事件循环）
+                key = await rate_limiter._get_rate_limit_key_async(request, rate_type)
                 try:
-                    # 获取速率限制键（用于计算 Retry-After）
-                    key = rate_limiter._get_rate_limit_key(request, rate_type)
-                    rate_info = rate_limiter.check_rate_limit(request, rate_type, actual_limit, actual_window)
-                    
-                    # 在响应头中添加速率限制信息
-                    response = await func(*args, **kwargs)
-                    if hasattr(response, 'headers'):
-                        response.headers["X-RateLimit-Limit"] = str(actual_limit)
-                        response.headers["X-RateLimit-Remaining"] = str(rate_info["remaining"])
-                        response.headers["X-RateLimit-Reset"] = str(rate_info["reset_time"])
-                    
-                    return response
-                    
+                    rate_info = await rate_limiter.check_rate_limit_async(
+                        request, rate_type, actual_limit, actual_window, key=key
+                    )
                 except HTTPException as e:
-                    if e.status_code == 429:
-                        # 计算剩余等待时间（秒）
-                        current_time = int(time.time())
-                        window_start = current_time - actual_window
-                        
-                        # 获取速率限制键
-                        key = rate_limiter._get_rate_limit_key(request, rate_type)
-                        
-                        # 获取窗口内最早的请求时间
-                        if rate_limiter.redis_client:
-                            earliest_request = rate_limiter.redis_client.zrange(key, 0, 0, withscores=True)
-                            if earliest_request and len(earliest_request) > 0:
-                                earliest_time = int(earliest_request[0][1])
-                                retry_after = (earliest_time + actual_window) - current_time
-                                retry_after = max(1, retry_after)
-                            else:
-                                retry_after = actual_window
-                        else:
-                            retry_after = actual_window
-                        
-                        # 返回速率限制错误响应
-                        return JSONResponse(
-                            status_code=429,
-                            content=e.detail,
-                            headers={
-                                "Retry-After": str(retry_after),  # 返回剩余等待时间（秒）
-                                "X-RateLimit-Limit": str(actual_limit),
-                                "X-RateLimit-Remaining": "0",
-                                "X-RateLimit-Reset": str(int(time.time()) + retry_after)
-                            }
-                        )
-                    else:
-                        raise e
+                    if e.status_code != 429:
+                        raise
+                    retry_after = await rate_limiter._retry_after_async(key, actual_window)
+                    
+                    # 返回速率限制错误响应
+                    return JSONResponse(
+                        status_code=429,
+                        content=e.detail,
+                        headers={
+                            "Retry-After": str(retry_after),  # 返回剩余等待时间（秒）
+                            "X-RateLimit-Limit": str(actual_limit),
+                            "X-RateLimit-Remaining": "0",
+                            "X-RateLimit-Reset": str(int(time.time()) + retry_after)
+                        }
+                    )
+                
+                # 在响应头中添加速率限制信息
+                response = await func(*args, **kwargs)
+                if hasattr(response, 'headers'):
+                    response.headers["X-RateLimit-Limit"] = str(actual_limit)
+                    response.headers["X-RateLimit-Remaining"] = str(rate_info["remaining"])
+                    response.headers["X-RateLimit-Reset"] = str(rate_info["reset_time"])
+                
+                return response
             
             return async_wrapper
         else:
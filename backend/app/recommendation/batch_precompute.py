@@ -0,0 +1,321 @@
+"""Batch recommendation precompute for the weekly-active population.
+
+Active users are read once per cycle and split into shards by a stable hash
+of their id.  Each shard receives its slice of ids and runs in its own worker (a Celery task, or a process of a local pool when the
+scheduler runs without Celery) and computes lists with the engine that serves
+GET /recommendations, writing the cache that engine reads:
+
+- scorer engine (``USE_NEW_RECOMMENDATION_ENGINE``): ``VersionedRecommendationCache``
+  entries tagged with the candidate-pool version read before the run, so
+  tasks created or closed meanwhile are patched in on first read.  The
+  open-task pool, popularity counts and poster rows are loaded once and
+  shared across every user in the shard, and candidates come from the
+  in-process candidate index (synced once per shard);
+- legacy engine: ``TaskRecommendationEngine.compute_recommendations`` output
+  under the ``recommendation_cache`` keys read by ``recommend_tasks``.
+
+Either way entries are written through pipelined SETEX.
+
+Each shard reports users/sec so a full cycle can be sized against the
+population.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of hash shards per cycle (one Celery task / pool process each)
+PRECOMPUTE_SHARDS = int(os.getenv("RECOMMENDATION_PRECOMPUTE_SHARDS", "8"))
+# Local process pool size when Celery is not running (0 = run shards inline)
+PRECOMPUTE_WORKERS = int(os.getenv("RECOMMENDATION_PRECOMPUTE_WORKERS", "2"))
+# Must match the default limit of GET /recommendations so the warm keys are the ones read
+PRECOMPUTE_LIMIT = int(os.getenv("RECOMMENDATION_PRECOMPUTE_LIMIT", "20"))
+# Cache TTL covers one hourly cycle plus slack, so entries survive until the next run
+PRECOMPUTE_TTL = int(os.getenv("RECOMMENDATION_PRECOMPUTE_TTL", "3900"))
+ACTIVE_DAYS = 7
+PIPELINE_BATCH = 200
+USER_CHUNK = 500
+_IN_CHUNK = 1000
+
+
+def shard_for(user_id: str, shards: int) -> int:
+    """Stable shard for a user id (crc32, identical across processes)."""
+    return zlib.crc32(user_id.encode("utf-8")) % max(1, shards)
+
+
+def active_user_ids(db, days: int = ACTIVE_DAYS) -> List[str]:
+    """Users with any task interaction in the last ``days`` days."""
+    from app.crud import get_utc_time
+    from app.models import UserTaskInteraction
+
+    cutoff = get_utc_time() - timedelta(days=days)
+    rows = db.query(UserTaskInteraction.user_id).filter(
+        UserTaskInteraction.interaction_time >= cutoff
+    ).distinct().all()
+    return sorted(user_id for (user_id,) in rows if user_id)
+
+
+def shard_user_ids(user_ids: Iterable[str], shards: int) -> List[List[str]]:
+    """Partition user ids into ``shards`` slices by ``shard_for``."""
+    slices: List[List[str]] = [[] for _ in range(max(1, shards))]
+    for user_id in user_ids:
+        slices[shard_for(user_id, shards)].append(user_id)
+    return slices
+
+
+def _active_user_slices(shards: int) -> List[List[str]]:
+    """Read the active population once and partition it for the shard workers."""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return shard_user_ids(active_user_ids(db), shards)
+    finally:
+        db.close()
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def load_shared_context(db) -> Dict[str, Any]:
+    """Task-side data shared by every user in a shard.
+
+    Returns context entries understood by HybridEngine and its scorers:
+    ``candidate_pool`` (task_id -> Task, newest first), ``task_stats``
+    (application / view counts) and ``task_posters`` (poster rows, used by
+    NewnessScorer).
+    """
+    from app.models import Task, User
+
+    from .engine import HybridEngine
+    from .scorers.popularity_scorer import PopularityScorer
+
+    query = HybridEngine.candidate_query(db).order_by(Task.created_at.desc())
+    pool = {task.id: task for task in query.all()}
+    applications: Dict[int, int] = {}
+    views: Dict[int, int] = {}
+    for task_ids in _chunks(list(pool), _IN_CHUNK):
+        app_counts, view_counts = PopularityScorer.load_counts(db, task_ids)
+        applications.update(app_counts)
+        views.update(view_counts)
+
+    poster_ids = sorted({task.poster_id for task in pool.values() if task.poster_id})
+    posters: Dict[str, Any] = {}
+    for ids in _chunks(poster_ids, _IN_CHUNK):
+        posters.update({user.id: user for user in db.query(User).filter(User.id.in_(ids)).all()})
+
+    return {
+        "candidate_pool": pool,
+        "task_stats": {"applications": applications, "views": views},
+        "task_posters": posters,
+    }
+
+
+def write_batch(client, entries: List[Tuple[str, bytes]], ttl: int = PRECOMPUTE_TTL) -> int:
+    """SETEX a batch of (key, payload) in one pipeline round trip; returns the count written."""
+    if client is None or not entries:
+        return 0
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key, payload in entries:
+            pipe.setex(key, ttl, payload)
+        pipe.execute()
+        return len(entries)
+    except Exception as e:
+        logger.warning(f"批量写入推荐缓存失败: {e}")
+        return 0
+
+
+def _versioned_entry_builder(db, client, limit: int) -> Optional[Callable]:
+    """user -> (key, payload) for the scorer engine's VersionedRecommendationCache; None when that cache is off."""
+    from . import create_engine
+    from .cache import VERSIONED_CACHE_ENABLED, encode_entry, entry_key, get_versioned_cache, read_pool_version
+    from .candidate_index import CANDIDATE_INDEX_ENABLED, get_candidate_index
+
+    if not VERSIONED_CACHE_ENABLED:
+        return None
+    if CANDIDATE_INDEX_ENABLED:
+        get_candidate_index().ensure_fresh(db)
+    engine = create_engine()
+    cache = get_versioned_cache()
+    shared = load_shared_context(db)
+    # 先读版本再计算：计算期间的任务变更在首次读取时按变更日志补上
+    version = read_pool_version(client)
+
+    def build(user) -> Optional[Tuple[str, bytes]]:
+        results, entry = cache.build_entry(engine, user, limit, version, {"db": db, **shared})
+        if not results:
+            return None
+        return entry_key(user.id, limit), encode_entry(entry).encode("utf-8")
+
+    return build
+
+
+def _legacy_entry_builder(db, limit: int) -> Callable:
+    """user -> (key, payload) for the recommendation_cache key read by TaskRecommendationEngine.recommend_tasks."""
+    from app.recommendation_cache import get_cache_key, serialize_recommendations
+    from app.task_recommendation import TaskRecommendationEngine
+
+    engine = TaskRecommendationEngine(db)
+
+    def build(user) -> Optional[Tuple[str, bytes]]:
+        recommendations = engine.compute_recommendations(user, limit, "hybrid")
+        if not recommendations:
+            return None
+        return get_cache_key(user.id, "hybrid", limit), serialize_recommendations(recommendations).encode("utf-8")
+
+    return build
+
+
+def precompute_shard(
+    shard: int = 0,
+    user_ids: Optional[List[str]] = None,
+    limit: int = PRECOMPUTE_LIMIT,
+    db=None,
+    client=None,
+) -> Dict[str, Any]:
+    """Compute and cache recommendations for one shard's slice of active users.
+
+    ``user_ids`` defaults to every active user (a single-shard run).
+    ``db`` / ``client`` default to a new SessionLocal and the shared Redis
+    client.  Returns per-shard stats including ``users_per_sec``.
+    """
+    from app import task_recommendation
+    from app.models import User
+    from app.redis_cache import get_redis_client
+
+    started = time.monotonic()
+    owns_session = db is None
+    if owns_session:
+        from app.database import SessionLocal
+        db = SessionLocal()
+    if client is None:
+        client = get_redis_client()
+
+    stats = {"shard": shard, "users": 0, "written": 0, "empty": 0, "failed": 0}
+    try:
+        if client is None:
+            logger.warning("Redis 不可用，跳过预计算推荐")
+            return _finish(stats, started)
+        if user_ids is None:
+            user_ids = active_user_ids(db)
+        if not user_ids:
+            return _finish(stats, started)
+        if task_recommendation.USE_NEW_ENGINE:
+            build = _versioned_entry_builder(db, client, limit)
+            if build is None:
+                # 新引擎只缓存版本化条目；关闭时请求路径不读缓存，预计算没有意义
+                logger.info("版本化推荐缓存未启用，跳过预计算推荐")
+                return _finish(stats, started)
+        else:
+            build = _legacy_entry_builder(db, limit)
+
+        pending: List[Tuple[str, bytes]] = []
+        for ids in _chunks(user_ids, USER_CHUNK):
+            for user in db.query(User).filter(User.id.in_(ids)).all():
+                stats["users"] += 1
+                # 每个用户一个 SAVEPOINT：失败只回滚该用户的写入；整体 rollback 会让
+                # 分片共享的任务池 / 发布者全部过期，之后每个用户都要逐个重新加载
+                savepoint = db.begin_nested()
+                try:
+                    entry = build(user)
+                    savepoint.commit()
+                except Exception as e:
+                    savepoint.rollback()
+                    stats["failed"] += 1
+                    logger.debug(f"预计算推荐失败: user_id={user.id}, {e}")
+                    continue
+                if entry is None:
+                    # 没有结果时不写缓存，请求时走实时计算 / 降级推荐
+                    stats["empty"] += 1
+                    continue
+                pending.append(entry)
+                if len(pending) >= PIPELINE_BATCH:
+                    stats["written"] += write_batch(client, pending)
+                    pending = []
+        stats["written"] += write_batch(client, pending)
+    finally:
+        if owns_session:
+            db.close()
+    return _finish(stats, started)
+
+
+def _finish(stats: Dict[str, Any], started: float) -> Dict[str, Any]:
+    elapsed = time.monotonic() - started
+    stats["elapsed"] = round(elapsed, 3)
+    stats["users_per_sec"] = round(stats["users"] / elapsed, 2) if elapsed > 0 else 0.0
+    logger.info(
+        f"预计算推荐分片完成: shard={stats['shard']}, 用户={stats['users']}, 写入={stats['written']}, "
+        f"失败={stats['failed']}, 耗时={stats['elapsed']}s, {stats['users_per_sec']} users/sec"
+    )
+    try:
+        from app.recommendation_metrics import record_precompute_throughput
+        record_precompute_throughput(stats["shard"], stats["users_per_sec"])
+    except Exception:
+        pass
+    return stats
+
+
+def run_precompute(
+    shards: int = PRECOMPUTE_SHARDS,
+    workers: int = PRECOMPUTE_WORKERS,
+    limit: int = PRECOMPUTE_LIMIT,
+) -> Dict[str, Any]:
+    """Run every shard on a local process pool (or inline when workers=0) and aggregate."""
+    started = time.monotonic()
+    slices = _active_user_slices(shards)
+    results: List[Dict[str, Any]] = []
+    if workers > 0 and shards > 1:
+        # spawn：避免 fork 带连接池 / 线程的调度进程
+        with ProcessPoolExecutor(
+            max_workers=min(workers, shards),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = [pool.submit(precompute_shard, shard, ids, limit) for shard, ids in enumerate(slices)]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error(f"预计算推荐分片失败: {e}", exc_info=True)
+    else:
+        for shard, ids in enumerate(slices):
+            results.append(precompute_shard(shard, ids, limit))
+
+    elapsed = time.monotonic() - started
+    total = {
+        "shards": shards,
+        "completed": len(results),
+        "users": sum(r["users"] for r in results),
+        "written": sum(r["written"] for r in results),
+        "failed": sum(r["failed"] for r in results),
+        "elapsed": round(elapsed, 3),
+    }
+    total["users_per_sec"] = round(total["users"] / elapsed, 2) if elapsed > 0 else 0.0
+    logger.info(
+        f"预计算推荐完成: {total['written']}/{total['users']} 个用户, {total['completed']}/{shards} 个分片, "
+        f"耗时={total['elapsed']}s, {total['users_per_sec']} users/sec"
+    )
+    return total
+
+
+def dispatch_precompute(shards: int = PRECOMPUTE_SHARDS, limit: int = PRECOMPUTE_LIMIT) -> Optional[int]:
+    """Fan shards out as Celery tasks; returns the number queued, or None without Celery."""
+    from app.recommendation_tasks import CELERY_AVAILABLE
+
+    if not CELERY_AVAILABLE:
+        return None
+    from app.recommendation_tasks import precompute_recommendation_shard_task
+
+    for shard, ids in enumerate(_active_user_slices(shards)):
+        precompute_recommendation_shard_task.delay(shard, ids, limit)
+    logger.info(f"已分发预计算推荐分片: {shards} 个")
+    return shards
@@ -1,7 +1,18 @@
-"""Recommendation caching with multi-level fallback."""
+"""Recommendation caching with multi-level fallback.
+
+Also holds the versioned result cache used by the scorer engine
+(VersionedRecommendationCache): each entry records the candidate-pool version
+and the user-vector signature it was computed from. Task creates / closes bump
+the pool version and append to a changelog; a stale entry is patched by
+scoring only the changed tasks and merging them into the cached top-k, and is
+recomputed only when the user's vector changed or the changelog has a gap.
+"""
 import json
 import logging
-from typing import Optional, List, Dict
+import os
+import threading
+from datetime import timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -80,3 +91,233 @@ def set_cached_recommendations(user_id: str, algorithm: str, limit: int,
             _redis.setex(cache_key, ttl, json.dumps(recommendations, default=str))
         except Exception as e:
             logger.debug(f"Redis set failed: {e}")
+
+
+VERSIONED_CACHE_ENABLED = os.getenv("REC_VERSIONED_CACHE_ENABLED", "true").lower() == "true"
+VERSIONED_CACHE_TTL = int(os.getenv("REC_VERSIONED_CACHE_TTL", "1800"))
+# Extra ranked items stored beyond `limit`, so closed tasks can drop out without a recompute
+CACHE_HEADROOM = int(os.getenv("REC_VERSIONED_CACHE_HEADROOM", "10"))
+POOL_CHANGELOG_SIZE = 5000
+
+VERSIONED_KEY_PREFIX = "rec:v1:"
+POOL_VERSION_KEY = "rec:pool:version"
+POOL_CHANGES_KEY = "rec:pool:changes"
+
+
+def entry_key(user_id: str, limit: int) -> str:
+    return f"{VERSIONED_KEY_PREFIX}{user_id}:{limit}"
+
+
+def encode_entry(entry: Dict) -> str:
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+def read_pool_version(client) -> int:
+    """Current candidate-pool version (0 before the first recorded change)."""
+    return int(client.get(POOL_VERSION_KEY) or 0)
+
+
+def record_pool_changes(changed: Iterable[int], removed: Iterable[int], client=None) -> Optional[int]:
+    """Bump the candidate-pool version once per change and log the change; returns the new version.
+
+    Changelog members are "{version}:+{task_id}" (created / edited, re-score)
+    or "{version}:-{task_id}" (closed / hidden / deleted) scored by version.
+    """
+    members = [f"+{task_id}" for task_id in changed] + [f"-{task_id}" for task_id in removed]
+    if not members:
+        return None
+    if client is None:
+        from app.redis_cache import get_redis_client
+        client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        top = int(client.incrby(POOL_VERSION_KEY, len(members)))
+        first = top - len(members) + 1
+        pipe = client.pipeline(transaction=False)
+        pipe.zadd(POOL_CHANGES_KEY, {f"{first + i}:{m}": first + i for i, m in enumerate(members)})
+        pipe.zremrangebyrank(POOL_CHANGES_KEY, 0, -(POOL_CHANGELOG_SIZE + 1))
+        pipe.execute()
+        return top
+    except Exception as e:
+        logger.warning(f"记录候选池变更失败: {e}")
+        return None
+
+
+def user_signature(db, user_id: str) -> str:
+    """Preference-vector version plus explicit-preference edit time, in one query."""
+    from sqlalchemy import select
+    from app.models import UserPreferenceVector, UserProfilePreference
+
+    row = db.execute(select(
+        select(UserPreferenceVector.version)
+        .where(UserPreferenceVector.user_id == user_id).scalar_subquery(),
+        select(UserProfilePreference.updated_at)
+        .where(UserProfilePreference.user_id == user_id).scalar_subquery(),
+    )).first()
+    version, edited = (row[0], row[1]) if row is not None else (None, None)
+    if edited is not None and edited.tzinfo is None:
+        edited = edited.replace(tzinfo=timezone.utc)
+    return f"{version or 0}:{int(edited.timestamp()) if edited else 0}"
+
+
+def _decode(raw) -> str:
+    return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+
+class VersionedRecommendationCache:
+    """Per-user top-k cache patched with candidate-pool deltas instead of dropped."""
+
+    def __init__(self, ttl: int = VERSIONED_CACHE_TTL, headroom: int = CACHE_HEADROOM, redis_client: Any = None):
+        self.ttl = ttl
+        self.headroom = headroom
+        self._redis_client = redis_client
+        self.stats = {"hits": 0, "patched": 0, "computed": 0, "gaps": 0}
+
+    def _redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        from app.redis_cache import get_redis_client
+        return get_redis_client()
+
+    def recommend(self, engine, user, limit: int, context: Dict[str, Any]) -> List[Dict]:
+        """HybridEngine.recommend for an unfiltered request, served from the cache when possible."""
+        client = self._redis()
+        if client is None:
+            return engine.recommend(user=user, limit=limit, context=context)
+        db = context["db"]
+        key = entry_key(user.id, limit)
+        try:
+            pool_version = read_pool_version(client)
+            raw = client.get(key)
+            entry = json.loads(raw) if raw else None
+            signature = user_signature(db, user.id)
+        except Exception as e:
+            logger.debug(f"读取版本化推荐缓存失败: {e}")
+            return engine.recommend(user=user, limit=limit, context=context)
+
+        if entry is not None and entry.get("user") == signature:
+            if entry["pool"] != pool_version:
+                entry = self._patch(client, engine, user, entry, pool_version, context)
+                if entry is not None:
+                    self.stats["patched"] += 1
+                    self._store(client, key, entry)
+            if entry is not None:
+                served = self._serve(db, user, entry, limit)
+                if served is not None:
+                    self.stats["hits"] += 1
+                    return served
+
+        self.stats["computed"] += 1
+        results, entry = self.build_entry(engine, user, limit, pool_version, context)
+        self._store(client, key, entry)
+        return results[:limit]
+
+    def build_entry(self, engine, user, limit: int, pool_version: int, context: Dict[str, Any]) -> Tuple[List[Dict], Dict]:
+        """Full computation of limit + headroom items, tagged with ``pool_version``.
+
+        ``pool_version`` must be read before computing so changes made during
+        the computation are patched in on the next read rather than missed.
+        """
+        capacity = limit + self.headroom
+        results = engine.recommend(user=user, limit=capacity, context=context)
+        return results, {
+            "pool": pool_version,
+            # 计算过程中可能刚生成偏好向量行，按计算后的版本记录
+            "user": user_signature(context["db"], user.id),
+            "capacity": capacity,
+            "full": len(results) >= capacity,
+            "items": [{"task_id": r["task_id"], "score": r["score"], "reasons": r["reasons"]} for r in results],
+        }
+
+    def _store(self, client, key: str, entry: Dict) -> None:
+        try:
+            client.setex(key, self.ttl, encode_entry(entry))
+        except Exception as e:
+            logger.debug(f"写入版本化推荐缓存失败: {e}")
+
+    def _patch(self, client, engine, user, entry: Dict, pool_version: int, context: Dict) -> Optional[Dict]:
+        """Apply pool changes since the entry's version; None when the changelog can't cover the gap."""
+        since = entry["pool"]
+        raw = client.zrangebyscore(POOL_CHANGES_KEY, since + 1, pool_version)
+        if len(raw) != pool_version - since:
+            # 变更日志已被裁剪，或另一进程的版本号已递增但日志还没写入
+            self.stats["gaps"] += 1
+            return None
+        ops: Dict[int, str] = {}
+        for member in raw:
+            op = _decode(member).split(":", 1)[1]
+            ops[int(op[1:])] = op[0]
+
+        items = [item for item in entry["items"] if item["task_id"] not in ops]
+        changed = [task_id for task_id, op in ops.items() if op == "+"]
+        if changed:
+            items.extend(self._score_changed(engine, user, changed, context))
+        items.sort(key=lambda item: item["score"], reverse=True)
+        capacity = entry["capacity"]
+        return {
+            **entry,
+            "pool": pool_version,
+            "full": entry["full"] or len(items) > capacity,
+            "items": items[:capacity],
+        }
+
+    @staticmethod
+    def _score_changed(engine, user, task_ids: List[int], context: Dict) -> List[Dict]:
+        from app.models import Task
+        from .utils import get_excluded_task_ids
+
+        db = context["db"]
+        tasks = engine.candidate_query(db).filter(Task.id.in_(task_ids)).all()
+        if tasks:
+            excluded = get_excluded_task_ids(db, user.id)
+            tasks = [t for t in tasks if t.id not in excluded and t.poster_id != user.id]
+        if not tasks:
+            return []
+        return [
+            {"task_id": r["task_id"], "score": r["score"], "reasons": r["reasons"]}
+            for r in engine.score_tasks(user, tasks, context)
+        ]
+
+    @staticmethod
+    def _serve(db, user, entry: Dict, limit: int) -> Optional[List[Dict]]:
+        """Top `limit` still-recommendable items as task cards; None if a full list ran short."""
+        from app.crud import get_utc_time
+        from app.services.task_cards import get_task_card_cache
+        from .utils import get_excluded_task_ids
+
+        excluded = get_excluded_task_ids(db, user.id)
+        items = [item for item in entry["items"] if item["task_id"] not in excluded]
+        cards = get_task_card_cache().get_many(db, [item["task_id"] for item in items])
+        now = get_utc_time()
+        served: List[Dict] = []
+        for item in items:
+            card = cards.get(item["task_id"])
+            if card is None or not _card_open(card, now):
+                continue
+            served.append({"task_id": item["task_id"], "score": item["score"], "reasons": item["reasons"], "task": card})
+            if len(served) == limit:
+                return served
+        # 列表里的任务都已下架 / 不可推荐，且缓存之外还有更低分的任务：重新计算
+        return None if entry["full"] else served
+
+
+def _card_open(card, now) -> bool:
+    deadline = card.deadline
+    if deadline is not None and deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=timezone.utc)
+    return card.status == "open" and bool(card.is_visible) and (deadline is None or deadline > now)
+
+
+# 全局缓存实例（延迟初始化，线程安全）
+_versioned_cache: Optional[VersionedRecommendationCache] = None
+_versioned_cache_lock = threading.Lock()
+
+
+def get_versioned_cache() -> VersionedRecommendationCache:
+    global _versioned_cache
+    if _versioned_cache is None:
+        with _versioned_cache_lock:
+            if _versioned_cache is None:
+                _versioned_cache = VersionedRecommendationCache()
+    return _versioned_cache
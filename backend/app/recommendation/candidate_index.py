@@ -0,0 +1,437 @@
+"""In-process candidate retrieval index for the recommendation engine.
+
+HybridEngine used to load the 500 newest open tasks matching the filters and
+run every scorer over all of them. This index retrieves a bounded candidate
+set first; only those rows are loaded and go through the full scorer stack.
+
+- Embeddings: each open task is a sparse, L2-normalised vector over tokens
+  (task type, city, ~5 km location cell, log2 price band, task level and
+  title keywords). The user query is built from the preference vector with
+  the same tokens; skipped task types get a negative weight.
+- Retrieval: an inverted file (token -> {task_id: weight}) accumulates the
+  dot product over the query's posting lists, then takes the top
+  CANDIDATE_INDEX_TOP_K. A slice of the newest tasks is always added so
+  fresh and cold-start tasks still reach the scorers.
+- Freshness: the first use loads all open tasks. Later calls sync rows whose
+  ``updated_at`` (trigger-maintained) moved past the watermark at most every
+  CANDIDATE_INDEX_SYNC_SECONDS. ORM inserts/updates/deletes in this process
+  are applied after commit by app.event_listeners. A full rebuild every
+  CANDIDATE_INDEX_REBUILD_SECONDS drops rows deleted in other processes.
+- Like the filter query it replaces, only tasks with a future deadline are
+  indexed.
+- Candidates are re-checked against the database (status / visibility /
+  deadline) when loaded, so a stale index can only cost recall, never show a
+  closed task.
+"""
+
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.utils.time_utils import get_utc_time
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_INDEX_ENABLED = os.getenv("CANDIDATE_INDEX_ENABLED", "true").lower() == "true"
+
+# Candidates handed to the scorer stack per request
+CANDIDATE_INDEX_TOP_K = int(os.getenv("CANDIDATE_INDEX_TOP_K", "300"))
+# Share of TOP_K reserved for the newest tasks regardless of similarity
+CANDIDATE_INDEX_FRESH_RATIO = float(os.getenv("CANDIDATE_INDEX_FRESH_RATIO", "0.2"))
+CANDIDATE_INDEX_SYNC_SECONDS = int(os.getenv("CANDIDATE_INDEX_SYNC_SECONDS", "30"))
+CANDIDATE_INDEX_REBUILD_SECONDS = int(os.getenv("CANDIDATE_INDEX_REBUILD_SECONDS", "3600"))
+
+# Location cell size in degrees (~5 km north-south)
+CELL_DEGREES = 0.05
+
+# Token weights (before L2 normalisation)
+TOKEN_WEIGHTS = {"type": 1.0, "city": 0.8, "cell": 0.6, "price": 0.4, "level": 0.3, "kw": 0.3}
+NEGATIVE_TYPE_WEIGHT = -1.0
+MAX_TITLE_TOKENS = 12
+MAX_PRICE_BANDS = 6
+
+# Columns the index needs (also what the ORM hook captures)
+INDEX_COLUMNS = (
+    "id", "task_type", "location", "city_canonical", "latitude", "longitude",
+    "reward", "task_level", "title", "created_at", "deadline", "status", "is_visible", "poster_id",
+)
+
+_WORD_RE = re.compile(r"[a-z0-9]{2,}")
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]+")
+
+
+class IndexedTask(NamedTuple):
+    task_id: int
+    task_type: Optional[str]
+    city: Optional[str]
+    created_at: datetime
+    deadline: datetime
+    poster_id: Optional[str]
+    features: Dict[str, float]
+
+
+def _aware(moment: Optional[datetime]) -> Optional[datetime]:
+    if moment is not None and moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def _city_token(location: Optional[str], city_canonical: Optional[str] = None) -> Optional[str]:
+    if city_canonical:
+        return city_canonical.lower()
+    if not location:
+        return None
+    from app.utils.city_filter_utils import resolve_city_canonical
+    canonical = resolve_city_canonical(location)
+    return (canonical or location.split(",")[-1].strip()).lower() or None
+
+
+def _cell_token(latitude, longitude) -> Optional[str]:
+    if latitude is None or longitude is None:
+        return None
+    row = int(math.floor(float(latitude) / CELL_DEGREES))
+    col = int(math.floor(float(longitude) / CELL_DEGREES))
+    return f"cell:{row}:{col}"
+
+
+def price_band(price: float) -> int:
+    return int(math.floor(math.log2(max(price, 1.0))))
+
+
+def text_tokens(text: Optional[str]) -> List[str]:
+    """Lower-cased words plus CJK bigrams (keywords are matched as substrings by the scorers)."""
+    if not text:
+        return []
+    text = text.lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        tokens.extend(run[i:i + 2] for i in range(max(len(run) - 1, 1)))
+    return list(dict.fromkeys(tokens))
+
+
+def _normalise(features: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(w * w for w in features.values()))
+    if norm == 0:
+        return {}
+    return {token: w / norm for token, w in features.items()}
+
+
+def task_features(values: Dict) -> Dict[str, float]:
+    """Sparse embedding of a task row (dict keyed by INDEX_COLUMNS)."""
+    features: Dict[str, float] = {}
+    if values.get("task_type"):
+        features[f"type:{values['task_type']}"] = TOKEN_WEIGHTS["type"]
+    city = _city_token(values.get("location"), values.get("city_canonical"))
+    if city:
+        features[f"city:{city}"] = TOKEN_WEIGHTS["city"]
+    cell = _cell_token(values.get("latitude"), values.get("longitude"))
+    if cell:
+        features[cell] = TOKEN_WEIGHTS["cell"]
+    if values.get("reward"):
+        features[f"price:{price_band(float(values['reward']))}"] = TOKEN_WEIGHTS["price"]
+    if values.get("task_level"):
+        features[f"level:{values['task_level']}"] = TOKEN_WEIGHTS["level"]
+    for token in text_tokens(values.get("title"))[:MAX_TITLE_TOKENS]:
+        features[f"kw:{token}"] = TOKEN_WEIGHTS["kw"]
+    return _normalise(features)
+
+
+def query_features(
+    user_vector: Dict, latitude: Optional[float] = None, longitude: Optional[float] = None,
+) -> Dict[str, float]:
+    """Sparse query from a preference vector (build_user_preference_vector / get_preference_vector shape)."""
+    features: Dict[str, float] = {}
+    for task_type in user_vector.get("task_types") or []:
+        features[f"type:{task_type}"] = TOKEN_WEIGHTS["type"]
+    for task_type in user_vector.get("negative_task_types") or []:
+        if f"type:{task_type}" not in features:
+            features[f"type:{task_type}"] = NEGATIVE_TYPE_WEIGHT
+    for location in user_vector.get("locations") or []:
+        city = _city_token(location)
+        if city:
+            features[f"city:{city}"] = TOKEN_WEIGHTS["city"]
+    cell = _cell_token(latitude, longitude)
+    if cell:
+        features[cell] = TOKEN_WEIGHTS["cell"]
+    price_range = user_vector.get("price_range") or {}
+    if user_vector.get("price_range_from_history") and price_range.get("max"):
+        low = price_band(float(price_range.get("min") or 0))
+        high = min(price_band(float(price_range["max"])), low + MAX_PRICE_BANDS - 1)
+        for band in range(low, high + 1):
+            features[f"price:{band}"] = TOKEN_WEIGHTS["price"]
+    for level in user_vector.get("task_levels") or []:
+        features[f"level:{level}"] = TOKEN_WEIGHTS["level"]
+    for keyword in user_vector.get("keywords") or []:
+        for token in text_tokens(keyword):
+            features[f"kw:{token}"] = TOKEN_WEIGHTS["kw"]
+    return _normalise(features)
+
+
+def _is_open(values: Dict, now: datetime) -> bool:
+    deadline = _aware(values.get("deadline"))
+    return (
+        values.get("status") == "open"
+        and bool(values.get("is_visible"))
+        and deadline is not None
+        and deadline > now
+    )
+
+
+def task_values(task) -> Dict:
+    """INDEX_COLUMNS of an ORM Task (or projection row) as a dict."""
+    return {name: getattr(task, name, None) for name in INDEX_COLUMNS}
+
+
+class CandidateIndex:
+    """Inverted-file retrieval over sparse task embeddings (thread-safe)."""
+
+    def __init__(
+        self,
+        top_k: int = CANDIDATE_INDEX_TOP_K,
+        fresh_ratio: float = CANDIDATE_INDEX_FRESH_RATIO,
+        sync_seconds: int = CANDIDATE_INDEX_SYNC_SECONDS,
+        rebuild_seconds: int = CANDIDATE_INDEX_REBUILD_SECONDS,
+    ):
+        self.top_k = top_k
+        self.fresh_ratio = fresh_ratio
+        self.sync_seconds = sync_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._tasks: Dict[int, IndexedTask] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._watermark: Optional[datetime] = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self.stats = {"builds": 0, "syncs": 0, "upserts": 0, "removals": 0, "searches": 0, "candidates": 0}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def built(self) -> bool:
+        return self._built_at > 0
+
+    # ---- maintenance ----
+
+    @staticmethod
+    def _entry(values: Dict) -> IndexedTask:
+        return IndexedTask(
+            task_id=values["id"],
+            task_type=values.get("task_type"),
+            city=_city_token(values.get("location"), values.get("city_canonical")),
+            created_at=_aware(values.get("created_at")) or get_utc_time(),
+            deadline=_aware(values.get("deadline")),
+            poster_id=values.get("poster_id"),
+            features=task_features(values),
+        )
+
+    def upsert(self, values: Dict, now: Optional[datetime] = None) -> None:
+        """Insert / replace one task; closed, hidden or expired tasks are removed instead."""
+        task_id = values.get("id")
+        if task_id is None:
+            return
+        if not _is_open(values, now or get_utc_time()):
+            self.remove([task_id])
+            return
+        entry = self._entry(values)
+        with self._lock:
+            self._remove_locked(task_id)
+            self._tasks[task_id] = entry
+            for token, weight in entry.features.items():
+                self._postings.setdefault(token, {})[task_id] = weight
+            self.stats["upserts"] += 1
+
+    def remove(self, task_ids: Iterable[int]) -> None:
+        with self._lock:
+            for task_id in task_ids:
+                if self._remove_locked(task_id):
+                    self.stats["removals"] += 1
+
+    def _remove_locked(self, task_id: int) -> bool:
+        entry = self._tasks.pop(task_id, None)
+        if entry is None:
+            return False
+        for token in entry.features:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(task_id, None)
+                if not posting:
+                    del self._postings[token]
+        return True
+
+    def _load_rows(self, db, since: Optional[datetime] = None) -> List[Dict]:
+        from app.models import Task
+
+        columns = [getattr(Task, name) for name in INDEX_COLUMNS] + [Task.updated_at]
+        query = db.query(*columns)
+        if since is None:
+            query = query.filter(Task.status == "open", Task.is_visible == True)  # noqa: E712
+        else:
+            query = query.filter(Task.updated_at > since)
+        rows = []
+        for row in query.all():
+            values = dict(zip(INDEX_COLUMNS, row[:-1]))
+            values["updated_at"] = _aware(row[-1])
+            rows.append(values)
+        return rows
+
+    def rebuild(self, db) -> int:
+        """Load every open task into fresh structures and swap them in; returns the number indexed."""
+        started = get_utc_time()
+        rows = self._load_rows(db)
+        tasks: Dict[int, IndexedTask] = {}
+        postings: Dict[str, Dict[int, float]] = {}
+        for values in rows:
+            if not _is_open(values, started):
+                continue
+            entry = self._entry(values)
+            tasks[entry.task_id] = entry
+            for token, weight in entry.features.items():
+                postings.setdefault(token, {})[entry.task_id] = weight
+        # 水位取数据库里的 updated_at，避免应用与数据库时钟偏差漏掉更新
+        watermark = max((v["updated_at"] for v in rows if v.get("updated_at")), default=None)
+        with self._lock:
+            self._tasks = tasks
+            self._postings = postings
+            self._watermark = watermark or started
+            self._built_at = self._synced_at = time.monotonic()
+            self.stats["builds"] += 1
+        return len(tasks)
+
+    def sync(self, db) -> int:
+        """Apply rows changed since the watermark; returns the number of rows seen."""
+        since = self._watermark
+        if since is None:
+            return self.rebuild(db)
+        rows = self._load_rows(db, since=since - timedelta(seconds=1))
+        now = get_utc_time()
+        for values in rows:
+            self.upsert(values, now=now)
+        with self._lock:
+            latest = max((v["updated_at"] for v in rows if v.get("updated_at")), default=None)
+            if latest is not None and latest > since:
+                self._watermark = latest
+            self._synced_at = time.monotonic()
+            self.stats["syncs"] += 1
+        return len(rows)
+
+    def ensure_fresh(self, db) -> None:
+        """Build on first use, then sync / rebuild on their intervals (one caller at a time)."""
+        now = time.monotonic()
+        if self.built and now - self._synced_at < self.sync_seconds:
+            return
+        if not self._sync_lock.acquire(blocking=not self.built):
+            return  # 另一个请求正在同步，先用现有索引
+        try:
+            now = time.monotonic()
+            if not self.built or now - self._built_at >= self.rebuild_seconds:
+                self.rebuild(db)
+            elif now - self._synced_at >= self.sync_seconds:
+                self.sync(db)
+        finally:
+            self._sync_lock.release()
+
+    # ---- retrieval ----
+
+    def search(
+        self,
+        query: Dict[str, float],
+        k: Optional[int] = None,
+        exclude: Optional[Set[int]] = None,
+        exclude_poster: Optional[str] = None,
+        task_type: Optional[str] = None,
+        city: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[int, float]]:
+        """Top-k (task_id, similarity), best first, followed by the newest unmatched tasks."""
+        k = k or self.top_k
+        exclude = exclude or set()
+        now = now or get_utc_time()
+        city = city.lower() if city else None
+
+        def allowed(entry: IndexedTask) -> bool:
+            return (
+                entry.task_id not in exclude
+                and (exclude_poster is None or entry.poster_id != exclude_poster)
+                and (task_type is None or entry.task_type == task_type)
+                and (city is None or entry.city == city)
+                and entry.deadline > now
+            )
+
+        with self._lock:
+            scores: Dict[int, float] = {}
+            for token, q_weight in query.items():
+                for task_id, weight in self._postings.get(token, {}).items():
+                    scores[task_id] = scores.get(task_id, 0.0) + q_weight * weight
+            similar_k = k - int(k * self.fresh_ratio)
+            ranked = heapq.nlargest(
+                similar_k,
+                ((score, task_id) for task_id, score in scores.items()
+                 if score > 0 and allowed(self._tasks[task_id])),
+            )
+            result = [(task_id, score) for score, task_id in ranked]
+            chosen = {task_id for task_id, _ in result}
+            fresh = heapq.nlargest(
+                k - len(result),
+                (entry for entry in self._tasks.values() if entry.task_id not in chosen and allowed(entry)),
+                key=lambda entry: entry.created_at,
+            )
+            result.extend((entry.task_id, 0.0) for entry in fresh)
+            self.stats["searches"] += 1
+            self.stats["candidates"] += len(result)
+        return result
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {
+                "tasks": len(self._tasks),
+                "tokens": len(self._postings),
+                "watermark": self._watermark.isoformat() if self._watermark else None,
+                **self.stats,
+            }
+
+
+# 全局索引实例（延迟初始化，线程安全）
+_candidate_index: Optional[CandidateIndex] = None
+_candidate_index_lock = threading.Lock()
+
+
+def get_candidate_index() -> CandidateIndex:
+    global _candidate_index
+    if _candidate_index is None:
+        with _candidate_index_lock:
+            if _candidate_index is None:
+                _candidate_index = CandidateIndex()
+    return _candidate_index
+
+
+def apply_task_changes(upserts: List[Dict], removed: List[int]) -> None:
+    """Apply committed ORM changes to this process's index (no-op before the first build)."""
+    index = get_candidate_index()
+    if not index.built:
+        return
+    now = get_utc_time()
+    for values in upserts:
+        index.upsert(values, now=now)
+    if removed:
+        index.remove(removed)
+
+
+def pool_changes(upserts: List[Dict], removed: List[int]) -> Tuple[List[int], List[int]]:
+    """Split committed changes into (open tasks added or edited, task ids that left the pool)."""
+    now = get_utc_time()
+    changed: List[int] = []
+    left = list(removed)
+    for values in upserts:
+        task_id = values.get("id")
+        if task_id is None:
+            continue
+        (changed if _is_open(values, now) else left).append(task_id)
+    return changed, left
@@ -1,5 +1,6 @@
 """HybridEngine: orchestrates all scorers and aggregates results."""
 import logging
+from itertools import islice
 from typing import List, Dict, Any, Optional
 
 from .scorer_registry import ScorerRegistry
@@ -19,7 +20,14 @@ class HybridEngine:
         candidate_tasks = self._get_candidates(user, filters, context)
         if not candidate_tasks:
             return []
+        return self.score_tasks(user, candidate_tasks, context)[:limit]
 
+    def score_tasks(self, user, candidate_tasks: List, context: Dict[str, Any]) -> List[Dict]:
+        """Score the given tasks with every active scorer and rank them.
+
+        Scorers score each task independently, so a subset (e.g. tasks added
+        since a cached list was computed) can be scored on its own and merged.
+        """
         # Pre-compute interaction count for dynamic weight scorers (e.g. DemandScorer)
         self._enrich_user_context(user, context)
 
@@ -47,7 +55,7 @@ class HybridEngine:
         return [
             {"task_id": task_id, "score": round(data["score"], 4),
              "reasons": data["reasons"], "task": task_map.get(task_id)}
-            for task_id, data in ranked[:limit]
+            for task_id, data in ranked
             if task_map.get(task_id) is not None
         ]
 
@@ -75,14 +83,16 @@ class HybridEngine:
         except Exception as e:
             logger.debug(f"Failed to load interaction count: {e}")
 
-        # 2. UserProfilePreference (shared by Content, Location, Profile scorers)
-        try:
-            from app.models import UserProfilePreference
-            context["user_preferences"] = db.query(UserProfilePreference).filter(
-                UserProfilePreference.user_id == user.id
-            ).first()
-        except Exception as e:
-            logger.debug(f"Failed to load user preferences: {e}")
+        # 2. UserProfilePreference (shared by Content, Location, Profile scorers;
+        #    candidate retrieval may have loaded it already)
+        if "user_preferences" not in context:
+            try:
+                from app.models import UserProfilePreference
+                context["user_preferences"] = db.query(UserProfilePreference).filter(
+                    UserProfilePreference.user_id == user.id
+                ).first()
+            except Exception as e:
+                logger.debug(f"Failed to load user preferences: {e}")
 
         # 3. TaskHistory (shared by Content, Collaborative scorers)
         try:
@@ -94,14 +104,13 @@ class HybridEngine:
         except Exception as e:
             logger.debug(f"Failed to load task history: {e}")
 
-    def _get_candidates(self, user, filters: Dict, context: Dict) -> List:
-        db = context.get("db")
-        if not db:
-            return []
+    @staticmethod
+    def candidate_query(db):
+        """Open, visible, unexpired tasks with the columns the scorers read."""
         from app.models import Task
         from app.crud import get_utc_time
         from sqlalchemy.orm import load_only
-        query = db.query(Task).options(
+        return db.query(Task).options(
             load_only(
                 Task.id, Task.task_type, Task.status, Task.is_visible,
                 Task.location, Task.reward, Task.base_reward, Task.agreed_reward,
@@ -114,12 +123,33 @@ class HybridEngine:
         ).filter(
             Task.status == "open", Task.is_visible == True, Task.deadline > get_utc_time()
         )
+
+    def _get_candidates(self, user, filters: Dict, context: Dict) -> List:
+        db = context.get("db")
+        if not db:
+            return []
+        from app.models import Task
+        query = self.candidate_query(db)
         # Exclude user's own tasks
+        excluded = set()
         if user:
             from .utils import get_excluded_task_ids
             excluded = get_excluded_task_ids(db, user.id)
             if excluded:
                 query = query.filter(~Task.id.in_(excluded))
+        # Batch jobs preload the open-task pool once and share it across users
+        pool = context.get("candidate_pool")
+        # Stage 1: retrieve a bounded candidate set from the in-process index
+        candidate_ids = self._retrieve_candidate_ids(user, filters, context, excluded)
+        if candidate_ids is not None:
+            if not candidate_ids:
+                return []
+            if pool is not None:
+                return [pool[task_id] for task_id in candidate_ids if task_id in pool]
+            return query.filter(Task.id.in_(candidate_ids)).all()
+        if pool is not None and not filters:
+            # The pool is ordered newest first, same as the query below
+            return list(islice((t for t in pool.values() if t.id not in excluded), 500))
         if filters.get("task_type"):
             query = query.filter(Task.task_type == filters["task_type"])
         if filters.get("location"):
@@ -143,3 +173,37 @@ class HybridEngine:
                 (Task.title_zh.ilike(kw)) | (Task.title_en.ilike(kw))
             )
         return query.order_by(Task.created_at.desc()).limit(500).all()
+
+    def _retrieve_candidate_ids(self, user, filters: Dict, context: Dict, excluded) -> Optional[List[int]]:
+        """Top candidates from the candidate index, or None to use the filter query.
+
+        Keyword filters and locations without a canonical city stay on the
+        filter query (they need ILIKE matching).
+        """
+        from .candidate_index import CANDIDATE_INDEX_ENABLED, get_candidate_index, query_features
+
+        if not CANDIDATE_INDEX_ENABLED or not user or filters.get("keyword"):
+            return None
+        city = None
+        if filters.get("location"):
+            from app.utils.city_filter_utils import resolve_city_canonical
+            city = resolve_city_canonical(filters["location"])
+            if not city:
+                return None
+        try:
+            from .scorers.content_scorer import ContentScorer
+            index = get_candidate_index()
+            index.ensure_fresh(context["db"])
+            user_vector = ContentScorer.resolve_user_vector(user, context)
+            query = query_features(user_vector, context.get("latitude"), context.get("longitude"))
+            hits = index.search(
+                query,
+                exclude=set(excluded),
+                exclude_poster=user.id,
+                task_type=filters.get("task_type"),
+                city=city,
+            )
+        except Exception as e:
+            logger.warning(f"Candidate index retrieval failed, using filter query: {e}")
+            return None
+        return [task_id for task_id, _ in hits]
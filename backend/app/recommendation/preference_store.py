@@ -0,0 +1,425 @@
+"""Persisted, incrementally updated user preference vectors.
+
+build_user_preference_vector re-aggregates TaskHistory, view/click/skip
+interactions and search keywords on every recommendation call. This module
+keeps one row per user (user_preference_vectors) holding decayed weights:
+
+  {"s": schema, "t": {task_type: w}, "l": {location: w}, "k": {keyword: w},
+   "n": {skipped task_type: w}, "p": [sum_w, sum_w*price, sum_w*price^2]}
+
+- Writes: InteractionLog applies view (> LONG_VIEW_SECONDS) / click / apply /
+  accept / complete / skip events after its batch commit; TaskHistory inserts
+  are applied after commit by app.event_listeners. Only existing rows are
+  updated, each write bumps ``version``.
+- Decay: weights are relative to ``updated_at``; adding an event first decays
+  the stored weights to the event time (half-life PREFERENCE_HALF_LIFE_DAYS),
+  reads decay lazily to "now" and drop entries below MIN_WEIGHT.
+- Bootstrap: the first read (or a row with an older schema) replays the most
+  recent TaskHistory and interaction rows, then persists the result in its own
+  transaction.
+- get_preference_vector returns the same dict shape as
+  build_user_preference_vector, plus ``vector_version``.
+"""
+
+import logging
+import math
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import desc, select
+
+from app.utils.time_utils import get_utc_time
+
+logger = logging.getLogger(__name__)
+
+PREFERENCE_VECTOR_ENABLED = os.getenv("PREFERENCE_VECTOR_ENABLED", "true").lower() == "true"
+
+# Half-life of interaction weights
+PREFERENCE_HALF_LIFE_DAYS = float(os.getenv("PREFERENCE_HALF_LIFE_DAYS", "30"))
+
+# Bump when the blob layout or event weights change: stale rows are rebuilt on read
+SCHEMA_VERSION = 1
+
+# Views longer than this count as interest (same cut-off as the rebuild path)
+LONG_VIEW_SECONDS = 30
+
+# Positive weight per event kind ("history" = a TaskHistory row of the user)
+EVENT_WEIGHTS = {"view": 1.0, "click": 0.5, "apply": 2.0, "accept": 3.0, "complete": 3.0, "history": 3.0}
+# Kinds whose task reward feeds the price range
+PRICE_EVENTS = frozenset({"apply", "accept", "complete", "history"})
+SKIP_WEIGHT = 1.0
+KEYWORD_WEIGHT = 1.0
+
+# Decayed weight a signal needs to show up in the materialised vector
+MIN_WEIGHT = 0.25
+# Entries below this are dropped on write; each map keeps at most MAX_ENTRIES
+PRUNE_WEIGHT = 0.01
+MAX_ENTRIES = 32
+
+# How many rows the bootstrap replays
+REPLAY_HISTORY_LIMIT = 50
+REPLAY_INTERACTION_LIMIT = 200
+
+# Materialised list sizes (same as build_user_preference_vector)
+TOP_TASK_TYPES = 5
+TOP_LOCATIONS = 3
+TOP_KEYWORDS = 10
+
+_MAPS = ("t", "l", "k", "n")
+
+
+class PreferenceEvent(NamedTuple):
+    user_id: str
+    task_id: int
+    kind: str  # a key of EVENT_WEIGHTS, "skip", or "search" (keyword only)
+    at: datetime
+    keyword: Optional[str] = None
+
+
+class _TaskAttrs(NamedTuple):
+    task_type: Optional[str]
+    location: Optional[str]
+    reward: Optional[float]
+
+
+def event_from_interaction(
+    user_id: str,
+    task_id: int,
+    interaction_type: str,
+    at: datetime,
+    duration_seconds: Optional[int] = None,
+    metadata: Optional[dict] = None,
+) -> Optional[PreferenceEvent]:
+    """Map a user_task_interactions row to a preference event (None = no signal)."""
+    keyword = None
+    if interaction_type in ("view", "click") and isinstance(metadata, dict):
+        keyword = metadata.get("search_keyword")
+        if not isinstance(keyword, str) or not keyword.strip():
+            keyword = None
+    if interaction_type == "view" and (duration_seconds or 0) <= LONG_VIEW_SECONDS:
+        # 短浏览只贡献搜索关键词
+        return PreferenceEvent(user_id, task_id, "search", at, keyword) if keyword else None
+    if interaction_type not in EVENT_WEIGHTS and interaction_type != "skip":
+        return None
+    return PreferenceEvent(user_id, task_id, interaction_type, at, keyword)
+
+
+def empty_state() -> Dict:
+    return {"s": SCHEMA_VERSION, "t": {}, "l": {}, "k": {}, "n": {}, "p": [0.0, 0.0, 0.0]}
+
+
+def decay_factor(since: datetime, until: datetime) -> float:
+    """Multiplier for weights recorded at ``since`` as seen at ``until``."""
+    seconds = (until - since).total_seconds()
+    if seconds <= 0:
+        return 1.0
+    return 0.5 ** (seconds / (PREFERENCE_HALF_LIFE_DAYS * 86400))
+
+
+def _scale(state: Dict, factor: float) -> None:
+    if factor == 1.0:
+        return
+    for name in _MAPS:
+        bucket = state[name]
+        for key in bucket:
+            bucket[key] *= factor
+    state["p"] = [value * factor for value in state["p"]]
+
+
+def _add_event(state: Dict, ref: datetime, event: PreferenceEvent, attrs: Optional[_TaskAttrs]) -> datetime:
+    """Add one event to ``state`` (weights relative to ``ref``); returns the new reference time."""
+    if event.at > ref:
+        _scale(state, decay_factor(ref, event.at))
+        ref = event.at
+    scale = decay_factor(event.at, ref)
+
+    if event.keyword:
+        key = event.keyword.strip()
+        state["k"][key] = state["k"].get(key, 0.0) + KEYWORD_WEIGHT * scale
+    if attrs is None:
+        return ref
+
+    if event.kind == "skip":
+        if attrs.task_type:
+            state["n"][attrs.task_type] = state["n"].get(attrs.task_type, 0.0) + SKIP_WEIGHT * scale
+        return ref
+
+    weight = EVENT_WEIGHTS.get(event.kind, 0.0) * scale
+    if weight <= 0:
+        return ref
+    if attrs.task_type:
+        state["t"][attrs.task_type] = state["t"].get(attrs.task_type, 0.0) + weight
+    if attrs.location:
+        state["l"][attrs.location] = state["l"].get(attrs.location, 0.0) + weight
+    if event.kind in PRICE_EVENTS and attrs.reward:
+        price = float(attrs.reward)
+        w, wp, wp2 = state["p"]
+        state["p"] = [w + weight, wp + weight * price, wp2 + weight * price * price]
+    return ref
+
+
+def _compact(state: Dict) -> Dict:
+    """Drop negligible entries, cap map sizes and round for storage."""
+    for name in _MAPS:
+        kept = sorted(
+            ((key, w) for key, w in state[name].items() if w >= PRUNE_WEIGHT),
+            key=lambda item: item[1],
+            reverse=True,
+        )[:MAX_ENTRIES]
+        state[name] = {key: round(w, 4) for key, w in kept}
+    if state["p"][0] < PRUNE_WEIGHT:
+        state["p"] = [0.0, 0.0, 0.0]
+    else:
+        state["p"] = [round(value, 4) for value in state["p"]]
+    return state
+
+
+def _load_task_attrs(connection, task_ids: Iterable[int]) -> Dict[int, _TaskAttrs]:
+    from app.models import Task
+
+    ids = list(set(task_ids))
+    if not ids:
+        return {}
+    rows = connection.execute(
+        select(Task.id, Task.task_type, Task.location, Task.reward).where(Task.id.in_(ids))
+    ).all()
+    return {
+        row.id: _TaskAttrs(row.task_type, row.location, float(row.reward) if row.reward is not None else None)
+        for row in rows
+    }
+
+
+def _vector_table():
+    from app.models import UserPreferenceVector
+    return UserPreferenceVector.__table__
+
+
+def _as_aware(moment: datetime) -> datetime:
+    # SQLite 读回的时间不带时区
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def apply_events(connection, events: Iterable[PreferenceEvent]) -> int:
+    """Fold events into existing vectors on ``connection``; returns the number of users updated.
+
+    Users without a row are skipped: their first read replays history, which
+    already contains these events. The caller owns the transaction.
+    """
+    by_user: Dict[str, List[PreferenceEvent]] = {}
+    for event in events:
+        if event is not None and event.user_id:
+            by_user.setdefault(event.user_id, []).append(event)
+    if not by_user:
+        return 0
+
+    table = _vector_table()
+    query = select(table.c.user_id, table.c.version, table.c.data, table.c.updated_at).where(
+        table.c.user_id.in_(list(by_user))
+    )
+    if connection.dialect.name != "sqlite":
+        query = query.with_for_update()
+    rows = connection.execute(query).all()
+    rows = [row for row in rows if isinstance(row.data, dict) and row.data.get("s") == SCHEMA_VERSION]
+    if not rows:
+        return 0
+
+    attrs = _load_task_attrs(connection, (e.task_id for row in rows for e in by_user[row.user_id]))
+    for row in rows:
+        state = row.data
+        ref = _as_aware(row.updated_at)
+        for event in sorted(by_user[row.user_id], key=lambda e: e.at):
+            ref = _add_event(state, ref, event, attrs.get(event.task_id))
+        connection.execute(
+            table.update()
+            .where(table.c.user_id == row.user_id)
+            .values(data=_compact(state), updated_at=ref, version=table.c.version + 1)
+        )
+    return len(rows)
+
+
+def record_preference_events(events: List[PreferenceEvent]) -> None:
+    """apply_events in a fresh session (used after the originating transaction committed)."""
+    if not PREFERENCE_VECTOR_ENABLED or not events:
+        return
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        apply_events(db.connection(), events)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"更新用户偏好向量失败: {e}")
+    finally:
+        db.close()
+
+
+def replay_state(db, user_id: str) -> Tuple[Dict, datetime]:
+    """Rebuild a user's state from recent TaskHistory and interaction rows."""
+    from app.models import TaskHistory, UserTaskInteraction
+
+    now = get_utc_time()
+    events: List[PreferenceEvent] = []
+    history = db.execute(
+        select(TaskHistory.task_id, TaskHistory.timestamp)
+        .where(TaskHistory.user_id == user_id)
+        .order_by(desc(TaskHistory.timestamp))
+        .limit(REPLAY_HISTORY_LIMIT)
+    ).all()
+    for row in history:
+        if row.task_id is not None:
+            events.append(PreferenceEvent(user_id, row.task_id, "history", _as_aware(row.timestamp or now)))
+
+    interactions = db.execute(
+        select(
+            UserTaskInteraction.task_id,
+            UserTaskInteraction.interaction_type,
+            UserTaskInteraction.interaction_time,
+            UserTaskInteraction.duration_seconds,
+            UserTaskInteraction.interaction_metadata,
+        )
+        .where(UserTaskInteraction.user_id == user_id)
+        .order_by(desc(UserTaskInteraction.interaction_time))
+        .limit(REPLAY_INTERACTION_LIMIT)
+    ).all()
+    for row in interactions:
+        event = event_from_interaction(
+            user_id, row.task_id, row.interaction_type, _as_aware(row.interaction_time or now),
+            row.duration_seconds, row.interaction_metadata,
+        )
+        if event is not None:
+            events.append(event)
+
+    state = empty_state()
+    if not events:
+        return state, now
+    events.sort(key=lambda e: e.at)
+    ref = events[0].at
+    attrs = _load_task_attrs(db.connection(), (e.task_id for e in events))
+    for event in events:
+        ref = _add_event(state, ref, event, attrs.get(event.task_id))
+    return _compact(state), ref
+
+
+def _persist(db, user_id: str, state: Dict, ref: datetime) -> int:
+    """Upsert a rebuilt row in its own transaction; returns the stored version."""
+    table = _vector_table()
+    bind = db.get_bind()
+    if bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    stmt = insert(table).values(user_id=user_id, version=1, data=state, updated_at=ref)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={"data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at, "version": table.c.version + 1},
+    ).returning(table.c.version)
+    with bind.begin() as connection:
+        return connection.execute(stmt).scalar_one()
+
+
+def load_state(db, user_id: str) -> Tuple[Dict, datetime, int]:
+    """(state, reference time, version) for a user, bootstrapping the row if needed."""
+    table = _vector_table()
+    row = db.execute(
+        select(table.c.version, table.c.data, table.c.updated_at).where(table.c.user_id == user_id)
+    ).first()
+    if row is not None and isinstance(row.data, dict) and row.data.get("s") == SCHEMA_VERSION:
+        return row.data, _as_aware(row.updated_at), row.version
+
+    state, ref = replay_state(db, user_id)
+    try:
+        version = _persist(db, user_id, state, ref)
+    except Exception as e:
+        logger.warning(f"保存用户偏好向量失败: {e}")
+        version = 0
+    return state, ref, version
+
+
+def _top(weights: Dict[str, float], factor: float, limit: int) -> List[str]:
+    ranked = sorted(weights.items(), key=lambda item: item[1], reverse=True)
+    return [key for key, w in ranked if w * factor >= MIN_WEIGHT][:limit]
+
+
+def _parse_json_field(val) -> List:
+    if not val:
+        return []
+    if isinstance(val, list):
+        return val
+    try:
+        import json
+        parsed = json.loads(val)
+    except (TypeError, ValueError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def to_preference_vector(state: Dict, ref: datetime, preferences=None, now: Optional[datetime] = None) -> Dict:
+    """Materialise a stored state into the build_user_preference_vector dict shape."""
+    factor = decay_factor(ref, now or get_utc_time())
+    vector = {
+        "task_types": [],
+        "task_types_from_preference": False,
+        "locations": [],
+        "locations_from_preference": False,
+        "price_range": {"min": 0, "max": 999999},
+        "price_range_from_history": False,
+        "task_levels": [],
+        "keywords": [],
+        "negative_task_types": _top(state["n"], factor, MAX_ENTRIES),
+    }
+
+    if preferences:
+        if preferences.task_types:
+            vector["task_types"] = list(_parse_json_field(preferences.task_types))
+            vector["task_types_from_preference"] = True
+        if preferences.locations:
+            vector["locations"] = list(_parse_json_field(preferences.locations))
+            vector["locations_from_preference"] = True
+        if preferences.task_levels:
+            vector["task_levels"] = list(_parse_json_field(preferences.task_levels))
+        if preferences.keywords:
+            vector["keywords"] = list(_parse_json_field(preferences.keywords))
+
+    for field, name, limit in (
+        ("task_types", "t", TOP_TASK_TYPES),
+        ("locations", "l", TOP_LOCATIONS),
+        ("keywords", "k", TOP_KEYWORDS),
+    ):
+        existing = set(vector[field])
+        vector[field].extend(key for key in _top(state[name], factor, limit) if key not in existing)
+
+    w, wp, wp2 = state["p"]
+    if w * factor >= MIN_WEIGHT:
+        mean = wp / w
+        spread = 2 * math.sqrt(max(wp2 / w - mean * mean, 0.0))
+        vector["price_range"] = {"min": max(mean - spread, 0.0) * 0.8, "max": (mean + spread) * 1.2}
+        vector["price_range_from_history"] = True
+
+    return vector
+
+
+def has_signal(vector: Dict) -> bool:
+    return bool(
+        vector["task_types"] or vector["locations"] or vector["keywords"]
+        or vector["task_levels"] or vector["price_range_from_history"]
+    )
+
+
+def get_preference_vector(db, user, preferences=None, now: Optional[datetime] = None) -> Dict:
+    """Preference vector for ``user`` from the persisted row (one query once bootstrapped).
+
+    Falls back to get_default_preference_vector when neither explicit
+    preferences nor any learned signal survive decay.
+    """
+    from .user_vector import get_default_preference_vector
+
+    state, ref, version = load_state(db, user.id)
+    vector = to_preference_vector(state, ref, preferences, now=now)
+    if not preferences and not has_signal(vector):
+        vector = get_default_preference_vector(user)
+    vector["vector_version"] = version
+    return vector
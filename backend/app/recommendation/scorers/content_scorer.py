@@ -8,6 +8,7 @@ import logging
 from typing import Dict, List, Any
 
 from ..base_scorer import BaseScorer, ScoredTask
+from ..preference_store import PREFERENCE_VECTOR_ENABLED, get_preference_vector
 from ..user_vector import (
     build_user_preference_vector,
     get_default_preference_vector,
@@ -33,15 +34,41 @@ class ContentScorer(BaseScorer):
         Context keys used:
             db: SQLAlchemy Session (required)
             user_vector: pre-built preference vector (optional, avoids rebuild)
+            user_preferences: preloaded UserProfilePreference (optional)
         """
-        db = context["db"]
+        user_vector = self.resolve_user_vector(user, context)
+
+        results: Dict[int, ScoredTask] = {}
+        for task in tasks:
+            content_score = self._calculate_content_match(user_vector, task)
+            if content_score > 0:
+                reason = self._build_reason(user_vector, task, content_score)
+                results[task.id] = ScoredTask(score=content_score, reason=reason)
+
+        return results
+
+    @staticmethod
+    def resolve_user_vector(user, context: Dict[str, Any]) -> Dict:
+        """Return context["user_vector"], building (and caching) it on first use.
 
-        # Use pre-built vector if available, otherwise build one
+        Order: pre-built vector, persisted vector (preference_store), live rebuild.
+        """
         user_vector = context.get("user_vector")
+        if user_vector is not None:
+            return user_vector
+        db = context["db"]
+
+        # Prefer engine-preloaded data from context, fall back to own queries
+        # Use `in` check (not truthiness) — None/[] are valid preloaded results
+        if "user_preferences" not in context:
+            context["user_preferences"] = get_user_preferences(db, user.id)
+        preferences = context["user_preferences"]
+        if PREFERENCE_VECTOR_ENABLED:
+            try:
+                user_vector = get_preference_vector(db, user, preferences)
+            except Exception as e:
+                logger.warning(f"读取持久化偏好向量失败，回退到实时构建: {e}")
         if user_vector is None:
-            # Prefer engine-preloaded data from context, fall back to own queries
-            # Use `in` check (not truthiness) — None/[] are valid preloaded results
-            preferences = context["user_preferences"] if "user_preferences" in context else get_user_preferences(db, user.id)
             history = context["user_task_history"] if "user_task_history" in context else get_user_task_history(db, user.id)
             view_history = get_user_view_history(db, user.id)
             search_keywords = get_user_search_keywords(db, user.id)
@@ -58,14 +85,8 @@ class ContentScorer(BaseScorer):
             if not history and not preferences:
                 user_vector = get_default_preference_vector(user)
 
-        results: Dict[int, ScoredTask] = {}
-        for task in tasks:
-            content_score = self._calculate_content_match(user_vector, task)
-            if content_score > 0:
-                reason = self._build_reason(user_vector, task, content_score)
-                results[task.id] = ScoredTask(score=content_score, reason=reason)
-
-        return results
+        context["user_vector"] = user_vector
+        return user_vector
 
     # ------------------------------------------------------------------
     # Internal helpers
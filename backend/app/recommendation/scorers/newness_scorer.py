@@ -34,6 +34,7 @@ class NewnessScorer(BaseScorer):
 
         Context keys used:
             db: SQLAlchemy Session (required)
+            task_posters: optional {poster_id: User} preloaded for a whole batch of users
         """
         db = context["db"]
         from app.crud import get_utc_time
@@ -49,7 +50,9 @@ class NewnessScorer(BaseScorer):
 
         # Batch-load all unique poster Users in ONE query (eliminates N+1)
         poster_ids: Set[str] = {t.poster_id for t in recent_tasks if t.poster_id}
-        if poster_ids:
+        if context.get("task_posters") is not None:
+            poster_map = context["task_posters"]
+        elif poster_ids:
             posters = db.query(UserModel).filter(UserModel.id.in_(list(poster_ids))).all()
             poster_map = {p.id: p for p in posters}
         else:
@@ -10,7 +10,7 @@ Scoring formula:
 """
 
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 
 from sqlalchemy import func
 
@@ -30,14 +30,40 @@ class PopularityScorer(BaseScorer):
 
         Context keys used:
             db: SQLAlchemy Session (required)
+            task_stats: optional {"applications": {task_id: n}, "views": {task_id: n}}
+                preloaded for a whole batch of users
         """
         db = context["db"]
         if not tasks:
             return {}
 
-        task_ids = [t.id for t in tasks]
+        stats = context.get("task_stats")
+        if stats is not None:
+            app_counts, view_counts = stats["applications"], stats["views"]
+        else:
+            app_counts, view_counts = self.load_counts(db, [t.id for t in tasks])
 
-        # Batch-load application counts
+        results: Dict[int, ScoredTask] = {}
+        for task in tasks:
+            apps = app_counts.get(task.id, 0)
+            views = view_counts.get(task.id, 0)
+
+            if apps == 0 and views == 0:
+                continue
+
+            app_score = min(1.0, apps / 5)
+            view_score = min(1.0, views / 20)
+            final = app_score * 0.6 + view_score * 0.4
+
+            if final > 0:
+                reason = f"热门任务（{apps}人申请）" if apps > 0 else "关注度较高"
+                results[task.id] = ScoredTask(score=final, reason=reason)
+
+        return results
+
+    @staticmethod
+    def load_counts(db, task_ids: List[int]) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """Application and view counts per task, one grouped query each."""
         from app.models import TaskApplication, UserTaskInteraction
         app_counts = dict(
             db.query(
@@ -58,21 +84,4 @@ class PopularityScorer(BaseScorer):
                 UserTaskInteraction.interaction_type == "view"
             ).group_by(UserTaskInteraction.task_id).all()
         )
-
-        results: Dict[int, ScoredTask] = {}
-        for task in tasks:
-            apps = app_counts.get(task.id, 0)
-            views = view_counts.get(task.id, 0)
-
-            if apps == 0 and views == 0:
-                continue
-
-            app_score = min(1.0, apps / 5)
-            view_score = min(1.0, views / 20)
-            final = app_score * 0.6 + view_score * 0.4
-
-            if final > 0:
-                reason = f"热门任务（{apps}人申请）" if apps > 0 else "关注度较高"
-                results[task.id] = ScoredTask(score=final, reason=reason)
-
-        return results
+        return app_counts, view_counts
@@ -202,7 +202,10 @@ def invalidate_user_recommendations(user_id: str):
     """
     清除用户的所有推荐缓存
     
-    当用户行为发生变化时调用
+    当用户行为发生变化时调用。
+    不删除版本化缓存（rec:v1:{user_id}:*，app.recommendation.cache）：
+    其条目记录了计算时的用户向量版本，行为改变向量后读取时自动重算；
+    任务新增 / 关闭只按候选池变更日志对变化的任务打分并合并，不整体失效
     
     Args:
         user_id: 用户ID
@@ -81,6 +81,13 @@ recommendation_data_quality = Gauge(
     ['metric']  # metric: completeness, accuracy, freshness
 )
 
+# 批量预计算吞吐
+recommendation_precompute_users_per_second = Gauge(
+    'recommendation_precompute_users_per_second',
+    'Batch recommendation precompute throughput (users/sec) of the last run per shard',
+    ['shard']
+)
+
 
 def record_recommendation_request(algorithm: str, duration: float, status: str = "success"):
     """记录推荐请求"""
@@ -126,3 +133,8 @@ def update_recommendation_health(component: str, is_healthy: bool):
 def update_data_quality(metric: str, score: float):
     """更新数据质量指标"""
     recommendation_data_quality.labels(metric=metric).set(score)
+
+
+def record_precompute_throughput(shard: int, users_per_sec: float):
+    """记录批量预计算吞吐（users/sec）"""
+    recommendation_precompute_users_per_second.labels(shard=str(shard)).set(users_per_sec)
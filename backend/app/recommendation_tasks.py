@@ -191,6 +191,45 @@ if CELERY_AVAILABLE:
             db.close()
 
 
+if CELERY_AVAILABLE:
+    @celery_app.task(
+        name='app.recommendation_tasks.precompute_recommendations_batch_task',
+        bind=True,
+        max_retries=1,
+        default_retry_delay=300
+    )
+    def precompute_recommendations_batch_task(self):
+        """
+        Celery任务：按用户哈希分片，把周活跃用户的预计算分发到各 worker
+        """
+        from app.recommendation.batch_precompute import dispatch_precompute
+        return {"dispatched": dispatch_precompute()}
+
+    @celery_app.task(
+        name='app.recommendation_tasks.precompute_recommendation_shard_task',
+        bind=True,
+        max_retries=1,
+        default_retry_delay=300
+    )
+    def precompute_recommendation_shard_task(self, shard: int, user_ids: list, limit: int = 20):
+        """
+        Celery任务：预计算一个分片内活跃用户的推荐并批量写入缓存
+
+        Args:
+            shard: 分片序号
+            user_ids: 该分片的活跃用户ID（分发时统一查询并按哈希切分）
+            limit: 推荐数量
+        """
+        try:
+            from app.recommendation.batch_precompute import precompute_shard
+            return precompute_shard(shard, user_ids, limit)
+        except Exception as e:
+            logger.error(f"预计算推荐分片失败: shard={shard}, 用户数={len(user_ids)}, {e}", exc_info=True)
+            if self.request.retries < self.max_retries:
+                raise self.retry(exc=e)
+            raise
+
+
 def precompute_recommendations_async(user_id: str, limit: int = 20):
     """异步预计算推荐（便捷函数）"""
     if CELERY_AVAILABLE:
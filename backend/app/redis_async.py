@@ -0,0 +1,267 @@
+"""
+异步 Redis 访问层
+基于 redis.asyncio，供 async 路由 / 依赖使用，避免同步客户端在事件循环里阻塞一次网络往返。
+
+- 共享连接池：每个事件循环一个池（redis.asyncio 的连接绑定创建它的事件循环），
+  按 decode_responses 区分两个池，不再每次 from_url 新建连接
+- AsyncRedisCache：与 redis_cache.RedisCache 相同的 get/set/setex/delete/delete_pattern/keys/exists/pipeline API，
+  序列化格式相同，同步与异步两侧读写同一批键
+- 连接失败后短暂熔断（REDIS_ASYNC_RETRY_INTERVAL 秒），Redis 宕机时请求直接回退而不是逐个等待连接超时
+
+同步客户端（redis_cache.get_redis_client / redis_pool.get_client）继续保留给 Celery 任务和 TaskScheduler 线程使用。
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from redis.exceptions import RedisError
+    from redis.exceptions import TimeoutError as RedisTimeoutError
+    REDIS_ASYNC_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    RedisError = Exception
+    RedisConnectionError = RedisTimeoutError = OSError
+    REDIS_ASYNC_AVAILABLE = False
+
+from app.config import get_settings
+from app.redis_cache import deserialize_value, serialize_value
+
+logger = logging.getLogger(__name__)
+
+# 每个事件循环、每种解码方式的最大连接数
+REDIS_ASYNC_MAX_CONNECTIONS = int(os.getenv("REDIS_ASYNC_MAX_CONNECTIONS", "100"))
+
+# 连接失败后暂停访问 Redis 的秒数
+REDIS_ASYNC_RETRY_INTERVAL = float(os.getenv("REDIS_ASYNC_RETRY_INTERVAL", "5"))
+
+# delete_pattern 每批删除的键数
+REDIS_ASYNC_DELETE_BATCH = 500
+
+# 事件循环 -> {decode_responses: ConnectionPool}；事件循环结束后自动释放
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[bool, Any]]" = weakref.WeakKeyDictionary()
+_pools_lock = threading.Lock()
+
+
+def get_async_pool(decode_responses: bool = False):
+    """获取当前事件循环的共享异步连接池；Redis 未启用或不可用返回 None"""
+    if not REDIS_ASYNC_AVAILABLE:
+        return None
+    settings = get_settings()
+    if not settings.USE_REDIS or not settings.REDIS_URL:
+        return None
+
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        pools = _pools.get(loop)
+        if pools is None:
+            pools = _pools[loop] = {}
+        pool = pools.get(decode_responses)
+        if pool is None:
+            pool = aioredis.ConnectionPool.from_url(
+                settings.REDIS_URL,
+                max_connections=REDIS_ASYNC_MAX_CONNECTIONS,
+                decode_responses=decode_responses,
+                socket_connect_timeout=int(os.getenv("REDIS_CONNECT_TIMEOUT", "5")),
+                socket_timeout=int(os.getenv("REDIS_SOCKET_TIMEOUT", "5")),
+                retry_on_timeout=True,
+                health_check_interval=int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")),
+                socket_keepalive=True,
+            )
+            pools[decode_responses] = pool
+            logger.info(
+                "异步 Redis 连接池已创建 (decode_responses=%s, max_connections=%d)",
+                decode_responses, REDIS_ASYNC_MAX_CONNECTIONS,
+            )
+    return pool
+
+
+def get_async_client(decode_responses: bool = False):
+    """从共享池获取异步客户端（创建客户端对象不建立连接，开销很小）"""
+    pool = get_async_pool(decode_responses)
+    if pool is None:
+        return None
+    return aioredis.Redis(connection_pool=pool)
+
+
+async def close_async_pools() -> None:
+    """关闭当前事件循环的异步连接池（应用关闭时调用）"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    with _pools_lock:
+        pools = _pools.pop(loop, None) or {}
+    for pool in pools.values():
+        try:
+            await pool.disconnect()
+        except Exception as e:
+            logger.warning(f"关闭异步 Redis 连接池失败: {e}")
+
+
+class AsyncRedisCache:
+    """异步 Redis 缓存管理器（API 与 RedisCache 一致，方法均为协程）"""
+
+    def __init__(self, client: Any = None, decode_responses: bool = False):
+        """
+        Args:
+            client: 指定的异步客户端（测试用）；默认从共享连接池获取
+            decode_responses: 使用哪个共享池
+        """
+        self._client = client
+        self._decode_responses = decode_responses
+        self._down_until = 0.0
+
+    def client(self):
+        """当前可用的异步客户端；Redis 未启用或处于熔断期返回 None"""
+        if self._down_until and time.monotonic() < self._down_until:
+            return None
+        if self._client is not None:
+            return self._client
+        return get_async_client(self._decode_responses)
+
+    def _on_error(self, action: str, e: Exception) -> None:
+        if isinstance(e, (RedisConnectionError, RedisTimeoutError, OSError)):
+            self._down_until = time.monotonic() + REDIS_ASYNC_RETRY_INTERVAL
+            logger.warning(f"异步 Redis 不可用（{action}），{REDIS_ASYNC_RETRY_INTERVAL:g} 秒内跳过: {e}")
+        else:
+            logger.error(f"异步 Redis {action}失败: {e}")
+
+    async def get_raw(self, key: str) -> Optional[Any]:
+        """获取原始值（不反序列化）"""
+        client = self.client()
+        if client is None:
+            return None
+        try:
+            return await client.get(key)
+        except (RedisError, OSError) as e:
+            self._on_error("获取", e)
+            return None
+
+    async def get(self, key: str) -> Optional[Any]:
+        """获取缓存数据"""
+        data = await self.get_raw(key)
+        if not data:
+            return None
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return deserialize_value(data)
+
+    async def set(self, key: str, value: Any, ttl: int = 300) -> bool:
+        """设置缓存数据"""
+        return await self.setex(key, ttl, value)
+
+    async def setex(self, key: str, ttl: int, value: Any) -> bool:
+        """设置缓存数据（bytes 原样写入，其他值含 str 与同步 RedisCache 一样 JSON 序列化）"""
+        client = self.client()
+        if client is None:
+            return False
+        try:
+            data = value if isinstance(value, bytes) else serialize_value(value)
+            return bool(await client.setex(key, ttl, data))
+        except ValueError as e:
+            logger.debug(f"Redis 跳过缓存（序列化失败）: {e}")
+            return False
+        except (RedisError, OSError) as e:
+            self._on_error("设置", e)
+            return False
+
+    async def delete(self, *keys: str) -> int:
+        """删除一个或多个键，返回删除数"""
+        client = self.client()
+        if client is None or not keys:
+            return 0
+        try:
+            return await client.delete(*keys)
+        except (RedisError, OSError) as e:
+            self._on_error("删除", e)
+            return 0
+
+    async def delete_pattern(self, pattern: str) -> int:
+        """删除匹配模式的所有键（SCAN 迭代，分批删除）"""
+        client = self.client()
+        if client is None:
+            return 0
+        deleted = 0
+        batch: List[Any] = []
+        try:
+            async for key in client.scan_iter(match=pattern, count=REDIS_ASYNC_DELETE_BATCH):
+                batch.append(key)
+                if len(batch) >= REDIS_ASYNC_DELETE_BATCH:
+                    deleted += await client.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += await client.delete(*batch)
+        except (RedisError, OSError) as e:
+            self._on_error("批量删除", e)
+        return deleted
+
+    async def keys(self, pattern: str) -> List[str]:
+        """获取匹配模式的所有键（SCAN）"""
+        client = self.client()
+        if client is None:
+            return []
+        try:
+            return [
+                key.decode("utf-8") if isinstance(key, bytes) else key
+                async for key in client.scan_iter(match=pattern, count=REDIS_ASYNC_DELETE_BATCH)
+            ]
+        except (RedisError, OSError) as e:
+            self._on_error("获取键列表", e)
+            return []
+
+    async def exists(self, key: str) -> bool:
+        """检查键是否存在"""
+        client = self.client()
+        if client is None:
+            return False
+        try:
+            return bool(await client.exists(key))
+        except (RedisError, OSError) as e:
+            self._on_error("检查存在", e)
+            return False
+
+    async def get_ttl(self, key: str) -> int:
+        """获取键的剩余生存时间"""
+        client = self.client()
+        if client is None:
+            return -1
+        try:
+            return await client.ttl(key)
+        except (RedisError, OSError) as e:
+            self._on_error("获取TTL", e)
+            return -1
+
+    def pipeline(self, transaction: bool = True):
+        """
+        返回异步 pipeline；Redis 不可用返回 None
+
+        Usage:
+            pipe = async_redis_cache.pipeline()
+            if pipe is not None:
+                pipe.incr(key)
+                pipe.expire(key, 60)
+                results = await pipe.execute()
+        """
+        client = self.client()
+        if client is None:
+            return None
+        return client.pipeline(transaction=transaction)
+
+
+# 全局异步缓存实例（不持有连接，连接池按事件循环懒创建）
+async_redis_cache = AsyncRedisCache()
+
+
+def get_async_redis_client(decode_responses: bool = False):
+    """获取异步 Redis 客户端（与 redis_cache.get_redis_client 对应）"""
+    if async_redis_cache.client() is None:
+        return None
+    return get_async_client(decode_responses)
@@ -23,6 +23,44 @@ from app.config import get_settings
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+
+def _json_default(obj: Any) -> Any:
+    """JSON 序列化时处理非常规类型（datetime、对象等），避免使用 pickle"""
+    if hasattr(obj, "isoformat"):  # datetime, date
+        return obj.isoformat()
+    return str(obj)
+
+
+def serialize_value(data: Any) -> bytes:
+    """序列化数据，仅使用 JSON（安全），不再使用 pickle（同步 / 异步缓存共用）"""
+    try:
+        return json.dumps(data, default=_json_default).encode("utf-8")
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Redis 序列化失败，跳过缓存: {type(data).__name__}, {e}")
+        raise ValueError(f"无法序列化为 JSON: {e}") from e
+
+
+def deserialize_value(data: bytes) -> Any:
+    """反序列化数据（安全优先：JSON优先，拒绝pickle防止RCE）"""
+    # 1. 优先尝试 JSON（安全）
+    try:
+        return json.loads(data.decode('utf-8'))
+    except Exception:
+        pass
+    
+    # 2. 尝试 pickle（向后兼容，仅用于读取旧数据；新写入已全部使用 JSON）
+    # TODO: 所有缓存条目过期后可删除此分支
+    try:
+        result = pickle.loads(data)
+        logger.debug("反序列化使用了pickle（旧数据），将逐渐过期")
+        return result
+    except Exception:
+        pass
+    
+    logger.error("反序列化失败: 无法识别的数据格式")
+    return None
+
+
 class RedisCache:
     """Redis缓存管理器"""
     
@@ -72,38 +110,13 @@ class RedisCache:
             logger.info("Redis未配置，使用内存缓存")
     
     def _json_default(self, obj: Any) -> Any:
-        """JSON 序列化时处理非常规类型（datetime、对象等），避免使用 pickle"""
-        if hasattr(obj, "isoformat"):  # datetime, date
-            return obj.isoformat()
-        return str(obj)
+        return _json_default(obj)
 
     def _serialize(self, data: Any) -> bytes:
-        """序列化数据，仅使用 JSON（安全），不再使用 pickle"""
-        try:
-            return json.dumps(data, default=self._json_default).encode("utf-8")
-        except (TypeError, ValueError) as e:
-            logger.warning(f"Redis 序列化失败，跳过缓存: {type(data).__name__}, {e}")
-            raise ValueError(f"无法序列化为 JSON: {e}") from e
+        return serialize_value(data)
     
     def _deserialize(self, data: bytes) -> Any:
-        """反序列化数据（安全优先：JSON优先，拒绝pickle防止RCE）"""
-        # 1. 优先尝试 JSON（安全）
-        try:
-            return json.loads(data.decode('utf-8'))
-        except Exception:
-            pass
-        
-        # 2. 尝试 pickle（向后兼容，仅用于读取旧数据；新写入已全部使用 JSON）
-        # TODO: 所有缓存条目过期后可删除此分支
-        try:
-            result = pickle.loads(data)
-            logger.debug("反序列化使用了pickle（旧数据），将逐渐过期")
-            return result
-        except Exception:
-            pass
-        
-        logger.error("反序列化失败: 无法识别的数据格式")
-        return None
+        return deserialize_value(data)
     
     def get(self, key: str) -> Optional[Any]:
         """获取缓存数据"""
@@ -446,8 +459,10 @@ def cache_tasks_list_safe(params: dict, fetch_fn, ttl: int = DEFAULT_TTL['TASKS_
         return []
 
 def invalidate_user_cache(user_id: str):
-    """使用户相关缓存失效"""
+    """使用户相关缓存失效（含认证用的 principal 缓存）"""
     redis_cache.clear_user_cache(user_id)
+    from app.principal_cache import invalidate_principal
+    invalidate_principal(user_id)
 
 def invalidate_tasks_cache():
     """使任务相关缓存失效"""
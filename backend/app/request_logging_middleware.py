@@ -73,8 +73,10 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         # 把 request_id 绑定到 request.state，方便其他代码读取
         request.state.request_id = req_id
 
-        # 2. 记录开始时间
+        # 2. 记录开始时间，开始统计本请求的 SQL
         start_time = time.time()
+        query_profile_token = _begin_query_profile(req_id)
+        loop_blocking_token = _begin_loop_blocking(request)
         path = request.url.path
         method = request.method
 
@@ -90,6 +92,10 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             duration = time.time() - start_time
             status_code = response.status_code if response else 500
 
+            _record_latency(request, method, duration, status_code)
+            _finish_query_profile(request, method, query_profile_token)
+            _finish_loop_blocking(loop_blocking_token)
+
             # 在响应头中透传 request_id
             if response:
                 response.headers["X-Request-ID"] = req_id
@@ -124,6 +130,66 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         return response
 
 
+def _record_latency(request: Request, method: str, duration: float, status_code: int):
+    """按路由模板记录请求耗时（未匹配路由的请求归为 unmatched，避免路径造成高基数）"""
+    if request.url.path in SKIP_LOG_PATHS:
+        return
+    try:
+        from app.performance_metrics import performance_metrics
+
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", None) or "unmatched"
+        performance_metrics.record_request(endpoint, method, duration, status_code)
+    except Exception as e:
+        logger.debug(f"记录请求延迟失败: {e}")
+
+
+def _begin_query_profile(req_id: str):
+    try:
+        from app.observability.query_profiler import query_profiler
+
+        return query_profiler.begin(req_id)
+    except Exception as e:
+        logger.debug(f"开始 SQL 剖析失败: {e}")
+        return None
+
+
+def _finish_query_profile(request: Request, method: str, token):
+    """按路由模板汇总本请求的 SQL 条数（N+1 / 超预算在 query_profiler 中告警）"""
+    if token is None:
+        return
+    try:
+        from app.observability.query_profiler import query_profiler
+
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", None) or "unmatched"
+        query_profiler.finish(token, f"{method} {endpoint}")
+    except Exception as e:
+        logger.debug(f"汇总 SQL 剖析失败: {e}")
+
+
+def _begin_loop_blocking(request: Request):
+    try:
+        from app.observability.loop_blocking import loop_blocking_detector
+
+        return loop_blocking_detector.begin(request.scope, request.method)
+    except Exception as e:
+        logger.debug(f"开始事件循环阻塞统计失败: {e}")
+        return None
+
+
+def _finish_loop_blocking(token):
+    """按路由模板汇总本请求占用事件循环的时长和超阈值的停顿"""
+    if token is None:
+        return
+    try:
+        from app.observability.loop_blocking import loop_blocking_detector
+
+        loop_blocking_detector.finish(token)
+    except Exception as e:
+        logger.debug(f"汇总事件循环阻塞统计失败: {e}")
+
+
 def _get_client_ip(request: Request) -> str:
     """从请求中提取客户端 IP，支持代理头"""
     forwarded = request.headers.get("x-forwarded-for")
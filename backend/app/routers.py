@@ -432,16 +432,8 @@ def _get_task_detail_legacy(
     ua_for_bg = request.headers.get("User-Agent", "") if hasattr(request, 'headers') else ""
 
     def _bg_view_count_and_track(t_id: int, uid, ua: str):
-        from app.redis_cache import get_redis_client
-        redis_client = get_redis_client()
-        if redis_client:
-            try:
-                redis_client.incr(f"task:view_count:{t_id}")
-            except Exception as e:
-                logger.warning("Redis 增加任务浏览量失败, 回退到直写: %s", e)
-                redis_client = None
-
-        if not redis_client:
+        from app.services.view_counts import get_view_count_overlay
+        if get_view_count_overlay().incr("task", t_id) is None:
             from app.database import SessionLocal
             bg_db = SessionLocal()
             try:
@@ -454,11 +446,10 @@ def _get_task_detail_legacy(
                 bg_db.close()
 
         if uid:
-            from app.database import SessionLocal
-            bg_db = SessionLocal()
+            # 浏览记录只追加到 InteractionLog，由后台线程批量落库，不需要数据库会话
             try:
                 from app.user_behavior_tracker import UserBehaviorTracker
-                tracker = UserBehaviorTracker(bg_db)
+                tracker = UserBehaviorTracker(None)
                 ua_lower = ua.lower()
                 if "mobile" in ua_lower or "android" in ua_lower or "iphone" in ua_lower:
                     device_type = "mobile"
@@ -469,8 +460,6 @@ def _get_task_detail_legacy(
                 tracker.record_view(user_id=uid, task_id=t_id, device_type=device_type)
             except Exception as e:
                 logger.warning(f"记录用户浏览行为失败: {e}")
-            finally:
-                bg_db.close()
 
     background_tasks.add_task(_bg_view_count_and_track, task_id, user_id_for_bg, ua_for_bg)
     
@@ -1007,17 +1007,8 @@ async def get_category(
         await assert_forum_visible(current_user, category_id, db, raise_exception=True)
 
     # 记录浏览量（Redis 累加，定时同步到 DB）
-    try:
-        from app.redis_cache import get_redis_client
-        _rc = get_redis_client()
-        if _rc:
-            _rk = f"forum:category:view_count:{category_id}"
-            _rc.incr(_rk)
-            _rc.expire(_rk, 7 * 24 * 3600)
-        else:
-            category.view_count += 1
-            await db.flush()
-    except Exception:
+    from app.services.view_counts import get_view_count_overlay
+    if await get_view_count_overlay().aincr("forum_category", category_id) is None:
         category.view_count += 1
         await db.flush()
 
@@ -500,6 +500,85 @@ async def get_unread_notification_count(
 
 # ==================== 热门内容 API ====================
 
+# 从热门排行读取时每批多取的倍数（部分帖子会被可见性过滤掉）
+_HOT_RANKING_OVERFETCH = 2
+# 最多读取的批数，超过后用已取到的结果返回
+_HOT_RANKING_MAX_BATCHES = 5
+
+
+async def _hot_posts_from_sql(db: AsyncSession, query, limit: int, load_options):
+    """在 SQL 中实时计算热度排序（排行不可用时的回退路径）"""
+    # 改进的热度算法：综合考虑点赞、收藏、评论和最近活跃度
+    # 使用 last_reply_at 作为时间因子（如果存在），否则使用 created_at
+    active_time = func.coalesce(models.ForumPost.last_reply_at, models.ForumPost.created_at)
+    hours_since_active = func.extract('epoch', func.now() - active_time) / 3600.0
+
+    # 综合热度分数 = (点赞数*权重 + 收藏数*权重 + 评论数*权重 + 浏览量*权重) / 时间衰减因子
+    # 与 app.services.forum_hot_ranking.hot_score 保持一致
+    hot_score = (
+        models.ForumPost.like_count * 5.0 +      # 点赞权重：5
+        models.ForumPost.favorite_count * 4.0 +  # 收藏权重：4（收藏表示深度兴趣）
+        models.ForumPost.reply_count * 3.0 +     # 评论权重：3
+        models.ForumPost.view_count * 0.1        # 浏览量权重：0.1（较低，因为浏览不代表互动）
+    ) / func.pow(
+        (hours_since_active / 24.0) + 1.0,  # 以天为单位，+1避免除零
+        1.2  # 衰减指数，值越大衰减越快
+    )
+
+    # 置顶优先，然后按热度排序
+    query = query.order_by(
+        models.ForumPost.is_pinned.desc(),  # 置顶帖子优先
+        hot_score.desc()  # 最后按热度
+    ).limit(limit).options(*load_options)
+
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+async def _hot_posts_from_ranking(db: AsyncSession, query, category_id: Optional[int], limit: int, load_options):
+    """
+    按预计算的热门排行取帖子：置顶帖子在前（按热度），其余按排行顺序
+
+    排行只提供 ID 顺序，可见性 / 权限过滤仍由 query 的条件在主键查询里完成。
+    返回 None 表示排行不可用。
+    """
+    from app.services.forum_hot_ranking import get_forum_hot_ranking, score_for_post
+
+    ranking = get_forum_hot_ranking()
+    batch_size = limit * _HOT_RANKING_OVERFETCH
+    ranked_ids = await ranking.top_ids(category_id, 0, batch_size)
+    if ranked_ids is None:
+        return None
+
+    # 置顶帖子数量很少，单独查询（idx_forum_posts_pinned）
+    pinned_result = await db.execute(
+        query.where(models.ForumPost.is_pinned == True).limit(limit).options(*load_options)
+    )
+    pinned = sorted(pinned_result.scalars().all(), key=lambda p: score_for_post(p) or 0.0, reverse=True)
+    posts = list(pinned)
+
+    offset = 0
+    for _ in range(_HOT_RANKING_MAX_BATCHES):
+        if len(posts) >= limit or not ranked_ids:
+            break
+        result = await db.execute(
+            query.where(
+                models.ForumPost.id.in_(ranked_ids),
+                models.ForumPost.is_pinned == False,
+            ).options(*load_options)
+        )
+        by_id = {p.id: p for p in result.scalars().all()}
+        posts.extend(by_id[pid] for pid in ranked_ids if pid in by_id)
+        if len(ranked_ids) < batch_size:
+            break
+        offset += batch_size
+        ranked_ids = await ranking.top_ids(category_id, offset, batch_size)
+        if ranked_ids is None:
+            break
+
+    return posts[:limit]
+
+
 @router.get("/hot-posts", response_model=schemas.ForumPostListResponse)
 @measure_api_performance("get_hot_posts")
 @cache_response(ttl=180, key_prefix="forum_hot_posts")  # 缓存3分钟
@@ -564,40 +643,16 @@ async def get_hot_posts(
                 # 即使无任何可见 categories，NULL category 帖子仍可见
                 query = query.where(models.ForumPost.category_id.is_(None))
 
-    # 改进的热度算法：综合考虑点赞、收藏、评论和最近活跃度
-    # 使用 last_reply_at 作为时间因子（如果存在），否则使用 created_at
-    active_time = func.coalesce(models.ForumPost.last_reply_at, models.ForumPost.created_at)
-    hours_since_active = func.extract('epoch', func.now() - active_time) / 3600.0
-
-    # 综合热度分数 = (点赞数*权重 + 收藏数*权重 + 评论数*权重 + 浏览量*权重) / 时间衰减因子
-    hot_score = (
-        models.ForumPost.like_count * 5.0 +      # 点赞权重：5
-        models.ForumPost.favorite_count * 4.0 +  # 收藏权重：4（收藏表示深度兴趣）
-        models.ForumPost.reply_count * 3.0 +     # 评论权重：3
-        models.ForumPost.view_count * 0.1        # 浏览量权重：0.1（较低，因为浏览不代表互动）
-    ) / func.pow(
-        (hours_since_active / 24.0) + 1.0,  # 以天为单位，+1避免除零
-        1.2  # 衰减指数，值越大衰减越快
-    )
-
-    # 置顶优先，然后按热度排序
-    query = query.order_by(
-        models.ForumPost.is_pinned.desc(),  # 置顶帖子优先
-        hot_score.desc()  # 最后按热度
-    )
-
-    # 限制数量
-    query = query.limit(limit)
-
-    # 加载关联数据
-    query = query.options(
+    load_options = (
         selectinload(models.ForumPost.category),
         selectinload(models.ForumPost.author),
-        selectinload(models.ForumPost.admin_author)
+        selectinload(models.ForumPost.admin_author),
     )
 
-    result = await db.execute(query)
-    posts = result.scalars().all()
+    # 优先读取预计算的热门排行（Redis 有序集合）；排行不可用时回退到 SQL 实时计算
+    posts = await _hot_posts_from_ranking(db, query, category_id, limit, load_options)
+    if posts is None:
+        posts = await _hot_posts_from_sql(db, query, limit, load_options)
 
     post_ids = [p.id for p in posts]
     liked_ids, favorited_ids = await _batch_get_user_liked_favorited_posts(
@@ -909,26 +964,21 @@ async def get_user_hot_posts(
 
 # ==================== 排行榜 API ====================
 
-@router.get("/leaderboard/posts")
-async def get_top_posts_leaderboard(
-    period: str = Query("all", pattern="^(all|today|week|month)$", description="统计周期：all/today/week/month"),
-    limit: int = Query(10, ge=1, le=50, description="返回数量"),
-    db: AsyncSession = Depends(get_async_db_dependency),
-):
-    """获取发帖排行榜"""
+def _leaderboard_start_time(period: str) -> Optional[datetime]:
+    """根据周期设置时间范围（SQL 聚合回退路径使用）"""
     now = datetime.now(timezone.utc)
-
-    # 根据周期设置时间范围
     if period == "today":
-        start_time = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
-    elif period == "week":
-        start_time = now - timedelta(days=7)
-    elif period == "month":
-        start_time = now - timedelta(days=30)
-    else:  # all
-        start_time = None
-
-    # 构建查询
+        return datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+    if period == "week":
+        return now - timedelta(days=7)
+    if period == "month":
+        return now - timedelta(days=30)
+    return None  # all
+
+
+async def _top_posts_from_sql(db: AsyncSession, period: str, limit: int) -> list:
+    """发帖数排行（全表聚合；计数桶关闭时使用）"""
+    start_time = _leaderboard_start_time(period)
     # 只统计普通板块（type='general'）的帖子，确保公平性
     query = select(
         models.ForumPost.author_id,
@@ -941,61 +991,16 @@ async def get_top_posts_leaderboard(
         models.ForumPost.is_visible == True,
         models.ForumCategory.type == 'general'  # 只统计普通板块
     )
-
     if start_time:
         query = query.where(models.ForumPost.created_at >= start_time)
-
     query = query.group_by(models.ForumPost.author_id).order_by(func.count(models.ForumPost.id).desc()).limit(limit)
-
     result = await db.execute(query)
-    top_users = result.all()
+    return [(user_id, count or 0) for user_id, count in result.all() if user_id]
 
-    user_ids = [uid for uid, _ in top_users if uid]
-    user_map = await _batch_get_users_by_ids_async(db, user_ids)
 
-    user_list = []
-    rank = 1
-    for user_id, post_count in top_users:
-        user = user_map.get(user_id)
-        if user:
-            user_list.append({
-                "user": schemas.UserInfo(
-                    id=user.id,
-                    name=user.name,
-                    avatar=user.avatar or None
-                ),
-                "count": post_count,
-                "rank": rank
-            })
-            rank += 1
-
-    return {
-        "period": period,
-        "users": user_list
-    }
-
-
-@router.get("/leaderboard/favorites")
-async def get_top_favorites_leaderboard(
-    period: str = Query("all", pattern="^(all|today|week|month)$", description="统计周期：all/today/week/month"),
-    limit: int = Query(10, ge=1, le=50, description="返回数量"),
-    db: AsyncSession = Depends(get_async_db_dependency),
-):
-    """获取收藏排行榜（统计用户发布的帖子被收藏的总数）"""
-    now = datetime.now(timezone.utc)
-
-    # 根据周期设置时间范围
-    if period == "today":
-        start_time = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
-    elif period == "week":
-        start_time = now - timedelta(days=7)
-    elif period == "month":
-        start_time = now - timedelta(days=30)
-    else:  # all
-        start_time = None
-
-    # 构建查询：统计用户发布的帖子被收藏的总数
-    # 只统计普通板块（type='general'）的帖子，确保公平性
+async def _top_favorites_from_sql(db: AsyncSession, period: str, limit: int) -> list:
+    """被收藏数排行（全表聚合；计数桶关闭时使用）"""
+    start_time = _leaderboard_start_time(period)
     query = select(
         models.ForumPost.author_id,
         func.sum(models.ForumPost.favorite_count).label("favorite_count")
@@ -1007,105 +1012,43 @@ async def get_top_favorites_leaderboard(
         models.ForumPost.is_visible == True,
         models.ForumCategory.type == 'general'  # 只统计普通板块
     )
-
     if start_time:
         query = query.where(models.ForumPost.created_at >= start_time)
-
     query = query.group_by(models.ForumPost.author_id).order_by(func.sum(models.ForumPost.favorite_count).desc()).limit(limit)
-
     result = await db.execute(query)
-    top_users = result.all()
-
-    user_ids = [uid for uid, _ in top_users if uid]
-    user_map = await _batch_get_users_by_ids_async(db, user_ids)
-
-    user_list = []
-    rank = 1
-    for user_id, favorite_count in top_users:
-        if user_id:
-            user = user_map.get(user_id)
-            if user:
-                user_list.append({
-                    "user": schemas.UserInfo(
-                        id=user.id,
-                        name=user.name,
-                        avatar=user.avatar or None
-                    ),
-                    "count": favorite_count or 0,
-                    "rank": rank
-                })
-                rank += 1
-
-    return {
-        "period": period,
-        "users": user_list
-    }
-
-
-@router.get("/leaderboard/likes")
-async def get_top_likes_leaderboard(
-    period: str = Query("all", pattern="^(all|today|week|month)$", description="统计周期：all/today/week/month"),
-    limit: int = Query(10, ge=1, le=50, description="返回数量"),
-    db: AsyncSession = Depends(get_async_db_dependency),
-):
-    """获取获赞排行榜（统计用户发布的帖子和回复获得的点赞数）"""
-    now = datetime.now(timezone.utc)
-
-    # 根据周期设置时间范围
-    if period == "today":
-        start_time = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
-    elif period == "week":
-        start_time = now - timedelta(days=7)
-    elif period == "month":
-        start_time = now - timedelta(days=30)
-    else:  # all
-        start_time = None
-
-    # 统计帖子获得的点赞数
-    post_likes_query = select(
-        models.ForumPost.author_id,
-        func.sum(models.ForumPost.like_count).label("likes")
-    ).where(
-        models.ForumPost.is_deleted == False
-    )
-    if start_time:
-        post_likes_query = post_likes_query.where(models.ForumPost.created_at >= start_time)
-    post_likes_query = post_likes_query.group_by(models.ForumPost.author_id)
-
-    # 统计回复获得的点赞数
-    reply_likes_query = select(
-        models.ForumReply.author_id,
-        func.sum(models.ForumReply.like_count).label("likes")
-    ).where(
-        models.ForumReply.is_deleted == False
-    )
-    if start_time:
-        reply_likes_query = reply_likes_query.where(models.ForumReply.created_at >= start_time)
-    reply_likes_query = reply_likes_query.group_by(models.ForumReply.author_id)
-
-    # 合并结果（简化处理：分别查询后合并）
-    post_result = await db.execute(post_likes_query)
-    post_likes_data = {row[0]: row[1] or 0 for row in post_result.all()}
+    return [(user_id, count or 0) for user_id, count in result.all() if user_id]
+
+
+async def _top_likes_from_sql(db: AsyncSession, period: str, limit: int) -> list:
+    """获赞数排行（帖子 + 回复全表聚合；计数桶关闭时使用）"""
+    start_time = _leaderboard_start_time(period)
+    totals = {}
+    for model in (models.ForumPost, models.ForumReply):
+        query = select(model.author_id, func.sum(model.like_count)).where(model.is_deleted == False)
+        if start_time:
+            query = query.where(model.created_at >= start_time)
+        result = await db.execute(query.group_by(model.author_id))
+        for user_id, likes in result.all():
+            totals[user_id] = totals.get(user_id, 0) + (likes or 0)
+    # 排序并取前N名
+    return sorted(totals.items(), key=lambda x: x[1], reverse=True)[:limit]
 
-    reply_result = await db.execute(reply_likes_query)
-    reply_likes_data = {row[0]: row[1] or 0 for row in reply_result.all()}
 
-    # 合并统计
-    total_likes = {}
-    for user_id, likes in post_likes_data.items():
-        total_likes[user_id] = total_likes.get(user_id, 0) + likes
-    for user_id, likes in reply_likes_data.items():
-        total_likes[user_id] = total_likes.get(user_id, 0) + likes
+async def _leaderboard(db: AsyncSession, metric: str, period: str, limit: int, sql_fallback) -> dict:
+    """从作者每日计数桶（或回退 SQL 聚合）读取排行并附上用户信息"""
+    from app.services import forum_author_stats
 
-    # 排序并取前N名
-    sorted_users = sorted(total_likes.items(), key=lambda x: x[1], reverse=True)[:limit]
+    if forum_author_stats.FORUM_AUTHOR_STATS_ENABLED:
+        top_users = await forum_author_stats.top_authors(db, metric, period, limit)
+    else:
+        top_users = await sql_fallback(db, period, limit)
 
-    user_ids = [uid for uid, _ in sorted_users]
+    user_ids = [uid for uid, _ in top_users if uid]
     user_map = await _batch_get_users_by_ids_async(db, user_ids)
 
     user_list = []
     rank = 1
-    for user_id, likes_count in sorted_users:
+    for user_id, count in top_users:
         user = user_map.get(user_id)
         if user:
             user_list.append({
@@ -1114,7 +1057,7 @@ async def get_top_likes_leaderboard(
                     name=user.name,
                     avatar=user.avatar or None
                 ),
-                "count": likes_count,
+                "count": count,
                 "rank": rank
             })
             rank += 1
@@ -1125,6 +1068,36 @@ async def get_top_likes_leaderboard(
     }
 
 
+@router.get("/leaderboard/posts")
+async def get_top_posts_leaderboard(
+    period: str = Query("all", pattern="^(all|today|week|month)$", description="统计周期：all/today/week/month"),
+    limit: int = Query(10, ge=1, le=50, description="返回数量"),
+    db: AsyncSession = Depends(get_async_db_dependency),
+):
+    """获取发帖排行榜"""
+    return await _leaderboard(db, "post_count", period, limit, _top_posts_from_sql)
+
+
+@router.get("/leaderboard/favorites")
+async def get_top_favorites_leaderboard(
+    period: str = Query("all", pattern="^(all|today|week|month)$", description="统计周期：all/today/week/month"),
+    limit: int = Query(10, ge=1, le=50, description="返回数量"),
+    db: AsyncSession = Depends(get_async_db_dependency),
+):
+    """获取收藏排行榜（统计用户发布的帖子被收藏的总数）"""
+    return await _leaderboard(db, "favorite_count", period, limit, _top_favorites_from_sql)
+
+
+@router.get("/leaderboard/likes")
+async def get_top_likes_leaderboard(
+    period: str = Query("all", pattern="^(all|today|week|month)$", description="统计周期：all/today/week/month"),
+    limit: int = Query(10, ge=1, le=50, description="返回数量"),
+    db: AsyncSession = Depends(get_async_db_dependency),
+):
+    """获取获赞排行榜（统计用户发布的帖子和回复获得的点赞数）"""
+    return await _leaderboard(db, "like_count", period, limit, _top_likes_from_sql)
+
+
 # ==================== 关联内容搜索（Discovery Feed） ====================
 
 @router.get("/search-linkable")
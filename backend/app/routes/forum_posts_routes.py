@@ -5,10 +5,11 @@ All helpers remain in app.forum_routes; this module imports them as needed.
 """
 from typing import Optional
 from datetime import datetime, timezone, timedelta
+import json
 import logging
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status, Request
-from sqlalchemy import select, func
+from sqlalchemy import DateTime, func, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -16,6 +17,15 @@ from app import models, schemas
 from app.deps import get_async_db_dependency
 from app.database import get_db  # sync session for points transaction
 from app.coupon_points_crud import add_points_transaction
+from app.utils.keyset_pagination import (
+    InvalidCursor,
+    SortKey,
+    apply_ordering,
+    count_cache_key,
+    count_rows,
+    decode_cursor,
+    paginate,
+)
 from app.utils.time_utils import get_utc_time
 from app.performance_monitor import measure_api_performance
 from app.content_filter.filter_service import check_content, create_review, create_mask_record
@@ -62,11 +72,16 @@ async def get_posts(
     q: Optional[str] = Query(None),
     is_deleted: Optional[bool] = Query(None, description="是否已删除（管理员筛选）"),
     is_visible: Optional[bool] = Query(None, description="是否可见（管理员筛选）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（传入后忽略 page）"),
     current_user: Optional[models.User] = Depends(get_current_user_optional),
     request: Request = None,  # FastAPI injects; Optional[Request] breaks Pydantic field detection
     db: AsyncSession = Depends(get_async_db_dependency),
 ):
-    """获取帖子列表（包含Redis增量的浏览量）"""
+    """获取帖子列表（包含Redis增量的浏览量）
+
+    分页：第一页或传入 cursor 时键集分页（响应带 next_cursor），只传 page > 1 时兼容 offset；
+    热度按第一页的时刻计算并写入游标，翻页期间顺序稳定。总数按筛选条件缓存。
+    """
     # 检查是否为管理员
     is_admin = False
     try:
@@ -75,6 +90,17 @@ async def get_posts(
     except HTTPException:
         pass
 
+    cursor_scope = json.dumps(
+        ["forum_posts", is_admin, category_id, sort, (q or "").strip(), is_deleted, is_visible],
+        ensure_ascii=False,
+    )
+    try:
+        after = decode_cursor(cursor, cursor_scope) if cursor else None
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+    as_of = after.param("as_of") if after else None
+    as_of = as_of or get_utc_time()
+
     # 构建基础查询
     query = select(models.ForumPost)
 
@@ -127,9 +153,9 @@ async def get_posts(
 
     # 改进的热度算法：综合考虑点赞、收藏、评论和最近活跃度
     # 使用 last_reply_at 作为时间因子（如果存在），否则使用 created_at
-    # 时间衰减：最近活跃的帖子权重更高
+    # 时间衰减：最近活跃的帖子权重更高；计算时刻 as_of 随游标冻结
     active_time = func.coalesce(models.ForumPost.last_reply_at, models.ForumPost.created_at)
-    hours_since_active = func.extract('epoch', func.now() - active_time) / 3600.0
+    hours_since_active = func.extract('epoch', literal(as_of, DateTime(timezone=True)) - active_time) / 3600.0
 
     # 综合热度分数 = (点赞数*权重 + 收藏数*权重 + 评论数*权重 + 浏览量*权重) / 时间衰减因子
     # 时间衰减：使用对数衰减，让最近活跃的帖子有更高的权重
@@ -145,34 +171,26 @@ async def get_posts(
         1.2  # 衰减指数，值越大衰减越快
     )
 
+    # 置顶帖子优先，最后按 id 打破并列（键集分页要求顺序确定）
+    pinned = SortKey(func.coalesce(models.ForumPost.is_pinned, False))
     if sort == "latest":
-        # 置顶优先，然后按创建时间降序
-        query = query.order_by(
-            models.ForumPost.is_pinned.desc(),  # 置顶帖子优先
-            models.ForumPost.created_at.desc()  # 最后按创建时间
-        )
+        # 按创建时间降序
+        sort_keys = [pinned, SortKey(models.ForumPost.created_at), SortKey(models.ForumPost.id)]
     elif sort == "last_reply":
-        # 置顶优先，然后按最后回复时间降序
-        query = query.order_by(
-            models.ForumPost.is_pinned.desc(),  # 置顶帖子优先
-            func.coalesce(models.ForumPost.last_reply_at, models.ForumPost.created_at).desc()  # 最后按最后回复时间
-        )
+        # 按最后回复时间降序
+        sort_keys = [pinned, SortKey(active_time), SortKey(models.ForumPost.id)]
     else:
         # 其他排序方式（hot, replies, likes）都使用综合热度排序
-        # 置顶优先，然后按综合热度排序
-        query = query.order_by(
-            models.ForumPost.is_pinned.desc(),  # 置顶帖子优先
-            hot_score.desc()  # 最后按综合热度排序
-        )
-
-    # 先获取总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-
-    # 分页
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
+        sort_keys = [pinned, SortKey(hot_score), SortKey(models.ForumPost.id)]
+
+    # 总数（按筛选条件缓存）
+    total = await count_rows(
+        db, query, mode="cached",
+        cache_key=count_cache_key(
+            "forum_posts", is_admin=is_admin, category_id=category_id, q=q,
+            is_deleted=is_deleted, is_visible=is_visible,
+        ),
+    )
 
     # 加载关联数据
     query = query.options(
@@ -181,8 +199,18 @@ async def get_posts(
         selectinload(models.ForumPost.admin_author)
     )
 
-    result = await db.execute(query)
-    posts = result.scalars().all()
+    # 分页：第一页 / 游标翻页走键集，只传 page 的深页兼容 offset
+    next_cursor = None
+    if after is not None or page == 1:
+        keyset_page = await paginate(
+            db, query, sort_keys, page_size, scope=cursor_scope, after=after, params={"as_of": as_of}
+        )
+        posts = keyset_page.items
+        next_cursor = keyset_page.next_cursor
+    else:
+        offset = (page - 1) * page_size
+        result = await db.execute(apply_ordering(query, sort_keys).offset(offset).limit(page_size))
+        posts = result.scalars().all()
 
     # 批量加载点赞/收藏状态与浏览量，避免 N+1 查询
     post_ids = [p.id for p in posts]
@@ -251,7 +279,8 @@ async def get_posts(
         "posts": post_items,
         "total": total,
         "page": page,
-        "page_size": page_size
+        "page_size": page_size,
+        "next_cursor": next_cursor,
     }
 
 
@@ -286,41 +315,17 @@ async def get_post(
     await assert_forum_visible(current_user, post.category_id, db, raise_exception=True)
 
     # 增加浏览次数
-    # 优化方案：使用 Redis 累加，定时批量落库（由 Celery 任务处理）
-    # 当前实现：如果 Redis 可用则使用 Redis，否则直接更新数据库
-    redis_view_count = 0
-    try:
-        from app.redis_cache import get_redis_client
-        redis_client = get_redis_client()
-
-        if redis_client:
-            # 使用 Redis 累加浏览数（存储增量）
-            redis_key = f"forum:post:view_count:{post_id}"
-            # incr 返回增加后的值（如果 key 不存在则创建并设置为1）
-            redis_client.incr(redis_key)
-            # 获取 Redis 中的总值（包括本次增加的1）
-            redis_view_count = int(redis_client.get(redis_key) or 0)
-            # 设置过期时间（7天），防止 key 无限增长
-            redis_client.expire(redis_key, 7 * 24 * 3600)
-            # 注意：Redis 中的增量会由后台任务定期同步到数据库
-            # 这里不更新数据库，减少数据库写入压力
-        else:
-            # Redis 不可用，直接更新数据库
-            post.view_count += 1
-            await db.flush()
-    except Exception as e:
-        # Redis 操作失败，回退到直接更新数据库
-        logger.debug(f"Redis view count increment failed, falling back to DB: {e}")
+    # Redis 哈希累加增量，定时批量落库；Redis 不可用则直接更新数据库
+    from app.services.view_counts import get_view_count_overlay
+    redis_view_count = await get_view_count_overlay().aincr("forum_post", post_id)
+    if redis_view_count is None:
         post.view_count += 1
         await db.flush()
 
     await db.commit()
 
     # 计算返回给用户的浏览量（数据库值 + Redis中的增量）
-    display_view_count = post.view_count
-    if redis_view_count > 0:
-        # 如果使用了 Redis，返回数据库值 + Redis 中的增量
-        display_view_count = post.view_count + redis_view_count
+    display_view_count = post.view_count + (redis_view_count or 0)
 
     # 检查当前用户是否已点赞/收藏
     is_liked = False
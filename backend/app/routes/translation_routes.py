@@ -14,6 +14,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
+from app.observability.loop_blocking import run_blocking
 from app.utils.translation_metrics import TranslationTimer
 # Module-level helper still lives in app/routers.py — re-imported here so /translate/tasks/batch
 # can dispatch the background fill (see Task 6 plan).
@@ -426,7 +427,8 @@ async def translate_batch(
                         cache_key = f"translation:{cache_key_hash}"
 
                         # 使用翻译管理器执行翻译（自动降级）
-                        translated_text = translation_manager.translate(
+                        translated_text = await run_blocking(
+                            translation_manager.translate,
                             text=text,
                             target_lang=target_lang,
                             source_lang=source_lang,
@@ -17,6 +17,7 @@ and unaffected by this split.
 
 Mounts at both /api and /api/users via main.py (same as the original main_router).
 """
+import asyncio
 import logging
 import os
 from pathlib import Path
@@ -251,25 +252,26 @@ async def upload_public_image(
             is_temp = True
             actual_resource_id = None  # 服务会自动使用 user_id 构建临时目录
 
-        # 使用流式读取文件内容，避免大文件一次性读入内存
-        from app.file_stream_utils import read_file_with_size_check
+        # 落盘读取文件内容，避免大文件一次性读入内存
+        from app.file_stream_utils import spool_upload
 
         # 公开图片最大大小：5MB
         MAX_PUBLIC_IMAGE_SIZE = 5 * 1024 * 1024
 
-        # 流式读取文件内容
-        content, file_size = await read_file_with_size_check(image, MAX_PUBLIC_IMAGE_SIZE)
+        spooled = await spool_upload(image, MAX_PUBLIC_IMAGE_SIZE)
 
         # 使用图片上传服务
         service = get_image_upload_service()
-        result = service.upload(
-            content=content,
-            category=image_category,
-            resource_id=actual_resource_id,
-            user_id=user_id,
-            filename=image.filename,
-            is_temp=is_temp
-        )
+        with spooled:
+            result = await asyncio.to_thread(
+                service.upload_stream,
+                spooled.rewind(),
+                category=image_category,
+                resource_id=actual_resource_id,
+                user_id=user_id,
+                filename=image.filename,
+                is_temp=is_temp
+            )
 
         if not result.success:
             raise HTTPException(status_code=400, detail=result.error)
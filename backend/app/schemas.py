@@ -3157,6 +3157,7 @@ class FleaMarketItemListResponse(BaseModel):
     pageSize: int
     total: int
     hasMore: bool
+    nextCursor: Optional[str] = None  # 键集分页游标，传回 cursor 参数获取下一页
 
 
 class FleaMarketPurchaseRequestCreate(BaseModel):
@@ -4069,6 +4070,7 @@ class ForumPostListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # 键集分页游标，传回 cursor 参数获取下一页
 
 
 # 回复相关 Schemas
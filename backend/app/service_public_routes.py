@@ -193,14 +193,12 @@ async def get_service_detail(
         )
 
     # 浏览次数 — 优先 Redis 计数, 退化到 DB
+    pending_view_count = 0
     try:
-        from app.redis_cache import get_redis_client
-        rc = get_redis_client()
-        if rc:
-            rk = f"service:view_count:{service_id}"
-            rc.incr(rk)
-            rc.expire(rk, 7 * 24 * 3600)
-        else:
+        from app.services.view_counts import get_view_count_overlay
+        pending_view_count = await get_view_count_overlay().aincr("service", service_id)
+        if pending_view_count is None:
+            pending_view_count = 0
             await db.execute(
                 update(models.TaskExpertService)
                 .where(models.TaskExpertService.id == service_id)
@@ -246,6 +244,7 @@ async def get_service_detail(
                     user_task_is_paid = bool(task.is_paid)
 
     service_out = schemas.TaskExpertServiceOut.from_orm(service)
+    service_out.view_count += pending_view_count
     service_out.user_application_id = user_application_id
     service_out.user_application_status = user_application_status
     service_out.user_task_id = user_task_id
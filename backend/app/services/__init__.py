@@ -22,6 +22,19 @@ from app.services.image_processor import (
     image_processor,
 )
 
+# 图片处理执行器（进程池）
+from app.services.image_executor import (
+    ImageProcessingExecutor,
+    get_image_executor,
+    shutdown_image_executor,
+)
+
+# 存储清单
+from app.services.storage_manifest import (
+    StorageManifest,
+    get_storage_manifest,
+)
+
 # 图片上传服务
 from app.services.image_upload_service import (
     ImageUploadService,
@@ -55,6 +68,13 @@ __all__ = [
     'ThumbnailConfig',
     'THUMBNAIL_PRESETS',
     'image_processor',
+    # 图片处理执行器
+    'ImageProcessingExecutor',
+    'get_image_executor',
+    'shutdown_image_executor',
+    # 存储清单
+    'StorageManifest',
+    'get_storage_manifest',
     # 图片上传服务
     'ImageUploadService',
     'ImageCategory',
@@ -1,32 +1,88 @@
 """
-BehaviorCollector — in-memory queue with background flush to DB.
+BehaviorCollector — bounded in-memory ring buffer with chunked background flush to DB.
 
 Collects user behavior events via a non-blocking `record()` call,
-then batch-writes them to the database every 30 seconds.
-For ai_insight events, merges extracted data into UserDemand in real-time.
+then batch-writes them to the database every 30 seconds (earlier when the
+buffer passes its high-water mark).
+
+- Events are kept as plain tuples; flushes use Postgres COPY (multi-row
+  INSERT on other dialects), never one ORM object per event.
+- The buffer is bounded: when full the oldest event is dropped and counted.
+- Each chunk is written in its own transaction. A failed chunk is appended
+  to a local JSON-lines spill file and retried on later flushes.
+- A chunk the database rejects for its content (FK violation, NUL byte, ...)
+  is bisected so the valid events are written and only the offending events
+  are dropped; they never reach the spill file.
+- For ai_insight events, merges extracted data into UserDemand in the same
+  transaction as the chunk.
 """
 
+import csv
+import io
+import json
 import logging
+import os
 import threading
+from collections import deque
 from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# (user_id, event_type, event_data, created_at)
+Event = Tuple[str, str, dict, datetime]
+
+_COLUMNS = ("user_id", "event_type", "event_data", "created_at")
+
+# DB-API / driver error classes meaning "these rows are invalid", as opposed to "the database is down"
+DATA_ERRORS = ("IntegrityError", "DataError")
+
+
+def is_data_error(exc: Exception) -> bool:
+    """Whether the rows themselves were refused (SQLAlchemy wraps driver errors in ``orig``)."""
+    for error in (exc, getattr(exc, "orig", None)):
+        if isinstance(error, ValueError):
+            return True
+        if error is not None and any(klass.__name__ in DATA_ERRORS for klass in type(error).__mro__):
+            return True
+    return False
+
 
 class BehaviorCollector:
-    """Singleton that queues behavior events and periodically flushes to DB."""
+    """Singleton that buffers behavior events and periodically flushes to DB."""
 
     FLUSH_INTERVAL = 30  # seconds between flushes
+    BUFFER_SIZE = int(os.getenv("BEHAVIOR_BUFFER_SIZE", "20000"))
+    HIGH_WATER_RATIO = 0.5  # wake the flusher early once the buffer is this full
+    CHUNK_SIZE = int(os.getenv("BEHAVIOR_FLUSH_CHUNK_SIZE", "1000"))
+    SPILL_PATH = os.getenv("BEHAVIOR_SPILL_PATH", os.path.join("logs", "behavior_spill.jsonl"))
+    SPILL_MAX_BYTES = int(os.getenv("BEHAVIOR_SPILL_MAX_BYTES", str(50 * 1024 * 1024)))
+    MAX_ATTEMPTS = 20  # spilled events are dropped after this many failed writes (~10 min of outage)
 
     _instance = None
     _instance_lock = threading.Lock()
 
-    def __init__(self):
-        self._queue: list = []
+    def __init__(self, buffer_size: Optional[int] = None, spill_path: Optional[str] = None):
+        self._buffer_size = buffer_size or self.BUFFER_SIZE
+        self._queue: deque = deque()
         self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
         self._running = False
         self._thread: threading.Thread | None = None
         self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._spill_path = spill_path or self.SPILL_PATH
+        self.stats = {
+            "recorded": 0,
+            "dropped": 0,  # evicted from a full buffer
+            "early_flushes": 0,  # high-water mark reached before the interval
+            "written": 0,
+            "failed_chunks": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "spill_dropped": 0,  # spill file full or retries exhausted
+            "rejected": 0,  # single events the database refused (dropped, not retried)
+        }
 
     @classmethod
     def get_instance(cls) -> "BehaviorCollector":
@@ -47,7 +103,10 @@ class BehaviorCollector:
         self._stop_event.clear()
         self._thread = threading.Thread(target=self._flush_loop, daemon=True)
         self._thread.start()
-        logger.info("BehaviorCollector started (flush every %ds)", self.FLUSH_INTERVAL)
+        logger.info(
+            "BehaviorCollector started (flush every %ds, buffer %d, chunk %d)",
+            self.FLUSH_INTERVAL, self._buffer_size, self.CHUNK_SIZE,
+        )
 
     def stop(self):
         """Stop the background thread and perform a final flush."""
@@ -55,6 +114,7 @@ class BehaviorCollector:
             return
         self._running = False
         self._stop_event.set()
+        self._wake_event.set()
         if self._thread is not None:
             self._thread.join(timeout=10)
             self._thread = None
@@ -63,23 +123,34 @@ class BehaviorCollector:
             self._flush()
         except Exception:
             logger.exception("Error during final flush on stop")
-        logger.info("BehaviorCollector stopped")
+        logger.info("BehaviorCollector stopped (%s)", self.get_stats())
 
     def record(self, user_id: str, event_type: str, event_data: dict):
-        """Append an event to the queue. Thread-safe."""
-        event = {
-            "user_id": user_id,
-            "event_type": event_type,
-            "event_data": event_data,
-            "created_at": datetime.now(timezone.utc),
-        }
+        """Append an event to the buffer. Thread-safe, never blocks on I/O."""
+        event = (user_id, event_type, event_data, datetime.now(timezone.utc))
         with self._lock:
+            if len(self._queue) >= self._buffer_size:
+                self._queue.popleft()
+                self.stats["dropped"] += 1
             self._queue.append(event)
+            self.stats["recorded"] += 1
+            wake = len(self._queue) >= self._buffer_size * self.HIGH_WATER_RATIO and not self._wake_event.is_set()
+            if wake:
+                self.stats["early_flushes"] += 1
+        if wake:
+            self._wake_event.set()
+
+    def get_stats(self) -> dict:
+        """Counters plus current buffer depth."""
+        with self._lock:
+            depth = len(self._queue)
+        return {**self.stats, "buffered": depth, "buffer_size": self._buffer_size}
 
     def _flush_loop(self):
-        """Background loop: sleep then flush, repeat until stopped."""
+        """Background loop: wait for the interval (or high-water wake-up) then flush."""
         while not self._stop_event.is_set():
-            self._stop_event.wait(timeout=self.FLUSH_INTERVAL)
+            self._wake_event.wait(timeout=self.FLUSH_INTERVAL)
+            self._wake_event.clear()
             if not self._running:
                 break
             try:
@@ -88,37 +159,66 @@ class BehaviorCollector:
                 logger.exception("Unhandled error in _flush_loop")
 
     def _flush(self):
-        """Drain the queue and write events to the database."""
-        # 1. Snapshot and clear queue under lock
-        with self._lock:
-            if not self._queue:
-                return
-            events = list(self._queue)
-            self._queue.clear()
+        """Retry spilled events, then drain the buffer and write it chunk by chunk."""
+        with self._flush_lock:
+            self._replay_spill()
+            while True:
+                with self._lock:
+                    if not self._queue:
+                        return
+                    chunk = [self._queue.popleft() for _ in range(min(self.CHUNK_SIZE, len(self._queue)))]
+                self._write_chunk_or_spill([(event, 0) for event in chunk])
 
-        if not events:
-            return
+    def _write_chunk_or_spill(self, items: List[Tuple[Event, int]]) -> bool:
+        """Write one chunk; on failure spill it with an incremented attempt count.
 
+        Returns False only when the chunk was spilled. A chunk rejected for its
+        content is split in halves until the offending events are isolated.
+        """
+        events = [event for event, _ in items]
+        try:
+            self._write_chunk(events)
+            self.stats["written"] += len(events)
+            return True
+        except Exception as exc:
+            if is_data_error(exc):
+                return self._split_rejected_chunk(items, exc)
+            self.stats["failed_chunks"] += 1
+            logger.exception("Failed to flush chunk of %d events, spilling to %s", len(events), self._spill_path)
+            self._spill([(event, attempts + 1) for event, attempts in items])
+            return False
+
+    def _split_rejected_chunk(self, items: List[Tuple[Event, int]], exc: Exception) -> bool:
+        """Bisect a chunk the database refused; a single refused event is dropped."""
+        if len(items) == 1:
+            (user_id, event_type, _, created_at), _ = items[0]
+            self.stats["rejected"] += 1
+            logger.error(
+                "Dropping behavior event rejected by the database (user=%s type=%s at=%s): %s",
+                user_id, event_type, created_at.isoformat(), exc,
+            )
+            return True
+        mid = len(items) // 2
+        if not self._write_chunk_or_spill(items[:mid]):
+            # The database went away mid-split: keep the untried half for the next flush
+            self._spill([(event, attempts + 1) for event, attempts in items[mid:]])
+            return False
+        return self._write_chunk_or_spill(items[mid:])
+
+    def _write_chunk(self, events: List[Event]):
+        """Insert a chunk of events (and merge its ai_insight events) in one transaction."""
         # Lazy imports to avoid circular dependencies
         from app.database import SessionLocal
-        from app.models import UserBehaviorEvent, UserDemand
 
         db = SessionLocal()
         try:
-            # 2. Batch insert all events
-            db_events = [
-                UserBehaviorEvent(
-                    user_id=e["user_id"],
-                    event_type=e["event_type"],
-                    event_data=e["event_data"],
-                    created_at=e["created_at"],
-                )
-                for e in events
-            ]
-            db.bulk_save_objects(db_events)
+            self._insert_events(db, events)
 
-            # 3. Process ai_insight events → merge into UserDemand
-            ai_events = [e for e in events if e["event_type"] == "ai_insight"]
+            ai_events = [
+                {"user_id": user_id, "event_data": data}
+                for user_id, event_type, data, _ in events
+                if event_type == "ai_insight"
+            ]
             if ai_events:
                 self._merge_ai_insights(db, ai_events)
 
@@ -126,10 +226,104 @@ class BehaviorCollector:
             logger.debug("Flushed %d events (%d ai_insight)", len(events), len(ai_events))
         except Exception:
             db.rollback()
-            logger.exception("Failed to flush %d events", len(events))
+            raise
         finally:
             db.close()
 
+    @staticmethod
+    def _insert_events(db, events: List[Event]):
+        """COPY the rows on Postgres; multi-row INSERT of plain rows elsewhere."""
+        from app.models import UserBehaviorEvent
+
+        connection = db.connection()
+        if connection.dialect.name == "postgresql":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for user_id, event_type, data, created_at in events:
+                writer.writerow((user_id, event_type, json.dumps(data, ensure_ascii=False, default=str), created_at.isoformat()))
+            buf.seek(0)
+            cursor = connection.connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {UserBehaviorEvent.__tablename__} ({', '.join(_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buf,
+                )
+            finally:
+                cursor.close()
+        else:
+            connection.execute(
+                UserBehaviorEvent.__table__.insert(),
+                [dict(zip(_COLUMNS, event)) for event in events],
+            )
+
+    # ---- spill file ----
+
+    def _spill(self, items: Iterable[Tuple[Event, int]]):
+        """Append failed events to the spill file (bounded by SPILL_MAX_BYTES)."""
+        lines = []
+        for (user_id, event_type, data, created_at), attempts in items:
+            if attempts >= self.MAX_ATTEMPTS:
+                self.stats["spill_dropped"] += 1
+                continue
+            lines.append(json.dumps({
+                "user_id": user_id,
+                "event_type": event_type,
+                "event_data": data,
+                "created_at": created_at.isoformat(),
+                "attempts": attempts,
+            }, ensure_ascii=False, default=str))
+        if not lines:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._spill_path) or ".", exist_ok=True)
+            size = os.path.getsize(self._spill_path) if os.path.exists(self._spill_path) else 0
+            if size >= self.SPILL_MAX_BYTES:
+                self.stats["spill_dropped"] += len(lines)
+                logger.error("Behavior spill file %s is full, dropping %d events", self._spill_path, len(lines))
+                return
+            with open(self._spill_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self.stats["spilled"] += len(lines)
+        except OSError:
+            self.stats["spill_dropped"] += len(lines)
+            logger.exception("Failed to write behavior spill file %s", self._spill_path)
+
+    def _replay_spill(self):
+        """Retry spilled events; chunks that fail again go back to the spill file."""
+        if not os.path.exists(self._spill_path):
+            return
+        replay_path = self._spill_path + ".replay"
+        try:
+            # Claim the file so new spills during the replay go to a fresh one
+            os.replace(self._spill_path, replay_path)
+            with open(replay_path, encoding="utf-8") as f:
+                lines = f.readlines()
+            os.remove(replay_path)
+        except OSError:
+            logger.exception("Failed to read behavior spill file %s", self._spill_path)
+            return
+
+        items: List[Tuple[Event, int]] = []
+        for line in lines:
+            try:
+                row = json.loads(line)
+                items.append((
+                    (row["user_id"], row["event_type"], row["event_data"], datetime.fromisoformat(row["created_at"])),
+                    int(row.get("attempts", 1)),
+                ))
+            except (ValueError, KeyError, TypeError):
+                self.stats["spill_dropped"] += 1
+                logger.warning("Skipping malformed behavior spill line: %r", line[:200])
+
+        for i in range(0, len(items), self.CHUNK_SIZE):
+            chunk = items[i:i + self.CHUNK_SIZE]
+            written = self.stats["written"]
+            if not self._write_chunk_or_spill(chunk):
+                # The database is still failing: put the rest back untouched
+                self._spill(items[i + self.CHUNK_SIZE:])
+                return
+            self.stats["replayed"] += self.stats["written"] - written
+
     def _merge_ai_insights(self, db, ai_events: list):
         """Merge ai_insight events into UserDemand records, grouped by user."""
         from app.models import UserDemand
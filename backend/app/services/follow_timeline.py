@@ -0,0 +1,371 @@
+"""
+关注 Feed 时间线存储（Redis 有序集合）
+get_follow_feed 原先每次请求都对九种内容各查 offset + page_size 行，在 Python 里合并后切片，
+第 N 页要重读前 N 页的全部内容。这里给每个用户维护一个按发布时间排序的时间线，
+翻页变成一次按游标的 ZREVRANGEBYSCORE，再只对这一页的条目回表。
+
+- 成员：feed 条目 ID（task_123 / post_45 ...），分数：发布时间（毫秒时间戳）
+- 写扩散：普通作者发布内容时，由 app.event_listeners 在提交后推入每个粉丝的时间线
+  （只推入已存在的时间线；不存在的在读取时从数据库重建）
+- 读扩散：粉丝数超过 FOLLOW_FANOUT_MAX_FOLLOWERS 的作者 / 达人团队不逐个推送，
+  只写入作者发件箱，读取时合并所关注大号的发件箱；大号集合只增不减，避免降级前后漏读
+- 关注 / 取消关注时删除该用户的时间线，下次读取按新的关注列表重建
+- 条目被删除 / 隐藏 / 过期不回写时间线，回表时按原查询条件过滤
+- 游标为 (分数, 成员) 的字符串编码，深页与第一页成本相同
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+logger = logging.getLogger(__name__)
+
+# 是否使用时间线存储（关闭后 get_follow_feed 走原合并分页）
+FOLLOW_TIMELINE_ENABLED = os.getenv("FOLLOW_TIMELINE_ENABLED", "true").lower() == "true"
+
+# 每个用户时间线最多保留的条目数
+FOLLOW_TIMELINE_MAX_MEMBERS = int(os.getenv("FOLLOW_TIMELINE_MAX_MEMBERS", "1000"))
+
+# 时间线过期时间（秒），读取时续期；不活跃用户的时间线自然淘汰
+FOLLOW_TIMELINE_TTL = int(os.getenv("FOLLOW_TIMELINE_TTL", str(7 * 24 * 3600)))
+
+# 粉丝数超过该值的作者改为读扩散
+FOLLOW_FANOUT_MAX_FOLLOWERS = int(os.getenv("FOLLOW_FANOUT_MAX_FOLLOWERS", "1000"))
+
+# 大号发件箱最多保留的条目数
+FOLLOW_OUTBOX_MAX_MEMBERS = int(os.getenv("FOLLOW_OUTBOX_MAX_MEMBERS", "500"))
+
+FOLLOW_TIMELINE_KEY_PREFIX = "follow:timeline:v1:"
+FOLLOW_OUTBOX_KEY_PREFIX = "follow:outbox:v1:"
+FOLLOW_FANIN_KEY = "follow:fanin:v1"
+
+# 单次 EVAL 推送的时间线键数
+_FANOUT_BATCH = 500
+
+# 只推入已存在的时间线，并裁剪到上限
+_FANOUT_SCRIPT = """
+local pushed = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('ZADD', key, ARGV[2], ARGV[1])
+        redis.call('ZREMRANGEBYRANK', key, 0, -(tonumber(ARGV[3]) + 1))
+        pushed = pushed + 1
+    end
+end
+return pushed
+"""
+
+# 关注对象：("user", 用户 ID) / ("expert", 达人团队 ID)
+Owner = Tuple[str, str]
+# (成员, 分数)
+TimelineRef = Tuple[str, float]
+
+
+class TimelineEntry(NamedTuple):
+    """一条待分发的新内容"""
+    member: str
+    score: float
+    owners: Tuple[Owner, ...]
+
+
+class TimelineSource(NamedTuple):
+    """一种会出现在关注 Feed 里的内容"""
+    prefix: str
+    time_attr: str
+    owners: Callable[[Mapping[str, Any]], List[Owner]]
+    # 不满足时不分发（None 表示总是分发）
+    eligible: Optional[Callable[[Mapping[str, Any]], bool]] = None
+    # 更新这些列后重新判断是否分发（如投票后补写留言）
+    watch: Tuple[str, ...] = ()
+
+
+def _owner_typed(values: Mapping[str, Any]) -> List[Owner]:
+    if values.get("owner_type") in ("user", "expert") and values.get("owner_id"):
+        return [(values["owner_type"], values["owner_id"])]
+    return []
+
+
+def _user(attr: str) -> Callable[[Mapping[str, Any]], List[Owner]]:
+    return lambda values: [("user", values[attr])] if values.get(attr) else []
+
+
+def _forum_post_owners(values: Mapping[str, Any]) -> List[Owner]:
+    owners = [("user", values["author_id"])] if values.get("author_id") else []
+    if values.get("expert_id"):
+        owners.append(("expert", values["expert_id"]))
+    return owners
+
+
+# 模型名 -> 内容来源；prefix 与 follow_feed_routes 里各条目的 id 前缀一致
+TIMELINE_SOURCES: Dict[str, TimelineSource] = {
+    "Task": TimelineSource("task", "created_at", _user("poster_id")),
+    "ForumPost": TimelineSource("post", "created_at", _forum_post_owners),
+    "FleaMarketItem": TimelineSource("product", "created_at", _user("seller_id")),
+    "TaskExpertService": TimelineSource("service", "created_at", _owner_typed),
+    "Activity": TimelineSource("activity", "created_at", _owner_typed),
+    "TaskHistory": TimelineSource(
+        "completion", "timestamp", _user("user_id"),
+        eligible=lambda values: values.get("action") == "completed",
+    ),
+    "LeaderboardVote": TimelineSource(
+        "creview", "created_at", _user("user_id"),
+        eligible=lambda values: bool(values.get("comment")) and not values.get("is_anonymous"),
+        watch=("comment", "is_anonymous"),
+    ),
+    "Review": TimelineSource(
+        "sreview", "created_at", _user("user_id"),
+        eligible=lambda values: bool(values.get("comment")) and values.get("is_anonymous") != 1,
+        watch=("comment", "is_anonymous"),
+    ),
+    "CustomLeaderboard": TimelineSource("ranking", "created_at", _user("applicant_id")),
+}
+
+
+def timeline_key(user_id: str) -> str:
+    return f"{FOLLOW_TIMELINE_KEY_PREFIX}{user_id}"
+
+
+def outbox_key(owner: Owner) -> str:
+    return f"{FOLLOW_OUTBOX_KEY_PREFIX}{owner[0]}:{owner[1]}"
+
+
+def to_score(value: Any) -> float:
+    """发布时间（datetime 或 isoformat 字符串）-> 毫秒时间戳；无时区按 UTC 处理"""
+    if not value:
+        return 0.0
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return float(int(value.timestamp() * 1000))
+
+
+def encode_cursor(ref: TimelineRef) -> str:
+    member, score = ref
+    return f"{int(score)}:{member}"
+
+
+def decode_cursor(cursor: str) -> TimelineRef:
+    """解析游标；格式不对抛 ValueError"""
+    score, sep, member = cursor.partition(":")
+    if not sep or not member:
+        raise ValueError(f"无效的游标: {cursor}")
+    return member, float(int(score))
+
+
+def _sort_key(ref: TimelineRef) -> Tuple[float, str]:
+    # 与 ZREVRANGEBYSCORE 一致：分数降序，同分按成员字典序降序
+    return ref[1], ref[0]
+
+
+def timeline_entry(source: TimelineSource, values: Mapping[str, Any], item_id: Any) -> Optional[TimelineEntry]:
+    """ORM 写入对应的待分发条目；不需要分发返回 None"""
+    if item_id is None or (source.eligible is not None and not source.eligible(values)):
+        return None
+    owners = tuple(source.owners(values))
+    if not owners:
+        return None
+    return TimelineEntry(f"{source.prefix}_{item_id}", to_score(values.get(source.time_attr)), owners)
+
+
+def _decode(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class FollowTimeline:
+    """关注 Feed 时间线的维护与读取"""
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        async_cache: Any = None,
+        session_factory: Optional[Callable[[], Any]] = None,
+        enabled: bool = FOLLOW_TIMELINE_ENABLED,
+    ):
+        """
+        Args:
+            redis_client: 同步 Redis 客户端（提交后分发），默认 redis_cache.get_redis_client()
+            async_cache: AsyncRedisCache（路由读取），默认 redis_async.async_redis_cache
+            session_factory: 返回同步 Session 的工厂（查询粉丝），默认 app.database.SessionLocal
+            enabled: 是否启用
+        """
+        self._redis_client = redis_client
+        self._async_cache = async_cache
+        self._session_factory = session_factory
+        self.enabled = enabled
+
+    def _redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        from app.redis_cache import get_redis_client
+        return get_redis_client()
+
+    def _async(self):
+        if self._async_cache is not None:
+            return self._async_cache
+        from app.redis_async import async_redis_cache
+        return async_redis_cache
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    # ==================== 写入 ====================
+
+    def _followers(self, db, owner: Owner) -> Optional[List[str]]:
+        """关注者用户 ID；超过写扩散上限返回 None（改为读扩散）"""
+        from app.models import UserFollow
+        from app.models_expert import ExpertFollow
+
+        kind, owner_id = owner
+        if kind == "expert":
+            query = select(ExpertFollow.user_id).where(ExpertFollow.expert_id == owner_id)
+        else:
+            query = select(UserFollow.follower_id).where(UserFollow.following_id == owner_id)
+        ids = [row[0] for row in db.execute(query.limit(FOLLOW_FANOUT_MAX_FOLLOWERS + 1)).all()]
+        return None if len(ids) > FOLLOW_FANOUT_MAX_FOLLOWERS else ids
+
+    def publish(self, entries: Iterable[TimelineEntry]) -> int:
+        """把新内容推入粉丝时间线（写扩散）或作者发件箱（读扩散）；返回推送的时间线数"""
+        entries = list(entries)
+        client = self._redis() if self.enabled else None
+        if client is None or not entries:
+            return 0
+        owners = {owner for entry in entries for owner in entry.owners}
+        with self._session() as db:
+            followers = {owner: self._followers(db, owner) for owner in owners}
+
+        pipe = client.pipeline(transaction=False)
+        fanout = []
+        for entry in entries:
+            keys = set()
+            for owner in entry.owners:
+                if followers[owner] is None:
+                    key = outbox_key(owner)
+                    pipe.sadd(FOLLOW_FANIN_KEY, f"{owner[0]}:{owner[1]}")
+                    pipe.zadd(key, {entry.member: entry.score})
+                    pipe.zremrangebyrank(key, 0, -(FOLLOW_OUTBOX_MAX_MEMBERS + 1))
+                else:
+                    keys.update(timeline_key(user_id) for user_id in followers[owner])
+            keys = sorted(keys)
+            fanout.extend((entry, keys[i:i + _FANOUT_BATCH]) for i in range(0, len(keys), _FANOUT_BATCH))
+        # 推送放在 pipeline 末尾，便于统计结果
+        for entry, batch in fanout:
+            pipe.eval(_FANOUT_SCRIPT, len(batch), *batch, entry.member, entry.score, FOLLOW_TIMELINE_MAX_MEMBERS)
+        results = pipe.execute()
+        return sum(int(r) for r in results[len(results) - len(fanout):])
+
+    def invalidate(self, user_ids: Iterable[str]) -> None:
+        """删除用户时间线（关注列表变化后下次读取重建）"""
+        keys = [timeline_key(user_id) for user_id in user_ids]
+        client = self._redis() if self.enabled else None
+        if client is not None and keys:
+            client.delete(*keys)
+
+    def dispatch(self, entries: Sequence[TimelineEntry], invalidated_user_ids: Iterable[str] = ()) -> None:
+        """提交后的统一入口（线程池执行）；失败只记录日志，读取时按数据库过滤 / 重建兜底"""
+        try:
+            self.invalidate(invalidated_user_ids)
+            self.publish(entries)
+        except Exception as e:
+            logger.warning(f"分发关注时间线失败: {e}")
+
+    # ==================== 读取 ====================
+
+    async def read(
+        self,
+        user_id: str,
+        owners: Iterable[Owner],
+        after: Optional[TimelineRef],
+        count: int,
+    ) -> Optional[List[TimelineRef]]:
+        """
+        读取游标之后的 count 个条目（合并用户时间线和所关注大号的发件箱，按成员去重）
+
+        Returns:
+            [(成员, 分数)]；未启用 / Redis 不可用 / 时间线尚未建立返回 None
+        """
+        if not self.enabled:
+            return None
+        client = self._async().client()
+        if client is None:
+            return None
+        key = timeline_key(user_id)
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.exists(key)
+            pipe.smembers(FOLLOW_FANIN_KEY)
+            ready, fanin = await pipe.execute()
+            if not ready:
+                return None
+            fanin = {_decode(token) for token in fanin}
+            keys = [key] + [outbox_key(owner) for owner in owners if f"{owner[0]}:{owner[1]}" in fanin]
+
+            pipe = client.pipeline(transaction=False)
+            pipe.expire(key, FOLLOW_TIMELINE_TTL)
+            for source_key in keys:
+                if after is None:
+                    pipe.zrevrangebyscore(source_key, "+inf", "-inf", start=0, num=count, withscores=True)
+                else:
+                    # 同分成员单独取出按成员过滤，其余用开区间
+                    pipe.zrevrangebyscore(source_key, after[1], after[1], withscores=True)
+                    pipe.zrevrangebyscore(source_key, f"({after[1]}", "-inf", start=0, num=count, withscores=True)
+            results = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"读取关注时间线失败: {e}")
+            return None
+
+        refs: Dict[str, float] = {}
+        for rows in results[1:]:
+            for member, score in rows:
+                member = _decode(member)
+                if member:
+                    refs[member] = float(score)
+        merged = [ref for ref in refs.items() if after is None or _sort_key(ref) < _sort_key(after)]
+        merged.sort(key=_sort_key, reverse=True)
+        return merged[:count]
+
+    async def fill(self, user_id: str, refs: Iterable[TimelineRef]) -> bool:
+        """用数据库重建的结果写入时间线（覆盖旧值）；返回是否写入成功"""
+        if not self.enabled:
+            return False
+        client = self._async().client()
+        if client is None:
+            return False
+        refs = sorted(refs, key=_sort_key, reverse=True)[:FOLLOW_TIMELINE_MAX_MEMBERS]
+        key = timeline_key(user_id)
+        try:
+            pipe = client.pipeline(transaction=True)
+            pipe.delete(key)
+            if refs:
+                pipe.zadd(key, dict(refs))
+            else:
+                # 空时间线也要占位，避免每次读取都重建
+                pipe.zadd(key, {"": 0})
+            pipe.expire(key, FOLLOW_TIMELINE_TTL)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"写入关注时间线失败: {e}")
+            return False
+
+
+# 全局时间线实例（延迟初始化，线程安全）
+_follow_timeline: Optional[FollowTimeline] = None
+_timeline_lock = threading.Lock()
+
+
+def get_follow_timeline() -> FollowTimeline:
+    """获取关注时间线实例（线程安全）"""
+    global _follow_timeline
+    if _follow_timeline is None:
+        with _timeline_lock:
+            if _follow_timeline is None:
+                _follow_timeline = FollowTimeline()
+    return _follow_timeline
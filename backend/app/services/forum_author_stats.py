@@ -0,0 +1,210 @@
+"""
+论坛作者排行榜的每日计数桶（forum_author_daily_stats）
+发帖 / 被收藏 / 获赞排行榜原先每次请求都对整张 forum_posts（+ forum_replies）按作者 GROUP BY。
+这里按 (作者, 内容创建日期, 板块) 预聚合计数，排行榜只对所需日期范围的桶求和。
+
+- 写入：ForumPost / ForumReply 的 ORM 插入 / 更新 / 删除由 app.event_listeners 算出计数变化，
+  flush 结束时在同一事务里批量累加到桶（upsert），回滚时一起回滚
+- 口径与原查询一致：按内容创建日期归桶；发帖数 / 被收藏数只算未删除且可见的帖子，
+  并在读取时按板块类型（general）过滤；获赞数为未删除帖子和回复的点赞数
+- 合并：超出最长周期（FORUM_AUTHOR_STATS_KEEP_DAYS）的日桶由定时任务折叠进汇总桶（ROLLUP_DAY），
+  "全部" 周期的读取成本约为 作者数 × 板块数
+- 周期按自然日近似：week / month 包含起始时刻所在的整天
+"""
+
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, delete, func, select, update
+
+from app.utils.time_utils import get_utc_time
+
+logger = logging.getLogger(__name__)
+
+# 是否使用计数桶（关闭后钩子不写入，排行榜走原 SQL 聚合）
+FORUM_AUTHOR_STATS_ENABLED = os.getenv("FORUM_AUTHOR_STATS_ENABLED", "true").lower() == "true"
+
+# 保留为日桶的天数（需大于最长排行周期 30 天）
+FORUM_AUTHOR_STATS_KEEP_DAYS = int(os.getenv("FORUM_AUTHOR_STATS_KEEP_DAYS", "35"))
+
+# 汇总桶日期：合并后的历史计数都记在这一天
+ROLLUP_DAY = date(1970, 1, 1)
+
+# 无板块的帖子和回复获赞记在板块 0
+NO_CATEGORY = 0
+
+METRICS = ("post_count", "favorite_count", "like_count")
+
+# 排行周期 -> 往前的天数（today 为当天）
+PERIOD_DAYS = {"today": 0, "week": 7, "month": 30}
+
+# (作者, 日期, 板块) -> {指标: 变化量}
+StatKey = Tuple[str, date, int]
+StatDeltas = Dict[StatKey, Dict[str, int]]
+
+
+def to_day(value: Optional[datetime]) -> date:
+    """内容创建时间对应的 UTC 日期（无时区按 UTC 处理，空值按当前时间）"""
+    if value is None:
+        value = get_utc_time()
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def period_start_day(period: str, now: Optional[datetime] = None) -> Optional[date]:
+    """周期起始日期；all 返回 None（包含汇总桶）"""
+    if period not in PERIOD_DAYS:
+        return None
+    now = now or get_utc_time()
+    return to_day(now - timedelta(days=PERIOD_DAYS[period]))
+
+
+def post_contribution(values: Mapping[str, Any]) -> StatDeltas:
+    """
+    一个帖子对计数桶的贡献
+
+    Args:
+        values: author_id / created_at / category_id / like_count / favorite_count / is_deleted / is_visible
+    """
+    author_id = values.get("author_id")
+    if not author_id or values.get("is_deleted"):
+        return {}
+    key = (author_id, to_day(values.get("created_at")), values.get("category_id") or NO_CATEGORY)
+    counts = {"like_count": values.get("like_count") or 0}
+    if values.get("is_visible") is not False:
+        counts["post_count"] = 1
+        counts["favorite_count"] = values.get("favorite_count") or 0
+    return {key: counts}
+
+
+def reply_contribution(values: Mapping[str, Any]) -> StatDeltas:
+    """一条回复对计数桶的贡献（只有获赞数）"""
+    author_id = values.get("author_id")
+    if not author_id or values.get("is_deleted"):
+        return {}
+    return {(author_id, to_day(values.get("created_at")), NO_CATEGORY): {"like_count": values.get("like_count") or 0}}
+
+
+def merge_deltas(target: StatDeltas, new: StatDeltas, old: StatDeltas) -> None:
+    """把 new - old 累加进 target（原地修改）"""
+    for contribution, sign in ((new, 1), (old, -1)):
+        for key, counts in contribution.items():
+            bucket = target.setdefault(key, {})
+            for metric, value in counts.items():
+                bucket[metric] = bucket.get(metric, 0) + sign * value
+
+
+def _stat_table():
+    from app.models import ForumAuthorDailyStat
+    return ForumAuthorDailyStat.__table__
+
+
+def _upsert(connection, rows: List[Dict[str, Any]]) -> None:
+    """按主键累加计数（PostgreSQL / SQLite 的 ON CONFLICT DO UPDATE）"""
+    if not rows:
+        return
+    if connection.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    table = _stat_table()
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.author_id, table.c.day, table.c.category_id],
+        set_={metric: table.c[metric] + stmt.excluded[metric] for metric in METRICS},
+    )
+    connection.execute(stmt, rows)
+
+
+def apply_deltas(connection, deltas: StatDeltas) -> int:
+    """把计数变化写入桶；返回写入的桶数"""
+    rows = []
+    for (author_id, day, category_id), counts in deltas.items():
+        if not any(counts.values()):
+            continue
+        row = {"author_id": author_id, "day": day, "category_id": category_id}
+        row.update({metric: counts.get(metric, 0) for metric in METRICS})
+        rows.append(row)
+    _upsert(connection, rows)
+    return len(rows)
+
+
+def compact(db, keep_days: int = FORUM_AUTHOR_STATS_KEEP_DAYS, now: Optional[datetime] = None) -> int:
+    """
+    把 keep_days 天之前的日桶折叠进汇总桶
+
+    先把读出的计数加到汇总桶、再从原桶减去同样的值，最后删除归零的桶；
+    合并期间钩子对旧日期的并发累加会留在原桶，下次合并再折叠，不会丢失。
+
+    Returns:
+        合并的日桶数
+    """
+    table = _stat_table()
+    cutoff = to_day(now or get_utc_time()) - timedelta(days=keep_days)
+    old = and_(table.c.day < cutoff, table.c.day != ROLLUP_DAY)
+    rows = db.execute(
+        select(table.c.author_id, table.c.day, table.c.category_id, *[table.c[m] for m in METRICS]).where(old)
+    ).all()
+    if not rows:
+        return 0
+
+    rollup: StatDeltas = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    for row in rows:
+        bucket = rollup[(row.author_id, ROLLUP_DAY, row.category_id)]
+        for metric in METRICS:
+            bucket[metric] += getattr(row, metric)
+    apply_deltas(db.connection(), rollup)
+
+    db.execute(
+        update(table)
+        .where(
+            table.c.author_id == bindparam("_author_id"),
+            table.c.day == bindparam("_day"),
+            table.c.category_id == bindparam("_category_id"),
+        )
+        .values({metric: table.c[metric] - bindparam(f"_{metric}") for metric in METRICS}),
+        [
+            {
+                "_author_id": row.author_id, "_day": row.day, "_category_id": row.category_id,
+                **{f"_{metric}": getattr(row, metric) for metric in METRICS},
+            }
+            for row in rows
+        ],
+    )
+    db.execute(delete(table).where(old, *[table.c[m] == 0 for m in METRICS]))
+    db.commit()
+    logger.info(f"论坛作者计数桶合并完成: {len(rows)} 个日桶 → {len(rollup)} 个汇总桶")
+    return len(rows)
+
+
+async def top_authors(db, metric: str, period: str, limit: int) -> List[Tuple[str, int]]:
+    """
+    按周期汇总计数桶，返回 [(作者 ID, 计数)]，计数从高到低、只含大于 0 的作者
+
+    Args:
+        db: AsyncSession
+        metric: post_count / favorite_count / like_count
+        period: all / today / week / month
+    """
+    from app.models import ForumCategory
+
+    if metric not in METRICS:
+        raise ValueError(f"未知的排行指标: {metric}")
+    table = _stat_table()
+    total = func.sum(table.c[metric])
+    query = select(table.c.author_id, total.label("total"))
+    if metric != "like_count":
+        # 发帖 / 收藏排行只统计普通板块（读取时过滤，板块类型变化无需重算）
+        query = query.join(ForumCategory, ForumCategory.id == table.c.category_id).where(
+            ForumCategory.type == "general"
+        )
+    start_day = period_start_day(period)
+    if start_day is not None:
+        query = query.where(table.c.day >= start_day)
+    query = query.group_by(table.c.author_id).having(total > 0).order_by(total.desc()).limit(limit)
+    result = await db.execute(query)
+    return [(author_id, int(count)) for author_id, count in result.all()]
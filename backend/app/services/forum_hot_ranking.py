@@ -0,0 +1,296 @@
+"""
+论坛热门帖子排行（Redis 有序集合）
+get_hot_posts 原先每次请求都对所有可见帖子在 SQL 里计算热度表达式再排序，无法走索引。
+这里把热度分数持久化在 Redis 有序集合里（全站一个 + 每个板块一个），热门列表变成一次 ZREVRANGE。
+
+- 写入：ForumPost 的 ORM 插入 / 更新 / 删除由 app.event_listeners 在提交后更新分数；
+  浏览数同步（Redis → DB 批量 UPDATE，不触发 ORM 钩子）完成后显式刷新对应帖子
+- 时间衰减：分数是计算时刻的热度；定时任务只重算每个集合头部窗口
+  （FORUM_HOT_RESCORE_WINDOW），窗口外的旧分数只会偏高，衰减后也进不了头部
+- 集合不存在时（首次部署 / Redis 清空）由定时任务全量重建，期间路由回退到 SQL 排序
+
+热度公式与原 SQL 保持一致：
+    (点赞*5 + 收藏*4 + 评论*3 + 浏览*0.1) / ((距最近活跃小时数/24 + 1) ^ 1.2)
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.utils.time_utils import get_utc_time
+
+logger = logging.getLogger(__name__)
+
+# 是否使用 Redis 热门排行（关闭后 get_hot_posts 走 SQL 排序）
+FORUM_HOT_RANKING_ENABLED = os.getenv("FORUM_HOT_RANKING_ENABLED", "true").lower() == "true"
+
+# 定时重算时每个集合重算的头部帖子数
+FORUM_HOT_RESCORE_WINDOW = int(os.getenv("FORUM_HOT_RESCORE_WINDOW", "500"))
+
+# 每个集合最多保留的帖子数（超出部分按分数从低到高裁剪）
+FORUM_HOT_MAX_MEMBERS = int(os.getenv("FORUM_HOT_MAX_MEMBERS", "5000"))
+
+# 分数公式变化时递增版本
+FORUM_HOT_KEY_PREFIX = "forum:hot:v1:"
+FORUM_HOT_GLOBAL_KEY = f"{FORUM_HOT_KEY_PREFIX}all"
+
+# 重算 / 重建时从数据库读取的列
+_SCORE_COLUMNS = (
+    "id", "category_id", "like_count", "favorite_count", "reply_count", "view_count",
+    "last_reply_at", "created_at", "is_deleted", "is_visible",
+)
+
+
+def category_key(category_id: Optional[int]) -> Optional[str]:
+    """板块集合的键；无板块的帖子只进入全站集合"""
+    return f"{FORUM_HOT_KEY_PREFIX}cat:{category_id}" if category_id is not None else None
+
+
+def hot_score(
+    like_count: Optional[int],
+    favorite_count: Optional[int],
+    reply_count: Optional[int],
+    view_count: Optional[int],
+    active_at: Optional[datetime],
+    now: Optional[datetime] = None,
+) -> float:
+    """计算帖子在 now 时刻的热度分数"""
+    now = now or get_utc_time()
+    if active_at is None:
+        active_at = now
+    elif active_at.tzinfo is None:
+        active_at = active_at.replace(tzinfo=timezone.utc)
+    hours = max(0.0, (now - active_at).total_seconds() / 3600.0)
+    raw = (
+        (like_count or 0) * 5.0
+        + (favorite_count or 0) * 4.0
+        + (reply_count or 0) * 3.0
+        + (view_count or 0) * 0.1
+    )
+    return raw / pow(hours / 24.0 + 1.0, 1.2)
+
+
+def score_for_post(post: Any, now: Optional[datetime] = None) -> Optional[float]:
+    """ORM 对象或查询行的分数；已删除 / 隐藏的帖子返回 None（应移出排行）"""
+    if post.is_deleted or post.is_visible is False:
+        return None
+    return hot_score(
+        post.like_count, post.favorite_count, post.reply_count, post.view_count,
+        post.last_reply_at or post.created_at, now,
+    )
+
+
+# (帖子 ID, 当前板块, 原板块, 分数；None 表示移出排行)
+RankingUpdate = Tuple[int, Optional[int], Optional[int], Optional[float]]
+
+
+class ForumHotRanking:
+    """论坛热门排行的维护与读取"""
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        async_cache: Any = None,
+        session_factory: Optional[Callable[[], Any]] = None,
+        enabled: bool = FORUM_HOT_RANKING_ENABLED,
+    ):
+        """
+        Args:
+            redis_client: 同步 Redis 客户端（写入 / 定时任务），默认 redis_cache.get_redis_client()
+            async_cache: AsyncRedisCache（路由读取），默认 redis_async.async_redis_cache
+            session_factory: 返回同步 Session 的工厂，默认 app.database.SessionLocal
+            enabled: 是否启用
+        """
+        self._redis_client = redis_client
+        self._async_cache = async_cache
+        self._session_factory = session_factory
+        self.enabled = enabled
+
+    def _redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        from app.redis_cache import get_redis_client
+        return get_redis_client()
+
+    def _async(self):
+        if self._async_cache is not None:
+            return self._async_cache
+        from app.redis_async import async_redis_cache
+        return async_redis_cache
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    # ==================== 写入 ====================
+
+    def apply_updates(self, updates: Iterable[RankingUpdate]) -> None:
+        """把分数变化写入全站集合和板块集合（一次 pipeline）"""
+        updates = list(updates)
+        client = self._redis() if self.enabled else None
+        if client is None or not updates:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for post_id, category_id, old_category_id, score in updates:
+                member = str(post_id)
+                if old_category_id != category_id and category_key(old_category_id):
+                    pipe.zrem(category_key(old_category_id), member)
+                keys = [FORUM_HOT_GLOBAL_KEY] + ([category_key(category_id)] if category_id is not None else [])
+                for key in keys:
+                    if score is None:
+                        pipe.zrem(key, member)
+                    else:
+                        pipe.zadd(key, {member: score})
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"更新论坛热门排行失败: {e}")
+
+    def _load_rows(self, db, post_ids: Iterable[int]) -> List[Any]:
+        from app.models import ForumPost
+
+        post_ids = list(post_ids)
+        if not post_ids:
+            return []
+        columns = [getattr(ForumPost, name) for name in _SCORE_COLUMNS]
+        return db.execute(select(*columns).where(ForumPost.id.in_(post_ids))).all()
+
+    def refresh_posts(self, post_ids: Iterable[int], db=None) -> None:
+        """按数据库当前值重算指定帖子（浏览数批量同步后调用）"""
+        post_ids = list(post_ids)
+        if not self.enabled or not post_ids:
+            return
+        if db is None:
+            with self._session() as session:
+                rows = self._load_rows(session, post_ids)
+        else:
+            rows = self._load_rows(db, post_ids)
+        now = get_utc_time()
+        updates = [(row.id, row.category_id, row.category_id, score_for_post(row, now)) for row in rows]
+        found = {row.id for row in rows}
+        # 已被物理删除的帖子移出全站集合（板块集合由重算 / 裁剪清理）
+        updates.extend((int(pid), None, None, None) for pid in post_ids if int(pid) not in found)
+        self.apply_updates(updates)
+
+    # ==================== 定时任务 ====================
+
+    def rebuild(self) -> int:
+        """从数据库全量重建所有集合；返回写入的帖子数"""
+        from app.models import ForumPost
+
+        client = self._redis() if self.enabled else None
+        if client is None:
+            return 0
+        now = get_utc_time()
+        columns = [getattr(ForumPost, name) for name in _SCORE_COLUMNS]
+        scores: Dict[str, Dict[str, float]] = {}
+        with self._session() as db:
+            rows = db.execute(
+                select(*columns).where(ForumPost.is_deleted == False, ForumPost.is_visible == True)  # noqa: E712
+            )
+            count = 0
+            for row in rows:
+                score = score_for_post(row, now)
+                member = str(row.id)
+                scores.setdefault(FORUM_HOT_GLOBAL_KEY, {})[member] = score
+                if row.category_id is not None:
+                    scores.setdefault(category_key(row.category_id), {})[member] = score
+                count += 1
+
+        pipe = client.pipeline(transaction=True)
+        for key in self._existing_keys(client):
+            pipe.delete(key)
+        for key, members in scores.items():
+            top = dict(sorted(members.items(), key=lambda kv: kv[1], reverse=True)[:FORUM_HOT_MAX_MEMBERS])
+            pipe.zadd(key, top)
+        pipe.execute()
+        logger.info(f"论坛热门排行已重建: {count} 个帖子，{len(scores)} 个集合")
+        return count
+
+    def _existing_keys(self, client) -> List[str]:
+        from app.redis_utils import scan_keys
+        return [
+            key.decode("utf-8") if isinstance(key, bytes) else key
+            for key in scan_keys(client, f"{FORUM_HOT_KEY_PREFIX}*")
+        ]
+
+    def rescore(self, max_rounds: int = 3) -> int:
+        """
+        重算每个集合头部窗口的分数（应用时间衰减）并裁剪集合；集合不存在时全量重建
+
+        头部帖子衰减后下滑，窗口外分数偏高的旧帖子可能补进头部，最多再重算 max_rounds 轮。
+
+        Returns:
+            重算的帖子数
+        """
+        client = self._redis() if self.enabled else None
+        if client is None:
+            return 0
+        if not client.exists(FORUM_HOT_GLOBAL_KEY):
+            return self.rebuild()
+
+        rescored = 0
+        keys = self._existing_keys(client)
+        with self._session() as db:
+            for key in keys:
+                fresh: set = set()
+                for _ in range(max_rounds):
+                    members = client.zrevrange(key, 0, FORUM_HOT_RESCORE_WINDOW - 1)
+                    stale = {int(m) for m in members} - fresh
+                    if not stale:
+                        break
+                    self.refresh_posts(stale, db=db)
+                    fresh |= stale
+                    rescored += len(stale)
+        # 重算会同时写全站和板块集合，全部重算完再裁剪
+        for key in keys:
+            client.zremrangebyrank(key, 0, -(FORUM_HOT_MAX_MEMBERS + 1))
+        return rescored
+
+    # ==================== 读取 ====================
+
+    async def top_ids(self, category_id: Optional[int], offset: int, count: int) -> Optional[List[int]]:
+        """
+        按热度从高到低读取一段帖子 ID
+
+        Returns:
+            帖子 ID 列表；排行不可用（未启用 / Redis 不可用 / 全站集合尚未建立）返回 None
+        """
+        if not self.enabled:
+            return None
+        client = self._async().client()
+        if client is None:
+            return None
+        key = category_key(category_id) if category_id is not None else FORUM_HOT_GLOBAL_KEY
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.exists(FORUM_HOT_GLOBAL_KEY)
+            pipe.zrevrange(key, offset, offset + count - 1)
+            ready, members = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"读取论坛热门排行失败: {e}")
+            return None
+        if not ready:
+            return None
+        return [int(m) for m in members]
+
+
+# 全局排行实例（延迟初始化，线程安全）
+_forum_hot_ranking: Optional[ForumHotRanking] = None
+_ranking_lock = threading.Lock()
+
+
+def get_forum_hot_ranking() -> ForumHotRanking:
+    """获取论坛热门排行实例（线程安全）"""
+    global _forum_hot_ranking
+    if _forum_hot_ranking is None:
+        with _ranking_lock:
+            if _forum_hot_ranking is None:
+                _forum_hot_ranking = ForumHotRanking()
+    return _forum_hot_ranking
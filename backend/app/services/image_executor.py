@@ -0,0 +1,208 @@
+"""
+图片处理执行器
+将 Pillow 编码等 CPU 密集型工作放到独立进程池，避免阻塞事件循环 / 线程池并绕开 GIL
+
+- 进程池懒加载，worker 数由 IMAGE_PROCESS_POOL_WORKERS 控制（0 表示禁用，直接在调用方线程执行）
+- 有界队列：在途任务数超过上限时不再排队，由调用方线程直接处理（背压而不是无限堆积）
+- 延迟模式：缩略图生成+上传交给后台线程，上传请求立即返回原图
+- 大图不以 bytes 传给子进程：分块复制到临时文件后只传路径，父进程内存占用与图片大小无关
+"""
+
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+from app.services.image_processor import ImageProcessor, ImageSource, _source_bytes, _source_size
+
+logger = logging.getLogger(__name__)
+
+# 进程池 worker 数（0 = 禁用进程池）
+IMAGE_PROCESS_POOL_WORKERS = int(os.getenv("IMAGE_PROCESS_POOL_WORKERS", "2"))
+
+# 每个 worker 允许的在途任务数（有界队列）
+IMAGE_PROCESS_QUEUE_PER_WORKER = int(os.getenv("IMAGE_PROCESS_QUEUE_PER_WORKER", "4"))
+
+# 延迟缩略图后台线程数
+IMAGE_DEFERRED_THREADS = int(os.getenv("IMAGE_DEFERRED_THREADS", "2"))
+
+# 等待进程池结果的超时（秒）
+IMAGE_PROCESS_TIMEOUT = 30
+
+# 不超过该大小的文件对象读成 bytes 传给子进程；更大的落临时文件、只传路径
+IMAGE_PROCESS_INLINE_BYTES = int(os.getenv("IMAGE_PROCESS_INLINE_BYTES", str(1024 * 1024)))
+
+_COPY_CHUNK_SIZE = 64 * 1024
+
+# 子进程内的处理器实例（每个进程一个）
+_worker_processor: Optional[ImageProcessor] = None
+
+
+def _get_worker_processor() -> ImageProcessor:
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = ImageProcessor()
+    return _worker_processor
+
+
+def generate_thumbnails_job(content: Union[bytes, str], preset_names: List[str]) -> Dict[str, Tuple[bytes, str]]:
+    """进程池任务：生成缩略图（模块级函数，可被 pickle）；content 为 str 时是源图临时文件路径"""
+    if isinstance(content, str):
+        with open(content, "rb") as f:
+            return _get_worker_processor().generate_thumbnails(f, preset_names)
+    return _get_worker_processor().generate_thumbnails(content, preset_names)
+
+
+def _copy_to_temp_path(source: BinaryIO) -> str:
+    """把文件对象分块复制到命名临时文件（SpooledTemporaryFile 落盘后没有可供子进程打开的路径）"""
+    source.seek(0)
+    fd, path = tempfile.mkstemp(prefix="image-source-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(source, f, _COPY_CHUNK_SIZE)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+class ImageProcessingExecutor:
+    """有界进程池执行器"""
+
+    def __init__(self, max_workers: int, queue_per_worker: int = IMAGE_PROCESS_QUEUE_PER_WORKER):
+        self.max_workers = max_workers
+        self.max_pending = max(1, max_workers * queue_per_worker)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._deferred: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "inline": 0, "rejected": 0, "deferred": 0, "failed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # spawn：避免 fork 一个带线程/连接池的 web worker
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    logger.info(f"图片处理进程池已启动: workers={self.max_workers}, max_pending={self.max_pending}")
+        return self._pool
+
+    def _get_deferred(self) -> ThreadPoolExecutor:
+        if self._deferred is None:
+            with self._lock:
+                if self._deferred is None:
+                    self._deferred = ThreadPoolExecutor(
+                        max_workers=IMAGE_DEFERRED_THREADS,
+                        thread_name_prefix="image-deferred",
+                    )
+        return self._deferred
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        在进程池中执行 fn 并等待结果
+
+        进程池禁用或队列已满时，直接在当前线程执行（背压）。
+        """
+        if not self.enabled or not self._slots.acquire(blocking=False):
+            if self.enabled:
+                self.stats["rejected"] += 1
+                logger.debug("图片处理队列已满，当前线程直接处理")
+            self.stats["inline"] += 1
+            return fn(*args)
+
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except Exception as e:
+            self._slots.release()
+            logger.warning(f"提交图片处理任务失败，当前线程直接处理: {e}")
+            self.stats["inline"] += 1
+            return fn(*args)
+
+        self.stats["submitted"] += 1
+        try:
+            return future.result(timeout=IMAGE_PROCESS_TIMEOUT)
+        finally:
+            self._slots.release()
+
+    def defer(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """在后台线程执行 fn（用于延迟缩略图），异常只记录日志"""
+        self.stats["deferred"] += 1
+
+        def _wrapped():
+            try:
+                return fn(*args)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"后台图片处理失败: {e}", exc_info=True)
+                return None
+
+        return self._get_deferred().submit(_wrapped)
+
+    def generate_thumbnails(
+        self,
+        processor: ImageProcessor,
+        content: ImageSource,
+        preset_names: List[str],
+    ) -> Dict[str, Tuple[bytes, str]]:
+        """
+        生成缩略图：启用进程池时在子进程中执行，否则使用传入的处理器
+
+        bytes 和小文件以 bytes 传给子进程；大文件复制到临时文件后传路径，不整体读入内存。
+        """
+        if not self.enabled:
+            self.stats["inline"] += 1
+            return processor.generate_thumbnails(content, preset_names)
+        if isinstance(content, (bytes, bytearray, memoryview)) or _source_size(content) <= IMAGE_PROCESS_INLINE_BYTES:
+            return self.run(generate_thumbnails_job, _source_bytes(content), preset_names)
+        path = _copy_to_temp_path(content)
+        try:
+            return self.run(generate_thumbnails_job, path, preset_names)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._deferred is not None:
+                self._deferred.shutdown(wait=wait)
+                self._deferred = None
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=not wait)
+                self._pool = None
+
+
+# 全局执行器实例（延迟初始化，线程安全）
+_executor: Optional[ImageProcessingExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_image_executor() -> ImageProcessingExecutor:
+    """获取图片处理执行器实例（线程安全）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ImageProcessingExecutor(IMAGE_PROCESS_POOL_WORKERS)
+    return _executor
+
+
+def shutdown_image_executor(wait: bool = True) -> None:
+    """关闭图片处理执行器（应用关闭时调用）"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
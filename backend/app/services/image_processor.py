@@ -5,7 +5,9 @@
 
 import io
 import logging
-from typing import Optional, Tuple, Dict, Any, List
+import os
+import shutil
+from typing import Optional, Tuple, Dict, Any, List, BinaryIO, Union
 from dataclasses import dataclass
 from enum import Enum
 
@@ -40,6 +42,46 @@ class ThumbnailConfig:
     format: ImageFormat = ImageFormat.WEBP
 
 
+# 图片来源：完整 bytes，或可 seek 的文件对象（如 SpooledTemporaryFile）
+ImageSource = Union[bytes, BinaryIO]
+
+
+def _as_stream(source: ImageSource) -> BinaryIO:
+    """将图片来源统一为从头开始的可读流（文件对象不复制内容）"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def _source_size(source: ImageSource) -> int:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    pos = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(pos)
+    return size
+
+
+def _source_head(source: ImageSource, length: int = 16) -> bytes:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:length])
+    source.seek(0)
+    head = source.read(length)
+    source.seek(0)
+    return head
+
+
+def _source_bytes(source: ImageSource) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+
 # 预定义的缩略图尺寸
 THUMBNAIL_PRESETS = {
     "tiny": ThumbnailConfig(name="_tiny", max_width=64, max_height=64, quality=75),
@@ -76,12 +118,12 @@ class ImageProcessor:
                 logger.warning("Pillow 未安装，图片处理功能不可用。请运行: pip install Pillow")
         return self._pillow_available
     
-    def get_image_info(self, content: bytes) -> Optional[Dict[str, Any]]:
+    def get_image_info(self, content: ImageSource) -> Optional[Dict[str, Any]]:
         """
-        获取图片信息
+        获取图片信息（只解析文件头，不解码像素）
         
         Args:
-            content: 图片二进制内容
+            content: 图片二进制内容或文件对象
             
         Returns:
             图片信息字典，包含 width, height, format 等
@@ -92,13 +134,13 @@ class ImageProcessor:
         try:
             from PIL import Image
             
-            with Image.open(io.BytesIO(content)) as img:
+            with Image.open(_as_stream(content)) as img:
                 return {
                     "width": img.width,
                     "height": img.height,
                     "format": img.format.lower() if img.format else None,
                     "mode": img.mode,
-                    "size": len(content)
+                    "size": _source_size(content)
                 }
         except Exception as e:
             logger.error(f"获取图片信息失败: {e}")
@@ -235,7 +277,7 @@ class ImageProcessor:
     
     def resize(
         self,
-        content: bytes,
+        content: ImageSource,
         max_width: int,
         max_height: int,
         quality: int = 85,
@@ -246,7 +288,7 @@ class ImageProcessor:
         调整图片尺寸
         
         Args:
-            content: 原始图片内容
+            content: 原始图片内容（bytes 或文件对象）
             max_width: 最大宽度
             max_height: 最大高度
             quality: 压缩质量
@@ -257,13 +299,13 @@ class ImageProcessor:
             (调整后的内容, 文件扩展名, 新尺寸)
         """
         if not self.pillow_available:
-            ext = self._detect_extension(content)
-            return content, ext, ImageSize(0, 0)
+            ext = self._detect_extension(_source_head(content))
+            return _source_bytes(content), ext, ImageSize(0, 0)
         
         try:
             from PIL import Image
             
-            with Image.open(io.BytesIO(content)) as img:
+            with Image.open(_as_stream(content)) as img:
                 original_format = img.format.lower() if img.format else 'jpeg'
                 original_size = ImageSize(img.width, img.height)
                 
@@ -274,7 +316,7 @@ class ImageProcessor:
                     if ratio >= 1:
                         # 图片已经小于目标尺寸，不需要调整
                         ext = f".{original_format}"
-                        return content, ext, original_size
+                        return _source_bytes(content), ext, original_size
                     
                     new_width = int(img.width * ratio)
                     new_height = int(img.height * ratio)
@@ -282,6 +324,11 @@ class ImageProcessor:
                     new_width = min(img.width, max_width)
                     new_height = min(img.height, max_height)
                 
+                # JPEG 缩小时启用 draft 模式：解码阶段直接按 1/2、1/4、1/8 缩放（DCT scaling），
+                # 只解码所需分辨率，大图生成缩略图的 CPU 和内存开销大幅下降
+                if original_format == 'jpeg' and img.mode in ('RGB', 'L', 'CMYK'):
+                    img.draft(img.mode, (new_width, new_height))
+                
                 # 调整尺寸
                 resized = img.resize(
                     (new_width, new_height),
@@ -311,18 +358,18 @@ class ImageProcessor:
                 if ext == '.jpeg':
                     ext = '.jpg'
                 
-                logger.debug(f"图片调整尺寸: {original_size} -> {new_size}, {len(content)} -> {len(result)} 字节")
+                logger.debug(f"图片调整尺寸: {original_size} -> {new_size}, {_source_size(content)} -> {len(result)} 字节")
                 
                 return result, ext, new_size
                 
         except Exception as e:
             logger.error(f"图片调整尺寸失败: {e}")
-            ext = self._detect_extension(content)
-            return content, ext, ImageSize(0, 0)
+            ext = self._detect_extension(_source_head(content))
+            return _source_bytes(content), ext, ImageSize(0, 0)
     
     def generate_thumbnail(
         self,
-        content: bytes,
+        content: ImageSource,
         config: ThumbnailConfig
     ) -> Tuple[bytes, str]:
         """
@@ -344,9 +391,26 @@ class ImageProcessor:
         )
         return result, ext
     
+    def predict_thumbnail_extension(
+        self,
+        width: Optional[int],
+        height: Optional[int],
+        image_format: Optional[str],
+        config: ThumbnailConfig
+    ) -> str:
+        """
+        不解码图片，预测 generate_thumbnail 输出的扩展名（与 resize 的规则一致）
+        
+        用于延迟生成缩略图时提前返回 URL。
+        """
+        if width and height and min(config.max_width / width, config.max_height / height) >= 1:
+            return f".{image_format or 'jpeg'}"
+        ext = f".{config.format.value}"
+        return '.jpg' if ext == '.jpeg' else ext
+    
     def generate_thumbnails(
         self,
-        content: bytes,
+        content: ImageSource,
         preset_names: Optional[List[str]] = None
     ) -> Dict[str, Tuple[bytes, str]]:
         """
@@ -363,10 +427,18 @@ class ImageProcessor:
         if preset_names is None:
             preset_names = list(THUMBNAIL_PRESETS.keys())
         
+        info = self.get_image_info(content)
+        original: Optional[Tuple[bytes, str]] = None
         results = {}
         for name in preset_names:
             if name in THUMBNAIL_PRESETS:
                 config = THUMBNAIL_PRESETS[name]
+                if info and min(config.max_width / info["width"], config.max_height / info["height"]) >= 1:
+                    # 原图已小于预设尺寸时 resize 原样返回：各预设共用一次读取，不再每个预设读一遍原图
+                    if original is None:
+                        original = self.generate_thumbnail(content, config)
+                    results[name] = original
+                    continue
                 thumb_content, ext = self.generate_thumbnail(content, config)
                 results[name] = (thumb_content, ext)
         
@@ -531,13 +603,68 @@ class ImageProcessor:
 
         return bytes(result)
 
-    def orient_if_needed(self, content: bytes, quality: int = 95) -> tuple[bytes, bool]:
+    def strip_exif_lossless_stream(self, src: BinaryIO, dst: BinaryIO) -> None:
+        """
+        strip_exif_lossless 的流式版本：逐个 segment 从 src 复制到 dst，
+        跳过 APP1 (EXIF)，SOS 之后的压缩数据用 copyfileobj 分块复制。
+        非 JPEG 内容原样复制。内存占用与文件大小无关。
+        """
+        src.seek(0)
+        soi = src.read(2)
+        if soi != b'\xff\xd8':
+            dst.write(soi)
+            shutil.copyfileobj(src, dst)
+            return
+
+        dst.write(soi)
+        while True:
+            marker_bytes = src.read(2)
+            if len(marker_bytes) < 2:
+                dst.write(marker_bytes)
+                return
+
+            if marker_bytes[0] != 0xFF:
+                dst.write(marker_bytes)
+                shutil.copyfileobj(src, dst)
+                return
+
+            marker = marker_bytes[1]
+
+            # SOS 之后是压缩图像数据，直接复制到结尾
+            if marker == 0xDA:
+                dst.write(marker_bytes)
+                shutil.copyfileobj(src, dst)
+                return
+
+            if marker == 0x00 or (0xD0 <= marker <= 0xD9):
+                dst.write(marker_bytes)
+                continue
+
+            length_bytes = src.read(2)
+            if len(length_bytes) < 2:
+                dst.write(marker_bytes)
+                dst.write(length_bytes)
+                return
+
+            seg_length = (length_bytes[0] << 8) | length_bytes[1]
+            payload_length = max(seg_length - 2, 0)
+
+            if marker == 0xE1:
+                src.seek(payload_length, os.SEEK_CUR)
+                continue
+
+            dst.write(marker_bytes)
+            dst.write(length_bytes)
+            dst.write(src.read(payload_length))
+
+    def orient_if_needed(self, content: ImageSource, quality: int = 95) -> tuple[ImageSource, bool]:
         """
         检查 EXIF orientation，仅在需要旋转时才解码和重新编码。
 
         Returns:
             (处理后的内容, 是否进行了旋转)
-            如果不需要旋转，返回原始 content 不做任何修改。
+            如果不需要旋转，返回原始 content（bytes 或文件对象）不做任何修改；
+            旋转后返回新编码的 bytes。
         """
         if not self.pillow_available:
             return content, False
@@ -545,7 +672,7 @@ class ImageProcessor:
         try:
             from PIL import Image, ExifTags
 
-            with Image.open(io.BytesIO(content)) as img:
+            with Image.open(_as_stream(content)) as img:
                 exif = img.getexif()
                 if not exif:
                     return content, False
@@ -3,12 +3,14 @@
 整合存储后端、图片处理和业务逻辑
 """
 
+import io
 import os
 import uuid
 import logging
+import tempfile
 import threading
 import re
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, BinaryIO
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
@@ -16,11 +18,22 @@ from pathlib import Path
 from app.services.storage_backend import StorageBackend, get_default_storage
 from app.services.image_processor import (
     ImageProcessor, image_processor, 
-    ImageFormat, ThumbnailConfig, THUMBNAIL_PRESETS
+    ImageFormat, ThumbnailConfig, THUMBNAIL_PRESETS, ImageSource, _source_bytes
 )
+from app.services.image_executor import ImageProcessingExecutor, get_image_executor
+from app.services.storage_manifest import StorageManifest, get_storage_manifest
 
 logger = logging.getLogger(__name__)
 
+# 流式上传：处理中间结果超过该大小时落盘
+_SPOOL_MAX_MEMORY = 1024 * 1024
+
+# 类型检测读取的文件头字节数
+_MAGIC_HEAD_SIZE = 64
+
+# 全局默认：是否延迟生成缩略图（先返回原图，缩略图在后台生成）
+DEFER_THUMBNAILS = os.getenv("IMAGE_DEFER_THUMBNAILS", "false").lower() == "true"
+
 
 class ImageCategory(Enum):
     """图片分类"""
@@ -61,6 +74,7 @@ class UploadConfig:
     convert_to_webp: bool = False  # 是否转换为 WebP
     generate_thumbnails: bool = False  # 是否生成缩略图
     thumbnail_presets: Tuple[str, ...] = ('thumb', 'medium')  # 缩略图预设
+    defer_thumbnails: bool = DEFER_THUMBNAILS  # True: 立即返回，缩略图在后台生成上传
     strip_metadata: bool = True  # 是否移除元数据
     auto_orient: bool = True  # 是否自动旋转
     max_dimension: Optional[int] = 2048  # 最大边长（像素），None 表示不限制
@@ -158,7 +172,9 @@ class ImageUploadService:
     def __init__(
         self,
         storage: Optional[StorageBackend] = None,
-        processor: Optional[ImageProcessor] = None
+        processor: Optional[ImageProcessor] = None,
+        executor: Optional[ImageProcessingExecutor] = None,
+        manifest: Optional[StorageManifest] = None
     ):
         """
         初始化图片上传服务
@@ -166,9 +182,13 @@ class ImageUploadService:
         Args:
             storage: 存储后端，默认使用全局实例
             processor: 图片处理器，默认使用全局实例
+            executor: 图片处理执行器（进程池），默认使用全局实例
+            manifest: 存储清单，默认使用全局实例
         """
         self.storage = storage or get_default_storage()
         self.processor = processor or image_processor
+        self.executor = executor or get_image_executor()
+        self.manifest = manifest or get_storage_manifest()
     
     def upload(
         self,
@@ -308,18 +328,20 @@ class ImageUploadService:
             
             # 上传到存储后端
             url = self.storage.upload(processed_content, storage_path)
+            self._record_manifest(storage_path, category, resource_id, user_id, is_temp, len(processed_content))
             
             # 生成缩略图
             thumbnails = None
             if cfg.generate_thumbnails:
-                thumbnails = self._generate_and_upload_thumbnails(
+                thumbnails = self._thumbnails_for_upload(
+                    cfg,
                     processed_content,
+                    processed_info,
                     category,
                     resource_id,
                     user_id,
                     file_id,
-                    is_temp,
-                    cfg.thumbnail_presets
+                    is_temp
                 )
             
             logger.info(
@@ -347,6 +369,139 @@ class ImageUploadService:
                 error=str(e)
             )
     
+    def upload_stream(
+        self,
+        fileobj: BinaryIO,
+        category: ImageCategory,
+        resource_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        filename: Optional[str] = None,
+        is_temp: bool = False,
+        config: Optional[UploadConfig] = None
+    ) -> UploadResult:
+        """
+        以流的方式上传图片（参数与 upload 相同，内容为可 seek 的文件对象）
+        
+        存原图管道（store_original）全程不持有完整 bytes：
+        文件头做类型检测，EXIF 逐段剥离到落盘临时文件，再流式上传到存储后端，
+        缩略图直接从文件对象解码。只有需要旋转时才会重新编码出一份 bytes。
+        传统压缩管道需要完整解码像素，仍回退到 upload()。
+        """
+        work = None
+        try:
+            cfg = config or CATEGORY_CONFIGS.get(category, UploadConfig())
+            
+            fileobj.seek(0, os.SEEK_END)
+            original_size = fileobj.tell()
+            fileobj.seek(0)
+            
+            if original_size == 0:
+                return UploadResult(
+                    success=False,
+                    error="文件内容为空"
+                )
+            
+            if original_size > cfg.max_size:
+                return UploadResult(
+                    success=False,
+                    error=f"文件过大，最大允许 {cfg.max_size // (1024*1024)}MB"
+                )
+            
+            if not cfg.store_original:
+                return self.upload(
+                    fileobj.read(), category, resource_id, user_id, filename, is_temp, config
+                )
+            
+            head = fileobj.read(_MAGIC_HEAD_SIZE)
+            fileobj.seek(0)
+            
+            ext = self._detect_extension(head, filename)
+            if ext.lower() not in cfg.allowed_extensions:
+                return UploadResult(
+                    success=False,
+                    error=f"不支持的文件类型，允许: {', '.join(cfg.allowed_extensions)}"
+                )
+            
+            if not self._validate_image_content(head):
+                return UploadResult(
+                    success=False,
+                    error="无效的图片文件"
+                )
+            
+            source: BinaryIO = fileobj
+            
+            # 1. 仅在需要时旋转（旋转必须解码+重新编码）
+            if cfg.auto_orient:
+                oriented, was_rotated = self.processor.orient_if_needed(source)
+                if was_rotated:
+                    source = io.BytesIO(oriented)
+            
+            # 2. 流式无损剥离 EXIF
+            if cfg.strip_metadata:
+                work = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+                self.processor.strip_exif_lossless_stream(source, work)
+                source = work
+            
+            processed_info = self.processor.get_image_info(source)
+            width = processed_info.get('width') if processed_info else None
+            height = processed_info.get('height') if processed_info else None
+            
+            source.seek(0, os.SEEK_END)
+            processed_size = source.tell()
+            source.seek(0)
+            ext = self._detect_extension(source.read(_MAGIC_HEAD_SIZE), filename)
+            
+            file_id = str(uuid.uuid4())
+            new_filename = f"{file_id}{ext}"
+            storage_path = self._build_storage_path(
+                category, resource_id, user_id, new_filename, is_temp
+            )
+            
+            source.seek(0)
+            url = self.storage.upload_fileobj(source, storage_path)
+            self._record_manifest(storage_path, category, resource_id, user_id, is_temp, processed_size)
+            
+            thumbnails = None
+            if cfg.generate_thumbnails:
+                thumbnails = self._thumbnails_for_upload(
+                    cfg,
+                    source,
+                    processed_info,
+                    category,
+                    resource_id,
+                    user_id,
+                    file_id,
+                    is_temp
+                )
+            
+            logger.info(
+                f"图片流式上传成功: category={category.value}, "
+                f"path={storage_path}, size={processed_size}, "
+                f"original_size={original_size}"
+            )
+            
+            return UploadResult(
+                success=True,
+                url=url,
+                path=storage_path,
+                filename=new_filename,
+                size=processed_size,
+                original_size=original_size,
+                width=width,
+                height=height,
+                thumbnails=thumbnails
+            )
+            
+        except Exception as e:
+            logger.error(f"图片上传失败: {e}", exc_info=True)
+            return UploadResult(
+                success=False,
+                error=str(e)
+            )
+        finally:
+            if work is not None:
+                work.close()
+    
     def move_from_temp(
         self,
         category: ImageCategory,
@@ -375,6 +530,7 @@ class ImageUploadService:
             return []
         
         new_urls = []
+        pending = []  # [(new_urls 下标, 原 URL, 源路径, 目标路径)]
         temp_marker = f"/temp_{user_id}/"
         temp_dir = f"temp_{user_id}"
         
@@ -440,28 +596,39 @@ class ImageUploadService:
                 # 替换临时目录为正式目录
                 dst_path = src_path.replace(f"{category.value}/{temp_dir}/", f"{category.value}/{resource_id}/")
                 
-                # 提取文件名（用于移动缩略图）
-                filename = src_path.split('/')[-1]
-                
-                # 移动文件
-                logger.info(f"尝试移动图片: src_path={src_path}, dst_path={dst_path}")
-                if self.storage.move(src_path, dst_path):
-                    new_url = self.storage.get_url(dst_path)
-                    new_urls.append(new_url)
-                    
-                    # 同时移动缩略图
-                    self._move_thumbnails(category, temp_dir, resource_id, filename)
-                    
-                    logger.info(f"图片移动成功: {src_path} -> {dst_path}, new_url={new_url}")
-                else:
-                    # 移动失败，保留原 URL
-                    new_urls.append(url)
-                    logger.warning(f"图片移动失败: {src_path} -> {dst_path}, 保留原URL: {url}")
+                # 先占位，批量移动后回填
+                pending.append((len(new_urls), url, src_path, dst_path))
+                new_urls.append(url)
                     
             except Exception as e:
                 logger.error(f"图片移动异常: {url}, 错误: {e}", exc_info=True)
                 new_urls.append(url)
         
+        if not pending:
+            return new_urls
+        
+        # 原图与缩略图一起批量移动（云存储上并行复制 + 一次批量删除）
+        thumb_moves = self._thumbnail_moves(
+            category, temp_dir, resource_id, [src.split('/')[-1] for _, _, src, _ in pending]
+        )
+        moves = [(src, dst) for _, _, src, dst in pending]
+        try:
+            results = self.storage.move_many(moves + thumb_moves)
+        except Exception as e:
+            logger.error(f"图片批量移动异常: {e}", exc_info=True)
+            return new_urls
+        
+        manifest_moves = []
+        for (index, url, src_path, dst_path), ok in zip(pending, results):
+            if ok:
+                new_urls[index] = self.storage.get_url(dst_path)
+                manifest_moves.append((src_path, dst_path))
+                logger.info(f"图片移动成功: {src_path} -> {dst_path}, new_url={new_urls[index]}")
+            else:
+                # 移动失败，保留原 URL
+                logger.warning(f"图片移动失败: {src_path} -> {dst_path}, 保留原URL: {url}")
+        
+        self.manifest.move(manifest_moves, resource_id)
         return new_urls
     
     def delete(
@@ -485,20 +652,25 @@ class ImageUploadService:
             if image_urls is None:
                 # 删除整个目录
                 dir_path = f"{category.value}/{resource_id}"
-                return self.storage.delete_directory(dir_path)
+                deleted = self.storage.delete_directory(dir_path)
+                if deleted:
+                    self.manifest.forget(prefix=dir_path)
+                return deleted
             else:
                 # 删除指定图片
-                success = True
+                paths = []
+                thumb_paths = []
                 for url in image_urls:
                     filename = url.split('/')[-1]
-                    path = f"{category.value}/{resource_id}/{filename}"
-                    
-                    if not self.storage.delete(path):
-                        success = False
-                    
+                    paths.append(f"{category.value}/{resource_id}/{filename}")
                     # 同时删除缩略图
-                    self._delete_thumbnails(category, resource_id, filename)
+                    thumb_paths.extend(self._thumbnail_paths(category, resource_id, filename))
+                
+                # 原图按个数判断成功；缩略图不一定存在，不计入结果
+                success = self.storage.delete_many(paths) == len(paths)
+                self.storage.delete_many(thumb_paths)
                 
+                self.manifest.forget(paths)
                 return success
                 
         except Exception as e:
@@ -522,7 +694,10 @@ class ImageUploadService:
         """
         try:
             temp_dir = f"{category.value}/temp_{user_id}"
-            return self.storage.delete_directory(temp_dir)
+            deleted = self.storage.delete_directory(temp_dir)
+            if deleted:
+                self.manifest.forget(prefix=temp_dir)
+            return deleted
         except Exception as e:
             logger.error(f"临时目录删除失败: {e}")
             return False
@@ -551,6 +726,21 @@ class ImageUploadService:
         path = self._build_storage_path(category, resource_id, user_id, filename, is_temp)
         return self.storage.get_url(path)
     
+    def _record_manifest(
+        self,
+        storage_path: str,
+        category: ImageCategory,
+        resource_id: Optional[str],
+        user_id: Optional[str],
+        is_temp: bool,
+        size: int
+    ) -> None:
+        """登记到存储清单（只登记归属实体或临时目录的对象，类别根目录下的文件不参与孤儿清理）"""
+        if is_temp and user_id:
+            self.manifest.record(storage_path, category.value, None, user_id, size)
+        elif resource_id:
+            self.manifest.record(storage_path, category.value, resource_id, user_id, size)
+    
     def _build_storage_path(
         self,
         category: ImageCategory,
@@ -631,9 +821,53 @@ class ImageUploadService:
         
         return False
     
+    def _thumbnails_for_upload(
+        self,
+        cfg: UploadConfig,
+        content: ImageSource,
+        image_info: Optional[Dict[str, Any]],
+        category: ImageCategory,
+        resource_id: Optional[str],
+        user_id: Optional[str],
+        file_id: str,
+        is_temp: bool
+    ) -> Dict[str, str]:
+        """按配置同步生成缩略图，或交给后台并返回预测的 URL"""
+        if not cfg.defer_thumbnails:
+            return self._generate_and_upload_thumbnails(
+                content, category, resource_id, user_id, file_id, is_temp, cfg.thumbnail_presets
+            )
+        
+        info = image_info or {}
+        thumbnails = {}
+        for preset_name in cfg.thumbnail_presets:
+            config = THUMBNAIL_PRESETS.get(preset_name)
+            if config is None:
+                continue
+            ext = self.processor.predict_thumbnail_extension(
+                info.get('width'), info.get('height'), info.get('format'), config
+            )
+            thumb_path = self._build_storage_path(
+                category, resource_id, user_id, f"{file_id}{config.name}{ext}", is_temp
+            )
+            thumbnails[preset_name] = self.storage.get_url(thumb_path)
+        
+        # 后台任务需要独立的 bytes 副本（调用方的临时文件会在返回后关闭）
+        self.executor.defer(
+            self._generate_and_upload_thumbnails,
+            _source_bytes(content),
+            category,
+            resource_id,
+            user_id,
+            file_id,
+            is_temp,
+            cfg.thumbnail_presets
+        )
+        return thumbnails
+    
     def _generate_and_upload_thumbnails(
         self,
-        content: bytes,
+        content: ImageSource,
         category: ImageCategory,
         resource_id: Optional[str],
         user_id: Optional[str],
@@ -644,7 +878,7 @@ class ImageUploadService:
         """生成并上传缩略图"""
         thumbnails = {}
         
-        thumb_results = self.processor.generate_thumbnails(content, list(preset_names))
+        thumb_results = self.executor.generate_thumbnails(self.processor, content, list(preset_names))
         
         for preset_name, (thumb_content, ext) in thumb_results.items():
             config = THUMBNAIL_PRESETS[preset_name]
@@ -661,39 +895,44 @@ class ImageUploadService:
         
         return thumbnails
     
-    def _move_thumbnails(
+    def _thumbnail_moves(
         self,
         category: ImageCategory,
         temp_dir: str,
         resource_id: str,
-        filename: str
-    ) -> None:
-        """移动缩略图"""
-        file_id = Path(filename).stem
+        filenames: List[str]
+    ) -> List[Tuple[str, str]]:
+        """找出临时目录中属于这些原图的缩略图（列一次目录按文件名匹配，不逐个 exists 探测）"""
+        thumb_stems = {
+            f"{Path(filename).stem}{config.name}"
+            for filename in filenames
+            for config in THUMBNAIL_PRESETS.values()
+        }
         
-        for preset_name, config in THUMBNAIL_PRESETS.items():
-            for ext in ('.webp', '.jpg', '.png'):
-                thumb_filename = f"{file_id}{config.name}{ext}"
-                src_path = f"{category.value}/{temp_dir}/{thumb_filename}"
-                
-                if self.storage.exists(src_path):
-                    dst_path = f"{category.value}/{resource_id}/{thumb_filename}"
-                    self.storage.move(src_path, dst_path)
+        moves = []
+        for path in self.storage.list_files(f"{category.value}/{temp_dir}"):
+            thumb_filename = path.replace('\\', '/').split('/')[-1]
+            if Path(thumb_filename).stem in thumb_stems:
+                moves.append((
+                    f"{category.value}/{temp_dir}/{thumb_filename}",
+                    f"{category.value}/{resource_id}/{thumb_filename}",
+                ))
+        return moves
     
-    def _delete_thumbnails(
+    def _thumbnail_paths(
         self,
         category: ImageCategory,
         resource_id: str,
         filename: str
-    ) -> None:
-        """删除缩略图"""
+    ) -> List[str]:
+        """原图对应的所有可能缩略图路径（各预设 × 可能的扩展名）"""
         file_id = Path(filename).stem
         
-        for preset_name, config in THUMBNAIL_PRESETS.items():
-            for ext in ('.webp', '.jpg', '.png'):
-                thumb_filename = f"{file_id}{config.name}{ext}"
-                path = f"{category.value}/{resource_id}/{thumb_filename}"
-                self.storage.delete(path)
+        return [
+            f"{category.value}/{resource_id}/{file_id}{config.name}{ext}"
+            for config in THUMBNAIL_PRESETS.values()
+            for ext in ('.webp', '.jpg', '.jpeg', '.png')
+        ]
 
 
 # 全局服务实例（延迟初始化，线程安全）
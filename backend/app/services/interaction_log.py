@@ -0,0 +1,450 @@
+"""
+用户任务交互的写回（write-behind）日志
+请求线程只把交互追加到内存缓冲，后台线程定期批量写入 user_task_interactions。
+
+原先每次浏览 / 点击都在请求的会话里查任务、查当天是否已有记录、INSERT/UPDATE 并提交，
+然后 SCAN 删除推荐缓存。任务详情页因此要多付一次写事务和若干 Redis 删除。
+
+- 合并：view / click 按 (用户, 任务, 类型, UTC 日) 合并，保留最新的设备和元数据、最长浏览时长；
+  落库时当天已有记录则更新，否则插入（与原先"每天只记一条"的口径一致）
+- 批量：一次 flush 用一条查询校验任务是否存在、一条查询找出当天已有记录，再批量 UPDATE / INSERT
+- 防抖：推荐缓存失效按用户防抖，同一用户在 INVALIDATE_DEBOUNCE 秒内最多失效一次
+- 有界：缓冲条目数超过上限时丢弃新条目并计数
+- 失败：数据库不可用时整批放回缓冲，下次 flush 重试（超过 MAX_ATTEMPTS 次后丢弃并计数）；
+  数据库因内容拒绝的批次（外键、非法值）二分定位，只丢弃出错的条目
+- 偏好向量：提交后把新增交互（以及浏览时长首次超过长浏览阈值的更新）增量写入用户偏好向量
+  （app.recommendation.preference_store），失败不影响交互本身
+- 未启动后台线程时（脚本、测试、Celery worker），record 之后立即同步 flush
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, select, tuple_, update
+
+from app.utils.time_utils import get_utc_time
+
+logger = logging.getLogger(__name__)
+
+# 按天合并的交互类型
+COALESCED_TYPES = ("view", "click")
+
+# 写入后触发偏好更新的交互类型
+PREFERENCE_UPDATE_TYPES = ("accept", "complete")
+
+
+class PendingInteraction(NamedTuple):
+    user_id: str
+    task_id: int
+    interaction_type: str
+    interaction_time: datetime
+    duration_seconds: Optional[int]
+    device_type: Optional[str]
+    metadata: Optional[dict]
+    attempts: int = 0  # 已失败的写入次数
+
+
+def _day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _longest_duration(*durations: Optional[int]) -> Optional[int]:
+    """合并口径：取最长浏览时长，都没有时为 None"""
+    known = [d for d in durations if d]
+    return max(known) if known else None
+
+
+class InteractionLog:
+    """用户任务交互的内存缓冲 + 后台批量落库"""
+
+    FLUSH_INTERVAL = int(os.getenv("INTERACTION_LOG_FLUSH_INTERVAL", "5"))
+    MAX_PENDING = int(os.getenv("INTERACTION_LOG_MAX_PENDING", "50000"))
+    INVALIDATE_DEBOUNCE = int(os.getenv("INTERACTION_CACHE_DEBOUNCE_SECONDS", "60"))
+    # 放回缓冲重试的次数上限（按 5 秒间隔约 10 分钟的故障）
+    MAX_ATTEMPTS = int(os.getenv("INTERACTION_LOG_MAX_ATTEMPTS", "120"))
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_pending: Optional[int] = None):
+        self._max_pending = max_pending or self.MAX_PENDING
+        # view / click：(user_id, task_id, type, day) -> 合并后的条目
+        self._coalesced: Dict[Tuple[str, int, str, datetime], PendingInteraction] = {}
+        # 其他类型逐条保留
+        self._events: List[PendingInteraction] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        # 缓存失效防抖：user_id -> 上次失效时间 / 计划失效时间（monotonic）
+        self._last_invalidated: Dict[str, float] = {}
+        self._pending_invalidations: Dict[str, float] = {}
+        self.stats = {"recorded": 0, "coalesced": 0, "dropped": 0, "inserted": 0, "updated": 0,
+                      "skipped_missing_task": 0, "failed": 0, "requeued": 0, "rejected": 0,
+                      "invalidations": 0}
+
+    @classmethod
+    def get_instance(cls) -> "InteractionLog":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        """启动后台 flush 线程"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="interaction-log")
+        self._thread.start()
+        logger.info("InteractionLog 已启动（每 %ds 落库）", self.FLUSH_INTERVAL)
+
+    def stop(self):
+        """停止后台线程并做最后一次 flush（到期前的缓存失效也一并执行）"""
+        if not self._running:
+            return
+        self._running = False
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        try:
+            self.flush(force_invalidate=True)
+        except Exception:
+            logger.exception("InteractionLog 最终 flush 失败")
+        logger.info("InteractionLog 已停止 %s", self.stats)
+
+    def record(
+        self,
+        user_id: str,
+        task_id: int,
+        interaction_type: str,
+        duration_seconds: Optional[int] = None,
+        device_type: Optional[str] = None,
+        metadata: Optional[dict] = None,
+    ) -> bool:
+        """追加一条交互，不做任何 I/O；缓冲已满时返回 False"""
+        now = get_utc_time()
+        item = PendingInteraction(user_id, task_id, interaction_type, now, duration_seconds, device_type, metadata)
+        with self._lock:
+            if interaction_type in COALESCED_TYPES:
+                key = (user_id, task_id, interaction_type, _day_start(now))
+                existing = self._coalesced.get(key)
+                if existing is not None:
+                    self._coalesced[key] = self._merge(existing, item)
+                    self.stats["coalesced"] += 1
+                    self.stats["recorded"] += 1
+                    return True
+            if len(self._coalesced) + len(self._events) >= self._max_pending:
+                self.stats["dropped"] += 1
+                return False
+            if interaction_type in COALESCED_TYPES:
+                self._coalesced[key] = item
+            else:
+                self._events.append(item)
+            self.stats["recorded"] += 1
+        return True
+
+    @staticmethod
+    def _merge(old: PendingInteraction, new: PendingInteraction) -> PendingInteraction:
+        return new._replace(
+            interaction_time=old.interaction_time,
+            duration_seconds=_longest_duration(old.duration_seconds, new.duration_seconds),
+            device_type=new.device_type or old.device_type,
+            metadata=new.metadata or old.metadata,
+            attempts=max(old.attempts, new.attempts),
+        )
+
+    def _requeue(self, items: List[PendingInteraction]) -> None:
+        """写入失败的条目放回缓冲等下次 flush；超过重试次数或缓冲已满时丢弃并计数"""
+        with self._lock:
+            for item in items:
+                item = item._replace(attempts=item.attempts + 1)
+                if item.attempts >= self.MAX_ATTEMPTS:
+                    self.stats["dropped"] += 1
+                    continue
+                if item.interaction_type in COALESCED_TYPES:
+                    key = (item.user_id, item.task_id, item.interaction_type, _day_start(item.interaction_time))
+                    newer = self._coalesced.get(key)
+                    if newer is not None:
+                        # 失败期间又记录了同一条：与新条目合并，保留较早的时间
+                        self._coalesced[key] = self._merge(item, newer)
+                        self.stats["requeued"] += 1
+                        continue
+                if len(self._coalesced) + len(self._events) >= self._max_pending:
+                    self.stats["dropped"] += 1
+                    continue
+                if item.interaction_type in COALESCED_TYPES:
+                    self._coalesced[key] = item
+                else:
+                    self._events.append(item)
+                self.stats["requeued"] += 1
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(timeout=self.FLUSH_INTERVAL):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("InteractionLog flush 失败")
+
+    def flush(self, db=None, force_invalidate: bool = False) -> int:
+        """
+        把缓冲写入数据库，返回写入（插入 + 更新）的条数
+
+        Args:
+            db: 使用的同步会话（默认新建 SessionLocal 并在结束时关闭）
+            force_invalidate: 忽略防抖，立即执行所有待失效的缓存
+        """
+        with self._flush_lock:
+            with self._lock:
+                coalesced = list(self._coalesced.values())
+                events = self._events
+                self._coalesced = {}
+                self._events = []
+
+            written = 0
+            if coalesced or events:
+                written = self._write_or_requeue(db, coalesced + events) or 0
+            self._run_due_invalidations(force=force_invalidate)
+            return written
+
+    def _write_or_requeue(self, db, items: List[PendingInteraction]) -> Optional[int]:
+        """写入一批；数据库不可用时放回缓冲并返回 None，内容被拒绝时二分隔离出错的条目"""
+        try:
+            return self._write(db, items)
+        except Exception as exc:
+            from app.services.behavior_collector import is_data_error
+
+            if is_data_error(exc):
+                return self._split_rejected(db, items, exc)
+            self.stats["failed"] += len(items)
+            logger.exception("批量写入用户交互失败（%d 条），放回缓冲稍后重试", len(items))
+            self._requeue(items)
+            return None
+
+    def _split_rejected(self, db, items: List[PendingInteraction], exc: Exception) -> Optional[int]:
+        """二分数据库拒绝的批次；单条仍被拒绝时丢弃并记录"""
+        if len(items) == 1:
+            item = items[0]
+            self.stats["rejected"] += 1
+            logger.error(
+                "丢弃数据库拒绝的交互记录 user=%s task=%s type=%s: %s",
+                item.user_id, item.task_id, item.interaction_type, exc,
+            )
+            return 0
+        mid = len(items) // 2
+        left = self._write_or_requeue(db, items[:mid])
+        if left is None:
+            # 拆分途中数据库不可用：未尝试的另一半一起放回缓冲
+            self._requeue(items[mid:])
+            return None
+        right = self._write_or_requeue(db, items[mid:])
+        return None if right is None else left + right
+
+    def _write(self, db, items: List[PendingInteraction]) -> int:
+        """一个事务写入一批交互；失败时回滚并抛出"""
+        from app.models import Task, UserTaskInteraction
+
+        coalesced = [item for item in items if item.interaction_type in COALESCED_TYPES]
+        events = [item for item in items if item.interaction_type not in COALESCED_TYPES]
+        own_session = db is None
+        if own_session:
+            from app.database import SessionLocal
+            db = SessionLocal()
+        try:
+            # 1. 一次查询过滤掉已不存在的任务（避免外键错误）
+            task_ids = {item.task_id for item in coalesced} | {item.task_id for item in events}
+            existing_tasks = set(db.execute(select(Task.id).where(Task.id.in_(task_ids))).scalars().all())
+            missing = [item for item in coalesced + events if item.task_id not in existing_tasks]
+            if missing:
+                self.stats["skipped_missing_task"] += len(missing)
+                logger.warning("跳过 %d 条任务已不存在的交互记录", len(missing))
+            coalesced = [item for item in coalesced if item.task_id in existing_tasks]
+            events = [item for item in events if item.task_id in existing_tasks]
+
+            # 2. view / click：当天已有记录的更新，其余插入
+            existing_rows: Dict[Tuple[str, int, str, datetime], Tuple[int, Optional[int], Optional[dict]]] = {}
+            if coalesced:
+                earliest_day = min(_day_start(item.interaction_time) for item in coalesced)
+                pairs = sorted({(item.user_id, item.task_id) for item in coalesced})
+                rows = db.execute(
+                    select(
+                        UserTaskInteraction.id,
+                        UserTaskInteraction.user_id,
+                        UserTaskInteraction.task_id,
+                        UserTaskInteraction.interaction_type,
+                        UserTaskInteraction.interaction_time,
+                        UserTaskInteraction.duration_seconds,
+                        UserTaskInteraction.interaction_metadata,
+                    ).where(
+                        UserTaskInteraction.interaction_type.in_(COALESCED_TYPES),
+                        UserTaskInteraction.interaction_time >= earliest_day,
+                        tuple_(UserTaskInteraction.user_id, UserTaskInteraction.task_id).in_(pairs),
+                    )
+                ).all()
+                for row in rows:
+                    existing_rows.setdefault(
+                        (row.user_id, row.task_id, row.interaction_type, _day_start(row.interaction_time)),
+                        (row.id, row.duration_seconds, row.interaction_metadata),
+                    )
+
+            updates = []
+            inserts = list(events)
+            for item in coalesced:
+                existing = existing_rows.get((item.user_id, item.task_id, item.interaction_type, _day_start(item.interaction_time)))
+                if existing is None:
+                    inserts.append(item)
+                else:
+                    # 与内存合并同一口径：不带时长 / 元数据的浏览不覆盖当天已记录的值
+                    row_id, old_duration, old_metadata = existing
+                    merged = item._replace(
+                        duration_seconds=_longest_duration(old_duration, item.duration_seconds),
+                        metadata=item.metadata or old_metadata,
+                    )
+                    updates.append((row_id, merged, old_duration))
+
+            if updates:
+                table = UserTaskInteraction.__table__
+                db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("row_id"))
+                    .values(
+                        duration_seconds=bindparam("new_duration"),
+                        metadata=bindparam("new_metadata"),
+                    ),
+                    [
+                        {"row_id": row_id, "new_duration": item.duration_seconds, "new_metadata": item.metadata}
+                        for row_id, item, _ in updates
+                    ],
+                )
+            if inserts:
+                db.execute(
+                    UserTaskInteraction.__table__.insert(),
+                    [
+                        {
+                            "user_id": item.user_id,
+                            "task_id": item.task_id,
+                            "interaction_type": item.interaction_type,
+                            "interaction_time": item.interaction_time,
+                            "duration_seconds": item.duration_seconds,
+                            "device_type": item.device_type,
+                            "metadata": item.metadata,
+                        }
+                        for item in inserts
+                    ],
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            if own_session:
+                db.close()
+            raise
+
+        try:
+            self._update_preference_vectors(db, inserts, updates)
+        finally:
+            if own_session:
+                db.close()
+
+        self.stats["inserted"] += len(inserts)
+        self.stats["updated"] += len(updates)
+
+        # 3. 只有新增记录才影响推荐（与原先口径一致）；按用户防抖
+        for user_id in {item.user_id for item in inserts}:
+            self._schedule_invalidation(user_id)
+
+        for user_id in {item.user_id for item in inserts if item.interaction_type in PREFERENCE_UPDATE_TYPES}:
+            try:
+                from app.recommendation_tasks import update_user_preferences_async
+                update_user_preferences_async(user_id)
+            except Exception as e:
+                logger.warning(f"异步更新用户偏好失败: {e}")
+
+        return len(inserts) + len(updates)
+
+    @staticmethod
+    def _update_preference_vectors(db, inserts: List[PendingInteraction], updates) -> None:
+        """
+        新增交互、以及当天浏览时长首次超过长浏览阈值的更新，增量写入用户偏好向量（单独一个事务）
+        """
+        from app.recommendation.preference_store import (
+            LONG_VIEW_SECONDS,
+            PREFERENCE_VECTOR_ENABLED,
+            apply_events,
+            event_from_interaction,
+        )
+
+        if not PREFERENCE_VECTOR_ENABLED:
+            return
+        items = list(inserts)
+        items.extend(
+            item for _, item, old_duration in updates
+            if item.interaction_type == "view"
+            and (item.duration_seconds or 0) > LONG_VIEW_SECONDS >= (old_duration or 0)
+        )
+        pref_events = [
+            event_from_interaction(
+                item.user_id, item.task_id, item.interaction_type, item.interaction_time,
+                item.duration_seconds, item.metadata,
+            )
+            for item in items
+        ]
+        pref_events = [e for e in pref_events if e is not None]
+        if not pref_events:
+            return
+        try:
+            apply_events(db.connection(), pref_events)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"增量更新用户偏好向量失败: {e}")
+
+    # ---- 推荐缓存失效（防抖） ----
+
+    def _schedule_invalidation(self, user_id: str):
+        if user_id in self._pending_invalidations:
+            return
+        last = self._last_invalidated.get(user_id)
+        now = time.monotonic()
+        due = now if last is None else max(now, last + self.INVALIDATE_DEBOUNCE)
+        self._pending_invalidations[user_id] = due
+
+    def _run_due_invalidations(self, force: bool = False):
+        now = time.monotonic()
+        due_users = [uid for uid, due in self._pending_invalidations.items() if force or due <= now]
+        for user_id in due_users:
+            del self._pending_invalidations[user_id]
+            self._last_invalidated[user_id] = now
+            self._invalidate_cache(user_id)
+            self.stats["invalidations"] += 1
+        # 防抖记录只需保留一个窗口
+        cutoff = now - self.INVALIDATE_DEBOUNCE
+        if len(self._last_invalidated) > 10000:
+            self._last_invalidated = {uid: t for uid, t in self._last_invalidated.items() if t > cutoff}
+
+    @staticmethod
+    def _invalidate_cache(user_id: str):
+        """清除用户推荐相关缓存"""
+        from app.redis_cache import redis_cache
+
+        for pattern in (f"recommendations:{user_id}:*", f"user_interactions:{user_id}*"):
+            try:
+                redis_cache.delete_pattern(pattern)
+            except Exception as e:
+                logger.warning(f"清除缓存失败: {e}")
+
+
+def get_interaction_log() -> InteractionLog:
+    return InteractionLog.get_instance()
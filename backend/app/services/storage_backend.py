@@ -3,16 +3,35 @@
 支持本地文件存储和云存储（AWS S3、Cloudflare R2）
 """
 
+import asyncio
 import os
 import logging
 import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, BinaryIO
+from typing import Optional, List, BinaryIO, Iterable, Iterator, AsyncIterator, Tuple
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# S3 客户端连接池大小（boto3 默认 10，批量移动 / 并发上传时会排队等待连接）
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+
+# S3 连接 / 读取超时（秒）与重试次数
+S3_CONNECT_TIMEOUT = int(os.getenv("S3_CONNECT_TIMEOUT", "5"))
+S3_READ_TIMEOUT = int(os.getenv("S3_READ_TIMEOUT", "30"))
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "3"))
+
+# 批量移动时并行服务端复制的线程数
+S3_MOVE_CONCURRENCY = int(os.getenv("S3_MOVE_CONCURRENCY", "8"))
+
+# DeleteObjects 单次请求的 key 上限（S3 / R2 协议限制）
+S3_DELETE_BATCH_SIZE = 1000
+
+# 分页列举默认每页对象数（list_objects_v2 单页上限 1000）
+LIST_PAGE_SIZE = 1000
+
 
 class StorageBackend(ABC):
     """存储后端抽象基类"""
@@ -31,6 +50,19 @@ class StorageBackend(ABC):
         """
         pass
     
+    def upload_fileobj(self, fileobj: BinaryIO, path: str) -> str:
+        """
+        以流的方式上传文件（默认实现读入内存后调用 upload，子类应覆盖）
+        
+        Args:
+            fileobj: 可读的文件对象（从当前位置读到结尾）
+            path: 存储路径（相对路径）
+            
+        Returns:
+            访问 URL
+        """
+        return self.upload(fileobj.read(), path)
+    
     @abstractmethod
     def download(self, path: str) -> Optional[bytes]:
         """
@@ -110,6 +142,52 @@ class StorageBackend(ABC):
         """
         pass
     
+    def delete_many(self, paths: Iterable[str]) -> int:
+        """
+        批量删除文件（默认逐个调用 delete，子类可覆盖为批量 API）
+        
+        Args:
+            paths: 存储路径列表（相对路径）
+            
+        Returns:
+            成功删除的文件数
+        """
+        return sum(1 for path in paths if path and self.delete(path))
+    
+    def move_many(self, moves: List[Tuple[str, str]]) -> List[bool]:
+        """
+        批量移动文件（默认逐个调用 move，子类可覆盖为并行实现）
+        
+        Args:
+            moves: [(源路径, 目标路径)]
+            
+        Returns:
+            与 moves 一一对应的是否成功
+        """
+        return [self.move(src, dst) for src, dst in moves]
+    
+    def iter_files_with_metadata(self, directory: str, page_size: int = LIST_PAGE_SIZE) -> Iterator[List[dict]]:
+        """
+        分页列出目录中的文件及元数据（默认一次性列出后切分，子类可覆盖为真正的分页）
+        
+        Yields:
+            每页一个 list，元素为 {'key', 'last_modified', 'size'}
+        """
+        files = self.list_files_with_metadata(directory)
+        for i in range(0, len(files), page_size):
+            yield files[i:i + page_size]
+    
+    async def alist_files_with_metadata(
+        self, directory: str, page_size: int = LIST_PAGE_SIZE
+    ) -> AsyncIterator[List[dict]]:
+        """异步分页列出：每一页在线程中获取，不阻塞事件循环，调用方可边列边处理"""
+        pages = self.iter_files_with_metadata(directory, page_size)
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return
+            yield page
+    
     @abstractmethod
     def get_url(self, path: str) -> str:
         """
@@ -209,6 +287,23 @@ class LocalStorageBackend(StorageBackend):
             logger.error(f"文件上传失败: {path}, 错误: {e}")
             raise
     
+    def upload_fileobj(self, fileobj: BinaryIO, path: str) -> str:
+        """流式写入本地文件（分块复制，不整体读入内存）"""
+        try:
+            import shutil
+            full_path = self._get_full_path(path)
+            self._ensure_directory(full_path)
+            
+            with open(full_path, 'wb') as f:
+                shutil.copyfileobj(fileobj, f)
+            
+            logger.debug(f"文件上传成功: {path}")
+            return self.get_url(path)
+            
+        except Exception as e:
+            logger.error(f"文件上传失败: {path}, 错误: {e}")
+            raise
+    
     def download(self, path: str) -> Optional[bytes]:
         """从本地下载文件"""
         try:
@@ -408,24 +503,36 @@ class S3StorageBackend(StorageBackend):
         
         # 延迟初始化 S3 客户端
         self._client = None
+        self._client_lock = threading.Lock()
+        self._transfer_config = None
         
         logger.info(f"S3 存储后端初始化: bucket={bucket_name}, endpoint={self.endpoint_url}")
     
     @property
     def client(self):
-        """延迟初始化 S3 客户端"""
+        """延迟初始化 S3 客户端（连接池按并发量调大，启用 keepalive 复用连接）"""
         if self._client is None:
-            try:
-                import boto3
-                self._client = boto3.client(
-                    's3',
-                    aws_access_key_id=self.access_key_id,
-                    aws_secret_access_key=self.secret_access_key,
-                    endpoint_url=self.endpoint_url,
-                    region_name=self.region_name
-                )
-            except ImportError:
-                raise ImportError("请安装 boto3: pip install boto3")
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        import boto3
+                        from botocore.config import Config as BotoConfig
+                    except ImportError:
+                        raise ImportError("请安装 boto3: pip install boto3")
+                    self._client = boto3.client(
+                        's3',
+                        aws_access_key_id=self.access_key_id,
+                        aws_secret_access_key=self.secret_access_key,
+                        endpoint_url=self.endpoint_url,
+                        region_name=self.region_name,
+                        config=BotoConfig(
+                            max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                            connect_timeout=S3_CONNECT_TIMEOUT,
+                            read_timeout=S3_READ_TIMEOUT,
+                            retries={'max_attempts': S3_MAX_ATTEMPTS, 'mode': 'standard'},
+                            tcp_keepalive=True,
+                        ),
+                    )
         return self._client
     
     # 🔒 安全修复：允许上传的 MIME 类型白名单
@@ -476,6 +583,56 @@ class S3StorageBackend(StorageBackend):
             logger.error(f"S3 文件上传失败: {path}, 错误: {e}")
             raise
     
+    # 流式上传：超过阈值走 multipart，每个分片独立上传，内存占用 ≈ 分片大小 × 并发数
+    MULTIPART_THRESHOLD = 8 * 1024 * 1024
+    MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+    MULTIPART_MAX_CONCURRENCY = 4
+    
+    @property
+    def transfer_config(self):
+        """boto3 TransferConfig（延迟创建）"""
+        if getattr(self, '_transfer_config', None) is None:
+            from boto3.s3.transfer import TransferConfig
+            self._transfer_config = TransferConfig(
+                multipart_threshold=self.MULTIPART_THRESHOLD,
+                multipart_chunksize=self.MULTIPART_CHUNKSIZE,
+                max_concurrency=self.MULTIPART_MAX_CONCURRENCY,
+            )
+        return self._transfer_config
+    
+    def upload_fileobj(self, fileobj: BinaryIO, path: str) -> str:
+        """流式上传文件到 S3（大文件自动使用 multipart upload）"""
+        try:
+            path = path.lstrip('/')
+            
+            # 🔒 文件大小检查（通过 seek 测量，不读取内容）
+            start = fileobj.tell()
+            fileobj.seek(0, os.SEEK_END)
+            size = fileobj.tell() - start
+            fileobj.seek(start)
+            if size > self.MAX_FILE_SIZE:
+                raise ValueError(f"文件过大: {size} 字节，上限 {self.MAX_FILE_SIZE} 字节")
+            
+            content_type = self._get_content_type(path)
+            if content_type not in self.ALLOWED_CONTENT_TYPES:
+                logger.warning(f"不允许的 Content-Type: {content_type}，文件: {path}")
+                raise ValueError(f"不允许的文件类型: {content_type}")
+            
+            self.client.upload_fileobj(
+                fileobj,
+                self.bucket_name,
+                path,
+                ExtraArgs={'ContentType': content_type, 'ACL': 'private'},
+                Config=self.transfer_config,
+            )
+            
+            logger.debug(f"S3 文件流式上传成功: {path}, size={size}")
+            return self.get_url(path)
+            
+        except Exception as e:
+            logger.error(f"S3 文件上传失败: {path}, 错误: {e}")
+            raise
+    
     def download(self, path: str) -> Optional[bytes]:
         """从 S3 下载文件"""
         try:
@@ -510,27 +667,42 @@ class S3StorageBackend(StorageBackend):
             logger.error(f"S3 文件删除失败: {path}, 错误: {e}")
             return False
     
+    def delete_many(self, paths: Iterable[str]) -> int:
+        """批量删除 S3 文件（DeleteObjects，每次最多 1000 个 key）"""
+        keys = [p.lstrip('/') for p in paths if p]
+        deleted = 0
+        
+        for i in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            batch = keys[i:i + S3_DELETE_BATCH_SIZE]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+            except Exception as e:
+                logger.error(f"S3 批量删除失败: {len(batch)} 个文件, 错误: {e}")
+                continue
+            
+            errors = response.get('Errors', [])
+            for err in errors[:10]:
+                logger.warning(f"S3 文件删除失败: {err.get('Key')}, 错误: {err.get('Code')} {err.get('Message')}")
+            deleted += len(batch) - len(errors)
+        
+        if deleted:
+            logger.debug(f"S3 批量删除成功: {deleted}/{len(keys)} 个文件")
+        return deleted
+    
     def delete_directory(self, path: str) -> bool:
-        """删除 S3 目录（前缀）下的所有文件"""
+        """删除 S3 目录（前缀）下的所有文件（边列举边按页批量删除）"""
         try:
             path = path.lstrip('/').rstrip('/') + '/'
             
-            # 列出所有匹配的对象
-            paginator = self.client.get_paginator('list_objects_v2')
-            
-            objects_to_delete = []
-            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=path):
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        objects_to_delete.append({'Key': obj['Key']})
+            total = 0
+            for page in self._iter_object_pages(path):
+                total += self.delete_many([obj['Key'] for obj in page])
             
-            if objects_to_delete:
-                # 批量删除
-                self.client.delete_objects(
-                    Bucket=self.bucket_name,
-                    Delete={'Objects': objects_to_delete}
-                )
-                logger.debug(f"S3 目录删除成功: {path}, 共 {len(objects_to_delete)} 个文件")
+            if total:
+                logger.debug(f"S3 目录删除成功: {path}, 共 {total} 个文件")
             
             return True
             
@@ -552,18 +724,26 @@ class S3StorageBackend(StorageBackend):
         except Exception:
             return False
     
+    def _iter_object_pages(self, prefix: str, page_size: int = LIST_PAGE_SIZE) -> Iterator[List[dict]]:
+        """按页列举前缀下的对象（list_objects_v2 原始对象字典），只在迭代时发请求"""
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=prefix,
+            PaginationConfig={'PageSize': page_size}
+        ):
+            contents = page.get('Contents')
+            if contents:
+                yield contents
+    
     def list_files(self, directory: str) -> List[str]:
         """列出 S3 目录中的文件"""
         try:
             directory = directory.lstrip('/').rstrip('/') + '/'
             
             files = []
-            paginator = self.client.get_paginator('list_objects_v2')
-            
-            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=directory):
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        files.append(obj['Key'])
+            for page in self._iter_object_pages(directory):
+                files.extend(obj['Key'] for obj in page)
             
             return files
             
@@ -579,58 +759,60 @@ class S3StorageBackend(StorageBackend):
             List of dicts with keys: 'key', 'last_modified', 'size'
         """
         try:
-            directory = directory.lstrip('/').rstrip('/') + '/'
-            
             files = []
-            paginator = self.client.get_paginator('list_objects_v2')
-            
-            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=directory):
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        files.append({
-                            'key': obj['Key'],
-                            'last_modified': obj['LastModified'],
-                            'size': obj.get('Size', 0)
-                        })
-            
+            for page in self.iter_files_with_metadata(directory):
+                files.extend(page)
             return files
             
         except Exception as e:
             logger.error(f"S3 列出目录（含元数据）失败: {directory}, 错误: {e}")
             return []
     
-    def move(self, src_path: str, dst_path: str) -> bool:
-        """移动 S3 文件（复制后删除）"""
+    def iter_files_with_metadata(self, directory: str, page_size: int = LIST_PAGE_SIZE) -> Iterator[List[dict]]:
+        """分页列出 S3 目录中的文件及元数据（每页一次 list_objects_v2 请求）"""
+        directory = directory.lstrip('/').rstrip('/') + '/'
+        for page in self._iter_object_pages(directory, page_size):
+            yield [
+                {
+                    'key': obj['Key'],
+                    'last_modified': obj['LastModified'],
+                    'size': obj.get('Size', 0)
+                }
+                for obj in page
+            ]
+    
+    def _copy_object(self, src_path: str, dst_path: str) -> bool:
+        """服务端复制；源文件不存在返回 False，其他错误抛出"""
         try:
-            src_path = src_path.lstrip('/')
-            dst_path = dst_path.lstrip('/')
-            
-            # 先检查源文件是否存在
-            try:
-                self.client.head_object(Bucket=self.bucket_name, Key=src_path)
-                logger.debug(f"S3 源文件存在: {src_path}")
-            except self.client.exceptions.ClientError as e:
-                error_code = e.response.get('Error', {}).get('Code', '')
-                if error_code == '404' or error_code == 'NoSuchKey':
-                    logger.error(f"S3 源文件不存在: {src_path}, bucket={self.bucket_name}")
-                    # 尝试列出目录中的文件，帮助调试
-                    try:
-                        directory = '/'.join(src_path.split('/')[:-1]) + '/'
-                        files = self.list_files(directory)
-                        logger.error(f"目录 {directory} 中的文件: {files[:10]}")  # 只显示前10个
-                    except Exception as list_error:
-                        logger.error(f"列出目录失败: {list_error}")
-                    return False
-                else:
-                    logger.warning(f"S3 检查源文件时出错: {src_path}, 错误: {e}")
-                    # 继续尝试移动，可能是权限问题
-            
-            # 复制文件
             self.client.copy_object(
                 Bucket=self.bucket_name,
                 CopySource={'Bucket': self.bucket_name, 'Key': src_path},
                 Key=dst_path
             )
+            return True
+        except self.client.exceptions.ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', '')
+            if error_code not in ('404', 'NoSuchKey'):
+                raise
+            logger.error(f"S3 源文件不存在: {src_path}, bucket={self.bucket_name}")
+            # 尝试列出目录中的文件，帮助调试
+            try:
+                directory = '/'.join(src_path.split('/')[:-1]) + '/'
+                files = self.list_files(directory)
+                logger.error(f"目录 {directory} 中的文件: {files[:10]}")  # 只显示前10个
+            except Exception as list_error:
+                logger.error(f"列出目录失败: {list_error}")
+            return False
+    
+    def move(self, src_path: str, dst_path: str) -> bool:
+        """移动 S3 文件（复制后删除；源不存在时由复制请求直接报告，不再额外 HEAD）"""
+        try:
+            src_path = src_path.lstrip('/')
+            dst_path = dst_path.lstrip('/')
+            
+            # 复制文件
+            if not self._copy_object(src_path, dst_path):
+                return False
             
             # 删除原文件
             self.client.delete_object(
@@ -647,6 +829,30 @@ class S3StorageBackend(StorageBackend):
             logger.error(f"详细错误: {traceback.format_exc()}")
             return False
     
+    def move_many(self, moves: List[Tuple[str, str]]) -> List[bool]:
+        """批量移动 S3 文件：并行服务端复制，成功的源文件用一次 DeleteObjects 删除"""
+        if not moves:
+            return []
+        pairs = [(src.lstrip('/'), dst.lstrip('/')) for src, dst in moves]
+        
+        def _copy(pair: Tuple[str, str]) -> bool:
+            try:
+                return self._copy_object(*pair)
+            except Exception as e:
+                logger.error(f"S3 文件复制失败: {pair[0]} -> {pair[1]}, 错误: {e}")
+                return False
+        
+        workers = min(S3_MOVE_CONCURRENCY, len(pairs))
+        if workers <= 1:
+            copied = [_copy(pair) for pair in pairs]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-move") as pool:
+                copied = list(pool.map(_copy, pairs))
+        
+        self.delete_many([src for (src, _), ok in zip(pairs, copied) if ok])
+        logger.info(f"S3 批量移动完成: {sum(copied)}/{len(pairs)} 个文件")
+        return copied
+    
     def get_url(self, path: str) -> str:
         """获取 S3 文件的访问 URL"""
         path = path.lstrip('/')
@@ -0,0 +1,323 @@
+"""
+存储清单（storage_objects）
+记录 ImageUploadService 上传的每个对象（归属实体、路径、大小），让孤儿文件清理变成增量操作
+
+- 上传时写入一行；移出临时目录时更新路径和实体 ID；服务层删除时同步删除行
+- 实体删除时由 app.event_listeners 的 after_delete 钩子写入 orphaned_at（与删除同一事务）
+- 清理任务只处理 orphaned_at 已过宽限期的行（部分索引），按目录删除对象
+- 绕过 ORM 的批量删除不会触发钩子，由抽样对账兜底：每轮按 id 游标取一段清单，
+  按实体类型批量主键查询，缺失的实体标记为孤儿；整数主键的实体类型跳过非数字目录名
+
+清单写入是尽力而为：数据库异常只记录日志，不影响上传本身。
+"""
+
+import logging
+import os
+import posixpath
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+
+from app.utils.time_utils import get_utc_time
+
+logger = logging.getLogger(__name__)
+
+# 是否启用存储清单
+STORAGE_MANIFEST_ENABLED = os.getenv("STORAGE_MANIFEST_ENABLED", "true").lower() == "true"
+
+# 实体删除后保留文件的宽限期（秒），给事务回滚 / 误删恢复留出时间
+STORAGE_MANIFEST_ORPHAN_GRACE = int(os.getenv("STORAGE_MANIFEST_ORPHAN_GRACE", "3600"))
+
+# 未被移出临时目录的上传在清单中保留的小时数
+STORAGE_MANIFEST_TEMP_RETENTION_HOURS = int(os.getenv("STORAGE_MANIFEST_TEMP_RETENTION_HOURS", "48"))
+
+# 上传目录 -> 实体类型（目录名即实体 ID）
+CATEGORY_ENTITY_TYPES: Dict[str, str] = {
+    "public/images/public": "task",
+    "private_images/tasks": "task",
+    "private_files/tasks": "task",
+    "private_images/chats": "cs_chat",
+    "private_files/chats": "cs_chat",
+    "flea_market": "flea_market_item",
+    "public/images/leaderboard_items": "leaderboard_item",
+    "public/images/leaderboard_covers": "leaderboard",
+    "public/images/banner": "banner",
+    "public/images/expert_avatars": "user",
+    "public/images/service_images": "user",
+    "public/images/forum_posts": "forum_post",
+    "public/files/forum_posts": "forum_post",
+}
+
+# 实体类型 -> (models 中的模型名, 主键列名, 主键是否为整数)
+ENTITY_KEYS: Dict[str, Tuple[str, str, bool]] = {
+    "task": ("Task", "id", True),
+    "cs_chat": ("CustomerServiceChat", "chat_id", False),
+    "flea_market_item": ("FleaMarketItem", "id", True),
+    "leaderboard_item": ("LeaderboardItem", "id", True),
+    "leaderboard": ("CustomLeaderboard", "id", True),
+    "banner": ("Banner", "id", True),
+    "user": ("User", "id", False),
+    "forum_post": ("ForumPost", "id", True),
+}
+
+
+def entity_type_for_category(category_value: str) -> str:
+    """上传目录对应的实体类型；未登记的目录以目录名作为类型（只记录，不参与对账）"""
+    return CATEGORY_ENTITY_TYPES.get(category_value, category_value.rsplit("/", 1)[-1])
+
+
+def _entity_dir(path: str) -> str:
+    """对象所在的实体目录（{category}/{entity_id}），缩略图与原图同目录"""
+    return posixpath.dirname(path)
+
+
+class StorageManifest:
+    """存储清单读写与对账"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Any]] = None,
+        enabled: bool = STORAGE_MANIFEST_ENABLED,
+    ):
+        """
+        Args:
+            session_factory: 返回同步 Session 的工厂，默认使用 app.database.SessionLocal
+            enabled: 是否启用（禁用时所有写入为空操作）
+        """
+        self._session_factory = session_factory
+        self.enabled = enabled
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    # ==================== 写入 ====================
+
+    def record(
+        self,
+        path: str,
+        category_value: str,
+        entity_id: Optional[str],
+        owner_user_id: Optional[str],
+        size: int,
+    ) -> None:
+        """记录一次上传（entity_id 为 None 表示临时上传）"""
+        if not self.enabled:
+            return
+        from app.models import StorageObject
+
+        try:
+            with self._session() as db:
+                db.add(StorageObject(
+                    path=path,
+                    entity_type=entity_type_for_category(category_value),
+                    entity_id=str(entity_id) if entity_id is not None else None,
+                    owner_user_id=owner_user_id,
+                    size=size,
+                ))
+                db.commit()
+        except Exception as e:
+            logger.warning(f"写入存储清单失败 {path}: {e}")
+
+    def move(self, moves: List[Tuple[str, str]], entity_id: str) -> None:
+        """对象从临时目录移到正式目录后更新路径和实体 ID"""
+        if not self.enabled or not moves:
+            return
+        from app.models import StorageObject
+
+        try:
+            with self._session() as db:
+                for src, dst in moves:
+                    db.execute(
+                        update(StorageObject)
+                        .where(StorageObject.path == src)
+                        .values(path=dst, entity_id=str(entity_id))
+                    )
+                db.commit()
+        except Exception as e:
+            logger.warning(f"更新存储清单失败 {entity_id}: {e}")
+
+    def forget(self, paths: Iterable[str] = (), prefix: Optional[str] = None) -> None:
+        """对象已被删除：移除对应清单行（指定路径，或某个目录前缀下的全部行）"""
+        paths = list(paths)
+        if not self.enabled or (not paths and not prefix):
+            return
+        from app.models import StorageObject
+
+        try:
+            with self._session() as db:
+                if paths:
+                    db.execute(delete(StorageObject).where(StorageObject.path.in_(paths)))
+                if prefix:
+                    db.execute(
+                        delete(StorageObject).where(
+                            StorageObject.path.startswith(prefix.rstrip("/") + "/", autoescape=True)
+                        )
+                    )
+                db.commit()
+        except Exception as e:
+            logger.warning(f"删除存储清单失败: {e}")
+
+    # ==================== 对账 ====================
+
+    def reconcile_orphans(self, storage, limit: int = 500) -> int:
+        """
+        删除已标记为孤儿且过了宽限期的对象，以及过期未使用的临时上传
+
+        Args:
+            storage: 存储后端
+            limit: 单次最多处理的清单行数
+
+        Returns:
+            删除的目录数 + 临时对象数
+        """
+        if not self.enabled:
+            return 0
+        from app.models import StorageObject
+
+        now = get_utc_time()
+        orphan_cutoff = now - timedelta(seconds=STORAGE_MANIFEST_ORPHAN_GRACE)
+        temp_cutoff = now - timedelta(hours=STORAGE_MANIFEST_TEMP_RETENTION_HOURS)
+        removed = 0
+
+        with self._session() as db:
+            rows = db.execute(
+                select(StorageObject.id, StorageObject.path)
+                .where(StorageObject.orphaned_at.isnot(None))
+                .where(StorageObject.orphaned_at <= orphan_cutoff)
+                .order_by(StorageObject.orphaned_at)
+                .limit(limit)
+            ).all()
+
+            # 同一实体的对象在同一目录下，整目录删除（连同缩略图与清单外的旧文件）
+            dirs: Dict[str, List[int]] = defaultdict(list)
+            for row_id, path in rows:
+                dirs[_entity_dir(path)].append(row_id)
+
+            for dir_path, row_ids in dirs.items():
+                try:
+                    storage.delete_directory(dir_path)
+                except Exception as e:
+                    logger.warning(f"删除孤儿目录失败 {dir_path}: {e}")
+                    continue
+                db.execute(delete(StorageObject).where(StorageObject.id.in_(row_ids)))
+                removed += 1
+                logger.info(f"删除已删除实体的存储目录: {dir_path}（{len(row_ids)} 个清单对象）")
+
+            temp_rows = db.execute(
+                select(StorageObject.id, StorageObject.path)
+                .where(StorageObject.entity_id.is_(None))
+                .where(StorageObject.created_at <= temp_cutoff)
+                .limit(limit)
+            ).all()
+            done_ids = []
+            for row_id, path in temp_rows:
+                try:
+                    storage.delete(path)
+                except Exception as e:
+                    logger.warning(f"删除过期临时对象失败 {path}: {e}")
+                    continue
+                done_ids.append(row_id)
+            if done_ids:
+                db.execute(delete(StorageObject).where(StorageObject.id.in_(done_ids)))
+                removed += len(done_ids)
+
+            db.commit()
+
+        return removed
+
+    def sample_reconcile(self, cursor: int = 0, sample_size: int = 1000) -> Tuple[int, int]:
+        """
+        抽样全量对账：从 id > cursor 开始取一段清单，检查归属实体是否仍存在
+
+        Args:
+            cursor: 上一轮返回的游标（0 表示从头开始）
+            sample_size: 本轮检查的清单行数
+
+        Returns:
+            (新标记的孤儿行数, 下一轮游标；扫到末尾时回到 0)
+        """
+        if not self.enabled:
+            return 0, 0
+        from app import models
+        from app.models import StorageObject
+
+        marked = 0
+        with self._session() as db:
+            rows = db.execute(
+                select(StorageObject.id, StorageObject.entity_type, StorageObject.entity_id)
+                .where(StorageObject.id > cursor)
+                .where(StorageObject.orphaned_at.is_(None))
+                .where(StorageObject.entity_id.isnot(None))
+                .order_by(StorageObject.id)
+                .limit(sample_size)
+            ).all()
+            if not rows:
+                return 0, 0
+
+            by_type: Dict[str, set] = defaultdict(set)
+            for _, entity_type, entity_id in rows:
+                if entity_type in ENTITY_KEYS:
+                    by_type[entity_type].add(entity_id)
+
+            now = get_utc_time()
+            for entity_type, entity_ids in by_type.items():
+                model_name, key_name, int_key = ENTITY_KEYS[entity_type]
+                key_col = getattr(getattr(models, model_name), key_name)
+                if int_key:
+                    # 非数字目录名（如 "S0012" 这类格式化 ID）对不上整数主键：无法判断，不标记
+                    keys = {v: int(v) for v in entity_ids if v.isdigit()}
+                else:
+                    keys = {v: v for v in entity_ids}
+                if not keys:
+                    continue
+                existing = {v for (v,) in db.execute(select(key_col).where(key_col.in_(set(keys.values())))).all()}
+                missing = {v for v, key in keys.items() if key not in existing}
+                if not missing:
+                    continue
+                result = db.execute(
+                    update(StorageObject)
+                    .where(StorageObject.entity_type == entity_type)
+                    .where(StorageObject.entity_id.in_(missing))
+                    .where(StorageObject.orphaned_at.is_(None))
+                    .values(orphaned_at=now)
+                )
+                marked += result.rowcount or 0
+
+            db.commit()
+
+        next_cursor = rows[-1][0] if len(rows) >= sample_size else 0
+        return marked, next_cursor
+
+
+def mark_entity_deleted(connection, entity_type: str, entity_id: Any) -> None:
+    """实体删除钩子：在删除实体的同一连接 / 事务里把其清单行标记为孤儿"""
+    from app.models import StorageObject
+
+    connection.execute(
+        update(StorageObject.__table__)
+        .where(StorageObject.__table__.c.entity_type == entity_type)
+        .where(StorageObject.__table__.c.entity_id == str(entity_id))
+        .where(StorageObject.__table__.c.orphaned_at.is_(None))
+        .values(orphaned_at=get_utc_time())
+    )
+
+
+# 全局清单实例（延迟初始化，线程安全）
+_storage_manifest: Optional[StorageManifest] = None
+_manifest_lock = threading.Lock()
+
+
+def get_storage_manifest() -> StorageManifest:
+    """获取存储清单实例（线程安全）"""
+    global _storage_manifest
+    if _storage_manifest is None:
+        with _manifest_lock:
+            if _storage_manifest is None:
+                _storage_manifest = StorageManifest()
+    return _storage_manifest
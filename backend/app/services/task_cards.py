@@ -0,0 +1,182 @@
+"""
+推荐用任务卡片缓存（task card）
+推荐结果缓存里只存 task_id / score / reason，命中后原先每次都要 `query(Task).filter(id IN ...)` 取完整 ORM 行。
+这里把推荐响应渲染用到的列做成紧凑的元组记录（TaskCard，NamedTuple），按任务 ID 存在 Redis：
+
+- 读取：get_many 一次 MGET 取回整页卡片；未命中的用一条只查这些列的投影查询补齐，
+  再用 pipeline 回填（SETEX）
+- 存储：task_card:v1:{id} → JSON 数组（与 TASK_CARD_FIELDS 顺序一致）；字段变化时递增版本前缀
+- 失效：Task 的 ORM 更新 / 删除在 commit 后由 app.event_listeners 删除对应卡片；
+  绕过 ORM 的批量 UPDATE 依赖 TTL（TASK_CARD_TTL，默认 10 分钟）收敛
+- TaskCard 的属性名与 Task 列同名，读取 item["task"].title 等字段的调用方无需改动；
+  需要关系属性或写入时请按 ID 加载 ORM 对象
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+TASK_CARD_CACHE_ENABLED = os.getenv("TASK_CARD_CACHE_ENABLED", "true").lower() == "true"
+
+# Redis 中卡片的 TTL（秒）：决定绕过 ORM 的写入最长多久后可见
+TASK_CARD_TTL = int(os.getenv("TASK_CARD_TTL", "600"))
+
+TASK_CARD_KEY_PREFIX = "task_card:v1:"
+
+
+class TaskCard(NamedTuple):
+    """推荐响应渲染用的任务列（只读）"""
+    id: int
+    title: Optional[str]
+    title_zh: Optional[str]
+    title_en: Optional[str]
+    description: Optional[str]
+    description_zh: Optional[str]
+    description_en: Optional[str]
+    task_type: Optional[str]
+    location: Optional[str]
+    reward: Optional[float]
+    base_reward: Optional[float]
+    agreed_reward: Optional[float]
+    reward_to_be_quoted: Optional[bool]
+    currency: Optional[str]
+    deadline: Optional[datetime]
+    task_level: Optional[str]
+    status: Optional[str]
+    is_visible: Optional[bool]
+    poster_id: Optional[str]
+    created_at: Optional[datetime]
+    images: Any
+
+
+TASK_CARD_FIELDS = TaskCard._fields
+
+_DATETIME_FIELDS = frozenset({"deadline", "created_at"})
+_DATETIME_INDEXES = tuple(TASK_CARD_FIELDS.index(name) for name in _DATETIME_FIELDS)
+
+
+def card_key(task_id: int) -> str:
+    return f"{TASK_CARD_KEY_PREFIX}{task_id}"
+
+
+def card_from_row(row: Iterable[Any]) -> TaskCard:
+    """投影查询的一行（列顺序同 TASK_CARD_FIELDS）或 ORM Task 的取值 → TaskCard"""
+    return TaskCard._make(float(v) if isinstance(v, Decimal) else v for v in row)
+
+
+def card_from_task(task: models.Task) -> TaskCard:
+    return card_from_row(getattr(task, name, None) for name in TASK_CARD_FIELDS)
+
+
+def encode_card(card: TaskCard) -> str:
+    return json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in card],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def decode_card(raw) -> Optional[TaskCard]:
+    try:
+        values = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != len(TASK_CARD_FIELDS):
+        return None
+    for index in _DATETIME_INDEXES:
+        if isinstance(values[index], str):
+            values[index] = datetime.fromisoformat(values[index])
+    return TaskCard._make(values)
+
+
+class TaskCardCache:
+    """按任务 ID 的卡片缓存：MGET 读取、投影查询补齐、pipeline 回填"""
+
+    def __init__(self, ttl: int = TASK_CARD_TTL, redis_client: Any = None):
+        self.ttl = ttl
+        self._redis_client = redis_client
+        self.stats = {"hits": 0, "misses": 0, "invalidated": 0}
+
+    def _redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        from app.redis_cache import get_redis_client
+        return get_redis_client()
+
+    def get_many(self, db, task_ids: Iterable[int]) -> Dict[int, TaskCard]:
+        """取一批任务的卡片；返回 {task_id: TaskCard}，不存在的任务不在结果中"""
+        ids = list(dict.fromkeys(task_ids))
+        if not ids:
+            return {}
+        cards: Dict[int, TaskCard] = {}
+        client = self._redis() if TASK_CARD_CACHE_ENABLED else None
+        if client is not None:
+            try:
+                for task_id, raw in zip(ids, client.mget([card_key(i) for i in ids])):
+                    card = decode_card(raw) if raw else None
+                    if card is not None:
+                        cards[task_id] = card
+            except Exception as e:
+                logger.debug(f"读取任务卡片缓存失败: {e}")
+
+        missing = [i for i in ids if i not in cards]
+        self.stats["hits"] += len(cards)
+        self.stats["misses"] += len(missing)
+        if not missing:
+            return cards
+
+        columns = [getattr(models.Task, name) for name in TASK_CARD_FIELDS]
+        loaded = [card_from_row(row) for row in db.query(*columns).filter(models.Task.id.in_(missing)).all()]
+        for card in loaded:
+            cards[card.id] = card
+        if client is not None and loaded:
+            self._put_many(client, loaded)
+        return cards
+
+    def _put_many(self, client, cards: List[TaskCard]) -> None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for card in cards:
+                pipe.setex(card_key(card.id), self.ttl, encode_card(card))
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"写入任务卡片缓存失败: {e}")
+
+    def invalidate(self, task_ids: Iterable[int]) -> None:
+        keys = [card_key(i) for i in task_ids]
+        if not keys:
+            return
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            client.delete(*keys)
+            self.stats["invalidated"] += len(keys)
+        except Exception as e:
+            logger.warning(f"删除任务卡片缓存失败: {e}")
+
+
+# 全局缓存实例（延迟初始化，线程安全）
+_task_card_cache: Optional[TaskCardCache] = None
+_task_card_cache_lock = threading.Lock()
+
+
+def get_task_card_cache() -> TaskCardCache:
+    global _task_card_cache
+    if _task_card_cache is None:
+        with _task_card_cache_lock:
+            if _task_card_cache is None:
+                _task_card_cache = TaskCardCache()
+    return _task_card_cache
+
+
+def invalidate_task_cards(task_ids: Iterable[int]) -> None:
+    get_task_card_cache().invalidate(task_ids)
@@ -0,0 +1,296 @@
+"""
+浏览数 Redis 增量（overlay）
+详情页浏览时只在 Redis 累加增量，定时任务批量落库；列表页显示 "数据库值 + 未落库增量"。
+
+原先每个实体一个键（forum:post:view_count:{id} 等），列表页要逐条 GET 或拼 MGET。
+这里每种实体一个哈希（view_counts:{entity}，字段为实体 ID），
+一页的增量用一次 HMGET 读出，落库时一次 HGETALL 读出全部待同步增量。
+
+- 写入：incr / aincr（HINCRBY）；Redis 不可用返回 None，调用方回退到直接更新数据库
+- 读取：overlay / pending_many（HMGET）
+- 落库：flush —— 批量 UPDATE 提交后，用 Lua 脚本原子地减去已同步增量并删除归零字段，
+  同步窗口内新增的浏览数不会丢失
+- 迁移：flush 同时清空旧的逐实体键，旧键清空后可删除相关代码
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+
+logger = logging.getLogger(__name__)
+
+VIEW_COUNT_KEY_PREFIX = "view_counts:"
+
+
+class ViewCountEntity(NamedTuple):
+    model: str  # app.models 中的模型名
+    legacy_prefix: str  # 旧的逐实体键前缀
+    label: str  # 日志用名称
+
+
+VIEW_COUNT_ENTITIES: Dict[str, ViewCountEntity] = {
+    "forum_post": ViewCountEntity("ForumPost", "forum:post:view_count:", "论坛帖子"),
+    "forum_category": ViewCountEntity("ForumCategory", "forum:category:view_count:", "论坛板块"),
+    "flea_market": ViewCountEntity("FleaMarketItem", "flea_market:view_count:", "跳蚤市场"),
+    "activity": ViewCountEntity("Activity", "activity:view_count:", "活动"),
+    "service": ViewCountEntity("TaskExpertService", "service:view_count:", "达人服务"),
+    "task": ViewCountEntity("Task", "task:view_count:", "任务"),
+    "leaderboard": ViewCountEntity("CustomLeaderboard", "leaderboard:view_count:", "榜单"),
+}
+
+# 减去已同步增量，归零（或被并发减成负数）的字段删除；ARGV 为 字段, 增量, 字段, 增量...
+_SETTLE_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    local remaining = redis.call('HINCRBY', KEYS[1], ARGV[i], -tonumber(ARGV[i + 1]))
+    if remaining <= 0 then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+return 1
+"""
+
+# 每次 Lua 调用处理的字段数（避免单个脚本阻塞 Redis 过久）
+_SETTLE_BATCH = 500
+
+
+def hash_key(entity: str) -> str:
+    """实体类型对应的增量哈希键"""
+    if entity not in VIEW_COUNT_ENTITIES:
+        raise ValueError(f"未知的浏览数实体类型: {entity}")
+    return f"{VIEW_COUNT_KEY_PREFIX}{entity}"
+
+
+def _to_int(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    return int(value)
+
+
+class ViewCountOverlay:
+    """浏览数增量的写入、批量读取与落库"""
+
+    def __init__(self, redis_client: Any = None, async_cache: Any = None):
+        """
+        Args:
+            redis_client: 同步 Redis 客户端（同步路由 / 定时任务），默认 redis_cache.get_redis_client()
+            async_cache: AsyncRedisCache（async 路由），默认 redis_async.async_redis_cache
+        """
+        self._redis_client = redis_client
+        self._async_cache = async_cache
+
+    def _redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        from app.redis_cache import get_redis_client
+        return get_redis_client()
+
+    def _async_client(self):
+        if self._async_cache is not None:
+            return self._async_cache.client()
+        from app.redis_async import async_redis_cache
+        return async_redis_cache.client()
+
+    # ==================== 写入 ====================
+
+    def incr(self, entity: str, entity_id: int) -> Optional[int]:
+        """
+        累加一次浏览
+
+        Returns:
+            累加后的未落库增量；Redis 不可用或出错返回 None（调用方应直接更新数据库）
+        """
+        key = hash_key(entity)
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            return int(client.hincrby(key, str(entity_id), 1))
+        except Exception as e:
+            logger.debug(f"Redis 累加浏览数失败 {entity}:{entity_id}: {e}")
+            return None
+
+    async def aincr(self, entity: str, entity_id: int) -> Optional[int]:
+        """incr 的异步版本"""
+        key = hash_key(entity)
+        client = self._async_client()
+        if client is None:
+            return None
+        try:
+            return int(await client.hincrby(key, str(entity_id), 1))
+        except Exception as e:
+            logger.debug(f"Redis 累加浏览数失败 {entity}:{entity_id}: {e}")
+            return None
+
+    # ==================== 读取 ====================
+
+    @staticmethod
+    def _zip_pending(ids: List[Any], values: Optional[List[Any]]) -> Dict[Any, int]:
+        pending = {}
+        for entity_id, value in zip(ids, values or []):
+            try:
+                count = _to_int(value)
+            except (ValueError, TypeError):
+                continue
+            if count > 0:
+                pending[entity_id] = count
+        return pending
+
+    def pending_many(self, entity: str, entity_ids: Iterable[Any]) -> Dict[Any, int]:
+        """一次 HMGET 读取多个实体的未落库增量（只返回 > 0 的项）"""
+        key = hash_key(entity)
+        ids = list(dict.fromkeys(entity_ids))
+        client = self._redis() if ids else None
+        if client is None:
+            return {}
+        try:
+            return self._zip_pending(ids, client.hmget(key, [str(i) for i in ids]))
+        except Exception as e:
+            logger.debug(f"Redis 批量读取浏览数失败 {entity}: {e}")
+            return {}
+
+    async def apending_many(self, entity: str, entity_ids: Iterable[Any]) -> Dict[Any, int]:
+        """pending_many 的异步版本"""
+        key = hash_key(entity)
+        ids = list(dict.fromkeys(entity_ids))
+        client = self._async_client() if ids else None
+        if client is None:
+            return {}
+        try:
+            return self._zip_pending(ids, await client.hmget(key, [str(i) for i in ids]))
+        except Exception as e:
+            logger.debug(f"Redis 批量读取浏览数失败 {entity}: {e}")
+            return {}
+
+    def display_counts(self, entity: str, items: Iterable[Any]) -> Dict[Any, int]:
+        """
+        一页实体的显示浏览数（数据库值 + 未落库增量）
+
+        Args:
+            items: 带 id / view_count 属性的 ORM 对象或查询行
+
+        Returns:
+            {实体 ID: 显示浏览数}
+        """
+        items = list(items)
+        pending = self.pending_many(entity, [item.id for item in items])
+        return {item.id: (item.view_count or 0) + pending.get(item.id, 0) for item in items}
+
+    async def overlay(self, entity: str, items: Iterable[Any]) -> Dict[Any, int]:
+        """display_counts 的异步版本（async 路由使用）"""
+        items = list(items)
+        pending = await self.apending_many(entity, [item.id for item in items])
+        return {item.id: (item.view_count or 0) + pending.get(item.id, 0) for item in items}
+
+    # ==================== 落库 ====================
+
+    def _read_hash(self, client, key: str, entity: str) -> Dict[int, int]:
+        increments: Dict[int, int] = {}
+        for field, value in (client.hgetall(key) or {}).items():
+            try:
+                entity_id, count = _to_int(field), _to_int(value)
+            except (ValueError, TypeError) as e:
+                logger.warning(f"跳过无效的{entity}浏览数字段 {field!r}: {e}")
+                continue
+            if count > 0:
+                increments[entity_id] = count
+        return increments
+
+    def _read_legacy(self, client, prefix: str) -> List[Tuple[Any, int, int]]:
+        from app.redis_utils import scan_keys
+
+        keys = scan_keys(client, f"{prefix}*")
+        if not keys:
+            return []
+        legacy = []
+        for key, value in zip(keys, client.mget(keys)):
+            key_str = key.decode("utf-8") if isinstance(key, bytes) else str(key)
+            try:
+                entity_id, count = int(key_str[len(prefix):]), _to_int(value)
+            except (ValueError, TypeError):
+                continue
+            if count > 0:
+                legacy.append((key, entity_id, count))
+        return legacy
+
+    def _settle(self, client, key: str, increments: Dict[int, int]) -> None:
+        items = list(increments.items())
+        for start in range(0, len(items), _SETTLE_BATCH):
+            args: List[Any] = []
+            for entity_id, count in items[start:start + _SETTLE_BATCH]:
+                args.extend((str(entity_id), count))
+            client.eval(_SETTLE_SCRIPT, 1, key, *args)
+
+    def flush(self, entity: str, db, on_synced: Optional[Callable[[List[int]], Any]] = None) -> int:
+        """
+        把未落库增量写入数据库
+
+        Args:
+            entity: 实体类型（VIEW_COUNT_ENTITIES 的键）
+            db: 同步 Session
+            on_synced: 提交后以已同步的实体 ID 列表调用（批量 UPDATE 不触发 ORM 钩子）
+
+        Returns:
+            同步的实体数
+        """
+        from app import models
+
+        spec = VIEW_COUNT_ENTITIES[entity]
+        key = hash_key(entity)
+        client = self._redis()
+        if client is None:
+            return 0
+
+        increments = self._read_hash(client, key, entity)
+        legacy = self._read_legacy(client, spec.legacy_prefix)
+        totals = dict(increments)
+        for _, entity_id, count in legacy:
+            totals[entity_id] = totals.get(entity_id, 0) + count
+        if not totals:
+            return 0
+
+        table = getattr(models, spec.model).__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("_id"))
+            .values(view_count=table.c.view_count + bindparam("_increment")),
+            [{"_id": entity_id, "_increment": count} for entity_id, count in totals.items()],
+        )
+        db.commit()
+
+        if on_synced:
+            try:
+                on_synced(list(totals))
+            except Exception as e:
+                logger.warning(f"{spec.label}浏览数同步回调失败: {e}")
+
+        # 提交成功后再从 Redis 扣除；扣除失败最多导致下次重复累加，不会丢失浏览数
+        self._settle(client, key, increments)
+        for legacy_key, _, count in legacy:
+            try:
+                remaining = client.decrby(legacy_key, count)
+                if remaining is not None and remaining <= 0:
+                    client.delete(legacy_key)
+            except Exception:
+                pass
+
+        logger.info(f"同步{spec.label}浏览数完成，同步了 {len(totals)} 个")
+        return len(totals)
+
+
+# 全局实例（延迟初始化，线程安全）
+_view_count_overlay: Optional[ViewCountOverlay] = None
+_overlay_lock = threading.Lock()
+
+
+def get_view_count_overlay() -> ViewCountOverlay:
+    """获取浏览数 overlay 实例（线程安全）"""
+    global _view_count_overlay
+    if _view_count_overlay is None:
+        with _overlay_lock:
+            if _view_count_overlay is None:
+                _view_count_overlay = ViewCountOverlay()
+    return _view_count_overlay
@@ -3,6 +3,7 @@
 实现任务聊天相关的所有接口
 """
 
+import asyncio
 import json
 import logging
 from datetime import datetime, timezone, timedelta
@@ -36,6 +37,7 @@ from app.consultation.notifications import (
     task_promoted_to_formal,
 )
 from app.deps import get_async_db_dependency
+from app.principal_cache import Principal
 from app.error_handlers import raise_http_error_with_code
 from app.utils.time_utils import get_utc_time, parse_iso_utc, format_iso_utc
 from app.push_notification_service import send_push_notification_async_safe
@@ -173,17 +175,18 @@ async def _check_is_service_owner(
 async def get_current_user_secure_async_csrf(
     request: Request,
     db: AsyncSession = Depends(get_async_db_dependency),
-) -> models.User:
+) -> Principal:
     """
     CSRF保护的安全用户认证（异步版本）
     直接使用 validate_session 进行认证，避免 cookie_bearer 对 GET 请求的影响
     """
     from app.secure_auth import validate_session
+    from app.principal_cache import get_principal
     
-    session = validate_session(request)
+    session = await asyncio.to_thread(validate_session, request)
     if session:
         from app import async_crud
-        user = await async_crud.async_user_crud.get_user_by_id(db, session.user_id)
+        user = await get_principal(db, session.user_id)
         if user:
             # 检查用户状态
             if hasattr(user, "is_suspended") and user.is_suspended:
@@ -175,6 +175,71 @@ class TaskRecommendationEngine:
         except Exception:
             pass
         
+        recommendations = self.compute_recommendations(
+            user, limit, algorithm, task_type, location, keyword
+        )
+        
+        # 缓存结果（使用智能缓存策略）
+        try:
+            from app.recommendation_cache_strategy import get_cache_strategy
+            cache_strategy = get_cache_strategy()
+            cache_strategy.cache_recommendations(
+                user_id, recommendations, algorithm, limit,
+                task_type, location, keyword, "personal"
+            )
+            
+            # 优化：同时缓存到用户聚类（如果用户属于某个聚类）
+            try:
+                from app.recommendation_user_clustering import UserClusteringManager
+                clustering_manager = UserClusteringManager(self.db)
+                cluster_id = clustering_manager.get_user_cluster_id(user_id)
+                if cluster_id:
+                    # 缓存到聚类（供其他相似用户使用）
+                    clustering_manager.cache_cluster_recommendations(
+                        cluster_id, recommendations, algorithm, limit,
+                        task_type, location, keyword, ttl=1800
+                    )
+                    logger.debug(f"缓存到用户聚类: user_id={user_id}, cluster_id={cluster_id}")
+            except ImportError:
+                # 如果聚类模块不可用，跳过
+                pass
+            except Exception as e:
+                logger.debug(f"缓存到用户聚类失败: {e}")
+        except ImportError:
+            # 如果缓存策略模块不可用，使用原始方法
+            try:
+                from app.recommendation_cache import cache_recommendations, get_cache_key
+                optimized_cache_key = get_cache_key(user_id, algorithm, limit, task_type, location, keyword)
+                cache_recommendations(optimized_cache_key, recommendations, ttl=1800)
+            except ImportError:
+                # 如果优化缓存模块不可用，使用原始方法
+                try:
+                    import json
+                    cache_data = json.dumps(recommendations, default=str)
+                    redis_cache.setex(cache_key, 1800, cache_data)
+                except Exception as e:
+                    logger.warning(f"写入推荐缓存失败: {e}，继续返回结果")
+        except Exception as e:
+            logger.warning(f"写入推荐缓存失败: {e}，继续返回结果")
+        
+        return recommendations
+    
+    def compute_recommendations(
+        self,
+        user: User,
+        limit: int = 20,
+        algorithm: str = "hybrid",
+        task_type: Optional[str] = None,
+        location: Optional[str] = None,
+        keyword: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        不读写缓存，直接计算推荐（含降级、最终过滤和最小数量补齐）
+
+        recommend_tasks 缓存未命中时调用；批量预计算（recommendation.batch_precompute）
+        用它生成与请求路径一致的结果再写入同一个缓存键。
+        """
+        user_id = user.id
         # 记录推荐请求开始时间
         import time
         start_time = time.time()
@@ -243,62 +308,19 @@ class TaskRecommendationEngine:
                 location,
                 keyword
             )
-        
-        # 缓存结果（使用智能缓存策略）
-        try:
-            from app.recommendation_cache_strategy import get_cache_strategy
-            cache_strategy = get_cache_strategy()
-            cache_strategy.cache_recommendations(
-                user_id, recommendations, algorithm, limit,
-                task_type, location, keyword, "personal"
-            )
-            
-            # 优化：同时缓存到用户聚类（如果用户属于某个聚类）
-            try:
-                from app.recommendation_user_clustering import UserClusteringManager
-                clustering_manager = UserClusteringManager(self.db)
-                cluster_id = clustering_manager.get_user_cluster_id(user_id)
-                if cluster_id:
-                    # 缓存到聚类（供其他相似用户使用）
-                    clustering_manager.cache_cluster_recommendations(
-                        cluster_id, recommendations, algorithm, limit,
-                        task_type, location, keyword, ttl=1800
-                    )
-                    logger.debug(f"缓存到用户聚类: user_id={user_id}, cluster_id={cluster_id}")
-            except ImportError:
-                # 如果聚类模块不可用，跳过
-                pass
-            except Exception as e:
-                logger.debug(f"缓存到用户聚类失败: {e}")
-        except ImportError:
-            # 如果缓存策略模块不可用，使用原始方法
-            try:
-                from app.recommendation_cache import cache_recommendations, get_cache_key
-                optimized_cache_key = get_cache_key(user_id, algorithm, limit, task_type, location, keyword)
-                cache_recommendations(optimized_cache_key, recommendations, ttl=1800)
-            except ImportError:
-                # 如果优化缓存模块不可用，使用原始方法
-                try:
-                    import json
-                    cache_data = json.dumps(recommendations, default=str)
-                    redis_cache.setex(cache_key, 1800, cache_data)
-                except Exception as e:
-                    logger.warning(f"写入推荐缓存失败: {e}，继续返回结果")
-        except Exception as e:
-            logger.warning(f"写入推荐缓存失败: {e}，继续返回结果")
-        
+
         return recommendations
     
     def _hydrate_cached_recommendations(self, cached: List[Dict]) -> List[Dict]:
         """
-        将缓存的推荐数据转换为完整的Task对象格式
+        将缓存的推荐数据转换为 {"task": ..., "score": ..., "reason": ...} 格式
         
         缓存中存储的格式可能是:
         - {"task_id": ..., "score": ..., "reason": ...}  (只包含ID)
         - {"task": <Task对象>, "score": ..., "reason": ...}  (包含完整对象)
         
-        返回格式:
-        - {"task": <Task对象>, "score": ..., "reason": ...}
+        只包含ID时从任务卡片缓存取（一次 MGET，未命中的用投影查询补齐），
+        返回的 task 是只读的 TaskCard，字段名与 Task 列一致
         """
         if not cached:
             return []
@@ -310,23 +332,21 @@ class TaskRecommendationEngine:
         if "task" in first_item and hasattr(first_item.get("task"), "id"):
             return cached
         
-        # 如果只包含task_id，需要查询数据库获取完整的Task对象
         if "task_id" in first_item:
             task_ids = [item.get("task_id") for item in cached if item.get("task_id")]
             if not task_ids:
                 return []
             
-            # 批量查询任务
-            tasks = self.db.query(Task).filter(Task.id.in_(task_ids), Task.is_visible == True).all()
-            task_dict = {task.id: task for task in tasks}
+            from app.services.task_cards import get_task_card_cache
+            cards = get_task_card_cache().get_many(self.db, task_ids)
             
-            # 重建推荐结果
+            # 重建推荐结果（跳过已下架的任务）
             result = []
             for item in cached:
-                task_id = item.get("task_id")
-                if task_id and task_id in task_dict:
+                card = cards.get(item.get("task_id"))
+                if card is not None and card.is_visible:
                     result.append({
-                        "task": task_dict[task_id],
+                        "task": card,
                         "score": item.get("score", 0.5),
                         "reason": item.get("reason", "为您推荐")
                     })
@@ -345,30 +365,10 @@ class TaskRecommendationEngine:
         keyword: Optional[str] = None
     ) -> List[Dict]:
         """基于内容的推荐（支持筛选，包含冷启动优化和新任务优先）"""
-        # 1. 获取用户偏好
-        user_preferences = self._get_user_preferences(user.id)
-        
-        # 2. 获取用户历史任务
-        user_history = self._get_user_task_history(user.id)
-        
-        # 3. 增强：分析用户浏览和搜索行为（新增）
-        view_history = self._get_user_view_history(user.id)
-        search_keywords = self._get_user_search_keywords(user.id)
-        skipped_tasks = self._get_user_skipped_tasks(user.id)
-        
-        # 4. 构建用户偏好向量（增强版）
-        user_vector = self._build_user_preference_vector(
-            user, 
-            user_preferences, 
-            user_history,
-            view_history=view_history,
-            search_keywords=search_keywords,
-            skipped_tasks=skipped_tasks
-        )
-        
-        # 冷启动处理：如果用户没有历史数据，使用默认偏好
-        if not user_history and not user_preferences:
-            user_vector = self._get_default_preference_vector(user)
+        # 1-4. 用户偏好向量：优先读持久化的增量向量（一行），失败或关闭时实时构建
+        user_vector = self._get_persisted_preference_vector(user)
+        if user_vector is None:
+            user_vector = self._build_live_preference_vector(user)
         
         # 4. 获取应该排除的任务ID（用户已发布、已接受、已申请、已完成的任务）
         excluded_task_ids = self._get_excluded_task_ids(user.id)
@@ -850,83 +850,52 @@ class TaskRecommendationEngine:
         if len(sorted_task_ids) <= limit:
             return sorted_task_ids
         
-        # 优化：只查询必要字段用于多样性判断（减少数据传输）
-        all_task_ids = [task_id for task_id, _ in sorted_task_ids]
-        try:
-            from app.recommendation_query_optimizer import optimize_diversity_query
-            task_info_dict = optimize_diversity_query(self.db, all_task_ids, limit)
-            
-            # 创建简化任务对象用于多样性判断
-            class SimpleTask:
-                def __init__(self, task_id, task_type, location):
-                    self.id = task_id
-                    self.task_type = task_type
-                    self.location = location
-            
-            task_dict = {}
-            for task_id, info in task_info_dict.items():
-                task_dict[task_id] = SimpleTask(
-                    info["id"],
-                    info["task_type"],
-                    info["location"]
-                )
-        except ImportError:
-            # 如果优化模块不可用，使用原始方法（只查询必要字段）
-            tasks = self.db.query(
-                Task.id,
-                Task.task_type,
-                Task.location
-            ).filter(Task.id.in_(all_task_ids)).all()
-            
-            class SimpleTask:
-                def __init__(self, task_id, task_type, location):
-                    self.id = task_id
-                    self.task_type = task_type
-                    self.location = location
-            
-            task_dict = {}
-            for task_id, task_type, location in tasks:
-                task_dict[task_id] = SimpleTask(task_id, task_type, location)
+        # 只看前 2 倍数量的候选，类型 / 地点取自任务卡片（一次 MGET）
+        from app.services.task_cards import get_task_card_cache
+        candidate_ids = [task_id for task_id, _ in sorted_task_ids[:limit * 2]]
+        cards = get_task_card_cache().get_many(self.db, candidate_ids)
         
         selected = []
+        selected_ids = set()
         type_count = {}
         location_count = {}
         max_type_count = max(1, limit // 2)  # 同一类型最多50%
         max_location_count = max(1, int(limit * 0.6))  # 同一地点最多60%
+        check_location = not location or location == "all"
         
         for task_id, score in sorted_task_ids:
             if len(selected) >= limit:
                 break
             
-            task = task_dict.get(task_id)
-            if not task:
+            card = cards.get(task_id)
+            if card is None:
                 continue
             
             # 检查类型多样性
-            type_key = task.task_type
+            type_key = card.task_type
             if type_count.get(type_key, 0) >= max_type_count:
                 continue
             
             # 检查地点多样性（如果用户没有筛选地点）
-            if not location or location == "all":
-                loc_key = task.location.split(',')[0] if task.location else "unknown"
+            if check_location:
+                loc_key = card.location.split(',')[0] if card.location else "unknown"
                 if location_count.get(loc_key, 0) >= max_location_count:
                     continue
+                location_count[loc_key] = location_count.get(loc_key, 0) + 1
             
             # 通过多样性检查，添加到结果
             selected.append((task_id, score))
+            selected_ids.add(task_id)
             type_count[type_key] = type_count.get(type_key, 0) + 1
-            if not location or location == "all":
-                loc_key = task.location.split(',')[0] if task.location else "unknown"
-                location_count[loc_key] = location_count.get(loc_key, 0) + 1
         
         # 如果多样性筛选后数量不足，补充高分任务
         if len(selected) < limit:
             for task_id, score in sorted_task_ids:
                 if len(selected) >= limit:
                     break
-                if task_id not in [tid for tid, _ in selected]:
+                if task_id not in selected_ids:
                     selected.append((task_id, score))
+                    selected_ids.add(task_id)
         
         return selected
     
@@ -1532,6 +1501,46 @@ class TaskRecommendationEngine:
         result.sort(key=lambda x: x["score"], reverse=True)
         return result[:limit]
     
+    def _get_persisted_preference_vector(self, user: User) -> Optional[Dict]:
+        """读取持久化的用户偏好向量（app.recommendation.preference_store）；关闭或失败时返回 None"""
+        from app.recommendation.preference_store import PREFERENCE_VECTOR_ENABLED, get_preference_vector
+
+        if not PREFERENCE_VECTOR_ENABLED:
+            return None
+        try:
+            return get_preference_vector(self.db, user, self._get_user_preferences(user.id))
+        except Exception as e:
+            logger.warning(f"读取持久化偏好向量失败，回退到实时构建: {e}")
+            return None
+
+    def _build_live_preference_vector(self, user: User) -> Dict:
+        """从偏好设置、任务历史、浏览 / 搜索 / 跳过记录实时构建偏好向量"""
+        # 1. 获取用户偏好
+        user_preferences = self._get_user_preferences(user.id)
+        
+        # 2. 获取用户历史任务
+        user_history = self._get_user_task_history(user.id)
+        
+        # 3. 增强：分析用户浏览和搜索行为
+        view_history = self._get_user_view_history(user.id)
+        search_keywords = self._get_user_search_keywords(user.id)
+        skipped_tasks = self._get_user_skipped_tasks(user.id)
+        
+        # 4. 构建用户偏好向量（增强版）
+        user_vector = self._build_user_preference_vector(
+            user, 
+            user_preferences, 
+            user_history,
+            view_history=view_history,
+            search_keywords=search_keywords,
+            skipped_tasks=skipped_tasks
+        )
+        
+        # 冷启动处理：如果用户没有历史数据，使用默认偏好
+        if not user_history and not user_preferences:
+            user_vector = self._get_default_preference_vector(user)
+        return user_vector
+    
     def _get_user_preferences(self, user_id: str) -> Optional[UserProfilePreference]:
         """获取用户偏好"""
         return self.db.query(UserProfilePreference).filter(
@@ -2200,10 +2209,17 @@ def _new_engine_recommend(db, user_id, limit, algorithm, task_type, location, ke
     if keyword:
         filters["keyword"] = keyword
 
-    results = engine.recommend(user=user, limit=limit, context=context, filters=filters)
+    from app.recommendation.cache import VERSIONED_CACHE_ENABLED, get_versioned_cache
+    if VERSIONED_CACHE_ENABLED and not filters and latitude is None and longitude is None:
+        # Unfiltered, location-free lists are cached per user and patched on task create / close
+        results = get_versioned_cache().recommend(engine, user, limit, context)
+    else:
+        results = engine.recommend(user=user, limit=limit, context=context, filters=filters)
 
-    # Return format MUST match old engine: {"task": <ORM Task>, "score": float, "reason": str}
-    # The router (routers.py) accesses item["task"], item["score"], item["reason"] directly.
+    # Return format MUST match old engine: {"task": ..., "score": float, "reason": str}
+    # "task" is an ORM Task when computed, or a TaskCard (attribute-compatible snapshot) on a
+    # versioned-cache hit. The router (routers.py) reads item["task"] attributes, item["score"]
+    # and item["reason"], so it must not rely on ORM-only behaviour (relationships, session).
     recommendations = []
     for r in results:
         task = r["task"]
@@ -2244,23 +2260,29 @@ def calculate_task_match_score(
     if USE_NEW_ENGINE:
         try:
             # Score a single task directly using content scorer (lightweight)
+            from app.recommendation.preference_store import PREFERENCE_VECTOR_ENABLED, get_preference_vector
             from app.recommendation.scorers.content_scorer import ContentScorer
             from app.recommendation.user_vector import (
                 build_user_preference_vector, get_user_preferences,
                 get_user_task_history, get_default_preference_vector,
             )
             preferences = get_user_preferences(db, user_id)
-            history = get_user_task_history(db, user_id)
-            user_vector = build_user_preference_vector(db, user, preferences, history)
-            if not history and not preferences:
-                user_vector = get_default_preference_vector(user)
+            if PREFERENCE_VECTOR_ENABLED:
+                user_vector = get_preference_vector(db, user, preferences)
+            else:
+                history = get_user_task_history(db, user_id)
+                user_vector = build_user_preference_vector(db, user, preferences, history)
+                if not history and not preferences:
+                    user_vector = get_default_preference_vector(user)
             return ContentScorer._calculate_content_match(user_vector, task)
         except Exception as e:
             logger.warning(f"New engine match score failed, falling back: {e}")
 
     engine = TaskRecommendationEngine(db)
-    user_preferences = engine._get_user_preferences(user_id)
-    user_history = engine._get_user_task_history(user_id)
-    user_vector = engine._build_user_preference_vector(user, user_preferences, user_history)
+    user_vector = engine._get_persisted_preference_vector(user)
+    if user_vector is None:
+        user_preferences = engine._get_user_preferences(user_id)
+        user_history = engine._get_user_task_history(user_id)
+        user_vector = engine._build_user_preference_vector(user, user_preferences, user_history)
 
     return engine._calculate_content_match_score(user_vector, task, user)
@@ -510,23 +510,14 @@ def init_scheduler():
         return wrapper
     
     # P0 #2: 通用的 Redis → DB 浏览数同步函数（消除重复代码 + DECRBY 修复数据丢失）
-    def sync_redis_view_counts(key_pattern: str, model_class, entity_name: str):
+    def sync_redis_view_counts(entity: str, on_synced=None):
         """
-        通用的 Redis 浏览数同步函数。
-        使用 DECRBY（减去已同步的增量）替代 DELETE，防止同步窗口期间的新增浏览数丢失。
+        通用的 Redis 浏览数同步函数（增量哈希 → DB，见 app.services.view_counts）。
+        落库后原子地减去已同步的增量，同步窗口期间的新增浏览数不会丢失。
+        on_synced: 可选回调，DB 提交后以已同步的实体 ID 列表调用（批量 UPDATE 不触发 ORM 钩子）。
         """
         try:
-            from app.redis_cache import get_redis_client
-            from app.redis_utils import scan_keys
-            from sqlalchemy import update
-            
-            redis_client = get_redis_client()
-            if not redis_client:
-                return
-            
-            keys = scan_keys(redis_client, key_pattern)
-            if not keys:
-                return
+            from app.services.view_counts import get_view_count_overlay
             
             try:
                 db = SessionLocal()
@@ -535,59 +526,18 @@ def init_scheduler():
                     raise DBUnavailableError(f"无法创建数据库连接: {e}") from e
                 raise
             try:
-                synced_count = 0
-                # 第一步：读取所有增量并记录
-                increments = []
-                for key in keys:
-                    try:
-                        key_str = key.decode('utf-8') if isinstance(key, bytes) else str(key)
-                        entity_id = int(key_str.split(":")[-1])
-                        redis_increment = redis_client.get(key)
-                        if redis_increment:
-                            increment = int(redis_increment.decode('utf-8') if isinstance(redis_increment, bytes) else redis_increment)
-                            if increment > 0:
-                                increments.append((key, entity_id, increment))
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"处理{entity_name}浏览数 key {key} 时出错: {e}")
-                        continue
-                
-                # 第二步：批量写入 DB
-                for key, entity_id, increment in increments:
-                    db.execute(
-                        update(model_class)
-                        .where(model_class.id == entity_id)
-                        .values(view_count=model_class.view_count + increment)
-                    )
-                    synced_count += 1
-                
-                db.commit()
-                
-                # 第三步：用 DECRBY 减去已同步的增量（而非 DELETE）
-                # 这样在 GET 和 DECRBY 之间新增的浏览数不会丢失
-                for key, entity_id, increment in increments:
-                    try:
-                        remaining = redis_client.decrby(key, increment)
-                        # 如果减完后 <= 0，清理 key（避免 key 无限积累）
-                        if remaining is not None and remaining <= 0:
-                            redis_client.delete(key)
-                    except Exception:
-                        pass
-                
-                if synced_count > 0:
-                    logger.info(f"同步{entity_name}浏览数完成，同步了 {synced_count} 个")
-            except DBUnavailableError:
-                raise
+                get_view_count_overlay().flush(entity, db, on_synced=on_synced)
             except Exception as e:
                 db.rollback()
                 if _is_db_connection_error(e):
-                    raise DBUnavailableError(f"同步{entity_name}浏览数时数据库不可用: {e}") from e
+                    raise DBUnavailableError(f"同步{entity}浏览数时数据库不可用: {e}") from e
                 raise
             finally:
                 db.close()
         except DBUnavailableError:
             raise
         except Exception as e:
-            logger.error(f"同步{entity_name}浏览数失败: {e}", exc_info=True)
+            logger.error(f"同步{entity}浏览数失败: {e}", exc_info=True)
     
     # ========== 高频任务（每30秒-1分钟）==========
     
@@ -663,22 +613,29 @@ def init_scheduler():
     scheduler.register_task(
         'sync_forum_view_counts',
         lambda: sync_redis_view_counts(
-            "forum:post:view_count:*",
-            __import__('app.models', fromlist=['ForumPost']).ForumPost,
-            "论坛帖子"
+            "forum_post",
+            on_synced=lambda post_ids: __import__(
+                'app.services.forum_hot_ranking', fromlist=['get_forum_hot_ranking']
+            ).get_forum_hot_ranking().refresh_posts(post_ids),
         ),
         interval_seconds=300,
         description="同步论坛浏览数（Redis → DB）"
     )
     
+    # 重算论坛热门排行（时间衰减）- 每10分钟
+    scheduler.register_task(
+        'rescore_forum_hot_ranking',
+        lambda: __import__(
+            'app.services.forum_hot_ranking', fromlist=['get_forum_hot_ranking']
+        ).get_forum_hot_ranking().rescore(),
+        interval_seconds=600,
+        description="重算论坛热门排行头部分数（时间衰减）"
+    )
+    
     # 同步榜单浏览数（Redis → DB）- 每5分钟
     scheduler.register_task(
         'sync_leaderboard_view_counts',
-        lambda: sync_redis_view_counts(
-            "leaderboard:view_count:*",
-            __import__('app.models', fromlist=['CustomLeaderboard']).CustomLeaderboard,
-            "榜单"
-        ),
+        lambda: sync_redis_view_counts("leaderboard"),
         interval_seconds=300,
         description="同步榜单浏览数（Redis → DB）"
     )
@@ -686,11 +643,7 @@ def init_scheduler():
     # 同步任务浏览数（Redis → DB）- 每5分钟
     scheduler.register_task(
         'sync_task_view_counts',
-        lambda: sync_redis_view_counts(
-            "task:view_count:*",
-            __import__('app.models', fromlist=['Task']).Task,
-            "任务"
-        ),
+        lambda: sync_redis_view_counts("task"),
         interval_seconds=300,
         description="同步任务浏览数（Redis → DB）"
     )
@@ -698,11 +651,7 @@ def init_scheduler():
     # 同步活动浏览数（Redis → DB）- 每5分钟
     scheduler.register_task(
         'sync_activity_view_counts',
-        lambda: sync_redis_view_counts(
-            "activity:view_count:*",
-            __import__('app.models', fromlist=['Activity']).Activity,
-            "活动"
-        ),
+        lambda: sync_redis_view_counts("activity"),
         interval_seconds=300,
         description="同步活动浏览数（Redis → DB）"
     )
@@ -710,11 +659,7 @@ def init_scheduler():
     # 同步论坛板块浏览数（Redis → DB）- 每5分钟
     scheduler.register_task(
         'sync_forum_category_view_counts',
-        lambda: sync_redis_view_counts(
-            "forum:category:view_count:*",
-            __import__('app.models', fromlist=['ForumCategory']).ForumCategory,
-            "论坛板块"
-        ),
+        lambda: sync_redis_view_counts("forum_category"),
         interval_seconds=300,
         description="同步论坛板块浏览数（Redis → DB）"
     )
@@ -722,11 +667,7 @@ def init_scheduler():
     # 同步跳蚤市场浏览数（Redis → DB）- 每5分钟
     scheduler.register_task(
         'sync_flea_market_view_counts',
-        lambda: sync_redis_view_counts(
-            "flea_market:view_count:*",
-            __import__('app.models', fromlist=['FleaMarketItem']).FleaMarketItem,
-            "跳蚤市场"
-        ),
+        lambda: sync_redis_view_counts("flea_market"),
         interval_seconds=300,
         description="同步跳蚤市场浏览数（Redis → DB）"
     )
@@ -734,11 +675,7 @@ def init_scheduler():
     # 同步达人服务浏览数（Redis → DB）- 每5分钟
     scheduler.register_task(
         'sync_service_view_counts',
-        lambda: sync_redis_view_counts(
-            "service:view_count:*",
-            __import__('app.models', fromlist=['TaskExpertService']).TaskExpertService,
-            "达人服务"
-        ),
+        lambda: sync_redis_view_counts("service"),
         interval_seconds=300,
         description="同步达人服务浏览数（Redis → DB）"
     )
@@ -976,49 +913,14 @@ def init_scheduler():
         description="更新热门任务列表"
     )
     
-    # 预计算推荐 - 每1小时
+    # 预计算推荐 - 每1小时（周活跃用户按哈希分片，本地进程池并行）
     def precompute_recommendations():
         try:
-            from app.task_recommendation import TaskRecommendationEngine
-            from app.models import UserTaskInteraction
-            from sqlalchemy import distinct
-            
-            try:
-                db = SessionLocal()
-            except Exception as e:
-                if _is_db_connection_error(e):
-                    raise DBUnavailableError(f"无法创建数据库连接: {e}") from e
-                raise
-            try:
-                # 通过最近有交互行为的用户来判断活跃用户（最多100个）
-                recent_time = get_utc_time() - timedelta(days=7)
-                active_users = db.query(
-                    distinct(UserTaskInteraction.user_id)
-                ).filter(
-                    UserTaskInteraction.interaction_time >= recent_time
-                ).limit(100).all()
-                
-                engine = TaskRecommendationEngine(db)
-                computed_count = 0
-                for (user_id,) in active_users:
-                    try:
-                        engine.recommend_tasks(user_id=user_id, limit=10, algorithm="hybrid")
-                        computed_count += 1
-                    except Exception:
-                        continue
-                
-                logger.info(f"预计算推荐完成: {computed_count}/{len(active_users)} 个用户")
-            except DBUnavailableError:
-                raise
-            except Exception as e:
-                if _is_db_connection_error(e):
-                    raise DBUnavailableError(f"预计算推荐时数据库不可用: {e}") from e
-                raise
-            finally:
-                db.close()
-        except DBUnavailableError:
-            raise
+            from app.recommendation.batch_precompute import run_precompute
+            run_precompute()
         except Exception as e:
+            if _is_db_connection_error(e):
+                raise DBUnavailableError(f"预计算推荐时数据库不可用: {e}") from e
             logger.error(f"预计算推荐失败: {e}", exc_info=True)
     
     scheduler.register_task(
@@ -1138,6 +1040,18 @@ def init_scheduler():
         description="更新特征任务达人响应时间（每天凌晨3点）"
     )
     
+    # 合并论坛作者计数桶（排行榜预聚合）- 每天凌晨3点
+    def _compact_forum_author_stats(db):
+        from app.services.forum_author_stats import compact
+        compact(db)
+    
+    scheduler.register_task(
+        'compact_forum_author_stats',
+        make_daily_task('compact_forum_author_stats', 3, with_db(_compact_forum_author_stats)),
+        interval_seconds=3600,
+        description="合并论坛作者计数桶（每天凌晨3点）"
+    )
+    
     # 推荐系统优化 - 每天凌晨4点
     def _recommendation_optimize():
         try:
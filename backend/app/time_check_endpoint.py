@@ -7,6 +7,7 @@ from fastapi import APIRouter, HTTPException
 from datetime import datetime
 import requests
 import json
+from app.observability.loop_blocking import run_blocking
 from app.utils.time_utils import get_utc_time, LONDON, to_user_timezone, format_iso_utc
 from app.models import get_uk_time_online  # 保留用于测试
 
@@ -94,7 +95,7 @@ async def time_check():
         network_checks = {}
         for api in apis:
             try:
-                response = requests.get(api, timeout=3)
+                response = await run_blocking(requests.get, api, timeout=3)
                 network_checks[api] = {
                     "status": "success" if response.status_code == 200 else "error",
                     "http_code": response.status_code
@@ -3,6 +3,7 @@
 使用统一的 ImageUploadService 替代分散的上传逻辑
 """
 
+import asyncio
 import logging
 from typing import Optional
 from fastapi import APIRouter, File, UploadFile, Query, Depends, HTTPException, Request
@@ -10,6 +11,7 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
+from app.file_stream_utils import spool_upload
 from app.rate_limiting import rate_limit
 from app.services import (
     ImageUploadService,
@@ -121,19 +123,21 @@ async def upload_image_v2(
             resource_id = user_id
             is_temp = False
 
-        # 读取文件内容
-        content = await image.read()
+        # 落盘读取文件内容（恒定内存，不拼接 bytes）
+        spooled = await spool_upload(image)
         
         # 使用图片上传服务
         service = get_image_upload_service()
-        result = service.upload(
-            content=content,
-            category=image_category,
-            resource_id=resource_id,
-            user_id=user_id,
-            filename=image.filename,
-            is_temp=is_temp
-        )
+        with spooled:
+            result = await asyncio.to_thread(
+                service.upload_stream,
+                spooled.rewind(),
+                category=image_category,
+                resource_id=resource_id,
+                user_id=user_id,
+                filename=image.filename,
+                is_temp=is_temp
+            )
         
         if not result.success:
             raise HTTPException(status_code=400, detail=result.error)
@@ -226,16 +230,18 @@ async def upload_images_batch(
         results = []
         
         for image in images:
-            content = await image.read()
+            spooled = await spool_upload(image)
             
-            result = service.upload(
-                content=content,
-                category=image_category,
-                resource_id=resource_id,
-                user_id=user_id,
-                filename=image.filename,
-                is_temp=is_temp
-            )
+            with spooled:
+                result = await asyncio.to_thread(
+                    service.upload_stream,
+                    spooled.rewind(),
+                    category=image_category,
+                    resource_id=resource_id,
+                    user_id=user_id,
+                    filename=image.filename,
+                    is_temp=is_temp
+                )
             
             if result.success:
                 results.append({
@@ -294,8 +300,9 @@ async def upload_forum_post_file(
     try:
         user_id = get_current_user_id(request)
 
-        content = await file.read()
-        if len(content) > MAX_FORUM_FILE_SIZE:
+        spooled = await spool_upload(file)
+        if spooled.size > MAX_FORUM_FILE_SIZE:
+            spooled.close()
             raise HTTPException(
                 status_code=400,
                 detail=f"文件过大，最大允许 {MAX_FORUM_FILE_SIZE // (1024 * 1024)}MB"
@@ -304,9 +311,10 @@ async def upload_forum_post_file(
         ext = detect_file_extension(
             filename=file.filename,
             content_type=file.content_type,
-            content=content,
+            content=spooled.head,
         )
         if ext.lower() not in ALLOWED_FORUM_FILE_EXTENSIONS:
+            spooled.close()
             raise HTTPException(
                 status_code=400,
                 detail=f"不支持的文件类型。允许: {', '.join(ALLOWED_FORUM_FILE_EXTENSIONS)}"
@@ -324,18 +332,19 @@ async def upload_forum_post_file(
         storage_path = f"{ImageCategory.FORUM_POST_FILE.value}/{sub_dir}/{new_filename}"
 
         service = get_image_upload_service()
-        url = service.storage.upload(content, storage_path)
+        with spooled:
+            url = service.storage.upload_fileobj(spooled.rewind(), storage_path)
 
         logger.info(
             f"用户 {user_id} 上传论坛帖子文件: filename={file.filename}, "
-            f"size={len(content)}, path={storage_path}"
+            f"size={spooled.size}, path={storage_path}"
         )
 
         return JSONResponse(content={
             "success": True,
             "url": url,
             "filename": file.filename or new_filename,
-            "size": len(content),
+            "size": spooled.size,
             "content_type": file.content_type or "application/octet-stream",
         })
 
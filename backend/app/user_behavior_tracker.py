@@ -5,11 +5,10 @@
 
 import logging
 from typing import Optional
-from datetime import datetime
 from sqlalchemy.orm import Session
 
-from app.models import UserTaskInteraction, get_utc_time
-from app.redis_cache import redis_cache
+from app.models import UserTaskInteraction
+from app.services.interaction_log import get_interaction_log
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +16,8 @@ logger = logging.getLogger(__name__)
 class UserBehaviorTracker:
     """用户行为追踪器"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Optional[Session]):
+        # db 只用于查询方法；记录交互走 InteractionLog，可以传 None
         self.db = db
     
     def record_interaction(
@@ -31,7 +31,7 @@ class UserBehaviorTracker:
         is_recommended: bool = False
     ):
         """
-        记录用户交互行为
+        记录用户交互行为（写回：只追加到 InteractionLog，由后台线程批量落库）
         
         Args:
             user_id: 用户ID
@@ -43,15 +43,6 @@ class UserBehaviorTracker:
             is_recommended: 是否为推荐任务
         """
         try:
-            # 优化：先验证任务是否存在，避免外键约束错误
-            from app.models import Task
-            task = self.db.query(Task).filter(Task.id == task_id).first()
-            if not task:
-                logger.warning(
-                    f"尝试记录交互时任务不存在: user_id={user_id}, task_id={task_id}, "
-                    f"interaction_type={interaction_type}，跳过记录"
-                )
-                return
             # 在metadata中添加推荐标记和默认值
             if metadata is None:
                 metadata = {}
@@ -74,52 +65,22 @@ class UserBehaviorTracker:
             if not device_type:
                 device_type = "unknown"
             
-            # 检查今天是否已记录过（避免重复记录view和click）
-            if interaction_type in ["view", "click"]:
-                today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-                existing = self.db.query(UserTaskInteraction).filter(
-                    UserTaskInteraction.user_id == user_id,
-                    UserTaskInteraction.task_id == task_id,
-                    UserTaskInteraction.interaction_type == interaction_type,
-                    UserTaskInteraction.interaction_time >= today_start
-                ).first()
-                
-                if existing:
-                    # 更新现有记录
-                    if duration_seconds:
-                        existing.duration_seconds = duration_seconds
-                    if metadata:
-                        existing.interaction_metadata = metadata
-                    self.db.commit()
-                    return
-            
-            # 创建新记录
-            interaction = UserTaskInteraction(
+            # 任务存在性校验、当天 view/click 去重、推荐缓存失效（按用户防抖）都在批量落库时处理
+            log = get_interaction_log()
+            log.record(
                 user_id=user_id,
                 task_id=task_id,
                 interaction_type=interaction_type,
                 duration_seconds=duration_seconds,
                 device_type=device_type,
-                interaction_metadata=metadata
+                metadata=metadata,
             )
-            
-            self.db.add(interaction)
-            self.db.commit()
-            
-            # 清除相关缓存
-            self._invalidate_cache(user_id, task_id)
-            
-            # 如果用户有足够的行为数据，异步更新偏好
-            if interaction_type in ["accept", "complete"]:
-                try:
-                    from app.recommendation_tasks import update_user_preferences_async
-                    update_user_preferences_async(user_id)
-                except Exception as e:
-                    logger.warning(f"异步更新用户偏好失败: {e}")
+            if not log.running:
+                # 后台线程未启动（脚本 / 测试 / Celery worker）：立即落库（没有会话时新建）
+                log.flush(self.db)
             
         except Exception as e:
             logger.error(f"记录用户交互失败: {e}", exc_info=True)
-            self.db.rollback()
     
     def record_view(
         self,
@@ -240,20 +201,6 @@ class UserBehaviorTracker:
         
         return query.count()
     
-    def _invalidate_cache(self, user_id: str, task_id: int):
-        """清除相关缓存"""
-        # 清除用户推荐缓存
-        patterns = [
-            f"recommendations:{user_id}:*",
-            f"user_interactions:{user_id}*"
-        ]
-        for pattern in patterns:
-            try:
-                redis_cache.delete_pattern(pattern)
-            except Exception as e:
-                logger.warning(f"清除缓存失败: {e}")
-
-
 def record_task_view(
     db: Session,
     user_id: str,
@@ -3,6 +3,7 @@
 实现用户对服务申请的管理接口（包括个人服务所有者管理收到的申请）
 """
 
+import asyncio
 import logging
 from datetime import timedelta
 from typing import Optional
@@ -20,6 +21,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models, schemas
 from app.deps import get_async_db_dependency
+from app.principal_cache import Principal
 from app.utils.time_utils import get_utc_time
 
 logger = logging.getLogger(__name__)
@@ -42,14 +44,15 @@ user_service_application_router = APIRouter(prefix="/api/users/me", tags=["user-
 async def get_current_user_secure_async_csrf(
     request: Request,
     db: AsyncSession = Depends(get_async_db_dependency),
-) -> models.User:
+) -> Principal:
     """CSRF保护的安全用户认证（异步版本）"""
     from app.secure_auth import validate_session
+    from app.principal_cache import get_principal
     
-    session = validate_session(request)
+    session = await asyncio.to_thread(validate_session, request)
     if session:
         from app import async_crud
-        user = await async_crud.async_user_crud.get_user_by_id(db, session.user_id)
+        user = await get_principal(db, session.user_id)
         if user:
             if hasattr(user, "is_suspended") and user.is_suspended:
                 raise HTTPException(
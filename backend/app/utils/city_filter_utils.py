@@ -9,6 +9,7 @@
 
 from __future__ import annotations
 
+import math
 import re
 from functools import lru_cache
 from typing import Iterable, List, Optional, Sequence
@@ -368,3 +369,80 @@ def resolve_city_canonical(text: Optional[str]) -> Optional[str]:
 
     return None
 
+
+# ============================================================================
+# Coordinate → city lookup
+# ============================================================================
+#
+# 主要城市的粗略坐标范围 (min_lat, max_lat, min_lon, max_lon)，用于给没有坐标的
+# 任务按"用户所在城市"做距离排序兜底。
+# 模块加载时预先展开为 0.1 度网格 → 候选城市的查表，查询时只看一个格子。
+
+UK_CITY_BOUNDS: dict[str, tuple[float, float, float, float]] = {
+    "London": (51.3, 51.7, -0.5, 0.3),
+    "Birmingham": (52.3, 52.6, -2.0, -1.7),
+    "Manchester": (53.3, 53.6, -2.4, -2.0),
+    "Edinburgh": (55.8, 56.0, -3.3, -3.0),
+    "Glasgow": (55.7, 55.9, -4.4, -4.1),
+    "Bristol": (51.4, 51.5, -2.7, -2.5),
+    "Sheffield": (53.3, 53.4, -1.6, -1.4),
+    "Leeds": (53.7, 53.9, -1.7, -1.4),
+    "Nottingham": (52.9, 53.0, -1.3, -1.1),
+    "Newcastle": (54.9, 55.0, -1.7, -1.5),
+    "Southampton": (50.8, 51.0, -1.5, -1.3),
+    "Liverpool": (53.3, 53.5, -3.0, -2.8),
+    "Cardiff": (51.4, 51.5, -3.3, -3.1),
+    "Coventry": (52.3, 52.5, -1.6, -1.4),
+    "Exeter": (50.7, 50.8, -3.6, -3.4),
+    "Leicester": (52.6, 52.7, -1.2, -1.0),
+    "York": (53.9, 54.0, -1.1, -0.9),
+    "Aberdeen": (57.1, 57.2, -2.2, -2.0),
+    "Bath": (51.3, 51.4, -2.4, -2.3),
+    "Dundee": (56.4, 56.5, -3.0, -2.9),
+    "Reading": (51.4, 51.5, -1.0, -0.9),
+    "St Andrews": (56.3, 56.4, -2.8, -2.7),
+    "Belfast": (54.5, 54.7, -6.0, -5.8),
+    "Brighton": (50.8, 50.9, -0.2, 0.0),
+    "Durham": (54.7, 54.8, -1.6, -1.5),
+    "Norwich": (52.6, 52.7, 1.2, 1.3),
+    "Swansea": (51.6, 51.7, -4.0, -3.9),
+    "Loughborough": (52.7, 52.8, -1.2, -1.1),
+    "Lancaster": (54.0, 54.1, -2.8, -2.7),
+    "Warwick": (52.2, 52.3, -1.6, -1.5),
+    "Cambridge": (52.2, 52.3, 0.0, 0.2),
+    "Oxford": (51.7, 51.8, -1.3, -1.2),
+}
+
+_CITY_GRID_CELLS_PER_DEGREE = 10
+
+
+def _grid_index(value: float) -> int:
+    # 先 round 消除 51.7 * 10 = 516.999... 之类的浮点误差
+    return math.floor(round(value * _CITY_GRID_CELLS_PER_DEGREE, 6))
+
+
+def _build_city_grid() -> dict[tuple[int, int], tuple[str, ...]]:
+    grid: dict[tuple[int, int], list[str]] = {}
+    for city, (min_lat, max_lat, min_lon, max_lon) in UK_CITY_BOUNDS.items():
+        for lat_idx in range(_grid_index(min_lat), _grid_index(max_lat) + 1):
+            for lon_idx in range(_grid_index(min_lon), _grid_index(max_lon) + 1):
+                grid.setdefault((lat_idx, lon_idx), []).append(city)
+    return {cell: tuple(cities) for cell, cities in grid.items()}
+
+
+_CITY_GRID: dict[tuple[int, int], tuple[str, ...]] = _build_city_grid()
+
+
+def cities_at_coordinates(latitude: float, longitude: float) -> List[str]:
+    """
+    根据坐标判断可能所在的主要城市（范围有重叠时可能返回多个）
+
+    返回 UK_CITY_BOUNDS 中的 canonical 英文名，与 resolve_city_canonical 的结果可直接比较。
+    """
+    candidates = _CITY_GRID.get((_grid_index(latitude), _grid_index(longitude)), ())
+    matched: List[str] = []
+    for city in candidates:
+        min_lat, max_lat, min_lon, max_lon = UK_CITY_BOUNDS[city]
+        if min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon:
+            matched.append(city)
+    return matched
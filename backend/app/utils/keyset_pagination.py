@@ -0,0 +1,266 @@
+"""
+通用键集（keyset）分页
+列表接口原先用 OFFSET/LIMIT 分页，并在每一页对整个结果集做精确 count()：
+深页要扫描并丢弃前面所有行，count 每次都扫描整个匹配集。这里提供：
+
+- 游标：按排序键（可含相关性 / 热度等表达式，最后一列必须是唯一 ID 打破并列）
+  记录上一页最后一行的键值，下一页用 (k1, k2, ...) 的字典序条件直接定位
+- 游标不透明且带签名（HMAC，SECRET_KEY），并绑定作用域（接口 + 排序 + 筛选条件），
+  篡改或换筛选条件复用游标会被拒绝（InvalidCursor）
+- 游标可携带冻结参数（如热度 / 新任务权重的计算时刻 as_of），保证翻页期间排序稳定
+- 总数：exact（精确 count）/ cached（Redis 缓存精确 count）/ estimate（PostgreSQL 规划器估算，
+  结果较小时回退精确 count）
+
+排序键表达式不能为 NULL（可空列用 coalesce 包一层），否则字典序条件会漏行。
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import and_, func, or_, select, text
+
+logger = logging.getLogger(__name__)
+
+# cached 模式下总数的缓存时间（秒）
+KEYSET_COUNT_CACHE_TTL = int(os.getenv("KEYSET_COUNT_CACHE_TTL", "120"))
+
+# estimate 模式下估算值低于该值时改用精确 count（小结果集的估算误差大，精确 count 也便宜）
+KEYSET_EXACT_COUNT_BELOW = int(os.getenv("KEYSET_EXACT_COUNT_BELOW", "1000"))
+
+COUNT_MODES = ("exact", "cached", "estimate")
+
+
+class InvalidCursor(ValueError):
+    """游标格式错误、签名不符或不属于当前查询"""
+
+
+class SortKey(NamedTuple):
+    """一个排序键：SQL 表达式 + 方向"""
+    expr: Any
+    descending: bool = True
+
+    def ordering(self):
+        return self.expr.desc() if self.descending else self.expr.asc()
+
+
+class CursorState(NamedTuple):
+    """解析后的游标：上一页最后一行的键值 + 冻结参数"""
+    values: tuple
+    params: Dict[str, Any]
+
+    def param(self, name: str, default: Any = None) -> Any:
+        return self.params.get(name, default)
+
+
+class KeysetPage(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+    has_more: bool
+
+
+# ==================== 游标编码 ====================
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$d" in value:
+            return date.fromisoformat(value["$d"])
+        if "$dec" in value:
+            return Decimal(value["$dec"])
+    return value
+
+
+def _secret() -> bytes:
+    from app.config import Config
+    return Config.SECRET_KEY.encode("utf-8")
+
+
+def _scope_tag(scope: str) -> str:
+    return hashlib.sha256(scope.encode("utf-8")).hexdigest()[:12]
+
+
+def _sign(body: bytes) -> str:
+    digest = hmac.new(_secret(), body, hashlib.sha256).digest()[:12]
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def encode_cursor(scope: str, values: Sequence[Any], params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    生成游标
+
+    Args:
+        scope: 作用域（接口 + 排序 + 筛选条件），解析时必须一致
+        values: 上一页最后一行的排序键值
+        params: 翻页期间需要冻结的参数
+    """
+    payload = {"s": _scope_tag(scope), "k": [_encode_value(v) for v in values]}
+    if params:
+        payload["p"] = {name: _encode_value(v) for name, v in params.items()}
+    body = base64.urlsafe_b64encode(
+        json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    ).decode("ascii").rstrip("=")
+    return f"{body}.{_sign(body.encode('ascii'))}"
+
+
+def decode_cursor(cursor: str, scope: str) -> CursorState:
+    """解析并校验游标；不合法抛 InvalidCursor"""
+    body, sep, signature = (cursor or "").partition(".")
+    if not sep or not hmac.compare_digest(signature, _sign(body.encode("ascii", "ignore"))):
+        raise InvalidCursor("游标签名无效")
+    try:
+        payload = json.loads(_b64decode(body))
+        values = tuple(_decode_value(v) for v in payload["k"])
+        params = {name: _decode_value(v) for name, v in payload.get("p", {}).items()}
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"游标格式无效: {e}")
+    if payload.get("s") != _scope_tag(scope):
+        raise InvalidCursor("游标不属于当前查询")
+    return CursorState(values, params)
+
+
+# ==================== 查询 ====================
+
+def keyset_condition(keys: Sequence[SortKey], values: Sequence[Any]):
+    """排在 values 之后的行：(k1, k2, ...) 按各自方向的字典序条件"""
+    if len(values) != len(keys):
+        raise InvalidCursor("游标键数量与排序不一致")
+    clauses = []
+    for i, key in enumerate(keys):
+        equal = [keys[j].expr == values[j] for j in range(i)]
+        after = key.expr < values[i] if key.descending else key.expr > values[i]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+
+def apply_ordering(query, keys: Sequence[SortKey]):
+    """替换查询的排序为排序键（offset 分页和游标分页共用同一顺序）"""
+    return query.order_by(None).order_by(*[key.ordering() for key in keys])
+
+
+async def paginate(
+    db,
+    query,
+    keys: Sequence[SortKey],
+    limit: int,
+    scope: str,
+    after: Optional[CursorState] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> KeysetPage:
+    """
+    按排序键取游标之后的一页
+
+    Args:
+        db: AsyncSession
+        query: select(Model) 形式的查询（不需要排序和 limit）
+        keys: 排序键，最后一个应为唯一 ID
+        scope: 游标作用域
+        after: decode_cursor 的结果；None 表示第一页
+        params: 写入下一页游标的冻结参数
+    """
+    query = apply_ordering(query, keys)
+    if after is not None:
+        query = query.where(keyset_condition(keys, after.values))
+    query = query.add_columns(*[key.expr.label(f"_keyset_{i}") for i, key in enumerate(keys)])
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(scope, tuple(rows[-1])[1:], params) if has_more else None
+    return KeysetPage([row[0] for row in rows], next_cursor, has_more)
+
+
+# ==================== 总数 ====================
+
+async def _exact_count(db, query) -> int:
+    result = await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+    return result.scalar() or 0
+
+
+async def _estimated_count(db, query) -> Optional[int]:
+    """PostgreSQL 规划器的行数估算；其他数据库或无法编译时返回 None"""
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return None
+    try:
+        compiled = query.order_by(None).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.debug(f"估算行数失败，改用精确 count: {e}")
+        return None
+
+
+async def _cached_count(db, query, cache_key: str, ttl: int) -> int:
+    try:
+        from app.redis_async import get_async_redis_client
+        redis_client = get_async_redis_client(decode_responses=True)
+        if redis_client is None:
+            return await _exact_count(db, query)
+        cached = await redis_client.get(cache_key)
+        if cached is not None:
+            return int(cached)
+        total = await _exact_count(db, query)
+        await redis_client.setex(cache_key, ttl, str(total))
+        return total
+    except (ValueError, TypeError):
+        return await _exact_count(db, query)
+    except Exception as e:
+        logger.warning(f"总数缓存不可用，直接执行 count: {e}")
+        return await _exact_count(db, query)
+
+
+async def count_rows(
+    db,
+    query,
+    mode: str = "exact",
+    cache_key: Optional[str] = None,
+    ttl: int = KEYSET_COUNT_CACHE_TTL,
+) -> int:
+    """
+    结果集总数
+
+    Args:
+        mode: exact / cached（需要 cache_key）/ estimate（估算较小时精确 count，结果有 cache_key 时缓存）
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"未知的计数模式: {mode}")
+    if mode == "estimate":
+        estimate = await _estimated_count(db, query)
+        if estimate is not None and estimate >= KEYSET_EXACT_COUNT_BELOW:
+            return estimate
+        mode = "cached" if cache_key else "exact"
+    if mode == "cached" and cache_key:
+        return await _cached_count(db, query, cache_key, ttl)
+    return await _exact_count(db, query)
+
+
+def count_cache_key(namespace: str, **filters: Any) -> str:
+    """按筛选条件生成总数缓存键"""
+    digest = hashlib.md5(
+        json.dumps(filters, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    return f"keyset:count:{namespace}:{digest}"
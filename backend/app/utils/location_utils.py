@@ -2,8 +2,14 @@
 位置工具函数
 用于位置信息的模糊显示和验证
 """
+import math
 from typing import Optional, Tuple
 
+# 地球半径（公里）
+EARTH_RADIUS_KM = 6371.0
+# 1 度纬度约 111km
+KM_PER_DEGREE_LAT = 111.0
+
 
 def obfuscate_location(location_text: Optional[str], latitude: Optional[float] = None, longitude: Optional[float] = None) -> str:
     """
@@ -156,10 +162,7 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     Returns:
         距离（公里）
     """
-    import math
-    
-    # 地球半径（公里）
-    R = 6371.0
+    R = EARTH_RADIUS_KM
     
     # 转换为弧度
     lat1_rad = math.radians(lat1)
@@ -179,3 +182,65 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     
     return distance
 
+
+def bounding_box(
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    margin: float = 1.2,
+) -> Tuple[float, float, float, float]:
+    """
+    计算覆盖以某点为圆心、给定半径的经纬度边界框（用于索引粗筛）
+
+    Args:
+        margin: 余量系数，保证边界框完整覆盖球面上的圆
+
+    Returns:
+        (min_lat, max_lat, min_lon, max_lon)
+    """
+    lat_range = radius_km / KM_PER_DEGREE_LAT * margin
+    cos_lat = math.cos(math.radians(latitude))
+    lon_range = radius_km / (KM_PER_DEGREE_LAT * max(cos_lat, 0.1)) * margin
+    return (
+        latitude - lat_range,
+        latitude + lat_range,
+        longitude - lon_range,
+        longitude + lon_range,
+    )
+
+
+def within_bounding_box(lat_column, lon_column, box: Tuple[float, float, float, float]):
+    """
+    构造"坐标落在边界框内"的过滤表达式（SQLAlchemy）
+
+    写成 point(lon, lat) <@ box(...)，与 GiST 表达式索引
+    idx_tasks_location_coordinates / idx_flea_market_items_location_coordinates 一致，可走索引。
+    """
+    from sqlalchemy import and_, func
+
+    min_lat, max_lat, min_lon, max_lon = box
+    return and_(
+        lat_column.isnot(None),
+        lon_column.isnot(None),
+        func.point(lon_column, lat_column).op("<@", is_comparison=True)(
+            func.box(func.point(min_lon, min_lat), func.point(max_lon, max_lat))
+        ),
+    )
+
+
+def distance_km_expr(lat_column, lon_column, latitude: float, longitude: float):
+    """
+    数据库端的 calculate_distance（Haversine，单位公里），坐标为空时结果为 NULL
+    """
+    from sqlalchemy import Float, cast, func
+
+    lat = cast(lat_column, Float)
+    lon = cast(lon_column, Float)
+    half_dlat = func.radians(lat - latitude) / 2
+    half_dlon = func.radians(lon - longitude) / 2
+    a = (
+        func.power(func.sin(half_dlat), 2)
+        + math.cos(math.radians(latitude)) * func.cos(func.radians(lat)) * func.power(func.sin(half_dlon), 2)
+    )
+    # least() 防止浮点误差使 sqrt 参数略大于 1
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(a, 1.0)))
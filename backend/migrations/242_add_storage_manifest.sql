@@ -0,0 +1,31 @@
+-- backend/migrations/242_add_storage_manifest.sql
+-- 存储清单：记录 ImageUploadService 上传的每个对象（归属实体、路径、大小）
+-- 实体删除时写入 orphaned_at，孤儿清理改为按索引增量处理，不再全量扫描目录 / S3 前缀
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS storage_objects (
+    id            SERIAL PRIMARY KEY,
+    path          VARCHAR(512) NOT NULL UNIQUE,
+    entity_type   VARCHAR(32) NOT NULL,
+    entity_id     VARCHAR(64),
+    owner_user_id VARCHAR(8),
+    size          BIGINT NOT NULL DEFAULT 0,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    orphaned_at   TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_storage_objects_entity
+    ON storage_objects(entity_type, entity_id);
+
+-- 只索引待清理行，常态下几乎为空
+CREATE INDEX IF NOT EXISTS ix_storage_objects_orphaned_at
+    ON storage_objects(orphaned_at)
+    WHERE orphaned_at IS NOT NULL;
+
+-- 临时上传（尚未归属实体）按创建时间过期
+CREATE INDEX IF NOT EXISTS ix_storage_objects_temp_created
+    ON storage_objects(created_at)
+    WHERE entity_id IS NULL;
+
+COMMIT;
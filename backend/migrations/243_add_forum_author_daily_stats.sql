@@ -0,0 +1,44 @@
+-- backend/migrations/243_add_forum_author_daily_stats.sql
+-- 论坛作者每日计数桶：发帖 / 被收藏 / 获赞排行榜改为对日期范围内的桶求和，
+-- 不再每次请求对整张 forum_posts / forum_replies 按作者 GROUP BY
+-- 由 ORM 事件钩子增量维护；超过 35 天的日桶由定时任务合并到 day='1970-01-01' 的汇总桶
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS forum_author_daily_stats (
+    author_id      VARCHAR(8) NOT NULL,
+    day            DATE NOT NULL,
+    category_id    INTEGER NOT NULL DEFAULT 0,  -- 0 = 无板块 / 回复获赞
+    post_count     INTEGER NOT NULL DEFAULT 0,
+    favorite_count INTEGER NOT NULL DEFAULT 0,
+    like_count     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (author_id, day, category_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_forum_author_daily_stats_day
+    ON forum_author_daily_stats(day);
+
+-- 回填：口径与原排行榜查询一致（按内容创建日期归桶）
+INSERT INTO forum_author_daily_stats (author_id, day, category_id, post_count, favorite_count, like_count)
+SELECT author_id, day, category_id, SUM(post_count), SUM(favorite_count), SUM(like_count)
+FROM (
+    SELECT p.author_id,
+           (p.created_at AT TIME ZONE 'UTC')::date AS day,
+           COALESCE(p.category_id, 0) AS category_id,
+           CASE WHEN p.is_visible THEN 1 ELSE 0 END AS post_count,
+           CASE WHEN p.is_visible THEN COALESCE(p.favorite_count, 0) ELSE 0 END AS favorite_count,
+           COALESCE(p.like_count, 0) AS like_count
+    FROM forum_posts p
+    WHERE p.author_id IS NOT NULL AND p.is_deleted = false
+    UNION ALL
+    SELECT r.author_id,
+           (r.created_at AT TIME ZONE 'UTC')::date,
+           0, 0, 0,
+           COALESCE(r.like_count, 0)
+    FROM forum_replies r
+    WHERE r.author_id IS NOT NULL AND r.is_deleted = false
+) s
+GROUP BY author_id, day, category_id
+ON CONFLICT (author_id, day, category_id) DO NOTHING;
+
+COMMIT;
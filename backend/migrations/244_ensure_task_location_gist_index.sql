@@ -0,0 +1,7 @@
+-- backend/migrations/244_ensure_task_location_gist_index.sql
+-- "附近"任务列表改为数据库端按距离排序分页：边界框条件 point(longitude, latitude) <@ box(...)
+-- 依赖该 GiST 表达式索引。037 只在新增坐标列时创建索引，这里补建以防已有列的库缺索引
+
+CREATE INDEX IF NOT EXISTS idx_tasks_location_coordinates
+    ON tasks USING GIST (point(longitude, latitude))
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
@@ -0,0 +1,15 @@
+-- backend/migrations/245_add_user_preference_vectors.sql
+-- 推荐用的用户偏好向量：每次推荐不再从任务历史 / 浏览 / 搜索 / 跳过记录重新聚合，
+-- 改为每个用户一行、由交互事件增量更新的衰减权重（JSON），读取时按经过时间做指数衰减
+-- 不做回填：首次读取时由最近的任务历史和交互记录重放生成
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS user_preference_vectors (
+    user_id    VARCHAR(8) PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    version    INTEGER NOT NULL DEFAULT 1,
+    data       JSONB NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()  -- 权重的衰减基准时间
+);
+
+COMMIT;
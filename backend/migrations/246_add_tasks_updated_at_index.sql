@@ -0,0 +1,5 @@
+-- backend/migrations/246_add_tasks_updated_at_index.sql
+-- 推荐候选索引（app.recommendation.candidate_index）每 30 秒按 updated_at 增量同步变更的任务，
+-- 每个进程一次 "WHERE updated_at > 水位" 查询；没有索引时是整表扫描
+
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks(updated_at);
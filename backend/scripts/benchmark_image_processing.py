@@ -0,0 +1,123 @@
+"""图片上传处理吞吐基准：测量每核每秒可处理的上传数（uploads/sec/core）。
+
+对比三种模式处理同一批合成 JPEG（带 EXIF，含缩略图预设）：
+    inline   — 调用方线程直接处理（旧行为）
+    pool     — ImageProcessingExecutor 进程池（N 个 worker，按实际可用核数折算）
+    deferred — 只处理原图，缩略图交给后台（只测请求路径耗时，不含后台生成）
+
+存储后端使用临时目录的 LocalStorageBackend，只测 CPU 处理，不含网络。
+
+用法（在 backend/ 目录下）：
+    python -m scripts.benchmark_image_processing
+    python -m scripts.benchmark_image_processing --uploads 200 --workers 4 --size 3000x2000
+    python -m scripts.benchmark_image_processing --json results.json
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent.parent
+if str(_HERE) not in sys.path:
+    sys.path.insert(0, str(_HERE))
+
+from PIL import Image
+
+from app.services.image_executor import ImageProcessingExecutor
+from app.services.image_processor import ImageProcessor
+from app.services.image_upload_service import (
+    CATEGORY_CONFIGS,
+    ImageCategory,
+    ImageUploadService,
+)
+from app.services.storage_backend import LocalStorageBackend
+
+
+def _make_jpeg(width: int, height: int, seed: int) -> bytes:
+    img = Image.effect_noise((width, height), 40 + seed % 20).convert("RGB")
+    exif = Image.Exif()
+    exif[0x010F] = "BenchCamera"
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90, exif=exif.tobytes())
+    return buf.getvalue()
+
+
+def _run(service: ImageUploadService, images: list[bytes], concurrency: int, defer: bool) -> float:
+    cfg = CATEGORY_CONFIGS[ImageCategory.FLEA_MARKET]
+    cfg = type(cfg)(**{**cfg.__dict__, "defer_thumbnails": defer})
+
+    def _one(data: bytes) -> None:
+        result = service.upload_stream(io.BytesIO(data), ImageCategory.FLEA_MARKET, resource_id="bench", config=cfg)
+        if not result.success:
+            raise RuntimeError(result.error)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_one, images))
+    return time.perf_counter() - start
+
+
+def _available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=60, help="每种模式处理的上传数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="进程池 worker 数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发上传请求数（模拟线程池）")
+    parser.add_argument("--size", default="2400x1800", help="合成图片尺寸 WxH")
+    parser.add_argument("--json", dest="json_path", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    images = [_make_jpeg(width, height, i) for i in range(min(args.uploads, 8))]
+    images = (images * (args.uploads // len(images) + 1))[:args.uploads]
+    processor = ImageProcessor()
+    pool_cores = min(args.workers, _available_cores())
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = LocalStorageBackend(base_dir=tmp, base_url="http://bench")
+        modes = [
+            ("inline", ImageProcessingExecutor(0), False, 1),
+            ("pool", ImageProcessingExecutor(args.workers), False, pool_cores),
+            ("deferred", ImageProcessingExecutor(args.workers), True, pool_cores),
+        ]
+        for name, executor, defer, cores in modes:
+            service = ImageUploadService(storage=storage, processor=processor, executor=executor)
+            # 预热：进程池启动、Pillow 插件加载
+            _run(service, images[:2], 1, defer)
+            elapsed = _run(service, images, args.concurrency, defer)
+            executor.shutdown(wait=True)
+            per_sec = args.uploads / elapsed
+            results.append({
+                "mode": name,
+                "uploads": args.uploads,
+                "cores": cores,
+                "seconds": round(elapsed, 3),
+                "uploads_per_sec": round(per_sec, 2),
+                "uploads_per_sec_per_core": round(per_sec / cores, 2),
+            })
+
+    print(f"图片 {width}x{height}，{args.uploads} 次上传，并发 {args.concurrency}")
+    print(f"{'mode':<10}{'cores':>6}{'seconds':>10}{'up/s':>10}{'up/s/core':>12}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['cores']:>6}{r['seconds']:>10}{r['uploads_per_sec']:>10}{r['uploads_per_sec_per_core']:>12}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"size": args.size, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
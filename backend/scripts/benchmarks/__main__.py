@@ -0,0 +1,142 @@
+"""命令行入口，见 scripts/benchmarks/__init__.py。"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent.parent.parent
+if str(_HERE) not in sys.path:
+    sys.path.insert(0, str(_HERE))
+
+from scripts.benchmarks import env  # noqa: E402  只依赖 sqlalchemy，不导入 app
+from scripts.benchmarks.harness import (  # noqa: E402
+    BENCHMARKS,
+    BenchContext,
+    build_report,
+    compare,
+    load_report,
+    run_suite,
+)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(prog="python -m scripts.benchmarks", description="热点路径基准")
+    parser.add_argument("--database-url", help="基准库（默认临时 SQLite 文件）；PostgreSQL 需为空库或配合 --reuse")
+    parser.add_argument("--redis-url", help="真实 Redis（建议独立 db，如 redis://localhost:6379/15）")
+    parser.add_argument("--fakeredis", action="store_true", help="使用 fakeredis 作为 Redis 替身")
+    parser.add_argument("--scale", default="small", choices=["tiny", "small", "medium", "large"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reuse", action="store_true", help="不生成数据，直接在 --database-url 的现有数据上运行")
+    parser.add_argument("--only", help="逗号分隔的基准名")
+    parser.add_argument("--group", choices=["micro", "endpoint"], help="只运行某一组")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每个基准至少运行的秒数")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--json", dest="json_path", help="将结果写入 JSON 文件")
+    parser.add_argument("--compare", dest="baseline", help="与之前的结果 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=0.10, help="中位数变化超过该比例视为回归 / 提升")
+    parser.add_argument("--fail-on-regression", action="store_true", help="有回归时以退出码 1 结束")
+    parser.add_argument("--list", action="store_true", help="列出基准后退出")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    env.configure_env(args.redis_url)
+    logging.basicConfig(level=logging.WARNING)
+
+    # 以下导入会加载 app 模块（注册基准）
+    from scripts.benchmarks import datagen, endpoints, micro  # noqa: F401
+
+    if args.list:
+        for bench in BENCHMARKS.values():
+            print(f"{bench.group:<10}{bench.name:<40}{','.join(bench.requires)}")
+        return 0
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="linku-bench-")
+        database_url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    capabilities: set = set()
+    sync_engine, session_factory, async_session_factory = env.bind_database(database_url, capabilities)
+    redis_client = env.bind_redis(args.redis_url, args.fakeredis, capabilities)
+
+    if args.reuse:
+        dataset = datagen.load_dataset(sync_engine, args.scale)
+    else:
+        print(f"生成 {args.scale} 规模数据（seed={args.seed}）→ {sync_engine.url.render_as_string()}")
+        dataset = datagen.generate(sync_engine, args.scale, args.seed)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    ctx = BenchContext(
+        scale=args.scale,
+        seed=args.seed,
+        capabilities=capabilities,
+        loop=loop,
+        sync_engine=sync_engine,
+        session_factory=session_factory,
+        async_session_factory=async_session_factory,
+        redis_client=redis_client,
+        dataset=dataset,
+    )
+    try:
+        results = run_suite(
+            ctx,
+            names=args.only.split(",") if args.only else None,
+            groups=[args.group] if args.group else None,
+            warmup=args.warmup,
+            min_rounds=args.min_rounds,
+            min_time=args.min_time,
+        )
+    finally:
+        loop.close()
+        sync_engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    report = build_report(
+        results,
+        scale=args.scale,
+        seed=args.seed,
+        database=sync_engine.dialect.name,
+        redis="redis" if args.redis_url else ("fakeredis" if args.fakeredis else "none"),
+    )
+
+    print(f"\n{'benchmark':<40}{'median ms':>12}{'p95 ms':>12}{'ops/s':>10}  status")
+    for r in results:
+        stats = r.get("stats") or {}
+        print(
+            f"{r['name']:<40}{stats.get('median_ms', ''):>12}{stats.get('p95_ms', ''):>12}"
+            f"{stats.get('ops_per_sec', '') or '':>10}  {r['status']} {r.get('reason', '')}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    regressions = 0
+    if args.baseline:
+        baseline = load_report(args.baseline)
+        rows = compare(baseline, report, args.threshold)
+        print(f"\n对比 {args.baseline}（阈值 ±{args.threshold:.0%}）")
+        mismatched = [k for k in ("scale", "database", "redis") if baseline["run"].get(k) != report["run"][k]]
+        if mismatched:
+            print(f"⚠️ 两次运行的 {', '.join(mismatched)} 不同，结果不可直接比较")
+        for row in rows:
+            print(f"{row['name']:<40}{row['baseline_ms']:>12}{row['current_ms']:>12}{row['change']:>+10.1%}  {row['verdict']}")
+        regressions = sum(row["verdict"] == "regression" for row in rows)
+
+    return 1 if args.fail_on_regression and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
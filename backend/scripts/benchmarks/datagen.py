@@ -0,0 +1,309 @@
+"""合成数据生成：按规模向基准库写入用户、任务、交互、论坛帖子、消息、跳蚤市场商品、搜索日志。
+
+同一 (scale, seed) 生成的数据完全相同（时间相对于生成时刻），便于跨运行对比。
+使用 Core 批量 INSERT，显式指定主键；PostgreSQL 上写完后同步序列。
+
+SQLite 作为替身时，JSONB / INET 分别按 JSON / VARCHAR 建表，其余模型原样创建。
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.dialects.postgresql import INET, JSONB
+from sqlalchemy.ext.compiler import compiles
+
+from app.flea_market_constants import FLEA_MARKET_CATEGORIES
+from app.schemas import TASK_TYPES
+from app.utils.city_filter_utils import UK_CITY_BOUNDS
+from app.utils.time_utils import get_utc_time
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(INET, "sqlite")
+def _inet_sqlite(type_, compiler, **kw):
+    return "VARCHAR(45)"
+
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "tiny": {"users": 50, "tasks": 200, "interactions": 1_000, "forum_posts": 100,
+             "messages": 500, "flea_items": 100, "search_logs": 300},
+    "small": {"users": 500, "tasks": 3_000, "interactions": 20_000, "forum_posts": 1_000,
+              "messages": 10_000, "flea_items": 1_000, "search_logs": 3_000},
+    "medium": {"users": 5_000, "tasks": 30_000, "interactions": 200_000, "forum_posts": 10_000,
+               "messages": 100_000, "flea_items": 10_000, "search_logs": 30_000},
+    "large": {"users": 50_000, "tasks": 300_000, "interactions": 2_000_000, "forum_posts": 100_000,
+              "messages": 1_000_000, "flea_items": 100_000, "search_logs": 300_000},
+}
+
+CHUNK_SIZE = 5_000
+
+WORDS = [
+    "help", "need", "urgent", "weekend", "student", "london", "moving", "furniture", "airport",
+    "pickup", "tutor", "maths", "english", "essay", "design", "logo", "website", "python",
+    "photo", "cleaning", "flat", "cooking", "dinner", "dog", "walk", "repair", "bike", "iphone",
+    "帮忙", "搬家", "接机", "代购", "辅导", "翻译", "设计", "拍照", "清洁", "做饭", "遛狗", "修理",
+]
+SEARCH_QUERIES = [
+    "搬家", "接机 希思罗", "代购", "雅思 辅导", "logo design", "python tutor", "遛狗", "二手 自行车",
+    "iphone 维修", "论文 润色", "租房", "宜家 家具", "毕业 照", "做饭", "cleaning", "airport pickup",
+]
+INTERACTION_TYPES = ["view"] * 12 + ["click"] * 4 + ["apply", "accept", "complete", "skip"]
+STATUSES = ["open"] * 7 + ["taken", "in_progress", "completed"]
+
+
+@dataclass
+class Dataset:
+    """生成（或读取）到的数据概况，供基准挑选参数"""
+    scale: str
+    counts: Dict[str, int]
+    user_ids: List[str] = field(default_factory=list)
+    active_user_id: str = ""
+    forum_category_ids: List[int] = field(default_factory=list)
+    cities: List[str] = field(default_factory=list)
+
+
+def _user_id(i: int) -> str:
+    return f"{10_000_000 + i}"
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _insert(conn, table, rows: Iterable[Dict[str, Any]]) -> int:
+    total = 0
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK_SIZE:
+            conn.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+
+def _sync_sequences(conn, tables):
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+        ))
+
+
+def create_schema(engine) -> None:
+    from app.models import Base
+    import app.models_ai_qa  # noqa: F401  注册 ai_questions 等表
+    import app.models_expert  # noqa: F401
+
+    Base.metadata.create_all(bind=engine, checkfirst=True)
+
+
+def generate(engine, scale: str = "small", seed: int = 42) -> Dataset:
+    """在空库上建表并写入合成数据；库中已有用户时拒绝写入"""
+    from app import models
+
+    counts = SCALES[scale]
+    rng = random.Random(seed)
+    now = get_utc_time()
+    create_schema(engine)
+
+    users_t = models.User.__table__
+    tasks_t = models.Task.__table__
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(users_t)).scalar():
+            raise RuntimeError("目标库已有用户数据：请使用空库，或加 --reuse 直接在现有数据上运行")
+
+    cities = list(UK_CITY_BOUNDS)
+    city_weights = [8 if c == "London" else 1 for c in cities]
+    n_users, n_tasks = counts["users"], counts["tasks"]
+    user_ids = [_user_id(i) for i in range(n_users)]
+    # 活跃度呈长尾：少数用户贡献大部分发布 / 交互
+    user_weights = [1 / (i + 1) ** 0.8 for i in range(n_users)]
+
+    def pick_user() -> str:
+        return rng.choices(user_ids, weights=user_weights)[0]
+
+    def pick_point(city: str):
+        min_lat, max_lat, min_lon, max_lon = UK_CITY_BOUNDS[city]
+        return round(rng.uniform(min_lat, max_lat), 6), round(rng.uniform(min_lon, max_lon), 6)
+
+    with engine.begin() as conn:
+        _insert(conn, users_t, (
+            {
+                "id": uid,
+                "name": f"bench_{uid}",
+                "email": f"{uid}@bench.local",
+                "hashed_password": "x",
+                "created_at": now - timedelta(days=rng.randint(0, 720)),
+                "residence_city": rng.choices(cities, weights=city_weights)[0],
+                "avg_rating": round(rng.uniform(3, 5), 2),
+            }
+            for uid in user_ids
+        ))
+
+        def task_rows():
+            for task_id in range(1, n_tasks + 1):
+                city = rng.choices(cities, weights=city_weights)[0]
+                lat, lon = pick_point(city) if rng.random() < 0.8 else (None, None)
+                reward = rng.choice([5, 10, 15, 20, 30, 50, 80, 120])
+                created = now - timedelta(hours=rng.randint(0, 24 * 120))
+                yield {
+                    "id": task_id,
+                    "title": _sentence(rng, 4)[:100],
+                    "description": _sentence(rng, 30),
+                    "reward": reward,
+                    "base_reward": reward,
+                    "location": city,
+                    "city_canonical": city,
+                    "latitude": lat,
+                    "longitude": lon,
+                    "task_type": rng.choice(TASK_TYPES),
+                    "poster_id": pick_user(),
+                    "status": rng.choice(STATUSES),
+                    "task_level": "normal",
+                    "created_at": created,
+                    "deadline": now + timedelta(days=rng.randint(1, 60)),
+                    "is_visible": True,
+                    "view_count": rng.randint(0, 500),
+                }
+        _insert(conn, tasks_t, task_rows())
+
+        _insert(conn, models.UserTaskInteraction.__table__, (
+            {
+                "id": i,
+                "user_id": pick_user(),
+                "task_id": rng.randint(1, n_tasks),
+                "interaction_type": rng.choice(INTERACTION_TYPES),
+                "interaction_time": now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+                "duration_seconds": rng.randint(3, 300),
+                "device_type": rng.choice(["ios", "android", "web"]),
+            }
+            for i in range(1, counts["interactions"] + 1)
+        ))
+
+        category_rows = [
+            {"id": i, "name": f"板块{i}", "type": "general", "is_visible": True, "sort_order": i}
+            for i in range(1, 9)
+        ]
+        _insert(conn, models.ForumCategory.__table__, category_rows)
+        forum_category_ids = [row["id"] for row in category_rows]
+        _insert(conn, models.ForumPost.__table__, (
+            {
+                "id": i,
+                "title": _sentence(rng, 5)[:200],
+                "content": _sentence(rng, 80),
+                "category_id": rng.choice(forum_category_ids),
+                "author_id": pick_user(),
+                "view_count": rng.randint(0, 5_000),
+                "reply_count": rng.randint(0, 80),
+                "like_count": rng.randint(0, 300),
+                "is_visible": True,
+                "is_deleted": False,
+                "created_at": (created := now - timedelta(hours=rng.randint(0, 24 * 180))),
+                "last_reply_at": created + timedelta(hours=rng.randint(0, 48)),
+            }
+            for i in range(1, counts["forum_posts"] + 1)
+        ))
+
+        def message_rows():
+            for i in range(1, counts["messages"] + 1):
+                task_id = rng.randint(1, n_tasks)
+                yield {
+                    "id": i,
+                    "sender_id": pick_user(),
+                    "receiver_id": pick_user(),
+                    "task_id": task_id,
+                    "content": _sentence(rng, 12),
+                    "conversation_type": "task",
+                    "message_type": "normal",
+                    "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+                    "is_read": int(rng.random() < 0.7),
+                }
+        _insert(conn, models.Message.__table__, message_rows())
+
+        _insert(conn, models.FleaMarketItem.__table__, (
+            {
+                "id": i,
+                "title": _sentence(rng, 4)[:200],
+                "description": _sentence(rng, 25),
+                "price": round(rng.uniform(1, 500), 2),
+                "category": rng.choice(FLEA_MARKET_CATEGORIES),
+                "location": rng.choices(cities, weights=city_weights)[0],
+                "listing_type": "rental" if rng.random() < 0.1 else "sale",
+                "status": "active" if rng.random() < 0.85 else "sold",
+                "is_visible": True,
+                "seller_id": pick_user(),
+                "view_count": rng.randint(0, 1_000),
+                "refreshed_at": (created := now - timedelta(hours=rng.randint(0, 24 * 60))),
+                "created_at": created,
+            }
+            for i in range(1, counts["flea_items"] + 1)
+        ))
+
+        _insert(conn, models.SearchLog.__table__, (
+            {
+                "id": i,
+                "user_id": pick_user(),
+                "raw_query": (query := rng.choice(SEARCH_QUERIES)),
+                "tokens": query.split(),
+                "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+            }
+            for i in range(1, counts["search_logs"] + 1)
+        ))
+
+        _sync_sequences(conn, [
+            tasks_t, models.UserTaskInteraction.__table__, models.ForumCategory.__table__,
+            models.ForumPost.__table__, models.Message.__table__, models.FleaMarketItem.__table__,
+            models.SearchLog.__table__,
+        ])
+
+    return Dataset(
+        scale=scale,
+        counts=dict(counts),
+        user_ids=user_ids,
+        active_user_id=user_ids[0],
+        forum_category_ids=forum_category_ids,
+        cities=cities,
+    )
+
+
+def load_dataset(engine, scale: str) -> Dataset:
+    """--reuse：从已有库读取数据概况（最活跃用户按交互数取）"""
+    from app import models
+
+    with engine.connect() as conn:
+        counts = {
+            "users": conn.execute(select(func.count()).select_from(models.User.__table__)).scalar(),
+            "tasks": conn.execute(select(func.count()).select_from(models.Task.__table__)).scalar(),
+        }
+        if not counts["users"]:
+            raise RuntimeError("目标库没有用户数据，无法 --reuse")
+        user_ids = list(conn.execute(select(models.User.id).limit(10_000)).scalars())
+        active = conn.execute(
+            select(models.UserTaskInteraction.user_id)
+            .group_by(models.UserTaskInteraction.user_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).scalar()
+        category_ids = list(conn.execute(select(models.ForumCategory.id)).scalars())
+    return Dataset(
+        scale=scale,
+        counts=counts,
+        user_ids=user_ids,
+        active_user_id=active or user_ids[0],
+        forum_category_ids=category_ids,
+        cities=list(UK_CITY_BOUNDS),
+    )
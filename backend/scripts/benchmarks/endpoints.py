@@ -0,0 +1,120 @@
+"""端点基准：直接调用路由函数（显式传入查询参数和会话），包含查询、组装与缓存，不含 HTTP / 鉴权中间件。
+
+响应缓存装饰器（cache_response）通过 __wrapped__ 绕过，测的是缓存未命中路径；
+各函数内部的计数缓存 / 对象缓存照常使用（有 Redis 时命中，无 Redis 时直接查库）。
+"""
+from __future__ import annotations
+
+import itertools
+
+from .harness import CAP_ASYNC_DB, CAP_DB, CAP_POSTGRES, BenchContext, SkipBenchmark, benchmark
+
+_ASYNC = (CAP_DB, CAP_ASYNC_DB)
+
+
+def _load_user(ctx: BenchContext):
+    from app import models
+
+    async def load():
+        async with ctx.async_session_factory() as db:
+            return await db.get(models.User, ctx.dataset.active_user_id)
+    user = ctx.run(load())
+    if user is None:
+        raise SkipBenchmark("找不到基准用户")
+    return user
+
+
+def _discovery(ctx: BenchContext, scope: str, logged_in: bool):
+    from app.discovery_routes import get_discovery_feed
+
+    feed = getattr(get_discovery_feed, "__wrapped__", get_discovery_feed)
+    user = _load_user(ctx) if logged_in else None
+    pages = itertools.cycle([1, 2, 3])
+
+    async def run():
+        async with ctx.async_session_factory() as db:
+            await feed(
+                page=next(pages), limit=20, seed=ctx.seed, scope=scope,
+                latitude=None, longitude=None, city=None,
+                request=None, current_user=user, db=db,
+            )
+    return run
+
+
+@benchmark("discovery.feed_home_anonymous", "endpoint", requires=_ASYNC, scope="home")
+def discovery_home_anonymous(ctx: BenchContext):
+    return _discovery(ctx, "home", logged_in=False)
+
+
+@benchmark("discovery.feed_home_user", "endpoint", requires=_ASYNC, scope="home")
+def discovery_home_user(ctx: BenchContext):
+    return _discovery(ctx, "home", logged_in=True)
+
+
+@benchmark("discovery.feed_community", "endpoint", requires=_ASYNC, scope="community")
+def discovery_community(ctx: BenchContext):
+    return _discovery(ctx, "community", logged_in=False)
+
+
+def _tasks(ctx: BenchContext, **filters):
+    from app.async_crud import AsyncTaskCRUD
+
+    skips = itertools.cycle([0, 20, 40])
+
+    async def run():
+        async with ctx.async_session_factory() as db:
+            await AsyncTaskCRUD.get_tasks_with_total(db, skip=next(skips), limit=20, **filters)
+    return run
+
+
+@benchmark("tasks.list_latest", "endpoint", requires=_ASYNC, sort_by="latest")
+def tasks_latest(ctx: BenchContext):
+    return _tasks(ctx, sort_by="latest")
+
+
+@benchmark("tasks.list_city_type", "endpoint", requires=_ASYNC, location="London", task_type="tutoring")
+def tasks_city_type(ctx: BenchContext):
+    return _tasks(ctx, location="London", task_type="tutoring", sort_by="latest")
+
+
+# 关键词检索用 pg_trgm similarity()，附近任务用 point / box 运算符，只在 PostgreSQL 上运行
+@benchmark("tasks.list_keyword", "endpoint", requires=_ASYNC + (CAP_POSTGRES,), keyword="moving")
+def tasks_keyword(ctx: BenchContext):
+    return _tasks(ctx, keyword="moving", sort_by="latest")
+
+
+@benchmark("tasks.list_nearby", "endpoint", requires=_ASYNC + (CAP_POSTGRES,), radius_km=5)
+def tasks_nearby(ctx: BenchContext):
+    return _tasks(ctx, sort_by="distance", user_latitude=51.5074, user_longitude=-0.1278, radius_km=5)
+
+
+def _flea_market(ctx: BenchContext, logged_in: bool, **filters):
+    from app.flea_market_routes import get_flea_market_items
+
+    user = _load_user(ctx) if logged_in else None
+    params = {
+        "page": 1, "pageSize": 20, "category": None, "keyword": None, "status_filter": "active",
+        "seller_id": None, "listing_type": None, "cursor": None, **filters,
+    }
+
+    async def run():
+        async with ctx.async_session_factory() as db:
+            await get_flea_market_items(**params, current_user=user, db=db)
+    return run
+
+
+@benchmark("flea_market.items_anonymous", "endpoint", requires=_ASYNC)
+def flea_market_anonymous(ctx: BenchContext):
+    """匿名首页：有 Redis 时预热后即为缓存命中路径"""
+    return _flea_market(ctx, logged_in=False)
+
+
+@benchmark("flea_market.items_user", "endpoint", requires=_ASYNC)
+def flea_market_user(ctx: BenchContext):
+    """登录用户：不走列表缓存，含收藏状态查询"""
+    return _flea_market(ctx, logged_in=True)
+
+
+@benchmark("flea_market.items_keyword_user", "endpoint", requires=_ASYNC, keyword="bike")
+def flea_market_keyword(ctx: BenchContext):
+    return _flea_market(ctx, logged_in=True, keyword="bike", category="Sports")
@@ -0,0 +1,138 @@
+"""基准环境：数据库 / Redis 替身的接入。
+
+应用模块在导入时按环境变量创建引擎和 Redis 客户端，因此：
+- configure_env 必须在导入任何 app 模块之前调用（关闭未配置的 Redis，避免连接 localhost 超时）
+- bind_database / bind_redis 在导入之后把应用使用的会话工厂、Redis 客户端指向基准环境
+"""
+from __future__ import annotations
+
+import os
+from datetime import timezone
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from sqlalchemy import DateTime, create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from .harness import CAP_ASYNC_DB, CAP_DB, CAP_POSTGRES, CAP_REDIS
+
+
+def configure_env(redis_url: Optional[str]) -> None:
+    os.environ.setdefault("ENVIRONMENT", "development")
+    if redis_url:
+        os.environ["REDIS_URL"] = redis_url
+        os.environ["USE_REDIS"] = "true"
+    else:
+        os.environ["USE_REDIS"] = "false"
+    # 基准只关心请求路径本身，关闭后台指标发布等附带开销
+    os.environ.setdefault("QUERY_PROFILER_ENABLED", "false")
+
+
+def _async_url(url) -> Optional[str]:
+    if url.get_backend_name() == "sqlite":
+        driver = "aiosqlite"
+    elif url.get_backend_name() == "postgresql":
+        driver = "asyncpg"
+    else:
+        return None
+    try:
+        __import__(driver)
+    except ImportError:
+        return None
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+@lru_cache(maxsize=None)
+def _aware_datetime_attrs(cls) -> Tuple[str, ...]:
+    return tuple(
+        prop.key
+        for prop in inspect(cls).column_attrs
+        if any(isinstance(col.type, DateTime) and col.type.timezone for col in prop.columns)
+    )
+
+
+def _restore_utc(target, *args):
+    """SQLite 不保存时区：ORM 加载后把 DateTime(timezone=True) 列补回 UTC，与 PostgreSQL 行为一致"""
+    state = target.__dict__
+    for key in _aware_datetime_attrs(type(target)):
+        value = state.get(key)
+        if value is not None and value.tzinfo is None:
+            state[key] = value.replace(tzinfo=timezone.utc)
+
+
+def bind_database(database_url: str, capabilities: set) -> Tuple:
+    """创建基准引擎并替换 app.database 的会话工厂；返回 (sync_engine, sessionmaker, async_sessionmaker)"""
+    import app.database as app_database
+
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        raise ValueError("SQLite 需使用文件库（同步和异步引擎要看到同一份数据），如 sqlite:///bench.db")
+
+    if url.get_backend_name() == "sqlite":
+        from app.models import Base
+
+        event.listen(Base, "load", _restore_utc, propagate=True)
+        event.listen(Base, "refresh", _restore_utc, propagate=True)
+
+    sync_engine = create_engine(url, future=True)
+    session_factory = sessionmaker(bind=sync_engine, autoflush=False, expire_on_commit=False)
+    capabilities.add(CAP_DB)
+    if url.get_backend_name() == "postgresql":
+        capabilities.add(CAP_POSTGRES)
+
+    async_session_factory = None
+    async_url = _async_url(url)
+    if async_url:
+        # NullPool：每轮新建连接，避免跨事件循环复用连接
+        async_engine = create_async_engine(async_url, poolclass=NullPool if url.get_backend_name() == "sqlite" else None)
+        async_session_factory = async_sessionmaker(
+            async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False,
+        )
+        capabilities.add(CAP_ASYNC_DB)
+
+    app_database.sync_engine = sync_engine
+    app_database.SessionLocal = session_factory
+    if async_session_factory is not None:
+        app_database.AsyncSessionLocal = async_session_factory
+        app_database.ASYNC_AVAILABLE = True
+    return sync_engine, session_factory, async_session_factory
+
+
+def bind_redis(redis_url: Optional[str], use_fakeredis: bool, capabilities: set):
+    """返回同步 Redis 客户端（无 Redis 时为 None）；fakeredis 时替换应用获取客户端的入口"""
+    if redis_url:
+        from app.redis_cache import get_redis_client
+
+        client = get_redis_client()
+        if client is not None:
+            capabilities.add(CAP_REDIS)
+        return client
+    if not use_fakeredis:
+        return None
+
+    import fakeredis
+    import fakeredis.aioredis
+
+    import app.redis_async as redis_async
+    import app.redis_pool as redis_pool
+    from app.redis_cache import redis_cache
+
+    server = fakeredis.FakeServer()
+    sync_clients = {flag: fakeredis.FakeRedis(server=server, decode_responses=flag) for flag in (False, True)}
+    async_clients = {}
+
+    def get_async_client(decode_responses: bool = False):
+        # 异步客户端绑定创建时的事件循环；基准全程只用一个循环
+        if decode_responses not in async_clients:
+            async_clients[decode_responses] = fakeredis.aioredis.FakeRedis(server=server, decode_responses=decode_responses)
+        return async_clients[decode_responses]
+
+    redis_pool.get_client = lambda decode_responses=False: sync_clients[decode_responses]
+    redis_async.get_async_client = get_async_client
+    redis_cache.redis_client = sync_clients[False]
+    redis_cache.enabled = True
+    capabilities.add(CAP_REDIS)
+    return sync_clients[False]
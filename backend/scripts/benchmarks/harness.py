@@ -0,0 +1,214 @@
+"""基准框架：注册、计时、结果格式与对比。
+
+结果 JSON（schema_version=1）::
+
+    {
+      "schema_version": 1,
+      "run": {"started_at", "git_commit", "python", "platform", "cpu_count",
+              "scale", "seed", "database", "redis"},
+      "benchmarks": [
+        {"name", "group", "status": "ok" | "skipped" | "error", "reason",
+         "params": {...},
+         "stats": {"rounds", "min_ms", "median_ms", "mean_ms", "p95_ms", "max_ms",
+                   "stdev_ms", "ops_per_sec"}}
+      ]
+    }
+
+对比以 median_ms 为准：变慢超过阈值记为 regression，变快超过阈值记为 improvement。
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+SCHEMA_VERSION = 1
+
+# 能力标签：基准声明所需能力，环境不满足时记为 skipped
+CAP_DB = "db"              # 任意数据库（SQLite / PostgreSQL）
+CAP_ASYNC_DB = "async_db"  # 异步驱动（aiosqlite / asyncpg）
+CAP_POSTGRES = "postgres"  # 依赖 PostgreSQL 专有 SQL
+CAP_REDIS = "redis"        # Redis 或 fakeredis
+
+
+class SkipBenchmark(Exception):
+    """基准在当前环境无法运行（缺少数据、依赖等）"""
+
+
+@dataclass
+class Benchmark:
+    name: str
+    group: str  # micro / endpoint
+    setup: Callable[["BenchContext"], Callable[[], Any]]
+    requires: Sequence[str] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, group: str, requires: Sequence[str] = (), **params):
+    """注册基准。被装饰函数接收 BenchContext，返回一个无参的被测函数（同步或 async）"""
+    def decorator(setup):
+        BENCHMARKS[name] = Benchmark(name=name, group=group, setup=setup, requires=tuple(requires), params=params)
+        return setup
+    return decorator
+
+
+@dataclass
+class BenchContext:
+    """一次运行共享的环境：数据库、Redis、已生成数据的概况"""
+    scale: str
+    seed: int
+    capabilities: set
+    loop: asyncio.AbstractEventLoop
+    sync_engine: Any = None
+    session_factory: Any = None        # sync sessionmaker
+    async_session_factory: Any = None  # async_sessionmaker
+    redis_client: Any = None
+    dataset: Any = None                # datagen.Dataset
+
+    def run(self, fn_or_coro):
+        """在共享事件循环里执行协程（endpoint 基准的 session 需绑定同一个 loop）"""
+        if inspect.iscoroutine(fn_or_coro):
+            return self.loop.run_until_complete(fn_or_coro)
+        return fn_or_coro
+
+
+def _summarize(samples_s: List[float]) -> Dict[str, Any]:
+    ordered = sorted(samples_s)
+    n = len(ordered)
+    median = statistics.median(ordered)
+    mean = statistics.fmean(ordered)
+    return {
+        "rounds": n,
+        "min_ms": round(ordered[0] * 1000, 4),
+        "median_ms": round(median * 1000, 4),
+        "mean_ms": round(mean * 1000, 4),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "stdev_ms": round(statistics.stdev(ordered) * 1000, 4) if n > 1 else 0.0,
+        "ops_per_sec": round(1 / mean, 2) if mean > 0 else None,
+    }
+
+
+def measure(fn: Callable[[], Any], ctx: BenchContext, warmup: int = 3,
+            min_rounds: int = 5, max_rounds: int = 1000, min_time: float = 1.0) -> Dict[str, Any]:
+    """
+    预热 warmup 次后反复调用 fn，直到至少 min_rounds 次且累计 min_time 秒（或达到 max_rounds）
+
+    async 函数在 ctx.loop 上逐次 run_until_complete，计时只包含函数本身。
+    """
+    is_async = inspect.iscoroutinefunction(fn)
+
+    def call():
+        if is_async:
+            ctx.loop.run_until_complete(fn())
+        else:
+            fn()
+
+    for _ in range(warmup):
+        call()
+    samples: List[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_rounds and (len(samples) < min_rounds or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return _summarize(samples)
+
+
+def run_suite(ctx: BenchContext, names: Optional[Sequence[str]] = None, groups: Optional[Sequence[str]] = None,
+              **measure_kwargs) -> List[Dict[str, Any]]:
+    results = []
+    for bench in BENCHMARKS.values():
+        if names and bench.name not in names:
+            continue
+        if groups and bench.group not in groups:
+            continue
+        entry: Dict[str, Any] = {"name": bench.name, "group": bench.group, "params": bench.params}
+        missing = [cap for cap in bench.requires if cap not in ctx.capabilities]
+        if missing:
+            entry.update(status="skipped", reason=f"需要 {', '.join(missing)}")
+            results.append(entry)
+            continue
+        try:
+            fn = bench.setup(ctx)
+            entry.update(status="ok", stats=measure(fn, ctx, **measure_kwargs))
+        except SkipBenchmark as e:
+            entry.update(status="skipped", reason=str(e))
+        except Exception as e:
+            entry.update(status="error", reason=f"{type(e).__name__}: {e}")
+        results.append(entry)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def build_report(results: List[Dict[str, Any]], *, scale: str, seed: int, database: str, redis: str) -> Dict[str, Any]:
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "run": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": scale,
+            "seed": seed,
+            "database": database,
+            "redis": redis,
+        },
+        "benchmarks": results,
+    }
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    if report.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(f"{path}: 不支持的 schema_version {report.get('schema_version')}")
+    return report
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """按名称对比两次运行的 median_ms；只比较两边都为 ok 的基准"""
+    base = {b["name"]: b for b in baseline["benchmarks"] if b.get("status") == "ok"}
+    rows = []
+    for bench in current["benchmarks"]:
+        old = base.get(bench["name"])
+        if bench.get("status") != "ok" or old is None:
+            continue
+        before = old["stats"]["median_ms"]
+        after = bench["stats"]["median_ms"]
+        change = (after - before) / before if before else 0.0
+        if change > threshold:
+            verdict = "regression"
+        elif change < -threshold:
+            verdict = "improvement"
+        else:
+            verdict = "same"
+        rows.append({
+            "name": bench["name"],
+            "baseline_ms": before,
+            "current_ms": after,
+            "change": round(change, 4),
+            "verdict": verdict,
+        })
+    return rows
@@ -0,0 +1,100 @@
+"""微基准：单个热点函数，不经过路由层。"""
+from __future__ import annotations
+
+import json
+import random
+
+from .harness import CAP_DB, CAP_POSTGRES, BenchContext, SkipBenchmark, benchmark
+from .datagen import WORDS
+
+
+@benchmark("content_filter.check", "micro", texts=200, keywords=2000)
+def content_filter_check(ctx: BenchContext):
+    """2000 个敏感词 + 200 段混合中英文 / 联系方式 / 变体的文本，每轮检查全部文本"""
+    from app.content_filter.content_filter import ContentFilter
+
+    rng = random.Random(ctx.seed)
+    keywords = [
+        {"word": f"{rng.choice(WORDS)}{i}", "category": "spam", "level": rng.choice(["mask", "review"])}
+        for i in range(2000)
+    ]
+    content_filter = ContentFilter(keywords=keywords, homophones={"微": "威", "信": "心"})
+    samples = [
+        "加我威心 abc123 便宜代购",
+        "call me on 07700 900123 for the flat",
+        "ｗｅｃｈａｔ：ｌｉｎｋｕ８８８",
+        "email me at someone@example.com",
+    ]
+    texts = []
+    for i in range(200):
+        body = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 60)))
+        if i % 5 == 0:
+            body += " " + rng.choice(samples)
+        if i % 7 == 0:
+            body += " " + keywords[rng.randrange(len(keywords))]["word"]
+        texts.append(body)
+
+    def run():
+        for text in texts:
+            content_filter.check(text)
+    return run
+
+
+@benchmark("websocket.broadcast", "micro", connections=2000)
+def websocket_broadcast(ctx: BenchContext):
+    """向 2000 个在线连接广播一条消息（发送端只做 JSON 序列化，不含网络）"""
+    from app.websocket_manager import WebSocketConnection, WebSocketManager
+
+    class _Socket:
+        __slots__ = ("sent",)
+
+        def __init__(self):
+            self.sent = 0
+
+        async def send_json(self, message):
+            json.dumps(message, ensure_ascii=False)
+            self.sent += 1
+
+    manager = WebSocketManager()
+    for i in range(2000):
+        user_id = f"{20_000_000 + i}"
+        connection = WebSocketConnection(_Socket(), user_id)
+        connection.is_accepted = True
+        manager.connections[user_id] = connection
+    message = {"type": "announcement", "data": {"title": "系统维护通知", "body": "x" * 200}}
+
+    async def run():
+        await manager.broadcast(message, exclude_users={"20000000"})
+    return run
+
+
+@benchmark("recommendation.hybrid_engine", "micro", requires=(CAP_DB,), limit=20)
+def hybrid_engine_recommend(ctx: BenchContext):
+    """最活跃用户的完整打分流程（9 个 scorer，候选 ≤ 500），每轮新建会话"""
+    from app import models
+    from app.recommendation import create_engine
+
+    engine = create_engine()
+    with ctx.session_factory() as db:
+        if db.get(models.User, ctx.dataset.active_user_id) is None:
+            raise SkipBenchmark("找不到基准用户")
+
+    def run():
+        with ctx.session_factory() as db:
+            user = db.get(models.User, ctx.dataset.active_user_id)
+            engine.recommend(user, limit=20, context={"db": db})
+    return run
+
+
+@benchmark("trending.compute", "micro", requires=(CAP_DB, CAP_POSTGRES))
+def compute_trending(ctx: BenchContext):
+    """热搜计算（聚合 + 聚类 + 浏览量 + 写快照），每轮回滚"""
+    from app.trending_search import compute_trending as compute
+
+    def run():
+        with ctx.session_factory() as db:
+            try:
+                compute(db)
+            finally:
+                db.rollback()
+    return run
@@ -4,20 +4,25 @@ pytest 配置与公共 fixture
 单元测试 (test_*.py):
 - db: 提供可回滚的 Session，测试后自动 rollback，不污染数据库
 - 需设置 DATABASE_URL（CI 中由 PostgreSQL 服务提供）
+- fake_redis: 内存 Redis 替身（字符串 / 哈希 / 集合 / 有序集合 + pipeline，as_async() 取异步客户端）
+- sqlite_sessionmaker: 只建指定表的内存 SQLite，返回 sessionmaker，不依赖 PostgreSQL
 
 API 集成测试 (tests/api/):
 - 不需要本地数据库，通过 HTTP 请求测试远程 Railway 环境
 - 有独立的 conftest.py
 """
 
+import fnmatch
+import inspect
 import os
+
 import pytest
 
 # =============================================================================
 # 尝试导入 sqlalchemy（API 测试不需要，单元测试需要）
 # =============================================================================
 try:
-    from sqlalchemy import create_engine
+    from sqlalchemy import create_engine, event
     from sqlalchemy.orm import Session, sessionmaker
     from sqlalchemy.pool import StaticPool
     SQLALCHEMY_AVAILABLE = True
@@ -99,3 +104,328 @@ def db(_tables):
         session.close()
         transaction.rollback()
         connection.close()
+
+
+# =============================================================================
+# 单元测试共用替身：内存 Redis、按需建表的 SQLite Session
+# =============================================================================
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def _score_bound(value):
+    """'(1.5' / '-inf' / '+inf' / 数字 -> (数值, 是否开区间)"""
+    value = _text(value)
+    exclusive = value.startswith("(")
+    return float(value.lstrip("(").replace("+inf", "inf")), exclusive
+
+
+class FakePipeline:
+    """排队命令，execute() 时按顺序在 FakeRedis 上执行；队列执行本身记为一次 "pipeline" 调用"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            return self
+        return _queue
+
+    def execute(self):
+        self.redis.calls.append("pipeline")
+        ops, self.ops = self.ops, []
+        return [getattr(self.redis, name)(*args, _record=False, **kwargs) for name, args, kwargs in ops]
+
+
+class _AsyncFakePipeline(FakePipeline):
+    async def execute(self):
+        return FakePipeline.execute(self)
+
+
+class _AsyncFakeRedis:
+    """FakeRedis 的 redis.asyncio 视图；同时充当 AsyncRedisCache（client() 返回自身）"""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def client(self):
+        return self
+
+    def pipeline(self, transaction=True):
+        return _AsyncFakePipeline(self.redis)
+
+    async def scan_iter(self, match=None, count=None):
+        for key in self.redis.scan_iter(match=match, count=count):
+            yield key
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+
+        async def _call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return _call
+
+
+class FakeRedis:
+    """
+    内存 Redis（redis-py decode_responses=False 语义）：字符串 / 哈希 / 集合 / 有序集合 + pipeline。
+
+    - 读出的值和成员是 bytes；strings / hashes / sets / zsets 按 str 键保存，便于断言
+    - calls 按顺序记录直接调用的命令名（pipeline 内的命令只记一次 "pipeline"）
+    - eval 交给测试设置的 eval_handler(redis, keys, args)，对应各模块的 Lua 脚本
+    - as_async() 返回同一份数据的异步客户端
+    """
+
+    def __init__(self):
+        self.strings = {}
+        self.hashes = {}
+        self.sets = {}
+        self.zsets = {}
+        self.ttls = {}
+        self.calls = []
+        self.eval_handler = None
+
+    def __getattribute__(self, name):
+        attr = object.__getattribute__(self, name)
+        if name.startswith("_") or name in ("pipeline", "as_async") or not inspect.ismethod(attr):
+            return attr
+
+        def _command(*args, _record=True, **kwargs):
+            if _record:
+                object.__getattribute__(self, "calls").append(name)
+            return attr(*args, **kwargs)
+        return _command
+
+    def as_async(self):
+        return _AsyncFakeRedis(self)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def _stores(self):
+        return (self.strings, self.hashes, self.sets, self.zsets)
+
+    def _drop_if_empty(self, store, key):
+        if key in store and not store[key]:
+            del store[key]
+            self.ttls.pop(key, None)
+
+    # ---- 通用键命令 ----
+    def delete(self, *keys):
+        removed = 0
+        for key in map(_text, keys):
+            removed += any([store.pop(key, None) is not None for store in self._stores()])
+            self.ttls.pop(key, None)
+        return removed
+
+    def exists(self, *keys):
+        return sum(any(_text(k) in store for store in self._stores()) for k in keys)
+
+    def expire(self, key, seconds):
+        key = _text(key)
+        if not self.exists(key, _record=False):
+            return False
+        self.ttls[key] = int(seconds)
+        return True
+
+    def ttl(self, key):
+        key = _text(key)
+        if not self.exists(key, _record=False):
+            return -2
+        return self.ttls.get(key, -1)
+
+    def scan_iter(self, match=None, count=None):
+        keys = [k for store in self._stores() for k in store]
+        return iter([k for k in keys if match is None or fnmatch.fnmatchcase(k, _text(match))])
+
+    def scan(self, cursor=0, match=None, count=None):
+        return 0, list(self.scan_iter(match=match, count=count, _record=False))
+
+    def eval(self, script, numkeys, *args):
+        keys, argv = [_text(k) for k in args[:numkeys]], args[numkeys:]
+        return self.eval_handler(self, keys, argv)
+
+    # ---- 字符串 ----
+    def get(self, key):
+        return self.strings.get(_text(key))
+
+    def mget(self, keys, *args):
+        keys = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+        return [self.strings.get(_text(k)) for k in [*keys, *args]]
+
+    def set(self, key, value, ex=None):
+        key = _text(key)
+        self.strings[key] = value if isinstance(value, bytes) else str(value).encode("utf-8")
+        if ex is not None:
+            self.ttls[key] = int(ex)
+        else:
+            self.ttls.pop(key, None)
+        return True
+
+    def setex(self, key, seconds, value):
+        return self.set(key, value, ex=seconds, _record=False)
+
+    def incrby(self, key, amount=1):
+        value = int(self.strings.get(_text(key), b"0")) + int(amount)
+        self.strings[_text(key)] = str(value).encode("utf-8")
+        return value
+
+    def decrby(self, key, amount=1):
+        return self.incrby(key, -int(amount), _record=False)
+
+    # ---- 哈希 ----
+    def hset(self, key, field, value):
+        fields = self.hashes.setdefault(_text(key), {})
+        fields[_text(field)] = value if isinstance(value, bytes) else str(value).encode("utf-8")
+        return 1
+
+    def hincrby(self, key, field, amount=1):
+        fields = self.hashes.setdefault(_text(key), {})
+        value = int(fields.get(_text(field), b"0")) + int(amount)
+        fields[_text(field)] = str(value).encode("utf-8")
+        return value
+
+    def hmget(self, key, fields, *args):
+        fields = list(fields) if isinstance(fields, (list, tuple)) else [fields]
+        values = self.hashes.get(_text(key), {})
+        return [values.get(_text(f)) for f in [*fields, *args]]
+
+    def hgetall(self, key):
+        return {f.encode("utf-8"): v for f, v in self.hashes.get(_text(key), {}).items()}
+
+    def hdel(self, key, *fields):
+        values = self.hashes.get(_text(key), {})
+        removed = sum(values.pop(_text(f), None) is not None for f in fields)
+        self._drop_if_empty(self.hashes, _text(key))
+        return removed
+
+    # ---- 集合 ----
+    def sadd(self, key, *members):
+        values = self.sets.setdefault(_text(key), set())
+        before = len(values)
+        values.update(_text(m) for m in members)
+        return len(values) - before
+
+    def smembers(self, key):
+        return {m.encode("utf-8") for m in self.sets.get(_text(key), set())}
+
+    # ---- 有序集合（同分按成员字典序，与 Redis 一致） ----
+    def _ranked(self, key):
+        return sorted(self.zsets.get(_text(key), {}).items(), key=lambda kv: (kv[1], kv[0]))
+
+    @staticmethod
+    def _rank_slice(items, start, end):
+        stop = len(items) + end + 1 if end < 0 else end + 1
+        return items[start:stop]
+
+    @staticmethod
+    def _reply(items, withscores):
+        if withscores:
+            return [(m.encode("utf-8"), s) for m, s in items]
+        return [m.encode("utf-8") for m, _ in items]
+
+    def _by_score(self, key, low, high):
+        lo, lo_open = _score_bound(low)
+        hi, hi_open = _score_bound(high)
+        return [
+            (m, s) for m, s in self._ranked(key)
+            if (s > lo if lo_open else s >= lo) and (s < hi if hi_open else s <= hi)
+        ]
+
+    def zadd(self, key, mapping):
+        values = self.zsets.setdefault(_text(key), {})
+        added = sum(_text(m) not in values for m in mapping)
+        values.update({_text(m): float(s) for m, s in mapping.items()})
+        return added
+
+    def zrem(self, key, *members):
+        values = self.zsets.get(_text(key), {})
+        removed = sum(values.pop(_text(m), None) is not None for m in members)
+        self._drop_if_empty(self.zsets, _text(key))
+        return removed
+
+    def zcard(self, key):
+        return len(self.zsets.get(_text(key), {}))
+
+    def zrange(self, key, start, end, withscores=False):
+        return self._reply(self._rank_slice(self._ranked(key), start, end), withscores)
+
+    def zrevrange(self, key, start, end, withscores=False):
+        return self._reply(self._rank_slice(self._ranked(key)[::-1], start, end), withscores)
+
+    def zrangebyscore(self, key, min, max, start=None, num=None, withscores=False):
+        items = self._by_score(key, min, max)
+        if start is not None:
+            items = items[start:start + num]
+        return self._reply(items, withscores)
+
+    def zrevrangebyscore(self, key, max, min, start=None, num=None, withscores=False):
+        items = self._by_score(key, min, max)[::-1]
+        if start is not None:
+            items = items[start:start + num]
+        return self._reply(items, withscores)
+
+    def zremrangebyrank(self, key, start, end):
+        values = self.zsets.get(_text(key), {})
+        doomed = self._rank_slice(self._ranked(key), start, end)
+        for member, _ in doomed:
+            del values[member]
+        self._drop_if_empty(self.zsets, _text(key))
+        return len(doomed)
+
+    def zremrangebyscore(self, key, min, max):
+        values = self.zsets.get(_text(key), {})
+        doomed = self._by_score(key, min, max)
+        for member, _ in doomed:
+            del values[member]
+        self._drop_if_empty(self.zsets, _text(key))
+        return len(doomed)
+
+
+@pytest.fixture
+def fake_redis():
+    """单元测试用内存 Redis（见 FakeRedis）"""
+    return FakeRedis()
+
+
+@pytest.fixture
+def sqlite_sessionmaker(tmp_path_factory):
+    """
+    返回 make(*models, **sessionmaker_kwargs)：为给定模型（或 Table）在新的内存 SQLite 上建表，
+    返回绑定该库的 sessionmaker。测试结束后释放所有引擎。
+    savepoints=True 时改用临时文件上的 WAL 库、由 SQLAlchemy 发 BEGIN（pysqlite 自己管理事务时
+    不认识 SAVEPOINT）：被测代码里的 begin_nested() 能正常提交 / 回滚，另开的连接也与会话互不干扰
+    （内存库所有连接共用一个，另一个连接的 COMMIT / ROLLBACK 会结束会话的事务）。
+    """
+    if not SQLALCHEMY_AVAILABLE:
+        pytest.skip("sqlalchemy 不可用")
+
+    from app.models import Base
+
+    engines = []
+
+    def make(*tables, metadata=None, savepoints=False, **kwargs):
+        if savepoints:
+            engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('sqlite') / 'test.db'}")
+        else:
+            engine = create_engine("sqlite://")
+        engines.append(engine)
+        if savepoints:
+            @event.listens_for(engine, "connect")
+            def _no_pysqlite_transactions(dbapi_connection, _record):
+                dbapi_connection.isolation_level = None
+                dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+            @event.listens_for(engine, "begin")
+            def _begin(connection):
+                connection.exec_driver_sql("BEGIN")
+        tables = [getattr(t, "__table__", t) for t in tables]
+        (metadata or Base.metadata).create_all(engine, tables=tables or None)
+        return sessionmaker(bind=engine, **kwargs)
+
+    yield make
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,202 @@
+"""
+批量推荐预计算（batch_precompute）单元测试
+
+测试覆盖:
+- 周活跃用户只查一次，按哈希稳定切分，各分片合起来恰好覆盖全部周活跃用户
+- 分片内共享任务池 / 热度统计，任务相关查询次数与用户数无关
+- 新引擎：结果按 PIPELINE_BATCH 分批通过 pipeline 写入版本化缓存条目，请求路径直接命中、不再跑引擎
+- 旧引擎：用 TaskRecommendationEngine 计算，写入 recommend_tasks 读取的 recommendation_cache 键
+- 新引擎未启用版本化缓存时不预计算（请求路径不读缓存）
+- 统计里报告 users/sec；没有结果的用户不写缓存
+- 单个用户计算失败只回滚该用户的 SAVEPOINT，分片共享的任务池不会过期重查
+- HybridEngine 使用共享任务池时按最新顺序返回候选并排除不可推荐任务
+
+运行方式:
+    pytest tests/test_batch_precompute.py -v
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from app import models, task_recommendation
+from app.recommendation import HybridEngine, ScorerRegistry
+from app.recommendation import batch_precompute
+from app.recommendation import cache as cache_module
+from app.recommendation import candidate_index as candidate_index_module
+from app.recommendation import utils as recommendation_utils
+from app.recommendation.batch_precompute import active_user_ids, precompute_shard, shard_for, shard_user_ids
+from app.recommendation.cache import VersionedRecommendationCache, entry_key
+from app.recommendation.candidate_index import CandidateIndex
+from app.recommendation.scorers.content_scorer import ContentScorer
+from app.recommendation.scorers.newness_scorer import NewnessScorer
+from app.recommendation.scorers.popularity_scorer import PopularityScorer
+from app.recommendation_cache import deserialize_recommendations, get_cache_key
+from app.services import task_cards
+from app.task_recommendation import TaskRecommendationEngine
+
+_NOW = datetime.now(timezone.utc)
+_USERS = ["u0000001", "u0000002", "u0000003", "u0000004", "u0000005"]
+
+
+@pytest.fixture
+def db(sqlite_sessionmaker):
+    session = sqlite_sessionmaker(
+        models.User,
+        models.Task,
+        models.TaskApplication,
+        models.TaskHistory,
+        models.UserTaskInteraction,
+        models.UserProfilePreference,
+        models.UserPreferenceVector,
+        savepoints=True,
+        expire_on_commit=False,
+    )()
+    for user_id in _USERS + ["u0000009"]:
+        session.add(models.User(id=user_id, name=f"user {user_id}", email=f"{user_id}@example.com", hashed_password="x"))
+    for task_id, task_type in ((1, "Tutoring"), (2, "Delivery"), (3, "Cleaning")):
+        session.add(models.Task(
+            id=task_id, title=f"task {task_id}", description="d", task_type=task_type, location="London",
+            poster_id="u0000009", reward=Decimal("20"), base_reward=Decimal("20"), status="open",
+            deadline=_NOW + timedelta(days=7), created_at=_NOW - timedelta(hours=task_id),
+        ))
+    # 前 4 个用户本周有交互；u0000005 的交互在一个月前，不算周活跃
+    for user_id in _USERS[:4]:
+        session.add(models.UserTaskInteraction(
+            user_id=user_id, task_id=1, interaction_type="view", interaction_time=_NOW - timedelta(days=1),
+        ))
+    session.add(models.UserTaskInteraction(
+        user_id="u0000005", task_id=1, interaction_type="view", interaction_time=_NOW - timedelta(days=30),
+    ))
+    session.add(models.TaskApplication(task_id=2, applicant_id="u0000009", status="pending"))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def scoring(monkeypatch):
+    monkeypatch.setattr(candidate_index_module, "_candidate_index", CandidateIndex(top_k=10))
+    monkeypatch.setattr(recommendation_utils, "get_excluded_task_ids", lambda _db, user_id: set())
+    monkeypatch.setattr(batch_precompute, "PIPELINE_BATCH", 2)
+    monkeypatch.setattr(task_recommendation, "USE_NEW_ENGINE", True)
+    monkeypatch.setattr(cache_module, "VERSIONED_CACHE_ENABLED", True)
+    monkeypatch.setattr(task_cards, "TASK_CARD_CACHE_ENABLED", False)
+    monkeypatch.setattr("app.recommendation.create_engine", _engine)
+
+
+def _engine():
+    registry = ScorerRegistry()
+    for scorer in (ContentScorer(), PopularityScorer(), NewnessScorer()):
+        registry.register(scorer)
+    return HybridEngine(registry)
+
+
+def test_shards_are_stable_and_cover_all_active_users(db):
+    assert shard_for("u0000001", 8) == shard_for("u0000001", 8)
+    assert shard_for("u0000001", 1) == 0
+
+    everyone = active_user_ids(db)
+    assert everyone == _USERS[:4]
+    per_shard = shard_user_ids(everyone, 3)
+    assert len(per_shard) == 3
+    assert sorted(user_id for ids in per_shard for user_id in ids) == everyone
+    for shard, ids in enumerate(per_shard):
+        assert all(shard_for(user_id, 3) == shard for user_id in ids)
+
+
+def test_shard_only_computes_its_slice(db, scoring, fake_redis):
+    stats = precompute_shard(1, ["u0000002", "u0000003"], db=db, client=fake_redis)
+    assert (stats["shard"], stats["users"], stats["written"]) == (1, 2, 2)
+    assert fake_redis.get(entry_key("u0000001", batch_precompute.PRECOMPUTE_LIMIT)) is None
+
+
+def test_precompute_shard_shares_task_data_and_pipelines_writes(db, scoring, fake_redis):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    stats = precompute_shard(db=db, client=fake_redis)
+    assert (stats["users"], stats["written"], stats["failed"]) == (4, 4, 0)
+    assert stats["users_per_sec"] > 0
+    # 计算前读一次候选池版本；4 个用户、每批 2 个：两次 pipeline 往返
+    assert fake_redis.calls == ["get", "pipeline", "pipeline"]
+
+    key = entry_key("u0000001", batch_precompute.PRECOMPUTE_LIMIT)
+    assert fake_redis.ttl(key) == batch_precompute.PRECOMPUTE_TTL
+
+    # 任务池和热度统计整个分片只查一次，而不是每个用户一次
+    assert sum("count(task_applications.id)" in s for s in statements) == 1
+    assert sum("tasks.description" in s for s in statements) == 1
+
+    # 请求路径读到的就是预计算条目：直接命中，不跑引擎
+    cache = VersionedRecommendationCache(redis_client=fake_redis)
+    served = cache.recommend(_engine(), db.get(models.User, "u0000001"), batch_precompute.PRECOMPUTE_LIMIT, {"db": db})
+    assert {item["task_id"] for item in served} == {1, 2, 3}
+    assert (cache.stats["hits"], cache.stats["computed"]) == (1, 0)
+
+
+def test_legacy_engine_writes_recommend_tasks_keys(db, scoring, monkeypatch, fake_redis):
+    monkeypatch.setattr(task_recommendation, "USE_NEW_ENGINE", False)
+    monkeypatch.setattr(
+        TaskRecommendationEngine, "compute_recommendations",
+        lambda self, user, limit, algorithm: [{"task": db.get(models.Task, 1), "score": 0.9, "reason": "legacy"}],
+    )
+    stats = precompute_shard(db=db, client=fake_redis)
+    assert (stats["users"], stats["written"]) == (4, 4)
+
+    key = get_cache_key("u0000001", "hybrid", batch_precompute.PRECOMPUTE_LIMIT)
+    assert fake_redis.ttl(key) == batch_precompute.PRECOMPUTE_TTL
+    cached = deserialize_recommendations(json.loads(fake_redis.get(key)))
+    assert [(item["task_id"], item["reason"]) for item in cached] == [(1, "legacy")]
+    assert fake_redis.get(entry_key("u0000001", batch_precompute.PRECOMPUTE_LIMIT)) is None
+
+
+def test_new_engine_without_versioned_cache_skips(db, scoring, monkeypatch, fake_redis):
+    monkeypatch.setattr(cache_module, "VERSIONED_CACHE_ENABLED", False)
+    stats = precompute_shard(db=db, client=fake_redis)
+    assert (stats["users"], stats["written"]) == (0, 0)
+    assert fake_redis.calls == []
+
+
+def test_users_without_results_are_not_cached(db, scoring, monkeypatch, fake_redis):
+    monkeypatch.setattr(HybridEngine, "recommend", lambda self, user, limit, context: [])
+    stats = precompute_shard(db=db, client=fake_redis)
+    assert (stats["users"], stats["written"], stats["empty"]) == (4, 0, 4)
+    assert fake_redis.calls == ["get"]
+
+
+def test_failed_user_keeps_shared_pool_loaded(db, scoring, monkeypatch, fake_redis):
+    recommend = HybridEngine.recommend
+
+    def flaky(self, user, limit, context):
+        if user.id == "u0000001":
+            raise RuntimeError("scorer blew up")
+        return recommend(self, user, limit, context)
+
+    monkeypatch.setattr(HybridEngine, "recommend", flaky)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    stats = precompute_shard(db=db, client=fake_redis)
+    assert (stats["users"], stats["written"], stats["failed"]) == (4, 3, 1)
+    assert fake_redis.get(entry_key("u0000001", batch_precompute.PRECOMPUTE_LIMIT)) is None
+    # 失败用户之后的用户仍用同一份任务池，不会因过期而逐个重新加载任务
+    assert sum("tasks.description" in s for s in statements) == 1
+
+
+def test_shared_pool_candidates_without_index(db, monkeypatch):
+    monkeypatch.setattr(candidate_index_module, "CANDIDATE_INDEX_ENABLED", False)
+    monkeypatch.setattr(recommendation_utils, "get_excluded_task_ids", lambda _db, user_id: {2})
+    shared = batch_precompute.load_shared_context(db)
+    assert list(shared["candidate_pool"]) == [1, 2, 3]
+    assert shared["task_stats"]["applications"] == {2: 1}
+    assert shared["task_stats"]["views"] == {1: 5}
+
+    engine = HybridEngine(ScorerRegistry())
+    user = SimpleNamespace(id="u0000001")
+    tasks = engine._get_candidates(user, {}, {"db": db, **shared})
+    assert [task.id for task in tasks] == [1, 3]
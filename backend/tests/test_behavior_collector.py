@@ -0,0 +1,114 @@
+"""
+BehaviorCollector 单元测试
+
+测试覆盖:
+- 有界缓冲：满时丢弃最旧事件并计数，超过高水位提前唤醒 flush
+- 分块写入：按 CHUNK_SIZE 切分，每块独立写入
+- 失败重试：失败块写入 spill 文件，下次 flush 时重放；重试次数耗尽后丢弃
+- 数据错误：块内个别事件被数据库拒绝时二分拆块，其余事件照常写入，坏事件直接丢弃、不阻塞重放
+
+运行方式:
+    pytest tests/test_behavior_collector.py -v
+"""
+
+import json
+import os
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.services.behavior_collector import BehaviorCollector
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    c = BehaviorCollector(buffer_size=10, spill_path=str(tmp_path / "spill.jsonl"))
+    monkeypatch.setattr(c, "CHUNK_SIZE", 3)
+    c.written_chunks = []
+    c.fail = False
+
+    def fake_write(events):
+        if c.fail:
+            raise RuntimeError("db down")
+        if any(e[2].get("bad") for e in events):
+            raise IntegrityError("COPY user_behavior_events", {}, Exception("violates foreign key constraint"))
+        c.written_chunks.append(list(events))
+
+    monkeypatch.setattr(c, "_write_chunk", fake_write)
+    return c
+
+
+def test_full_buffer_drops_oldest(collector):
+    for i in range(12):
+        collector.record("u1", "browse", {"i": i})
+    stats = collector.get_stats()
+    assert stats["buffered"] == 10
+    assert stats["dropped"] == 2
+    assert stats["early_flushes"] == 1
+    collector._flush()
+    written = [e[2]["i"] for chunk in collector.written_chunks for e in chunk]
+    assert written == list(range(2, 12))
+
+
+def test_flush_writes_in_chunks(collector):
+    for i in range(7):
+        collector.record("u1", "search", {"i": i})
+    collector._flush()
+    assert [len(c) for c in collector.written_chunks] == [3, 3, 1]
+    assert collector.get_stats()["written"] == 7
+
+
+def test_failed_chunk_is_spilled_and_replayed(collector):
+    for i in range(4):
+        collector.record("u1", "search", {"i": i})
+    collector.fail = True
+    collector._flush()
+    assert collector.written_chunks == []
+    with open(collector._spill_path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [r["event_data"]["i"] for r in rows] == [0, 1, 2, 3]
+    assert all(r["attempts"] == 1 for r in rows)
+
+    collector.fail = False
+    collector._flush()
+    written = [e[2]["i"] for chunk in collector.written_chunks for e in chunk]
+    assert written == [0, 1, 2, 3]
+    assert collector.get_stats()["replayed"] == 4
+
+
+def test_spilled_events_dropped_after_max_attempts(collector, monkeypatch):
+    monkeypatch.setattr(collector, "MAX_ATTEMPTS", 2)
+    collector.record("u1", "search", {"i": 0})
+    collector.fail = True
+    collector._flush()
+    collector._flush()
+    stats = collector.get_stats()
+    assert stats["spill_dropped"] == 1
+    assert not os.path.exists(collector._spill_path)
+
+
+def test_rejected_event_is_isolated_and_dropped(collector):
+    for i in range(4):
+        collector.record("u1", "search", {"i": i, "bad": i == 1})
+    collector._flush()
+    written = sorted(e[2]["i"] for chunk in collector.written_chunks for e in chunk)
+    assert written == [0, 2, 3]
+    stats = collector.get_stats()
+    assert (stats["written"], stats["rejected"], stats["spilled"]) == (3, 1, 0)
+    assert not os.path.exists(collector._spill_path)
+
+
+def test_rejected_event_does_not_block_replay(collector):
+    for i in range(6):
+        collector.record("u1", "search", {"i": i, "bad": i == 0})
+    collector.fail = True
+    collector._flush()
+
+    # 数据库恢复后：第一块里的坏事件被拆出丢弃，后面的块继续重放
+    collector.fail = False
+    collector._flush()
+    written = sorted(e[2]["i"] for chunk in collector.written_chunks for e in chunk)
+    assert written == [1, 2, 3, 4, 5]
+    stats = collector.get_stats()
+    assert (stats["replayed"], stats["rejected"]) == (5, 1)
+    assert not os.path.exists(collector._spill_path)
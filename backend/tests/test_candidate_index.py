@@ -0,0 +1,164 @@
+"""
+推荐候选索引（candidate_index）单元测试
+
+测试覆盖:
+- 与用户偏好向量相似的任务排在前面，跳过过的类型降权；固定比例留给最新任务
+- 排除列表、自己发布的任务、类型 / 城市筛选、已过期任务不返回
+- 任务关闭 / 隐藏时移出索引并清理倒排表
+- 首次使用全量构建；Task 的 ORM 写入 commit 后同步到索引；绕过 ORM 的更新按 updated_at 增量同步
+- HybridEngine 只加载索引召回的候选任务
+
+运行方式:
+    pytest tests/test_candidate_index.py -v
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import update
+
+from app import models
+from app.recommendation import candidate_index as candidate_index_module
+from app.recommendation import utils as recommendation_utils
+from app.recommendation.candidate_index import CandidateIndex, query_features, text_tokens
+from app.recommendation.engine import HybridEngine
+from app.recommendation.scorer_registry import ScorerRegistry
+
+_NOW = datetime.now(timezone.utc)
+_DEADLINE = _NOW + timedelta(days=7)
+
+
+def _values(task_id, task_type="Tutoring", city="London", reward=20, title="maths tutor", **extra):
+    values = {
+        "id": task_id, "task_type": task_type, "location": city, "city_canonical": city,
+        "latitude": None, "longitude": None, "reward": reward, "task_level": "normal", "title": title,
+        "created_at": _NOW - timedelta(hours=task_id), "deadline": _DEADLINE,
+        "status": "open", "is_visible": True, "poster_id": "u0000009",
+    }
+    values.update(extra)
+    return values
+
+
+def _vector(**overrides):
+    vector = {
+        "task_types": ["Tutoring"], "locations": ["London"], "keywords": [], "task_levels": [],
+        "negative_task_types": [], "price_range": {"min": 0, "max": 999999}, "price_range_from_history": False,
+    }
+    vector.update(overrides)
+    return vector
+
+
+def test_search_ranks_similar_tasks_and_keeps_fresh_slice():
+    index = CandidateIndex(top_k=5, fresh_ratio=0.2)
+    index.upsert(_values(1, "Delivery", "Leeds"))
+    index.upsert(_values(2, "Tutoring", "London"))
+    index.upsert(_values(3, "Tutoring", "Leeds"))
+    index.upsert(_values(4, "Cleaning", "London"))
+    index.upsert(_values(5, "Delivery", "Manchester"))
+    index.upsert(_values(6, "Gardening", "Bristol"))
+
+    hits = index.search(query_features(_vector()), k=5)
+    ids = [task_id for task_id, _ in hits]
+    assert ids[:3] == [2, 3, 4]
+    assert hits[0][1] > hits[1][1] > 0
+    # 相似度为 0 的任务里只补最新的（task 1 最新）
+    assert ids[3:] == [1, 5]
+
+    # 跳过过的类型降权：London 的 Cleaning 不再靠城市命中进入相似结果
+    penalised = index.search(query_features(_vector(negative_task_types=["Cleaning"])), k=3)
+    assert 4 not in [task_id for task_id, score in penalised if score > 0]
+
+
+def test_search_filters():
+    index = CandidateIndex(top_k=10)
+    index.upsert(_values(1))
+    index.upsert(_values(2, poster_id="u0000001"))
+    index.upsert(_values(3, "Delivery"))
+    index.upsert(_values(4, city="Leeds"))
+    index.upsert(_values(5))
+    query = query_features(_vector())
+
+    ids = {task_id for task_id, _ in index.search(query, exclude={5}, exclude_poster="u0000001")}
+    assert ids == {1, 3, 4}
+    assert {t for t, _ in index.search(query, task_type="Delivery")} == {3}
+    assert {t for t, _ in index.search(query, city="leeds")} == {4}
+    assert index.search(query, now=_DEADLINE + timedelta(seconds=1)) == []
+
+
+def test_closing_task_removes_it_from_postings():
+    index = CandidateIndex()
+    index.upsert(_values(1, title="garden help"))
+    index.upsert(_values(2))
+    assert "kw:garden" in index._postings
+
+    index.upsert(_values(1, status="in_progress"))
+    index.upsert(_values(2, is_visible=False))
+    assert len(index) == 0
+    assert index._postings == {}
+    assert index.stats["removals"] == 2
+
+
+def test_text_tokens_handles_cjk():
+    assert text_tokens("Need a Maths tutor") == ["need", "maths", "tutor"]
+    assert text_tokens("代取快递") == ["代取", "取快", "快递"]
+
+
+@pytest.fixture
+def db(sqlite_sessionmaker):
+    session = sqlite_sessionmaker(models.Task)()
+    for task_id, task_type, city in ((1, "Tutoring", "London"), (2, "Delivery", "Leeds"), (3, "Tutoring", "Leeds")):
+        session.add(models.Task(
+            id=task_id, title=f"task {task_id}", description="d", task_type=task_type, location=city,
+            poster_id="u0000009", reward=Decimal("20"), base_reward=Decimal("20"), status="open",
+            deadline=_DEADLINE, created_at=_NOW - timedelta(hours=task_id),
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = CandidateIndex(top_k=2, fresh_ratio=0.0)
+    monkeypatch.setattr(candidate_index_module, "_candidate_index", index)
+    return index
+
+
+def test_orm_commits_and_sync_keep_index_fresh(db, index):
+    index.ensure_fresh(db)
+    assert len(index) == 3 and index.stats["builds"] == 1
+
+    db.add(models.Task(
+        id=4, title="task 4", description="d", task_type="Tutoring", location="London", poster_id="u0000009",
+        reward=Decimal("20"), base_reward=Decimal("20"), status="open", deadline=_DEADLINE,
+    ))
+    db.get(models.Task, 1).status = "taken"
+    db.flush()
+    assert 4 not in index._tasks
+    db.commit()
+    assert 4 in index._tasks and 1 not in index._tasks
+
+    # 绕过 ORM 的批量更新：按 updated_at 增量同步
+    db.execute(
+        update(models.Task).where(models.Task.id == 2)
+        .values(is_visible=False, updated_at=_NOW + timedelta(minutes=5))
+    )
+    db.commit()
+    assert 2 in index._tasks
+    assert index.sync(db) >= 1
+    assert 2 not in index._tasks
+
+
+def test_engine_loads_only_retrieved_candidates(db, index, monkeypatch):
+    monkeypatch.setattr(recommendation_utils, "get_excluded_task_ids", lambda _db, _user_id: set())
+    engine = HybridEngine(ScorerRegistry())
+    user = SimpleNamespace(id="u0000001")
+    context = {"db": db, "user_vector": _vector(locations=["Leeds"], task_types=["Delivery"])}
+
+    tasks = engine._get_candidates(user, {}, context)
+    assert sorted(task.id for task in tasks) == [2, 3]
+
+    # 关键词筛选仍走原查询
+    assert [task.id for task in engine._get_candidates(user, {"keyword": "task 1"}, context)] == [1]
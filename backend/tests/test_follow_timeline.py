@@ -0,0 +1,170 @@
+"""
+关注 Feed 时间线存储（follow_timeline）单元测试
+
+测试覆盖:
+- 游标编码 / 解析，非法游标抛 ValueError
+- 写扩散只推入已存在的时间线；粉丝超过上限的作者写入发件箱并登记为大号
+- 读取：合并时间线与所关注大号的发件箱、按成员去重，同分条目按游标正确翻页
+- 路由：时间线不存在时用数据库结果重建并分页，之后按游标只回表当前页，失效条目跳过
+- ORM 钩子：提交后分发新内容，关注关系变化删除关注者的时间线
+
+运行方式:
+    pytest tests/test_follow_timeline.py -v
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app import event_listeners, follow_feed_routes, models
+from app.models_expert import ExpertFollow
+from app.services import follow_timeline as follow_timeline_module
+from app.services.follow_timeline import (
+    FOLLOW_FANIN_KEY,
+    FollowTimeline,
+    TimelineEntry,
+    decode_cursor,
+    encode_cursor,
+    outbox_key,
+    timeline_key,
+)
+
+
+def _fanout(redis, keys, args):
+    """对应 _FANOUT_SCRIPT：只推入已存在的时间线"""
+    member, score, cap = args
+    pushed = 0
+    for key in keys:
+        if redis.exists(key):
+            redis.zadd(key, {member: score})
+            redis.zremrangebyrank(key, 0, -(int(cap) + 1))
+            pushed += 1
+    return pushed
+
+
+@pytest.fixture
+def db_factory(sqlite_sessionmaker):
+    return sqlite_sessionmaker(models.UserFollow, ExpertFollow, models.TaskHistory)
+
+
+@pytest.fixture
+def timeline(fake_redis, db_factory):
+    fake_redis.eval_handler = _fanout
+    return FollowTimeline(redis_client=fake_redis, async_cache=fake_redis.as_async(), session_factory=db_factory)
+
+
+def _follow(db_factory, pairs):
+    with db_factory() as db:
+        db.add_all([models.UserFollow(follower_id=f, following_id=u) for f, u in pairs])
+        db.commit()
+
+
+class TestCursor:
+    def test_round_trip(self):
+        assert decode_cursor(encode_cursor(("post_12", 1700000000123.0))) == ("post_12", 1700000000123.0)
+
+    @pytest.mark.parametrize("cursor", ["", "abc", "123:", "x:task_1"])
+    def test_invalid(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestPublish:
+    def test_fanout_and_fanin(self, timeline, fake_redis, db_factory, monkeypatch):
+        monkeypatch.setattr(follow_timeline_module, "FOLLOW_FANOUT_MAX_FOLLOWERS", 2)
+        _follow(db_factory, [("F1", "U1"), ("F2", "U1"), ("F1", "BIG"), ("F2", "BIG"), ("F3", "BIG")])
+        fake_redis.zadd(timeline_key("F1"), {"task_1": 1})
+
+        pushed = timeline.publish([
+            TimelineEntry("task_2", 2.0, (("user", "U1"),)),
+            TimelineEntry("post_3", 3.0, (("user", "BIG"),)),
+        ])
+
+        assert pushed == 1
+        # 只推入已存在的时间线，F2 的时间线留给读取时重建
+        assert fake_redis.zsets[timeline_key("F1")] == {"task_1": 1.0, "task_2": 2.0}
+        assert timeline_key("F2") not in fake_redis.zsets
+        # 大号只写发件箱
+        assert fake_redis.zsets[outbox_key(("user", "BIG"))] == {"post_3": 3.0}
+        assert fake_redis.smembers(FOLLOW_FANIN_KEY) == {b"user:BIG"}
+
+    def test_invalidate(self, timeline, fake_redis):
+        fake_redis.zadd(timeline_key("F1"), {"task_1": 1})
+        timeline.invalidate(["F1", "F2"])
+        assert fake_redis.zsets == {}
+
+
+class TestRead:
+    @pytest.mark.asyncio
+    async def test_merge_dedupe_and_cursor_ties(self, timeline, fake_redis):
+        fake_redis.zadd(timeline_key("F1"), {"task_1": 10, "task_2": 20, "post_5": 20, "task_3": 30})
+        fake_redis.zadd(outbox_key(("user", "BIG")), {"post_9": 25, "task_3": 30})
+        fake_redis.zadd(outbox_key(("user", "OTHER")), {"post_7": 40})
+        fake_redis.sadd(FOLLOW_FANIN_KEY, "user:BIG", "user:OTHER")
+        owners = [("user", "BIG"), ("user", "U1")]
+
+        page1 = await timeline.read("F1", owners, None, 3)
+        assert page1 == [("task_3", 30.0), ("post_9", 25.0), ("task_2", 20.0)]
+        # 游标落在同分条目上：剩下的同分条目不丢、不重复
+        page2 = await timeline.read("F1", owners, page1[-1], 3)
+        assert page2 == [("post_5", 20.0), ("task_1", 10.0)]
+
+    @pytest.mark.asyncio
+    async def test_missing_timeline(self, timeline):
+        assert await timeline.read("F1", [], None, 10) is None
+
+
+class TestFeedFromTimeline:
+    @pytest.mark.asyncio
+    async def test_rebuild_then_cursor_pages(self, timeline, fake_redis, monkeypatch):
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        rows = {i: {"id": f"task_{i}", "created_at": (base + timedelta(minutes=i)).isoformat()} for i in range(1, 8)}
+        hidden = set()
+        calls = []
+
+        async def fetch(db, limit, ids=None):
+            calls.append(ids)
+            selected = sorted(rows, reverse=True) if ids is None else ids
+            return [rows[i] for i in selected if i not in hidden][:limit]
+
+        monkeypatch.setattr(follow_feed_routes, "get_follow_timeline", lambda: timeline)
+        monkeypatch.setattr(follow_feed_routes, "_timeline_fetchers", lambda *args: {"task": ("tasks", fetch)})
+        user = SimpleNamespace(id="F1")
+
+        async def page(cursor):
+            return await follow_feed_routes._follow_feed_from_timeline(None, user, ["U1"], [], cursor, 3)
+
+        first = await page(None)
+        assert [item["id"] for item in first["items"]] == ["task_7", "task_6", "task_5"]
+        assert calls == [None]
+        assert len(fake_redis.zsets[timeline_key("F1")]) == 7
+
+        hidden.add(4)
+        calls.clear()
+        second = await page(first["next_cursor"])
+        # 失效的 task_4 被跳过，继续向后读取补满一页；每轮只回表当轮条目
+        assert [item["id"] for item in second["items"]] == ["task_3", "task_2", "task_1"]
+        assert calls == [[4, 3, 2], [1]]
+        assert second["has_more"] is False and second["next_cursor"] is None
+
+        with pytest.raises(follow_feed_routes.HTTPException):
+            await page("bad")
+
+
+class TestHooks:
+    def test_commit_dispatches_and_follow_invalidates(self, db_factory, monkeypatch):
+        dispatched = []
+        monkeypatch.setattr(
+            event_listeners, "get_follow_timeline",
+            lambda: SimpleNamespace(dispatch=lambda entries, user_ids: dispatched.append((entries, user_ids))),
+        )
+        with db_factory() as db:
+            db.add(models.TaskHistory(id=5, task_id=1, user_id="U1", action="completed"))
+            db.add(models.TaskHistory(id=6, task_id=1, user_id="U1", action="accepted"))
+            db.add(models.UserFollow(follower_id="F1", following_id="U1"))
+            db.commit()
+
+        (entries, user_ids), = dispatched
+        assert [(e.member, e.owners) for e in entries] == [("completion_5", (("user", "U1"),))]
+        assert user_ids == ["F1"]
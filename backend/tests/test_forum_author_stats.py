@@ -0,0 +1,195 @@
+"""
+论坛作者每日计数桶（forum_author_stats）单元测试
+
+测试覆盖:
+- ORM 钩子：发帖 / 点赞 / 收藏 / 隐藏 / 删除 / 回复点赞在 flush 时累加到桶，回滚不写入
+- 排行读取：按周期求和，发帖 / 收藏只统计普通板块，获赞包含回复
+- 合并：旧日桶折叠进汇总桶，"全部" 周期结果不变
+- 举报风控自动隐藏 / 软删除（AsyncSession）同样更新计数桶
+
+运行方式:
+    pytest tests/test_forum_author_stats.py -v
+"""
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import models
+from app import models_ai_qa  # noqa: F401 — forum_posts.ai_question_id 外键目标
+from app.forum_routes import check_and_trigger_risk_control
+from app.services.forum_author_stats import ROLLUP_DAY, compact, to_day, top_authors
+from app.utils.time_utils import get_utc_time
+
+_TABLES = [
+    models.ForumCategory.__table__,
+    models.ForumPost.__table__,
+    models.ForumReply.__table__,
+    models.ForumAuthorDailyStat.__table__,
+]
+
+
+class _AsyncSessionAdapter:
+    """把同步 Session 包装成 top_authors 需要的 await db.execute 接口"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def execute(self, statement):
+        return self.db.execute(statement)
+
+
+@pytest.fixture
+def db(sqlite_sessionmaker):
+    session = sqlite_sessionmaker(*_TABLES, expire_on_commit=False)()
+    session.add_all([
+        models.ForumCategory(id=1, name="general", type="general"),
+        models.ForumCategory(id=2, name="school", type="university"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _post(db, post_id, author_id, category_id=1, **fields):
+    post = models.ForumPost(id=post_id, title="t", content="c", author_id=author_id, category_id=category_id, **fields)
+    db.add(post)
+    return post
+
+
+def _buckets(db):
+    table = models.ForumAuthorDailyStat.__table__
+    rows = db.execute(select(table)).all()
+    return {
+        (r.author_id, r.category_id): (r.post_count, r.favorite_count, r.like_count)
+        for r in rows if r.day != ROLLUP_DAY
+    }
+
+
+async def _top(db, metric, period="all", limit=10):
+    return await top_authors(_AsyncSessionAdapter(db), metric, period, limit)
+
+
+class TestHooks:
+    def test_post_like_favorite_hide_delete(self, db):
+        post = _post(db, 1, "U1")
+        _post(db, 2, "U1", category_id=None)
+        db.commit()
+        assert _buckets(db) == {("U1", 1): (1, 0, 0), ("U1", 0): (1, 0, 0)}
+
+        post.like_count += 2
+        post.favorite_count += 1
+        db.commit()
+        assert _buckets(db)[("U1", 1)] == (1, 1, 2)
+
+        # 隐藏：不再计入发帖 / 收藏，获赞仍计入
+        post.is_visible = False
+        db.commit()
+        assert _buckets(db)[("U1", 1)] == (0, 0, 2)
+
+        post.is_deleted = True
+        db.commit()
+        assert _buckets(db)[("U1", 1)] == (0, 0, 0)
+
+    def test_reply_likes_and_hard_delete(self, db):
+        _post(db, 1, "U1")
+        db.flush()
+        reply = models.ForumReply(id=1, post_id=1, content="r", author_id="U2")
+        db.add(reply)
+        db.commit()
+        reply.like_count = 3
+        db.commit()
+        assert _buckets(db)[("U2", 0)] == (0, 0, 3)
+
+        db.delete(reply)
+        db.commit()
+        assert _buckets(db)[("U2", 0)] == (0, 0, 0)
+
+    def test_rollback_discards(self, db):
+        _post(db, 1, "U1")
+        db.flush()
+        db.rollback()
+        assert _buckets(db) == {}
+
+
+class TestTopAuthors:
+    @pytest.mark.asyncio
+    async def test_periods_and_category_filter(self, db):
+        now = get_utc_time()
+        _post(db, 1, "U1", like_count=1, created_at=now)
+        _post(db, 2, "U1", like_count=1, created_at=now - timedelta(days=3))
+        _post(db, 3, "U2", favorite_count=5, created_at=now - timedelta(days=20))
+        _post(db, 4, "U3", category_id=2, like_count=9, created_at=now)
+        db.commit()
+        db.add(models.ForumReply(id=1, post_id=3, content="r", author_id="U2", like_count=4, created_at=now))
+        db.commit()
+
+        assert await _top(db, "post_count", "today") == [("U1", 1)]
+        assert await _top(db, "post_count", "week") == [("U1", 2)]
+        assert await _top(db, "post_count", "month") == [("U1", 2), ("U2", 1)]
+        assert await _top(db, "favorite_count") == [("U2", 5)]
+        # 获赞不限板块，包含回复
+        assert await _top(db, "like_count", "today") == [("U3", 9), ("U2", 4), ("U1", 1)]
+        assert await _top(db, "like_count", "today", limit=1) == [("U3", 9)]
+
+        with pytest.raises(ValueError):
+            await _top(db, "view_count")
+
+
+class TestCompact:
+    @pytest.mark.asyncio
+    async def test_compact_preserves_all_time_totals(self, db):
+        now = get_utc_time()
+        _post(db, 1, "U1", like_count=2, created_at=now - timedelta(days=100))
+        _post(db, 2, "U1", like_count=3, created_at=now - timedelta(days=60))
+        _post(db, 3, "U1", like_count=1, created_at=now)
+        db.commit()
+        before = await _top(db, "like_count")
+
+        assert compact(db, keep_days=35) == 2
+        table = models.ForumAuthorDailyStat.__table__
+        days = sorted(r.day for r in db.execute(select(table.c.day)).all())
+        assert days == [ROLLUP_DAY, to_day(now)]
+        assert await _top(db, "like_count") == before == [("U1", 6)]
+        assert await _top(db, "like_count", "month") == [("U1", 1)]
+
+        # 合并后旧帖子再获赞：写入旧日期的新桶，下次合并继续折叠
+        db.get(models.ForumPost, 1).like_count += 1
+        db.commit()
+        assert compact(db, keep_days=35) == 1
+        assert await _top(db, "like_count") == [("U1", 7)]
+        assert compact(db, keep_days=35) == 0
+
+
+class TestRiskControl:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("action_type, expected", [("hide", (0, 0, 2)), ("soft_delete", (0, 0, 0))])
+    async def test_auto_action_updates_buckets(self, tmp_path, action_type, expected):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'forum.db'}")
+        tables = _TABLES + [
+            models.ForumRiskControlRule.__table__,
+            models.ForumReport.__table__,
+            models.ForumRiskControlLog.__table__,
+        ]
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: models.Base.metadata.create_all(sync_conn, tables=tables))
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                db.add(models.ForumCategory(id=1, name="general", type="general"))
+                db.add(models.ForumPost(
+                    id=1, title="t", content="c", author_id="U1", category_id=1, like_count=2, favorite_count=1,
+                ))
+                db.add(models.ForumRiskControlRule(
+                    rule_name="r", target_type="post", trigger_count=1, trigger_time_window=24, action_type=action_type,
+                ))
+                db.add(models.ForumReport(target_type="post", target_id=1, reporter_id="U2", reason="spam"))
+                await db.commit()
+                assert (await db.run_sync(_buckets))[("U1", 1)] == (1, 1, 2)
+
+                await check_and_trigger_risk_control("post", 1, db)
+                await db.commit()
+                assert (await db.run_sync(_buckets))[("U1", 1)] == expected
+        finally:
+            await engine.dispose()
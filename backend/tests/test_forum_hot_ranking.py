@@ -0,0 +1,159 @@
+"""
+论坛热门排行（forum_hot_ranking）单元测试
+
+测试覆盖:
+- 热度公式：互动加权、按最近活跃时间衰减
+- ORM 钩子：新帖 / 点赞 / 换板块 / 软删除在提交后更新有序集合，回滚不写入
+- 浏览数批量同步后按数据库当前值刷新
+- 定时重算：集合不存在时全量重建；头部窗口按当前时间重算并裁剪
+- 路由读取：排行未建立时返回 None（回退 SQL）
+
+运行方式:
+    pytest tests/test_forum_hot_ranking.py -v
+"""
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import event_listeners, models
+from app import models_ai_qa  # noqa: F401 — forum_posts.ai_question_id 外键目标
+from app.services import forum_hot_ranking as ranking_module
+from app.services.forum_hot_ranking import (
+    FORUM_HOT_GLOBAL_KEY,
+    ForumHotRanking,
+    category_key,
+    hot_score,
+)
+from app.utils.time_utils import get_utc_time
+
+
+@pytest.fixture
+def session_factory(sqlite_sessionmaker):
+    return sqlite_sessionmaker(models.ForumPost, models.ForumAuthorDailyStat, expire_on_commit=False)
+
+
+@pytest.fixture
+def ranking(fake_redis, session_factory, monkeypatch):
+    ranking = ForumHotRanking(
+        redis_client=fake_redis,
+        async_cache=fake_redis.as_async(),
+        session_factory=session_factory,
+        enabled=True,
+    )
+    monkeypatch.setattr(event_listeners, "get_forum_hot_ranking", lambda: ranking)
+    return ranking
+
+
+def _post(db, post_id, category_id=1, **fields):
+    post = models.ForumPost(
+        id=post_id, title="t", content="c", category_id=category_id, admin_author_id="A0001", **fields
+    )
+    db.add(post)
+    return post
+
+
+def _members(fake_redis, key):
+    return [member.decode() for member in fake_redis.zrevrange(key, 0, -1)]
+
+
+class TestHotScore:
+    def test_weights_and_decay(self):
+        now = get_utc_time()
+        assert hot_score(1, 1, 1, 10, now, now) == pytest.approx(5 + 4 + 3 + 1)
+        one_day = hot_score(1, 0, 0, 0, now - timedelta(days=1), now)
+        assert one_day == pytest.approx(5 / 2 ** 1.2)
+        # 无时区的时间按 UTC 处理
+        naive = (now - timedelta(days=1)).replace(tzinfo=None)
+        assert hot_score(1, 0, 0, 0, naive, now) == pytest.approx(one_day)
+
+
+class TestOrmHooks:
+    def test_insert_update_move_delete(self, ranking, fake_redis, session_factory):
+        with session_factory() as db:
+            _post(db, 1, like_count=1)
+            _post(db, 2, like_count=0)
+            db.commit()
+        assert _members(fake_redis, FORUM_HOT_GLOBAL_KEY) == ["1", "2"]
+        assert _members(fake_redis, category_key(1)) == ["1", "2"]
+
+        with session_factory() as db:
+            post = db.get(models.ForumPost, 2)
+            post.like_count = 5
+            post.category_id = 3
+            db.commit()
+        assert _members(fake_redis, FORUM_HOT_GLOBAL_KEY) == ["2", "1"]
+        assert _members(fake_redis, category_key(1)) == ["1"]
+        assert _members(fake_redis, category_key(3)) == ["2"]
+
+        with session_factory() as db:
+            db.get(models.ForumPost, 1).is_deleted = True
+            db.commit()
+        assert _members(fake_redis, FORUM_HOT_GLOBAL_KEY) == ["2"]
+        assert _members(fake_redis, category_key(1)) == []
+
+    def test_rollback_discards_updates(self, ranking, fake_redis, session_factory):
+        with session_factory() as db:
+            _post(db, 1)
+            db.flush()
+            db.rollback()
+        assert fake_redis.zsets == {}
+
+    def test_title_edit_does_not_touch_ranking(self, ranking, fake_redis, session_factory, monkeypatch):
+        with session_factory() as db:
+            _post(db, 1)
+            db.commit()
+        calls = []
+        monkeypatch.setattr(ranking, "apply_updates", lambda updates: calls.append(updates))
+        with session_factory() as db:
+            db.get(models.ForumPost, 1).title = "new"
+            db.commit()
+        assert calls == []
+
+
+class TestMaintenance:
+    def test_refresh_after_bulk_view_sync(self, ranking, fake_redis, session_factory):
+        with session_factory() as db:
+            _post(db, 1, like_count=1)
+            _post(db, 2)
+            db.commit()
+            # 浏览数同步使用批量 UPDATE，不触发 ORM 钩子
+            db.execute(update(models.ForumPost).where(models.ForumPost.id == 2).values(view_count=1000))
+            db.commit()
+        assert _members(fake_redis, FORUM_HOT_GLOBAL_KEY) == ["1", "2"]
+
+        ranking.refresh_posts([2])
+        assert _members(fake_redis, FORUM_HOT_GLOBAL_KEY) == ["2", "1"]
+
+    def test_rescore_rebuilds_and_decays(self, ranking, fake_redis, session_factory, monkeypatch):
+        now = get_utc_time()
+        with session_factory() as db:
+            _post(db, 1, like_count=10, created_at=now - timedelta(days=30))
+            _post(db, 2, like_count=3, created_at=now)
+            _post(db, 3, category_id=None, like_count=1, created_at=now)
+            db.commit()
+        fake_redis.zsets.clear()
+
+        assert ranking.rescore() == 3
+        # 30 天前的 10 个赞衰减后低于刚发布的 1 个赞
+        assert _members(fake_redis, FORUM_HOT_GLOBAL_KEY) == ["2", "3", "1"]
+        assert _members(fake_redis, category_key(1)) == ["2", "1"]
+
+        # 模拟旧分数：帖子 1 仍按很早之前算的分数排在最前，重算后衰减并被裁剪
+        fake_redis.zadd(FORUM_HOT_GLOBAL_KEY, {"1": 50.0})
+        monkeypatch.setattr(ranking_module, "FORUM_HOT_MAX_MEMBERS", 2)
+        assert ranking.rescore() == 5  # 全站 3 个 + 板块 1 的 2 个
+        assert _members(fake_redis, FORUM_HOT_GLOBAL_KEY) == ["2", "3"]
+
+
+class TestRead:
+    @pytest.mark.asyncio
+    async def test_top_ids(self, ranking, fake_redis):
+        assert await ranking.top_ids(None, 0, 10) is None
+
+        fake_redis.zadd(FORUM_HOT_GLOBAL_KEY, {"1": 1.0, "2": 3.0, "3": 2.0})
+        fake_redis.zadd(category_key(7), {"3": 2.0})
+        assert await ranking.top_ids(None, 0, 2) == [2, 3]
+        assert await ranking.top_ids(None, 2, 2) == [1]
+        assert await ranking.top_ids(7, 0, 10) == [3]
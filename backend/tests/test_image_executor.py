@@ -0,0 +1,125 @@
+"""
+图片处理执行器（image_executor）单元测试
+
+测试覆盖:
+- 禁用进程池时在调用方线程执行
+- 队列已满时回退到调用方线程（背压）
+- 延迟缩略图：立即返回预测 URL，后台生成的文件与 URL 一致
+- JPEG 缩小使用 draft 模式后尺寸正确
+- 进程池模式下大文件以临时文件路径交给子进程，用完删除；小图各预设只读一次原图
+
+运行方式:
+    pytest tests/test_image_executor.py -v
+"""
+
+import io
+import os
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+from app.services import image_executor
+from app.services.image_executor import ImageProcessingExecutor, generate_thumbnails_job
+from app.services.image_processor import ImageProcessor, THUMBNAIL_PRESETS
+from app.services.image_upload_service import (
+    CATEGORY_CONFIGS,
+    ImageCategory,
+    ImageUploadService,
+)
+from app.services.storage_backend import LocalStorageBackend
+
+
+def _jpeg(size=(1200, 900)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (10, 120, 200)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_disabled_executor_runs_inline():
+    executor = ImageProcessingExecutor(0)
+    assert executor.run(sum, [1, 2, 3]) == 6
+    assert executor.stats["inline"] == 1
+    assert executor.stats["submitted"] == 0
+
+
+def test_full_queue_falls_back_to_caller_thread():
+    executor = ImageProcessingExecutor(1, queue_per_worker=1)
+    assert executor._slots.acquire(blocking=False)  # 占满唯一槽位
+    try:
+        assert executor.run(sum, [4, 5]) == 9
+        assert executor.stats["rejected"] == 1
+    finally:
+        executor._slots.release()
+        executor.shutdown()
+
+
+def test_draft_resize_keeps_target_dimensions():
+    processor = ImageProcessor()
+    thumb, ext, size = processor.resize(_jpeg((4000, 3000)), max_width=150, max_height=150)
+    assert ext == ".jpg"
+    assert (size.width, size.height) == (150, 112)
+    with Image.open(io.BytesIO(thumb)) as img:
+        assert img.size == (150, 112)
+
+
+def test_predicted_extension_matches_generated():
+    processor = ImageProcessor()
+    small = _jpeg((100, 80))
+    for config in THUMBNAIL_PRESETS.values():
+        _, ext = processor.generate_thumbnail(small, config)
+        assert processor.predict_thumbnail_extension(100, 80, "jpeg", config) == ext
+
+
+def test_deferred_thumbnails_return_predicted_urls(tmp_path):
+    executor = ImageProcessingExecutor(0)
+    storage = LocalStorageBackend(base_dir=str(tmp_path), base_url="http://test")
+    service = ImageUploadService(storage=storage, processor=ImageProcessor(), executor=executor)
+    cfg = CATEGORY_CONFIGS[ImageCategory.FLEA_MARKET]
+    cfg = type(cfg)(**{**cfg.__dict__, "defer_thumbnails": True})
+
+    result = service.upload(_jpeg(), ImageCategory.FLEA_MARKET, resource_id="7", config=cfg)
+    assert result.success, result.error
+    executor.shutdown(wait=True)
+
+    assert set(result.thumbnails) == {"thumb", "medium", "large"}
+    for url in result.thumbnails.values():
+        relative = url.split("/uploads/", 1)[1]
+        assert (Path(tmp_path) / relative).exists()
+    assert executor.stats["deferred"] == 1
+
+
+def test_large_source_is_passed_to_worker_by_path(monkeypatch):
+    monkeypatch.setattr(image_executor, "IMAGE_PROCESS_INLINE_BYTES", 1024)
+    executor = ImageProcessingExecutor(1)
+    submitted = []
+
+    def _run(fn, content, preset_names):
+        submitted.append(content)
+        assert os.path.exists(content)
+        return fn(content, preset_names)
+
+    monkeypatch.setattr(executor, "run", _run)
+    spool = tempfile.SpooledTemporaryFile(max_size=1024)
+    spool.write(_jpeg())
+    results = executor.generate_thumbnails(ImageProcessor(), spool, ["thumb"])
+
+    assert isinstance(submitted[0], str)
+    assert not os.path.exists(submitted[0])
+    with Image.open(io.BytesIO(results["thumb"][0])) as img:
+        assert max(img.size) == 150
+
+
+def test_small_image_read_once_for_all_presets():
+    class _CountingReads(io.BytesIO):
+        full_reads = 0
+
+        def read(self, size=-1):
+            if size is None or size < 0:
+                self.full_reads += 1
+            return super().read(size)
+
+    source = _CountingReads(_jpeg((100, 80)))
+    results = generate_thumbnails_job(source, list(THUMBNAIL_PRESETS))
+    assert set(results) == set(THUMBNAIL_PRESETS)
+    assert source.full_reads == 1
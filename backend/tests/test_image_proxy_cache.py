@@ -0,0 +1,170 @@
+"""
+资源代理（image_proxy_routes）单元测试
+
+测试覆盖:
+- ResourceDiskCache: 提交/命中/LRU 淘汰/跨进程元数据回读
+- _proxy_resource: 流式下载写入缓存、新鲜期内命中、过期后 ETag 重新验证(304)、大小上限
+- 缓存的磁盘读写不在事件循环线程上执行
+
+运行方式:
+    pytest tests/test_image_proxy_cache.py -v
+"""
+
+import threading
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import image_proxy_routes as proxy
+from app.image_proxy_routes import ResourceDiskCache
+
+
+def _write_temp(cache: ResourceDiskCache, data: bytes) -> str:
+    path = cache.new_temp_path()
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _make_request(headers=None) -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw, "query_string": b""})
+
+
+async def _read_body(response) -> bytes:
+    chunks = []
+    async for chunk in response.body_iterator:
+        chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode())
+    return b"".join(chunks)
+
+
+class TestResourceDiskCache:
+
+    def test_commit_and_get(self, tmp_path):
+        cache = ResourceDiskCache(str(tmp_path), max_bytes=1024)
+        cache.commit("https://cdn.link2ur.com/a.png", _write_temp(cache, b"abc"), "image/png", '"e1"', None, 3)
+
+        entry = cache.get("https://cdn.link2ur.com/a.png")
+        assert entry is not None
+        assert entry.etag == '"e1"'
+        with open(cache.body_path(entry), "rb") as f:
+            assert f.read() == b"abc"
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ResourceDiskCache(str(tmp_path), max_bytes=10)
+        cache.commit("u1", _write_temp(cache, b"x" * 4), "image/png", None, None, 4)
+        cache.commit("u2", _write_temp(cache, b"x" * 4), "image/png", None, None, 4)
+        cache.get("u1")  # u1 变为最近使用
+        cache.commit("u3", _write_temp(cache, b"x" * 4), "image/png", None, None, 4)
+
+        assert cache.get("u2") is None
+        assert cache.get("u1") is not None
+        assert cache.get("u3") is not None
+        assert cache.total_bytes <= 10
+
+    def test_oversized_entry_not_cached(self, tmp_path):
+        cache = ResourceDiskCache(str(tmp_path), max_bytes=2)
+        cache.commit("u1", _write_temp(cache, b"abc"), "image/png", None, None, 3)
+        assert cache.get("u1") is None
+
+    def test_shared_directory_between_instances(self, tmp_path):
+        writer = ResourceDiskCache(str(tmp_path), max_bytes=1024)
+        writer.commit("u1", _write_temp(writer, b"abc"), "image/png", None, None, 3)
+
+        reader = ResourceDiskCache(str(tmp_path), max_bytes=1024)
+        assert reader.get("u1") is not None
+
+
+class TestProxyResource:
+
+    @pytest.fixture
+    def upstream(self, tmp_path, monkeypatch):
+        state = {"calls": 0, "conditional": 0, "body": b"img-bytes"}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            state["calls"] += 1
+            if request.headers.get("If-None-Match") == '"v1"':
+                state["conditional"] += 1
+                return httpx.Response(304, headers={"ETag": '"v1"'})
+            body = state["body"]
+            if state.get("chunked"):
+                # 不带 Content-Length 的分块响应
+                async def _chunks(data=state["body"]):
+                    yield data
+                body = _chunks()
+            return httpx.Response(
+                200,
+                headers={"Content-Type": "image/png", "ETag": '"v1"'},
+                content=body,
+            )
+
+        monkeypatch.setattr(proxy, "_cache", ResourceDiskCache(str(tmp_path), max_bytes=1024 * 1024))
+        monkeypatch.setattr(proxy, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        return state
+
+    @pytest.mark.asyncio
+    async def test_streams_then_serves_from_cache(self, upstream):
+        url = "https://cdn.link2ur.com/x.png"
+        first = await proxy._proxy_resource(_make_request(), url)
+        assert await _read_body(first) == b"img-bytes"
+
+        second = await proxy._proxy_resource(_make_request(), url)
+        assert second.status_code == 200
+        assert upstream["calls"] == 1
+
+    @pytest.mark.asyncio
+    async def test_revalidates_stale_entry_with_etag(self, upstream, monkeypatch):
+        url = "https://cdn.link2ur.com/x.png"
+        await _read_body(await proxy._proxy_resource(_make_request(), url))
+
+        monkeypatch.setattr(proxy, "PROXY_CACHE_FRESH_SECONDS", 0)
+        response = await proxy._proxy_resource(_make_request(), url)
+        assert response.status_code == 200
+        assert upstream["conditional"] == 1
+
+    @pytest.mark.asyncio
+    async def test_client_if_none_match_returns_304(self, upstream):
+        url = "https://cdn.link2ur.com/x.png"
+        await _read_body(await proxy._proxy_resource(_make_request(), url))
+
+        response = await proxy._proxy_resource(_make_request({"If-None-Match": '"v1"'}), url)
+        assert response.status_code == 304
+
+    @pytest.mark.asyncio
+    async def test_declared_length_over_limit_rejected(self, upstream, monkeypatch):
+        monkeypatch.setattr(proxy, "MAX_BODY_BYTES", 4)
+        with pytest.raises(HTTPException) as exc:
+            await proxy._proxy_resource(_make_request(), "https://cdn.link2ur.com/big.png")
+        assert exc.value.status_code == 413
+
+    @pytest.mark.asyncio
+    async def test_streamed_body_over_limit_is_aborted_and_not_cached(self, upstream, monkeypatch):
+        monkeypatch.setattr(proxy, "MAX_BODY_BYTES", 4)
+        upstream["chunked"] = True
+        url = "https://cdn.link2ur.com/big.png"
+        response = await proxy._proxy_resource(_make_request(), url)
+        with pytest.raises(RuntimeError):
+            await _read_body(response)
+        assert proxy._cache.get(url) is None
+
+    @pytest.mark.asyncio
+    async def test_disk_io_runs_off_the_event_loop(self, upstream, monkeypatch):
+        loop_thread = threading.get_ident()
+        threads = []
+        cache = proxy._cache
+        for name in ("get", "new_temp_path", "commit"):
+            original = getattr(cache, name)
+
+            def _recorded(*args, _original=original, **kwargs):
+                threads.append(threading.get_ident())
+                return _original(*args, **kwargs)
+
+            monkeypatch.setattr(cache, name, _recorded)
+
+        url = "https://cdn.link2ur.com/x.png"
+        await _read_body(await proxy._proxy_resource(_make_request(), url))
+        await proxy._proxy_resource(_make_request(), url)
+        assert len(threads) == 4
+        assert loop_thread not in threads
@@ -0,0 +1,164 @@
+"""
+InteractionLog（用户任务交互写回日志）单元测试
+
+测试覆盖:
+- 合并：同一用户×任务×类型当天的 view / click 只保留一条（最长时长、最新元数据）
+- 落库：当天已有记录时按同一口径更新，不带时长 / 元数据的浏览不会把已记录的值清空
+- 有界：缓冲满时丢弃新条目并计数，已有条目的合并不受影响
+- 失败：数据库不可用时整批放回缓冲；内容被拒绝时只丢弃出错的条目
+- 防抖：同一用户的推荐缓存失效在窗口内最多执行一次，窗口结束后补做
+
+运行方式:
+    pytest tests/test_interaction_log.py -v
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import models
+from app.recommendation import preference_store
+from app.services import interaction_log as interaction_log_module
+from app.services.interaction_log import InteractionLog
+
+
+@pytest.fixture
+def log(monkeypatch):
+    instance = InteractionLog(max_pending=3)
+    instance.invalidated = []
+    monkeypatch.setattr(instance, "_invalidate_cache", lambda user_id: instance.invalidated.append(user_id))
+    return instance
+
+
+def test_views_are_coalesced_per_user_task_day(log):
+    log.record("u1", 1, "view", duration_seconds=10, device_type="mobile", metadata={"source": "a"})
+    log.record("u1", 1, "view", duration_seconds=5, metadata={"source": "b"})
+    log.record("u1", 1, "click")
+    log.record("u1", 2, "view")
+
+    assert len(log._coalesced) == 3
+    merged = next(item for item in log._coalesced.values() if item.task_id == 1 and item.interaction_type == "view")
+    assert merged.duration_seconds == 10
+    assert merged.device_type == "mobile"
+    assert merged.metadata == {"source": "b"}
+    assert log.stats["coalesced"] == 1
+
+
+def test_same_day_update_keeps_recorded_duration(log, sqlite_sessionmaker, monkeypatch):
+    monkeypatch.setattr(preference_store, "PREFERENCE_VECTOR_ENABLED", False)
+    # SQLite 读回的时间不带时区：记录时也用 naive UTC，当天记录才能对上
+    now = interaction_log_module.get_utc_time().replace(tzinfo=None)
+    monkeypatch.setattr(interaction_log_module, "get_utc_time", lambda: now)
+    db = sqlite_sessionmaker(models.Task, models.UserTaskInteraction)()
+    db.add(models.Task(
+        id=1, title="task 1", description="d", task_type="Tutoring", location="London", poster_id="u9",
+        reward=Decimal("20"), base_reward=Decimal("20"), status="open", deadline=now + timedelta(days=7),
+    ))
+    db.commit()
+
+    def flush_and_read(**fields):
+        log.record("u1", 1, "view", **fields)
+        log.flush(db=db)
+        row = db.query(models.UserTaskInteraction).one()
+        db.expire_all()
+        return row.duration_seconds, row.interaction_metadata
+
+    assert flush_and_read(duration_seconds=40, metadata={"source": "feed"}) == (40, {"source": "feed"})
+    # 当天再次浏览但没有时长 / 元数据：更新这条记录而不是清空
+    assert flush_and_read() == (40, {"source": "feed"})
+    assert flush_and_read(duration_seconds=10) == (40, {"source": "feed"})
+    assert flush_and_read(duration_seconds=90, metadata={"source": "search"}) == (90, {"source": "search"})
+    db.close()
+
+
+def test_full_buffer_drops_new_entries_but_still_coalesces(log):
+    log.record("u1", 1, "apply")
+    log.record("u1", 2, "apply")
+    log.record("u1", 3, "view")
+    assert log.record("u1", 4, "view") is False
+    assert log.record("u1", 3, "view", duration_seconds=30) is True
+    assert log.stats["dropped"] == 1
+    assert len(log._events) == 2
+
+
+def test_cache_invalidation_is_debounced_per_user(log, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(interaction_log_module.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(log, "INVALIDATE_DEBOUNCE", 60)
+
+    log._schedule_invalidation("u1")
+    log._run_due_invalidations()
+    assert log.invalidated == ["u1"]
+
+    # 窗口内再次写入：推迟到窗口结束
+    clock[0] += 10
+    log._schedule_invalidation("u1")
+    log._schedule_invalidation("u1")
+    log._run_due_invalidations()
+    assert log.invalidated == ["u1"]
+
+    clock[0] += 50
+    log._run_due_invalidations()
+    assert log.invalidated == ["u1", "u1"]
+
+
+def test_force_runs_pending_invalidations(log):
+    log._last_invalidated["u2"] = interaction_log_module.time.monotonic()
+    log._schedule_invalidation("u2")
+    log._run_due_invalidations(force=True)
+    assert log.invalidated == ["u2"]
+
+
+def _database_down(db, items):
+    raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+
+def test_outage_requeues_batch_for_next_flush(log, monkeypatch):
+    monkeypatch.setattr(log, "_write", _database_down)
+    log.record("u1", 1, "view", duration_seconds=10)
+    log.record("u1", 2, "apply")
+
+    assert log.flush() == 0
+    assert log.stats["failed"] == 2
+    assert log.stats["requeued"] == 2
+    # 故障期间又记录了同一条浏览：与放回的条目合并，不重复占位
+    log.record("u1", 1, "view", duration_seconds=30)
+    assert len(log._coalesced) == 1 and len(log._events) == 1
+    assert next(iter(log._coalesced.values())).duration_seconds == 30
+
+    written = []
+    monkeypatch.setattr(log, "_write", lambda db, items: written.extend(items) or len(items))
+    assert log.flush() == 2
+    assert {(item.task_id, item.interaction_type) for item in written} == {(1, "view"), (2, "apply")}
+
+
+def test_requeue_gives_up_after_max_attempts(log, monkeypatch):
+    monkeypatch.setattr(log, "MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(log, "_write", _database_down)
+    log.record("u1", 1, "apply")
+
+    log.flush()
+    assert len(log._events) == 1
+    log.flush()
+    assert not log._events and log.stats["dropped"] == 1
+
+
+def test_rejected_row_is_isolated_from_the_batch(log, monkeypatch):
+    written = []
+
+    def write(db, items):
+        if any(item.task_id == 2 for item in items):
+            raise IntegrityError("INSERT", {}, Exception("violates foreign key constraint"))
+        written.extend(items)
+        return len(items)
+
+    monkeypatch.setattr(log, "_write", write)
+    for task_id in (1, 2, 3):
+        log.record("u1", task_id, "apply")
+
+    assert log.flush() == 2
+    assert sorted(item.task_id for item in written) == [1, 3]
+    assert log.stats["rejected"] == 1
+    assert not log._events and log.stats["requeued"] == 0
@@ -0,0 +1,139 @@
+"""
+通用键集分页（keyset_pagination）单元测试
+
+测试覆盖:
+- 游标编码 / 解析：类型化键值与冻结参数往返，篡改、格式错误、换作用域被拒绝
+- 翻页：多列混合方向排序、同分条目跨页不丢不重，结果与一次性排序一致
+- 总数：exact / estimate（非 PostgreSQL 回退精确 count）/ cached（Redis 命中不再 count）
+
+运行方式:
+    pytest tests/test_keyset_pagination.py -v
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+
+from app.utils.keyset_pagination import (
+    InvalidCursor,
+    SortKey,
+    count_cache_key,
+    count_rows,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+)
+
+_metadata = MetaData()
+_items = Table(
+    "keyset_items",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("score", Integer, nullable=False),
+    Column("name", String(20), nullable=False),
+)
+
+
+class _AsyncSessionAdapter:
+    """把同步 Session 包装成分页需要的 await db.execute 接口"""
+
+    def __init__(self, db):
+        self.db = db
+        self.statements = 0
+
+    async def execute(self, statement):
+        self.statements += 1
+        return self.db.execute(statement)
+
+    def get_bind(self):
+        return self.db.get_bind()
+
+
+@pytest.fixture
+def db(sqlite_sessionmaker):
+    session = sqlite_sessionmaker(metadata=_metadata)()
+    # score 有大量并列，name 也有并列，最后靠 id 打破
+    session.execute(_items.insert(), [
+        {"id": i, "score": i % 3, "name": "ab"[i % 2]} for i in range(1, 24)
+    ])
+    session.commit()
+    yield _AsyncSessionAdapter(session)
+    session.close()
+
+
+class TestCursor:
+    def test_round_trip_typed_values_and_params(self):
+        as_of = datetime(2026, 5, 1, 12, 30, tzinfo=timezone.utc)
+        cursor = encode_cursor("scope", (Decimal("1.50"), as_of, "x", 7), {"as_of": as_of})
+        state = decode_cursor(cursor, "scope")
+        assert state.values == (Decimal("1.50"), as_of, "x", 7)
+        assert state.param("as_of") == as_of
+        assert state.param("missing", 3) == 3
+
+    def test_rejects_tampered_malformed_and_foreign(self):
+        cursor = encode_cursor("scope", (1,))
+        body, _, signature = cursor.partition(".")
+        for bad in ("", "abc", f"{body}x.{signature}", f"{body}.{signature[:-1]}A"):
+            with pytest.raises(InvalidCursor):
+                decode_cursor(bad, "scope")
+        # 换了筛选条件的游标不能复用
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, "other-scope")
+
+
+class TestPaginate:
+    @pytest.mark.asyncio
+    async def test_mixed_directions_and_ties(self, db):
+        keys = [SortKey(_items.c.score), SortKey(_items.c.name, descending=False), SortKey(_items.c.id)]
+        query = select(_items.c.id)
+        expected = [
+            row.id for row in db.db.execute(
+                query.order_by(_items.c.score.desc(), _items.c.name.asc(), _items.c.id.desc())
+            )
+        ]
+
+        seen, after = [], None
+        while True:
+            page = await paginate(db, query, keys, 5, scope="items", after=after)
+            seen.extend(page.items)
+            if not page.has_more:
+                assert page.next_cursor is None
+                break
+            after = decode_cursor(page.next_cursor, "items")
+
+        assert seen == expected
+        assert len(seen) == 23
+
+    @pytest.mark.asyncio
+    async def test_cursor_key_count_mismatch(self, db):
+        after = decode_cursor(encode_cursor("items", (1,)), "items")
+        with pytest.raises(InvalidCursor):
+            await paginate(db, select(_items.c.id), [SortKey(_items.c.score), SortKey(_items.c.id)], 5, "items", after)
+
+
+class TestCount:
+    @pytest.mark.asyncio
+    async def test_exact_and_estimate_fallback(self, db):
+        query = select(_items).where(_items.c.score == 0)
+        assert await count_rows(db, query) == 7
+        assert await count_rows(db, query, mode="estimate") == 7
+        with pytest.raises(ValueError):
+            await count_rows(db, query, mode="fuzzy")
+
+    @pytest.mark.asyncio
+    async def test_cached(self, db, fake_redis, monkeypatch):
+        from app import redis_async
+        monkeypatch.setattr(redis_async, "get_async_redis_client", lambda decode_responses=True: fake_redis.as_async())
+        key = count_cache_key("items", score=0)
+        query = select(_items).where(_items.c.score == 0)
+
+        assert await count_rows(db, query, mode="cached", cache_key=key) == 7
+        assert fake_redis.strings == {key: b"7"}
+        db.statements = 0
+        db.db.execute(_items.delete().where(_items.c.id == 3))
+        # 缓存期内直接返回缓存值，不再执行 count
+        assert await count_rows(db, query, mode="cached", cache_key=key) == 7
+        assert db.statements == 0
+        assert count_cache_key("items", score=1) != key
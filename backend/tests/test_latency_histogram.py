@@ -0,0 +1,102 @@
+"""
+延迟直方图（latency_histogram）与 KPI 评估单元测试
+
+测试覆盖:
+- 分位数相对误差在 α 以内，合并结果与一次性记录一致，序列化往返
+- 桶数固定上限
+- 按线程分片记录、合并；跨 worker 经 Redis 汇总
+- evaluate_latency_kpis 用实时 P95 对比 KPI_THRESHOLDS
+
+运行方式:
+    pytest tests/test_latency_histogram.py -v
+"""
+
+import random
+import threading
+
+from app.observability.kpi_definitions import evaluate_latency_kpis
+from app.observability.latency_histogram import LatencyHistogram, LatencyRegistry
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_within_relative_accuracy():
+    rng = random.Random(42)
+    values = [rng.lognormvariate(3, 1.2) for _ in range(20000)]
+    hist = LatencyHistogram(alpha=0.01)
+    for v in values:
+        hist.record(v)
+    for q in (0.5, 0.95, 0.99):
+        exact = _exact_quantile(values, q)
+        assert abs(hist.quantile(q) - exact) / exact <= 0.011
+    assert hist.count == len(values)
+
+
+def test_merge_and_serialization_round_trip():
+    rng = random.Random(7)
+    values = [rng.uniform(1, 500) for _ in range(5000)]
+    whole, left, right = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i, v in enumerate(values):
+        whole.record(v)
+        (left if i % 2 else right).record(v)
+    left.merge(LatencyHistogram.from_dict(right.to_dict()))
+    assert left.buckets == whole.buckets
+    assert left.count == whole.count
+    assert left.quantile(0.95) == whole.quantile(0.95)
+
+
+def test_bucket_count_is_bounded():
+    hist = LatencyHistogram(alpha=0.01, max_buckets=64)
+    for exponent in range(-2, 7):
+        for step in range(1, 100):
+            hist.record(step * 10 ** exponent)
+    assert len(hist.buckets) <= 64
+    # 高分位不受低端桶合并影响
+    assert abs(hist.quantile(1.0) - 99e6) / 99e6 <= 0.011
+
+
+def test_registry_merges_thread_shards_and_workers(fake_redis):
+    registry = LatencyRegistry(window_seconds=3600)
+
+    def worker(offset):
+        for i in range(100):
+            registry.record("endpoint", "GET /api/tasks", 10 + offset)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snapshot = registry.local_snapshot()
+    assert snapshot[("endpoint", "GET /api/tasks")].count == 400
+
+    other = LatencyRegistry(window_seconds=3600)
+    other.worker_id = "other:1"
+    other.record("endpoint", "GET /api/tasks", 50)
+    assert registry.publish(fake_redis) and other.publish(fake_redis)
+    merged = registry.cluster_snapshot(fake_redis)
+    assert merged[("endpoint", "GET /api/tasks")].count == 401
+
+
+def test_evaluate_latency_kpis_flags_slow_endpoints():
+    slow, fast, query = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for _ in range(100):
+        slow.record(450)  # task_detail 阈值 200ms，超过 1.5 倍 → critical
+        fast.record(20)
+        query.record(5)
+    snapshot = {
+        ("endpoint", "GET /api/tasks/{task_id}"): slow,
+        ("endpoint", "GET /api/forum/posts"): fast,
+        ("query", "SELECT tasks"): query,
+    }
+    report = evaluate_latency_kpis(snapshot)
+    by_endpoint = {r["endpoint"]: r for r in report["results"]}
+    assert by_endpoint["task_detail"]["exceeded"] is True
+    assert by_endpoint["task_detail"]["level"] == "critical"
+    assert by_endpoint["GET /api/forum/posts"]["exceeded"] is False
+    assert by_endpoint["all_queries"]["exceeded"] is False
+    assert "task_list" not in by_endpoint  # 没有样本的端点不评估
+    assert report["exceeded"] == 1
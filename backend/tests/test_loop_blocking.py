@@ -0,0 +1,151 @@
+"""
+事件循环阻塞检测（LoopBlockingDetector）与阻塞调用卸载（BlockingOffloader）单元测试
+
+测试覆盖:
+- async 路由里的同步调用被记录：归属路由模板、阻塞时长、调用栈
+- 未超阈值的步骤只累计占用时长，不记为阻塞
+- 调用点取最内层的应用帧
+- 卸载打开时阻塞调用在线程池执行且不阻塞循环；关闭时原地执行
+
+运行方式:
+    pytest tests/test_loop_blocking.py -v
+"""
+
+import asyncio
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.observability.loop_blocking import (
+    BlockingOffloader,
+    LoopBlockingDetector,
+    _call_site,
+)
+from app.request_logging_middleware import RequestLoggingMiddleware
+
+
+def _slow_sync_call():
+    time.sleep(0.15)
+
+
+def _build_app(detector: LoopBlockingDetector) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestLoggingMiddleware)
+
+    @app.on_event("startup")
+    async def install():
+        detector.install()
+
+    @app.on_event("shutdown")
+    async def uninstall():
+        detector.uninstall()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        _slow_sync_call()
+        return {"id": item_id}
+
+    @app.get("/fast")
+    async def fast():
+        await asyncio.sleep(0)
+        return {"ok": True}
+
+    return app
+
+
+def test_detector_attributes_blocking_call_to_route(monkeypatch):
+    detector = LoopBlockingDetector(threshold_ms=50)
+    monkeypatch.setattr("app.observability.loop_blocking.loop_blocking_detector", detector)
+
+    with TestClient(_build_app(detector)) as client:
+        # 预热：中间件首次请求时才导入剖析相关模块
+        client.get("/fast")
+        detector.reset()
+        assert client.get("/items/7").status_code == 200
+        assert client.get("/fast").status_code == 200
+
+    report = detector.report()
+    assert report["stalls"] == 1
+    routes = {row["route"]: row for row in report["routes"]}
+    assert routes["GET /items/{item_id}"]["stalls"] == 1
+    assert routes["GET /items/{item_id}"]["max_ms"] >= 140
+    assert routes["GET /fast"]["stalls"] == 0
+    assert routes["GET /fast"]["requests"] == 1
+
+    event = report["recent"][0]
+    assert event["route"] == "GET /items/{item_id}"
+    assert event["blocked_ms"] >= 140
+    assert any("_slow_sync_call" in frame for frame in event["stack"])
+    assert report["call_sites"][0]["routes"] == {"GET /items/{item_id}": 1}
+
+
+def test_detector_ignores_short_steps():
+    detector = LoopBlockingDetector(threshold_ms=200)
+
+    async def short_steps():
+        for _ in range(3):
+            time.sleep(0.01)
+            await asyncio.sleep(0)
+
+    async def main():
+        detector.install()
+        task = asyncio.create_task(short_steps())
+        await task
+        detector.uninstall()
+        return task.get_coro().busy_ms
+
+    busy_ms = asyncio.run(main())
+    assert detector.steps >= 4
+    assert detector.stalls == 0
+    assert busy_ms >= 25
+
+
+def test_call_site_prefers_innermost_app_frame():
+    stack = [
+        "run (asyncio/runners.py:86)",
+        "translate_batch (app/routes/translation_routes.py:319)",
+        "translate (app/translation_manager.py:200)",
+        "send (app/observability/loop_blocking.py:85)",
+        "get (requests/api.py:62)",
+    ]
+    assert _call_site(stack) == "translate (app/translation_manager.py:200)"
+    assert _call_site(["get (requests/api.py:62)"]) is None
+
+
+def test_offloader_runs_blocking_call_off_loop():
+    offloader = BlockingOffloader(enabled=True, max_workers=2, max_pending=2)
+    loop_thread = threading.get_ident()
+
+    def blocking(value):
+        time.sleep(0.1)
+        return value, threading.get_ident()
+
+    async def main():
+        started = time.perf_counter()
+        ticker = asyncio.create_task(asyncio.sleep(0.02))
+        results = await asyncio.gather(*(offloader.run(blocking, i) for i in range(3)))
+        await ticker
+        return results, time.perf_counter() - started
+
+    try:
+        results, elapsed = asyncio.run(main())
+    finally:
+        offloader.shutdown()
+    assert [value for value, _ in results] == [0, 1, 2]
+    assert all(thread_id != loop_thread for _, thread_id in results)
+    # 在途上限 2：第三个调用排队等待
+    assert offloader.stats["offloaded"] == 3
+    assert offloader.stats["waited"] >= 1
+    assert elapsed < 0.3
+
+
+def test_offloader_disabled_runs_inline():
+    offloader = BlockingOffloader(enabled=False)
+
+    async def main():
+        return await offloader.run(threading.get_ident)
+
+    assert asyncio.run(main()) == threading.get_ident()
+    assert offloader.stats["inline"] == 1
@@ -0,0 +1,56 @@
+"""
+附近任务的坐标工具单元测试
+
+测试覆盖:
+- cities_at_coordinates：网格查表与逐个城市范围比对结果一致（含边界点）
+- bounding_box：覆盖给定半径内的所有点
+
+运行方式:
+    pytest tests/test_nearby_lookup.py -v
+"""
+
+import math
+
+from app.utils.city_filter_utils import UK_CITY_BOUNDS, cities_at_coordinates
+from app.utils.location_utils import bounding_box, calculate_distance
+
+
+def _scan(lat, lon):
+    return [
+        city for city, (min_lat, max_lat, min_lon, max_lon) in UK_CITY_BOUNDS.items()
+        if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+    ]
+
+
+def test_cities_at_coordinates_matches_full_scan():
+    for lat_step in range(495, 580):
+        for lon_step in range(-620, 150):
+            lat, lon = lat_step / 10 + 0.05, lon_step / 10 + 0.05
+            assert cities_at_coordinates(lat, lon) == _scan(lat, lon)
+
+
+def test_cities_at_coordinates_includes_boundaries():
+    assert cities_at_coordinates(51.7, 0.3) == ["London"]
+    assert cities_at_coordinates(51.3, -0.5) == ["London"]
+    assert cities_at_coordinates(51.7, -1.2) == ["Oxford"]
+    assert cities_at_coordinates(51.5074, -0.1278) == ["London"]
+    assert cities_at_coordinates(40.0, -74.0) == []
+
+
+def test_bounding_box_covers_radius():
+    lat, lon, radius = 53.48, -2.24, 25.0
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius)
+    for bearing in range(0, 360, 5):
+        theta = math.radians(bearing)
+        # 沿各个方向略小于半径的点都应落在边界框内
+        d = radius * 0.999 / 6371.0
+        lat2 = math.asin(math.sin(math.radians(lat)) * math.cos(d)
+                         + math.cos(math.radians(lat)) * math.sin(d) * math.cos(theta))
+        lon2 = math.radians(lon) + math.atan2(
+            math.sin(theta) * math.sin(d) * math.cos(math.radians(lat)),
+            math.cos(d) - math.sin(math.radians(lat)) * math.sin(lat2),
+        )
+        lat2, lon2 = math.degrees(lat2), math.degrees(lon2)
+        assert calculate_distance(lat, lon, lat2, lon2) <= radius
+        assert min_lat <= lat2 <= max_lat
+        assert min_lon <= lon2 <= max_lon
@@ -0,0 +1,205 @@
+"""
+持久化用户偏好向量（preference_store）单元测试
+
+测试覆盖:
+- 首次读取由任务历史和交互记录重放生成并落库；之后只查一行、不再聚合历史
+- 增量事件更新已有向量并递增版本；没有向量行的用户跳过
+- 读取时按半衰期衰减，衰减到阈值以下的信号不再出现，回退到冷启动默认向量
+- 显式偏好设置与学习到的信号合并，价格区间来自申请 / 历史任务
+- TaskHistory 提交后、InteractionLog 落库后增量更新向量（长浏览在当天更新时补记）
+
+运行方式:
+    pytest tests/test_preference_vectors.py -v
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import event_listeners, models
+from app.recommendation import preference_store
+from app.recommendation.preference_store import (
+    PreferenceEvent,
+    apply_events,
+    event_from_interaction,
+    get_preference_vector,
+    load_state,
+    to_preference_vector,
+)
+from app.services.interaction_log import InteractionLog
+
+_NOW = datetime.now(timezone.utc)
+_USER = SimpleNamespace(id="u0000001", residence_city="Leeds", user_level="normal")
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'prefs.db'}")
+    models.Base.metadata.create_all(engine, tables=[
+        models.Task.__table__,
+        models.TaskHistory.__table__,
+        models.UserTaskInteraction.__table__,
+        models.UserPreferenceVector.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    for task_id, task_type, location, reward in (
+        (1, "Tutoring", "London", "20"),
+        (2, "Tutoring", "London", "30"),
+        (3, "Delivery", "Manchester", "10"),
+        (4, "Cleaning", "Bristol", "15"),
+    ):
+        session.add(models.Task(
+            id=task_id, title=f"task {task_id}", description="d", task_type=task_type, location=location,
+            poster_id="u0000009", reward=Decimal(reward), base_reward=Decimal(reward), status="open", created_at=_NOW,
+        ))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def _no_commit_hook(monkeypatch):
+    # TaskHistory 提交后的钩子默认用 SessionLocal 新开会话；测试里不连真实数据库
+    monkeypatch.setattr(event_listeners, "record_preference_events", lambda events: None)
+
+
+def _add_interaction(db, task_id, interaction_type, at, duration=None, metadata=None):
+    db.add(models.UserTaskInteraction(
+        user_id=_USER.id, task_id=task_id, interaction_type=interaction_type,
+        interaction_time=at, duration_seconds=duration, interaction_metadata=metadata,
+    ))
+
+
+def _statements(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_first_read_replays_history_then_reads_one_row(db):
+    db.add(models.TaskHistory(task_id=1, user_id=_USER.id, action="accepted", timestamp=_NOW - timedelta(days=1)))
+    _add_interaction(db, 3, "view", _NOW - timedelta(hours=2), duration=45, metadata={"search_keyword": "van"})
+    _add_interaction(db, 4, "skip", _NOW - timedelta(hours=1))
+    db.commit()
+
+    vector = get_preference_vector(db, _USER)
+    assert vector["task_types"] == ["Tutoring", "Delivery"]
+    assert vector["locations"] == ["London", "Manchester"]
+    assert vector["keywords"] == ["van"]
+    assert vector["negative_task_types"] == ["Cleaning"]
+    assert vector["price_range_from_history"] is True
+    assert vector["price_range"]["min"] == pytest.approx(16.0, rel=1e-3)
+    assert vector["price_range"]["max"] == pytest.approx(24.0, rel=1e-3)
+    assert vector["vector_version"] == 1
+    assert db.get(models.UserPreferenceVector, _USER.id) is not None
+
+    statements = _statements(db)
+    again = get_preference_vector(db, _USER)
+    assert len(statements) == 1
+    assert "user_preference_vectors" in statements[0]
+    assert again["task_types"] == vector["task_types"]
+
+
+def test_apply_events_updates_existing_rows_only(db):
+    load_state(db, _USER.id)
+    events = [
+        PreferenceEvent(_USER.id, 3, "apply", _NOW),
+        PreferenceEvent(_USER.id, 3, "apply", _NOW),
+        PreferenceEvent("u0000002", 1, "apply", _NOW),
+    ]
+    assert apply_events(db.connection(), events) == 1
+    db.commit()
+
+    row = db.get(models.UserPreferenceVector, _USER.id)
+    assert row.version == 2
+    assert row.data["t"] == {"Delivery": 4.0}
+    assert db.get(models.UserPreferenceVector, "u0000002") is None
+    vector = get_preference_vector(db, _USER)
+    assert vector["task_types"] == ["Delivery"]
+    assert vector["vector_version"] == 2
+
+
+def test_weights_decay_lazily_on_read():
+    ref = _NOW - timedelta(days=60)
+    state = preference_store.empty_state()
+    preference_store._add_event(state, ref, PreferenceEvent(_USER.id, 1, "apply", ref), preference_store._TaskAttrs("Tutoring", "London", 20.0))
+    preference_store._add_event(state, ref, PreferenceEvent(_USER.id, 3, "click", ref), preference_store._TaskAttrs("Delivery", None, 10.0))
+
+    # 两个半衰期后：apply 2.0 → 0.5 仍保留，click 0.5 → 0.125 低于阈值
+    vector = to_preference_vector(state, ref, now=_NOW)
+    assert vector["task_types"] == ["Tutoring"]
+    assert vector["locations"] == ["London"]
+
+    # 再过两个半衰期所有信号都消失
+    faded = to_preference_vector(state, ref, now=_NOW + timedelta(days=60))
+    assert not preference_store.has_signal(faded)
+
+
+def test_explicit_preferences_come_first(db):
+    state = preference_store.empty_state()
+    preference_store._add_event(state, _NOW, PreferenceEvent(_USER.id, 1, "history", _NOW), preference_store._TaskAttrs("Tutoring", "London", 20.0))
+    preferences = SimpleNamespace(task_types='["Delivery"]', locations=["Leeds"], task_levels=None, keywords=None)
+    vector = to_preference_vector(state, _NOW, preferences, now=_NOW)
+    assert vector["task_types"] == ["Delivery", "Tutoring"]
+    assert vector["task_types_from_preference"] is True
+    assert vector["locations"] == ["Leeds", "London"]
+
+    # 没有任何信号也没有偏好设置：冷启动默认向量
+    empty = get_preference_vector(db, _USER)
+    assert empty["locations"] == ["Leeds"]
+    assert empty["task_levels"] == ["normal"]
+
+
+def test_event_from_interaction_mapping():
+    assert event_from_interaction("u", 1, "view", _NOW, duration_seconds=10) is None
+    short = event_from_interaction("u", 1, "view", _NOW, duration_seconds=10, metadata={"search_keyword": "van"})
+    assert (short.kind, short.keyword) == ("search", "van")
+    assert event_from_interaction("u", 1, "view", _NOW, duration_seconds=31).kind == "view"
+    assert event_from_interaction("u", 1, "skip", _NOW).kind == "skip"
+    assert event_from_interaction("u", 1, "unknown", _NOW) is None
+
+
+def test_task_history_commit_updates_vector(db, monkeypatch):
+    load_state(db, _USER.id)
+    captured = []
+    monkeypatch.setattr(event_listeners, "record_preference_events", captured.extend)
+
+    db.add(models.TaskHistory(task_id=2, user_id=_USER.id, action="accepted"))
+    db.add(models.TaskHistory(task_id=2, user_id=None, action="admin_update"))
+    db.flush()
+    assert captured == []
+    db.commit()
+    assert [(e.user_id, e.task_id, e.kind) for e in captured] == [(_USER.id, 2, "history")]
+
+    apply_events(db.connection(), captured)
+    db.commit()
+    assert db.get(models.UserPreferenceVector, _USER.id).data["t"] == {"Tutoring": 3.0}
+
+
+def test_interaction_log_flush_updates_vector(db, monkeypatch):
+    load_state(db, _USER.id)
+    log = InteractionLog()
+    monkeypatch.setattr(log, "_invalidate_cache", lambda user_id: None)
+    monkeypatch.setattr("app.recommendation_tasks.update_user_preferences_async", lambda user_id: None, raising=False)
+
+    log.record(_USER.id, 3, "view", duration_seconds=5)
+    log.record(_USER.id, 4, "skip")
+    log.flush(db)
+    row = db.get(models.UserPreferenceVector, _USER.id)
+    db.refresh(row)
+    assert row.data["t"] == {}
+    assert row.data["n"] == {"Cleaning": 1.0}
+
+    # 当天同一浏览记录的时长首次超过长浏览阈值：补记一次兴趣
+    log.record(_USER.id, 3, "view", duration_seconds=40)
+    view = next(iter(log._coalesced.values()))
+    log._coalesced.clear()
+    log._update_preference_vectors(db, [], [(1, view, 5)])
+    log._update_preference_vectors(db, [], [(1, view._replace(duration_seconds=90), 40)])
+    db.refresh(row)
+    assert row.data["t"] == {"Delivery": 1.0}
@@ -0,0 +1,189 @@
+"""
+已认证用户（principal）缓存单元测试
+
+测试覆盖:
+- 进程内命中不访问数据库和 Redis
+- Redis 命中时日期字段正确还原
+- 未命中查库并回填两级缓存；用户不存在不缓存
+- 失效同时清除进程内缓存和 Redis
+- 快照不含 hashed_password 且只读
+- 封禁 / 暂停用户被拒绝
+- User 的 ORM 写入和会话里直接执行的 update(models.User)（按 WHERE 中的用户 ID）在 flush / 执行时
+  只失效本进程缓存，commit 后才删除 Redis
+
+运行方式:
+    pytest tests/test_principal_cache.py -v
+"""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import async_crud, models
+from app.deps import _reject_inactive_principal
+from app.principal_cache import PRINCIPAL_KEY_PREFIX, Principal, PrincipalCache
+
+
+def _user(user_id="u1", **overrides):
+    fields = dict(
+        id=user_id,
+        name="alice",
+        email="alice@example.com",
+        hashed_password="secret-hash",
+        is_banned=0,
+        is_suspended=0,
+        created_at=datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    )
+    fields.update(overrides)
+    return models.User(**fields)
+
+
+@pytest.fixture
+def cache(fake_redis):
+    return PrincipalCache(local_ttl=60, redis_ttl=60, max_entries=2, redis_client=fake_redis)
+
+
+@pytest.fixture
+def db_calls(monkeypatch):
+    calls = []
+    users = {"u1": _user("u1"), "u2": _user("u2"), "u3": _user("u3")}
+
+    async def fake_get_user_by_id(db, user_id):
+        calls.append(user_id)
+        return users.get(user_id)
+
+    monkeypatch.setattr(async_crud.async_user_crud, "get_user_by_id", fake_get_user_by_id)
+    return calls
+
+
+def _request():
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "client": ("1.2.3.4", 0)})
+
+
+class TestPrincipalCache:
+    @pytest.mark.asyncio
+    async def test_miss_populates_both_levels(self, cache, fake_redis, db_calls):
+        principal = await cache.get(None, "u1")
+        assert principal.name == "alice"
+        assert db_calls == ["u1"]
+        assert f"{PRINCIPAL_KEY_PREFIX}u1" in fake_redis.strings
+
+        again = await cache.get(None, "u1")
+        assert again.id == "u1"
+        assert db_calls == ["u1"]
+        assert fake_redis.calls.count("get") == 1
+        assert cache.stats == {"local_hits": 1, "redis_hits": 0, "misses": 1}
+
+    @pytest.mark.asyncio
+    async def test_redis_hit_restores_datetimes(self, cache, db_calls):
+        await cache.get(None, "u1")
+        cache.clear_local()
+
+        principal = await cache.get(None, "u1")
+        assert db_calls == ["u1"]
+        assert cache.stats["redis_hits"] == 1
+        assert principal.created_at == datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    @pytest.mark.asyncio
+    async def test_unknown_user_not_cached(self, cache, fake_redis, db_calls):
+        assert await cache.get(None, "missing") is None
+        assert await cache.get(None, "missing") is None
+        assert db_calls == ["missing", "missing"]
+        assert fake_redis.strings == {}
+
+    @pytest.mark.asyncio
+    async def test_local_lru_is_bounded(self, cache, db_calls):
+        for user_id in ("u1", "u2", "u3"):
+            await cache.get(None, user_id)
+        assert list(cache._local) == ["u2", "u3"]
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self, cache, fake_redis, db_calls):
+        await cache.get(None, "u1")
+        cache.invalidate("u1")
+        assert fake_redis.strings == {}
+
+        await cache.get(None, "u1")
+        assert db_calls == ["u1", "u1"]
+
+
+class TestPrincipal:
+    def test_snapshot_excludes_password_and_is_read_only(self):
+        principal = Principal.from_user(_user())
+        assert "hashed_password" not in principal.to_dict()
+        assert "secret-hash" not in json.dumps(principal.to_dict())
+        with pytest.raises(AttributeError):
+            principal.hashed_password
+        with pytest.raises(AttributeError):
+            principal.name = "bob"
+
+    def test_reject_inactive(self):
+        _reject_inactive_principal(_request(), "u1", Principal.from_user(_user()))
+        with pytest.raises(HTTPException) as exc:
+            _reject_inactive_principal(_request(), "u1", Principal.from_user(_user(is_banned=1)))
+        assert exc.value.status_code == 403
+        with pytest.raises(HTTPException) as exc:
+            _reject_inactive_principal(_request(), "u1", Principal.from_user(_user(is_suspended=1)))
+        assert exc.value.detail == "账户已被暂停"
+
+
+class _RecordingCache:
+    def __init__(self):
+        self.local, self.redis, self.cleared = [], [], []
+
+    def invalidate_local(self, *user_ids):
+        self.local.extend(user_ids)
+
+    def invalidate(self, *user_ids):
+        self.redis.extend(user_ids)
+
+    def clear_local(self):
+        self.cleared.append(True)
+
+
+@pytest.fixture
+def user_session(sqlite_sessionmaker, monkeypatch):
+    from app import event_listeners
+
+    session = sqlite_sessionmaker(models.User)()
+    session.add_all([_user("u1"), _user("u2", name="bob", email="bob@example.com")])
+    session.commit()
+    recording = _RecordingCache()
+    monkeypatch.setattr(event_listeners, "get_principal_cache", lambda: recording)
+    yield session, recording
+    session.close()
+
+
+def test_user_writes_defer_redis_delete_to_commit(user_session):
+    session, recording = user_session
+    session.get(models.User, "u1").name = "alice2"
+    session.flush()
+    # flush 时只失效本进程缓存，不访问 Redis
+    assert (recording.local, recording.redis) == (["u1"], [])
+    session.commit()
+    assert recording.redis == ["u1"]
+
+
+def test_bulk_user_updates_invalidate_principal(user_session):
+    from sqlalchemy import update
+
+    session, recording = user_session
+
+    # 绕过 ORM 对象写 stripe_customer_id：执行时失效本进程缓存，commit 后删除 Redis
+    session.execute(update(models.User).where(models.User.id == "u1").values(stripe_customer_id="cus_1"))
+    assert (recording.local, recording.redis) == (["u1"], [])
+    session.commit()
+    assert recording.redis == ["u1"]
+
+    recording.local.clear()
+    session.execute(update(models.User).where(models.User.id.in_(["u1", "u2"])).values(is_suspended=1))
+    assert sorted(recording.local) == ["u1", "u2"]
+    session.rollback()
+    assert recording.redis == ["u1"]
+
+    # WHERE 里没有用户 ID：清空本进程缓存
+    session.execute(update(models.User).where(models.User.name == "bob").values(is_suspended=1))
+    assert recording.cleared == [True]
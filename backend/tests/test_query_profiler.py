@@ -0,0 +1,89 @@
+"""
+每请求 SQL 剖析（query_profiler）单元测试
+
+测试覆盖:
+- 指纹：字面量 / 各种绑定参数 / 注释归一化，IN 列表与多行 VALUES 折叠，:: 类型转换保留
+- 语句标签：语句类型 + 第一个表
+- 请求归属：begin / finish 之间的语句计入请求，之后的不计入
+- N+1 与路由预算：超出时记入最近违规列表，路由汇总正确
+
+运行方式:
+    pytest tests/test_query_profiler.py -v
+"""
+
+from app.observability.query_profiler import QueryProfiler, fingerprint, statement_label
+
+
+def test_fingerprint_normalizes_literals_and_params():
+    a = fingerprint("SELECT * FROM tasks WHERE id = 42 AND title = 'foo' -- comment")
+    b = fingerprint("select * from tasks where id = 7 and title = 'it''s'")
+    assert a.lower() == b.lower()
+    assert fingerprint("SELECT * FROM users WHERE id = $1") == fingerprint("SELECT * FROM users WHERE id = %(id_1)s")
+    assert fingerprint("SELECT * FROM users WHERE id = :uid") == "SELECT * FROM users WHERE id = ?"
+
+
+def test_fingerprint_collapses_lists_and_keeps_casts():
+    short = fingerprint("SELECT id FROM tasks WHERE id IN (1, 2)")
+    long = fingerprint("SELECT id FROM tasks WHERE id IN (1, 2, 3, 4, 5, 6)")
+    assert short == long == "SELECT id FROM tasks WHERE id IN (...)"
+    one = fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)")
+    many = fingerprint("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y'), (3, 'z')")
+    assert one == many
+    assert "::jsonb" in fingerprint("SELECT '{}'::jsonb FROM t")
+
+
+def test_statement_label():
+    assert statement_label(fingerprint("SELECT a FROM tasks t JOIN users u ON u.id = t.poster_id")) == "SELECT tasks"
+    assert statement_label(fingerprint("UPDATE users SET name = 'x'")) == "UPDATE users"
+    assert statement_label(fingerprint("INSERT INTO messages (a) VALUES (1)")) == "INSERT messages"
+    assert statement_label(fingerprint("BEGIN")) == "BEGIN"
+
+
+def test_statements_outside_request_are_not_attributed():
+    profiler = QueryProfiler(n_plus_one_threshold=3, default_budget=100, budgets={})
+    profiler.on_statement("SELECT 1", 1.0)
+    token = profiler.begin("req-1")
+    profiler.on_statement("SELECT * FROM tasks WHERE id = 1", 2.0)
+    profile = profiler.finish(token, "GET /api/tasks/{task_id}")
+    assert profile.query_count == 1
+    assert profile.total_ms == 2.0
+    profiler.on_statement("SELECT * FROM tasks WHERE id = 2", 2.0)
+    assert profile.query_count == 1
+
+
+def test_n_plus_one_and_budget_violations():
+    profiler = QueryProfiler(n_plus_one_threshold=5, default_budget=100, budgets={"GET /api/messages/tasks": 8})
+
+    token = profiler.begin("req-n1")
+    profiler.on_statement("SELECT * FROM tasks WHERE poster_id = 'u1'", 1.0)
+    for task_id in range(6):
+        profiler.on_statement(f"SELECT count(*) FROM messages WHERE task_id = {task_id}", 0.5)
+    profiler.finish(token, "GET /api/messages/tasks")
+
+    token = profiler.begin("req-ok")
+    profiler.on_statement("SELECT * FROM tasks WHERE id IN (1, 2, 3)", 1.0)
+    profiler.finish(token, "GET /api/messages/tasks")
+
+    report = profiler.report()
+    route = report["routes"]["GET /api/messages/tasks"]
+    assert route["requests"] == 2
+    assert route["queries"] == 8
+    assert route["max_queries"] == 7
+    assert route["n_plus_one"] == 1
+    assert route["over_budget"] == 0
+    assert route["budget"] == 8
+
+    violations = report["recent_violations"]
+    assert len(violations) == 1
+    assert violations[0]["request_id"] == "req-n1"
+    assert violations[0]["repeated_statements"][0]["count"] == 6
+    assert report["top_fingerprints"][0]["fingerprint"] == "SELECT count(*) FROM messages WHERE task_id = ?"
+
+    token = profiler.begin("req-heavy")
+    for i in range(9):
+        profiler.on_statement(f"SELECT * FROM table_{i}", 0.1)
+    profiler.finish(token, "GET /api/messages/tasks")
+    assert profiler.report()["routes"]["GET /api/messages/tasks"]["over_budget"] == 1
+
+    profiler.reset()
+    assert profiler.report()["routes"] == {}
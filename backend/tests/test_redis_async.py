@@ -0,0 +1,145 @@
+"""
+异步 Redis 访问层单元测试
+
+测试覆盖:
+- AsyncRedisCache 与同步 RedisCache 序列化格式一致（get/set/setex/delete_pattern/keys，str 值同样 JSON 序列化）
+- 连接失败后熔断，期间不再访问 Redis
+- 连接池按事件循环隔离，同一事件循环内复用
+- 速率限制装饰器的异步路径使用异步 pipeline，超限返回 429 和 Retry-After
+
+运行方式:
+    pytest tests/test_redis_async.py -v
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError
+from starlette.requests import Request
+
+from app import rate_limiting, redis_async
+from app.redis_async import AsyncRedisCache
+from app.redis_cache import deserialize_value, serialize_value
+
+
+class _DownRedis:
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, key):
+        self.calls += 1
+        raise RedisConnectionError("connection refused")
+
+
+def _request():
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "client": ("9.9.9.9", 0)})
+
+
+class TestAsyncRedisCache:
+    @pytest.mark.asyncio
+    async def test_round_trip_matches_sync_format(self, fake_redis):
+        cache = AsyncRedisCache(client=fake_redis.as_async())
+
+        assert await cache.set("k", {"a": 1}, ttl=30)
+        assert fake_redis.strings["k"] == serialize_value({"a": 1})
+        assert await cache.get("k") == {"a": 1}
+
+        fake_redis.set("legacy", serialize_value([1, 2]))
+        assert await cache.get("legacy") == deserialize_value(serialize_value([1, 2]))
+        assert await cache.get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_str_round_trip_matches_sync_set(self, fake_redis):
+        cache = AsyncRedisCache(client=fake_redis.as_async())
+        assert await cache.set("s", "x", ttl=30)
+        assert fake_redis.strings["s"] == serialize_value("x")
+        assert await cache.get("s") == "x"
+
+    @pytest.mark.asyncio
+    async def test_delete_pattern_and_keys(self, fake_redis, monkeypatch):
+        monkeypatch.setattr(redis_async, "REDIS_ASYNC_DELETE_BATCH", 2)
+        cache = AsyncRedisCache(client=fake_redis.as_async())
+        for i in range(5):
+            await cache.setex(f"forum:list:{i}", 30, b"x")
+        await cache.setex("other", 30, b"x")
+
+        assert sorted(await cache.keys("forum:*")) == [f"forum:list:{i}" for i in range(5)]
+        assert await cache.delete_pattern("forum:*") == 5
+        assert list(fake_redis.strings) == ["other"]
+
+    @pytest.mark.asyncio
+    async def test_circuit_breaker(self):
+        client = _DownRedis()
+        cache = AsyncRedisCache(client=client)
+
+        assert await cache.get("k") is None
+        assert await cache.get("k") is None
+        assert client.calls == 1
+        assert cache.pipeline() is None
+
+
+class TestAsyncPool:
+    def test_pool_per_event_loop(self, monkeypatch):
+        settings = redis_async.get_settings()
+        monkeypatch.setattr(settings, "USE_REDIS", True)
+        monkeypatch.setattr(settings, "REDIS_URL", "redis://127.0.0.1:6399/0")
+
+        async def _pools():
+            return (
+                redis_async.get_async_pool(),
+                redis_async.get_async_pool(),
+                redis_async.get_async_pool(decode_responses=True),
+            )
+
+        first, same, decoded = asyncio.run(_pools())
+        other, _, _ = asyncio.run(_pools())
+        assert first is same
+        assert decoded is not first
+        assert other is not first
+
+    def test_disabled_returns_none(self, monkeypatch):
+        monkeypatch.setattr(redis_async.get_settings(), "USE_REDIS", False)
+
+        async def _client():
+            return redis_async.get_async_client()
+
+        assert asyncio.run(_client()) is None
+
+
+class TestAsyncRateLimit:
+    @pytest.fixture
+    def fake_client(self, fake_redis, monkeypatch):
+        client = fake_redis.as_async()
+        monkeypatch.setattr(rate_limiting, "async_redis_cache", AsyncRedisCache(client=client))
+        monkeypatch.setattr(rate_limiting.rate_limiter, "redis_client", object())
+        monkeypatch.setattr(rate_limiting.rate_limiter, "_get_user_id", lambda request: None)
+        return client
+
+    @pytest.mark.asyncio
+    async def test_check_rate_limit_async(self, fake_client):
+        limiter = rate_limiting.rate_limiter
+        info = await limiter.check_rate_limit_async(_request(), "unit", limit=2, window=60)
+        assert info["remaining"] == 1
+        assert await fake_client.zcard("rate_limit:unit:ip:9.9.9.9") == 1
+
+    @pytest.mark.asyncio
+    async def test_decorator_returns_429(self, fake_client):
+        @rate_limiting.rate_limit("unit_decorated", limit=1, window=60)
+        async def endpoint(request: Request):
+            return {"ok": True}
+
+        assert await endpoint(_request()) == {"ok": True}
+        response = await endpoint(_request())
+        assert response.status_code == 429
+        assert 1 <= int(response.headers["Retry-After"]) <= 60
+
+    @pytest.mark.asyncio
+    async def test_non_rate_limit_errors_propagate(self, fake_client):
+        @rate_limiting.rate_limit("unit_errors", limit=5, window=60)
+        async def endpoint(request: Request):
+            raise HTTPException(status_code=404)
+
+        with pytest.raises(HTTPException) as exc:
+            await endpoint(_request())
+        assert exc.value.status_code == 404
@@ -0,0 +1,97 @@
+"""
+采样剖析器（StackSampler）与事件循环卡顿监控（LoopLagMonitor）单元测试
+
+测试覆盖:
+- 采样线程能抓到忙碌线程的调用栈，输出 flamegraph 折叠格式
+- 默认跳过空闲线程；按持续时间自动停止
+- 阻塞事件循环的协程被记录（名称、调用栈、阻塞时长），未超阈值的延迟不记为卡顿
+
+运行方式:
+    pytest tests/test_sampling_profiler.py -v
+"""
+
+import asyncio
+import threading
+import time
+
+from app.observability.sampling_profiler import LoopLagMonitor, StackSampler
+
+
+def _busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(2000))
+
+
+def test_sampler_collects_folded_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+    idle = threading.Thread(target=stop.wait, name="idle-worker")
+    worker.start()
+    idle.start()
+    sampler = StackSampler()
+    try:
+        sampler.start(interval_ms=5)
+        time.sleep(0.3)
+    finally:
+        sampler.stop()
+        stop.set()
+        worker.join()
+        idle.join()
+
+    folded = sampler.folded()
+    lines = folded.strip().splitlines()
+    assert sampler.samples > 5
+    assert any(line.startswith("busy-worker;") and "_busy_loop" in line for line in lines)
+    assert not any(line.startswith("idle-worker;") for line in lines)
+    # 每行以空格分隔的样本数结尾，且按样本数降序
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+    assert counts == sorted(counts, reverse=True)
+    assert any("_busy_loop" in item["function"] or "genexpr" in item["function"] for item in sampler.top_functions(5))
+    assert sampler.get_status()["overhead_ratio"] < 0.5
+
+
+def test_sampler_stops_after_duration():
+    sampler = StackSampler()
+    sampler.start(interval_ms=5, duration_seconds=0.05)
+    time.sleep(0.3)
+    assert not sampler.running
+    sampler.reset()
+    assert sampler.folded() == ""
+
+
+def test_loop_lag_monitor_attributes_blocking_coroutine():
+    monitor = LoopLagMonitor(interval_ms=10, threshold_ms=50)
+
+    async def blocking_handler():
+        time.sleep(0.2)
+
+    async def main():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(blocking_handler())
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    asyncio.run(main())
+    report = monitor.report()
+    assert report["stalls"] == 1
+    assert report["max_lag_ms"] >= 150
+    event = report["recent"][0]
+    assert event["coroutine"].endswith("blocking_handler")
+    assert any("blocking_handler" in frame for frame in event["stack"])
+    assert report["by_coroutine"][0]["count"] == 1
+
+
+def test_loop_lag_monitor_ignores_small_lag():
+    monitor = LoopLagMonitor(interval_ms=10, threshold_ms=200)
+
+    async def main():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.02)
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    asyncio.run(main())
+    assert monitor.ticks > 0
+    assert monitor.stalls == 0
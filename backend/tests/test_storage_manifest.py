@@ -0,0 +1,150 @@
+"""
+存储清单（storage_manifest）单元测试
+
+测试覆盖:
+- 上传写入清单；移出临时目录更新路径和实体 ID；删除时移除清单行
+- ORM 删除实体时钩子标记孤儿，过宽限期后整目录删除
+- 抽样对账标记绕过 ORM 删除的实体，游标扫到末尾回到 0
+- 整数主键实体的非数字目录名（如 "S0012"）不被标记，对账后文件仍在
+- 过期临时上传被删除
+
+运行方式:
+    pytest tests/test_storage_manifest.py -v
+"""
+
+import io
+from datetime import timedelta
+
+import pytest
+from PIL import Image
+from sqlalchemy import delete, select
+
+from app import models
+from app.services import storage_manifest as manifest_module
+from app.services.image_executor import ImageProcessingExecutor
+from app.services.image_upload_service import ImageCategory, ImageUploadService
+from app.services.storage_backend import LocalStorageBackend
+from app.services.storage_manifest import StorageManifest
+from app.utils.time_utils import get_utc_time
+
+
+def _jpeg() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 30, 30)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def session_factory(sqlite_sessionmaker):
+    return sqlite_sessionmaker(models.StorageObject, models.Banner, expire_on_commit=False)
+
+
+@pytest.fixture
+def manifest(session_factory):
+    return StorageManifest(session_factory=session_factory, enabled=True)
+
+
+@pytest.fixture
+def service(tmp_path, manifest):
+    storage = LocalStorageBackend(base_dir=str(tmp_path), base_url="http://test")
+    return ImageUploadService(
+        storage=storage, executor=ImageProcessingExecutor(0), manifest=manifest
+    )
+
+
+def _rows(session_factory):
+    with session_factory() as db:
+        return db.execute(select(models.StorageObject)).scalars().all()
+
+
+def _banner(db, banner_id):
+    db.add(models.Banner(id=banner_id, image_url="x", title="t", order=0, is_active=True))
+
+
+class TestManifestWrites:
+    def test_upload_move_delete(self, service, session_factory):
+        result = service.upload(_jpeg(), ImageCategory.BANNER, user_id="u1", is_temp=True)
+        assert result.success
+        (row,) = _rows(session_factory)
+        assert row.entity_type == "banner"
+        assert row.entity_id is None and row.owner_user_id == "u1"
+
+        (new_url,) = service.move_from_temp(ImageCategory.BANNER, "u1", "7", [result.url])
+        (row,) = _rows(session_factory)
+        assert row.entity_id == "7"
+        assert row.path == f"public/images/banner/7/{result.filename}"
+
+        assert service.delete(ImageCategory.BANNER, "7", [new_url])
+        assert _rows(session_factory) == []
+
+    def test_upload_without_resource_not_recorded(self, service, session_factory):
+        assert service.upload(_jpeg(), ImageCategory.BANNER).success
+        assert _rows(session_factory) == []
+
+
+class TestReconcile:
+    def test_orm_delete_marks_and_reconcile_removes_dir(self, service, session_factory, manifest, monkeypatch):
+        with session_factory() as db:
+            _banner(db, 3)
+            db.commit()
+        result = service.upload(_jpeg(), ImageCategory.BANNER, resource_id="3")
+        local_file = service.storage.base_dir / result.path
+
+        with session_factory() as db:
+            db.delete(db.get(models.Banner, 3))
+            db.commit()
+        (row,) = _rows(session_factory)
+        assert row.orphaned_at is not None
+
+        # 宽限期内不删除
+        assert manifest.reconcile_orphans(service.storage) == 0
+        assert local_file.exists()
+
+        monkeypatch.setattr(manifest_module, "STORAGE_MANIFEST_ORPHAN_GRACE", 0)
+        assert manifest.reconcile_orphans(service.storage) == 1
+        assert not local_file.parent.exists()
+        assert _rows(session_factory) == []
+
+    def test_sample_marks_bulk_deleted_entities(self, service, session_factory, manifest):
+        with session_factory() as db:
+            _banner(db, 1)
+            _banner(db, 2)
+            db.commit()
+        service.upload(_jpeg(), ImageCategory.BANNER, resource_id="1")
+        service.upload(_jpeg(), ImageCategory.BANNER, resource_id="2")
+        with session_factory() as db:
+            # 批量删除不触发 ORM 钩子
+            db.execute(delete(models.Banner).where(models.Banner.id == 2))
+            db.commit()
+
+        marked, cursor = manifest.sample_reconcile(0, sample_size=1)
+        assert marked == 0 and cursor > 0
+        marked, cursor = manifest.sample_reconcile(cursor, sample_size=1)
+        assert marked == 1 and cursor > 0
+        marked, cursor = manifest.sample_reconcile(cursor, sample_size=1)
+        assert (marked, cursor) == (0, 0)
+
+        orphaned = {r.entity_id for r in _rows(session_factory) if r.orphaned_at}
+        assert orphaned == {"2"}
+
+    def test_non_numeric_ids_survive_reconcile(self, service, session_factory, manifest, monkeypatch):
+        monkeypatch.setattr(manifest_module, "STORAGE_MANIFEST_ORPHAN_GRACE", 0)
+        result = service.upload(_jpeg(), ImageCategory.BANNER, resource_id="S0012")
+        local_file = service.storage.base_dir / result.path
+
+        assert manifest.sample_reconcile(0) == (0, 0)
+        assert manifest.reconcile_orphans(service.storage) == 0
+        assert local_file.exists()
+        (row,) = _rows(session_factory)
+        assert row.entity_id == "S0012" and row.orphaned_at is None
+
+    def test_expired_temp_uploads_removed(self, service, session_factory, manifest):
+        result = service.upload(_jpeg(), ImageCategory.BANNER, user_id="u9", is_temp=True)
+        with session_factory() as db:
+            row = db.execute(select(models.StorageObject)).scalar_one()
+            row.created_at = get_utc_time() - timedelta(days=30)
+            db.commit()
+
+        assert manifest.reconcile_orphans(service.storage) == 1
+        assert not (service.storage.base_dir / result.path).exists()
+        assert _rows(session_factory) == []
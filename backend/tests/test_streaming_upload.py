@@ -0,0 +1,136 @@
+"""
+流式上传管道单元测试
+
+测试覆盖:
+- spool_upload: 复用 UploadFile 底层临时文件 / 分块落盘 / 大小上限
+- ImageProcessor.strip_exif_lossless_stream: 与 bytes 版本结果一致
+- ImageUploadService.upload_stream: 存原图管道 + 缩略图（本地存储后端）
+- S3StorageBackend.upload_fileobj: 走 upload_fileobj（multipart）而不是 put_object
+
+运行方式:
+    pytest tests/test_streaming_upload.py -v
+"""
+
+import io
+import tempfile
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from app.file_stream_utils import spool_upload, MAGIC_HEAD_SIZE
+from app.services.image_processor import ImageProcessor
+from app.services.image_upload_service import ImageUploadService, ImageCategory
+from app.services.storage_backend import LocalStorageBackend, S3StorageBackend
+
+
+def _jpeg_with_exif(size=(800, 600)) -> bytes:
+    img = Image.new("RGB", size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = "TestCamera"  # Make
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", exif=exif.tobytes())
+    return buf.getvalue()
+
+
+class _FakeUpload:
+    """最小 UploadFile 替身：只提供异步 read（不可 seek 的底层流）"""
+
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+        self.filename = "a.jpg"
+        self.content_type = "image/jpeg"
+        self.size = None
+        self.headers = {}
+
+    async def read(self, n: int = -1) -> bytes:
+        return self._buf.read(n)
+
+
+class TestSpoolUpload:
+
+    @pytest.mark.asyncio
+    async def test_reuses_seekable_upload_file(self):
+        raw = tempfile.SpooledTemporaryFile()
+        raw.write(b"\xff\xd8\xff" + b"x" * 100)
+        upload = _FakeUpload(b"")
+        upload.file = raw
+
+        spooled = await spool_upload(upload, max_size=1024)
+        assert spooled.file is raw
+        assert spooled.size == 103
+        assert spooled.head == (b"\xff\xd8\xff" + b"x" * 100)[:MAGIC_HEAD_SIZE]
+
+    @pytest.mark.asyncio
+    async def test_copies_non_seekable_stream_in_chunks(self):
+        data = b"\x89PNG\r\n\x1a\n" + b"y" * 5000
+        with await spool_upload(_FakeUpload(data), max_size=10_000, chunk_size=1000) as spooled:
+            assert spooled.size == len(data)
+            assert spooled.head == data[:MAGIC_HEAD_SIZE]
+            assert spooled.read_bytes() == data
+
+    @pytest.mark.asyncio
+    async def test_rejects_oversized(self):
+        with pytest.raises(HTTPException) as exc:
+            await spool_upload(_FakeUpload(b"z" * 2000), max_size=1000, chunk_size=500)
+        assert exc.value.status_code == 413
+
+
+def test_strip_exif_stream_matches_bytes_version():
+    processor = ImageProcessor()
+    data = _jpeg_with_exif()
+    out = io.BytesIO()
+    processor.strip_exif_lossless_stream(io.BytesIO(data), out)
+
+    assert out.getvalue() == processor.strip_exif_lossless(data)
+    assert b"TestCamera" not in out.getvalue()
+
+
+def test_strip_exif_stream_passes_through_non_jpeg():
+    processor = ImageProcessor()
+    data = b"\x89PNG\r\n\x1a\n" + b"p" * 100
+    out = io.BytesIO()
+    processor.strip_exif_lossless_stream(io.BytesIO(data), out)
+    assert out.getvalue() == data
+
+
+def test_upload_stream_stores_original_and_thumbnails(tmp_path):
+    storage = LocalStorageBackend(base_dir=str(tmp_path), base_url="http://test")
+    service = ImageUploadService(storage=storage, processor=ImageProcessor())
+
+    result = service.upload_stream(
+        io.BytesIO(_jpeg_with_exif()),
+        category=ImageCategory.FLEA_MARKET,
+        resource_id="42",
+        filename="photo.jpg",
+    )
+
+    assert result.success, result.error
+    assert (result.width, result.height) == (800, 600)
+    stored = (tmp_path / result.path).read_bytes()
+    assert stored.startswith(b"\xff\xd8")
+    assert b"TestCamera" not in stored
+    assert set(result.thumbnails) == {"thumb", "medium", "large"}
+
+
+def test_upload_stream_rejects_invalid_content(tmp_path):
+    storage = LocalStorageBackend(base_dir=str(tmp_path), base_url="http://test")
+    service = ImageUploadService(storage=storage, processor=ImageProcessor())
+
+    result = service.upload_stream(io.BytesIO(b"not an image at all"), category=ImageCategory.TASK)
+    assert not result.success
+
+
+def test_s3_upload_fileobj_uses_managed_transfer():
+    backend = S3StorageBackend(bucket_name="bucket", public_url="https://cdn.example.com")
+    backend._client = MagicMock()
+
+    url = backend.upload_fileobj(io.BytesIO(b"\xff\xd8\xff data"), "public/a.jpg")
+
+    assert url == "https://cdn.example.com/public/a.jpg"
+    backend._client.upload_fileobj.assert_called_once()
+    args, kwargs = backend._client.upload_fileobj.call_args
+    assert args[1:] == ("bucket", "public/a.jpg")
+    assert kwargs["ExtraArgs"] == {"ContentType": "image/jpeg", "ACL": "private"}
+    backend._client.put_object.assert_not_called()
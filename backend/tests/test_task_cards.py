@@ -0,0 +1,159 @@
+"""
+推荐用任务卡片缓存（task_cards）单元测试
+
+测试覆盖:
+- 未命中时投影查询并用 pipeline 回填；再次读取只发一次 MGET、不查库
+- 卡片编码 / 解码保留 datetime，Decimal 转为 float
+- Task 的 ORM 更新在 commit 后删除对应卡片；未涉及卡片列的更新不失效
+- commit 后的失效失败（同步执行或线程池执行）只记录日志，不影响 commit
+- 缓存推荐的还原走卡片缓存并跳过已下架任务
+- 多样性筛选按类型上限挑选，不足时按分数补齐且不重复
+
+运行方式:
+    pytest tests/test_task_cards.py -v
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app import event_listeners, models
+from app.services import task_cards as task_cards_module
+from app.services.task_cards import TaskCard, TaskCardCache, card_key, decode_card, encode_card
+from app.task_recommendation import TaskRecommendationEngine
+
+
+_CREATED_AT = datetime(2026, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db(sqlite_sessionmaker):
+    session = sqlite_sessionmaker(models.Task)()
+    for task_id, task_type, location, visible in (
+        (1, "Tutoring", "London", True),
+        (2, "Tutoring", "London", True),
+        (3, "Delivery", "Manchester", True),
+        (4, "Cleaning", "London", False),
+    ):
+        session.add(models.Task(
+            id=task_id, title=f"task {task_id}", description="d", task_type=task_type, location=location,
+            poster_id="u0000001", reward=Decimal("12.50"), base_reward=Decimal("12.50"),
+            currency="GBP", status="open", is_visible=visible, images='["a.jpg"]',
+            deadline=_CREATED_AT + timedelta(days=7), created_at=_CREATED_AT,
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def cache(fake_redis, monkeypatch):
+    cache = TaskCardCache(ttl=60, redis_client=fake_redis)
+    monkeypatch.setattr(task_cards_module, "_task_card_cache", cache)
+    return cache
+
+
+def _count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_get_many_fills_and_then_hits_redis(db, cache, fake_redis):
+    statements = _count_queries(db)
+    cards = cache.get_many(db, [3, 1, 99])
+    assert sorted(cards) == [1, 3]
+    assert len(statements) == 1
+    assert fake_redis.calls == ["mget", "pipeline"]
+    assert set(fake_redis.strings) == {card_key(1), card_key(3)}
+
+    fake_redis.calls.clear()
+    again = cache.get_many(db, [1, 3])
+    assert fake_redis.calls == ["mget"]
+    assert len(statements) == 1
+    assert again == {1: cards[1], 3: cards[3]}
+    assert again[1].reward == 12.5
+    assert cache.stats == {"hits": 2, "misses": 3, "invalidated": 0}
+
+
+def test_card_round_trip_keeps_datetimes():
+    card = TaskCard(
+        7, "t", None, "t-en", "d", None, None, "Tutoring", "London", 10.0, 10.0, None, False, "GBP",
+        _CREATED_AT, "normal", "open", True, "u0000001", _CREATED_AT, '["a.jpg"]',
+    )
+    decoded = decode_card(encode_card(card))
+    assert decoded == card
+    assert decoded.created_at.tzinfo is not None
+    assert decode_card(b"[1, 2]") is None
+
+
+def test_orm_update_invalidates_card_after_commit(db, cache, fake_redis):
+    cache.get_many(db, [1, 2])
+    task = db.get(models.Task, 1)
+    task.title = "renamed"
+    db.flush()
+    assert card_key(1) in fake_redis.strings
+    db.commit()
+    assert card_key(1) not in fake_redis.strings
+    assert card_key(2) in fake_redis.strings
+
+    # 不在卡片里的列变化不失效
+    task = db.get(models.Task, 2)
+    task.view_count = 42
+    db.commit()
+    assert card_key(2) in fake_redis.strings
+    assert cache.get_many(db, [1])[1].title == "renamed"
+
+
+def _fail_invalidation(monkeypatch):
+    def _boom(task_ids):
+        raise RuntimeError("redis down")
+
+    monkeypatch.setattr(event_listeners, "invalidate_task_cards", _boom)
+
+
+def test_after_commit_failure_is_logged(db, monkeypatch, caplog):
+    _fail_invalidation(monkeypatch)
+    db.get(models.Task, 1).title = "renamed"
+    with caplog.at_level(logging.ERROR, logger=event_listeners.__name__):
+        db.commit()
+    assert "redis down" in caplog.text
+
+
+async def test_after_commit_failure_in_executor_is_logged(db, monkeypatch, caplog):
+    _fail_invalidation(monkeypatch)
+    db.get(models.Task, 1).title = "renamed"
+    with caplog.at_level(logging.ERROR, logger=event_listeners.__name__):
+        db.commit()
+        for _ in range(100):
+            if "redis down" in caplog.text:
+                break
+            await asyncio.sleep(0.01)
+    assert "redis down" in caplog.text
+
+
+def test_hydrate_cached_recommendations_uses_cards(db, cache):
+    engine = TaskRecommendationEngine(db)
+    cached = [
+        {"task_id": 3, "score": 0.9, "reason": "r3"},
+        {"task_id": 4, "score": 0.8, "reason": "hidden"},
+        {"task_id": 1, "score": 0.7, "reason": "r1"},
+    ]
+    result = engine._hydrate_cached_recommendations(cached)
+    assert [(item["task"].id, item["score"], item["reason"]) for item in result] == [
+        (3, 0.9, "r3"), (1, 0.7, "r1"),
+    ]
+    assert isinstance(result[0]["task"], TaskCard)
+    assert result[0]["task"].location == "Manchester"
+
+
+def test_diversify_caps_task_type_and_fills_without_duplicates(db, cache):
+    engine = TaskRecommendationEngine(db)
+    scored = [(1, 0.9), (2, 0.8), (3, 0.7), (4, 0.6)]
+    assert engine._diversify_recommendations(scored, limit=2) == [(1, 0.9), (3, 0.7)]
+    # limit=3：同类型最多 1 个、同地点最多 1 个，筛完只剩 2 个，按分数补齐
+    assert engine._diversify_recommendations(scored, limit=3) == [(1, 0.9), (3, 0.7), (2, 0.8)]
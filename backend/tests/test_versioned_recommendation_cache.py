@@ -0,0 +1,189 @@
+"""
+版本化推荐结果缓存（recommendation/cache.py 的 VersionedRecommendationCache）单元测试
+
+测试覆盖:
+- 任务新增 / 关闭时候选池版本递增并写入变更日志，日志按上限裁剪
+- 首次请求完整计算并记录候选池版本和用户向量签名；再次请求直接命中、不跑引擎
+- 候选池变更后只对新增任务打分并合并进缓存的 top-k，关闭的任务直接移出
+- 用户向量版本变化、变更日志有缺口、满列表移除后不足 limit 时才完整重算
+- Task 的 ORM 写入 commit 后记录候选池变更；候选索引关闭时照样记录，只是不同步索引
+
+运行方式:
+    pytest tests/test_versioned_recommendation_cache.py -v
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app import event_listeners, models
+from app.recommendation import HybridEngine, ScorerRegistry
+from app.recommendation import cache as cache_module
+from app.recommendation import candidate_index as candidate_index_module
+from app.recommendation import utils as recommendation_utils
+from app.recommendation.base_scorer import BaseScorer, ScoredTask
+from app.recommendation.cache import (
+    POOL_CHANGES_KEY,
+    POOL_VERSION_KEY,
+    VersionedRecommendationCache,
+    entry_key,
+    record_pool_changes,
+)
+from app.services import task_cards
+
+_NOW = datetime.now(timezone.utc)
+_USER = SimpleNamespace(id="u0000001")
+
+
+class _RewardScorer(BaseScorer):
+    """按报酬打分，便于断言排序"""
+    name = "reward"
+    default_weight = 1.0
+
+    def __init__(self):
+        self.scored = []
+
+    def score(self, user, tasks, context):
+        self.scored.append(sorted(t.id for t in tasks))
+        return {t.id: ScoredTask(score=float(t.reward) / 100, reason=f"reward {int(t.reward)}") for t in tasks}
+
+
+@pytest.fixture
+def db(sqlite_sessionmaker, monkeypatch):
+    session = sqlite_sessionmaker(
+        models.Task,
+        models.TaskHistory,
+        models.UserTaskInteraction,
+        models.UserProfilePreference,
+        models.UserPreferenceVector,
+        expire_on_commit=False,
+    )()
+    monkeypatch.setattr(event_listeners, "record_pool_changes", lambda changed, removed: None)
+    for task_id, reward in ((1, 90), (2, 70), (3, 50)):
+        _add_task(session, task_id, reward)
+    session.commit()
+    yield session
+    session.close()
+
+
+def _add_task(session, task_id, reward, poster_id="u0000009"):
+    session.add(models.Task(
+        id=task_id, title=f"task {task_id}", description="d", task_type="Tutoring", location="London",
+        poster_id=poster_id, reward=Decimal(reward), base_reward=Decimal(reward), status="open",
+        deadline=_NOW + timedelta(days=7), created_at=_NOW - timedelta(hours=task_id),
+    ))
+
+
+@pytest.fixture
+def scorer(monkeypatch):
+    monkeypatch.setattr(candidate_index_module, "CANDIDATE_INDEX_ENABLED", False)
+    monkeypatch.setattr(recommendation_utils, "get_excluded_task_ids", lambda _db, user_id: set())
+    monkeypatch.setattr(task_cards, "TASK_CARD_CACHE_ENABLED", False)
+    return _RewardScorer()
+
+
+@pytest.fixture
+def engine(scorer):
+    registry = ScorerRegistry()
+    registry.register(scorer)
+    return HybridEngine(registry)
+
+
+def _ids(results):
+    return [r["task_id"] for r in results]
+
+
+def test_record_pool_changes_versions_and_trims(fake_redis, monkeypatch):
+    assert record_pool_changes([4, 5], [1], client=fake_redis) == 3
+    assert int(fake_redis.get(POOL_VERSION_KEY)) == 3
+    assert fake_redis.zsets[POOL_CHANGES_KEY] == {"1:+4": 1, "2:+5": 2, "3:-1": 3}
+    assert record_pool_changes([], [], client=fake_redis) is None
+
+    monkeypatch.setattr(cache_module, "POOL_CHANGELOG_SIZE", 2)
+    record_pool_changes([], [2], client=fake_redis)
+    assert fake_redis.zsets[POOL_CHANGES_KEY] == {"3:-1": 3, "4:-2": 4}
+
+
+def test_hit_after_compute_does_not_run_engine(db, fake_redis, engine, scorer):
+    cache = VersionedRecommendationCache(headroom=1, redis_client=fake_redis)
+    context = {"db": db}
+    assert _ids(cache.recommend(engine, _USER, 2, context)) == [1, 2]
+    assert cache.stats["computed"] == 1
+
+    scorer.scored.clear()
+    served = cache.recommend(engine, _USER, 2, {"db": db})
+    assert _ids(served) == [1, 2]
+    assert scorer.scored == []
+    assert cache.stats["hits"] == 1
+    assert served[0]["task"].title == "task 1"
+    assert served[0]["reasons"] == ["reward 90"]
+
+
+def test_pool_changes_patch_cached_top_k(db, fake_redis, engine, scorer):
+    cache = VersionedRecommendationCache(headroom=1, redis_client=fake_redis)
+    cache.recommend(engine, _USER, 2, {"db": db})
+
+    # 新任务 4（报酬 80）发布、任务 1 关闭；自己发布的任务 5 不进入列表
+    _add_task(db, 4, 80)
+    _add_task(db, 5, 99, poster_id=_USER.id)
+    db.get(models.Task, 1).status = "taken"
+    db.commit()
+    record_pool_changes([4, 5], [1], client=fake_redis)
+
+    scorer.scored.clear()
+    assert _ids(cache.recommend(engine, _USER, 2, {"db": db})) == [4, 2]
+    assert scorer.scored == [[4]]
+    assert (cache.stats["patched"], cache.stats["computed"]) == (1, 1)
+
+    entry = cache_module.json.loads(fake_redis.get(entry_key(_USER.id, 2)))
+    assert entry["pool"] == 3
+    assert [item["task_id"] for item in entry["items"]] == [4, 2, 3]
+
+
+def test_user_vector_change_and_changelog_gap_recompute(db, fake_redis, engine, scorer, monkeypatch):
+    cache = VersionedRecommendationCache(headroom=1, redis_client=fake_redis)
+    cache.recommend(engine, _USER, 2, {"db": db})
+
+    db.add(models.UserPreferenceVector(user_id=_USER.id, version=2, data={}, updated_at=_NOW))
+    db.commit()
+    cache.recommend(engine, _USER, 2, {"db": db})
+    assert cache.stats["computed"] == 2
+
+    monkeypatch.setattr(cache_module, "POOL_CHANGELOG_SIZE", 1)
+    record_pool_changes([2, 3], [], client=fake_redis)
+    cache.recommend(engine, _USER, 2, {"db": db})
+    assert (cache.stats["gaps"], cache.stats["computed"]) == (1, 3)
+
+
+def test_full_list_running_short_recomputes(db, fake_redis, engine):
+    cache = VersionedRecommendationCache(headroom=0, redis_client=fake_redis)
+    cache.recommend(engine, _USER, 2, {"db": db})
+
+    # 绕过变更日志关闭任务：读取时按卡片状态过滤；满列表不足 limit 时重新计算
+    db.get(models.Task, 2).is_visible = False
+    db.commit()
+    assert _ids(cache.recommend(engine, _USER, 2, {"db": db})) == [1, 3]
+    assert cache.stats["computed"] == 2
+
+
+def test_task_commits_record_pool_changes(db, monkeypatch):
+    captured = []
+    monkeypatch.setattr(event_listeners, "record_pool_changes", lambda changed, removed: captured.append((changed, removed)))
+    _add_task(db, 4, 10)
+    db.get(models.Task, 3).status = "cancelled"
+    db.commit()
+    assert captured == [([4], [3])]
+
+
+def test_pool_changes_recorded_without_candidate_index(db, monkeypatch):
+    captured, applied = [], []
+    monkeypatch.setattr(event_listeners, "CANDIDATE_INDEX_ENABLED", False)
+    monkeypatch.setattr(event_listeners, "VERSIONED_CACHE_ENABLED", True)
+    monkeypatch.setattr(event_listeners, "apply_task_changes", lambda upserts, removed: applied.append(removed))
+    monkeypatch.setattr(event_listeners, "record_pool_changes", lambda changed, removed: captured.append((changed, removed)))
+    _add_task(db, 4, 10)
+    db.commit()
+    assert captured == [([4], [])]
+    assert applied == []
@@ -0,0 +1,130 @@
+"""
+浏览数增量 overlay（view_counts）单元测试
+
+测试覆盖:
+- 增量写入哈希字段；Redis 不可用返回 None（调用方回退数据库）
+- 一页实体的显示浏览数只发一次 HMGET（同步 / 异步）
+- 落库：批量 UPDATE 后扣除已同步增量，同步期间的新增浏览保留
+- 落库时清空旧的逐实体键
+- 论坛帖子批量显示浏览数走 overlay
+
+运行方式:
+    pytest tests/test_view_counts.py -v
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app import forum_routes, models
+from app import models_ai_qa  # noqa: F401 — forum_posts.ai_question_id 外键目标
+from app.services import view_counts as view_counts_module
+from app.services.view_counts import ViewCountOverlay, hash_key
+
+
+def _settle(redis, keys, args):
+    """对应 _SETTLE_SCRIPT：逐字段扣减，归零删除"""
+    for field, count in zip(args[::2], args[1::2]):
+        if redis.hincrby(keys[0], field, -int(count)) <= 0:
+            redis.hdel(keys[0], field)
+    return 1
+
+
+class _NoRedis:
+    def client(self):
+        return None
+
+
+@pytest.fixture
+def overlay(fake_redis):
+    fake_redis.eval_handler = _settle
+    return ViewCountOverlay(redis_client=fake_redis, async_cache=fake_redis.as_async())
+
+
+@pytest.fixture
+def db(sqlite_sessionmaker):
+    session = sqlite_sessionmaker(models.ForumPost, models.ForumAuthorDailyStat)()
+    for post_id, views in ((1, 10), (2, 0), (3, 5)):
+        session.add(models.ForumPost(
+            id=post_id, title="t", content="c", admin_author_id="A0001", view_count=views
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def _views(db):
+    db.expire_all()
+    return {p.id: p.view_count for p in db.query(models.ForumPost).order_by(models.ForumPost.id)}
+
+
+class TestIncrement:
+    @pytest.mark.asyncio
+    async def test_incr_writes_hash_field(self, overlay, fake_redis):
+        assert overlay.incr("flea_market", 7) == 1
+        assert await overlay.aincr("flea_market", 7) == 2
+        assert fake_redis.hashes == {hash_key("flea_market"): {"7": b"2"}}
+
+    @pytest.mark.asyncio
+    async def test_redis_unavailable_returns_none(self):
+        overlay = ViewCountOverlay(redis_client=None, async_cache=_NoRedis())
+        overlay._redis = lambda: None
+        assert overlay.incr("task", 1) is None
+        assert await overlay.aincr("task", 1) is None
+        assert await overlay.apending_many("task", [1]) == {}
+
+    def test_unknown_entity(self, overlay):
+        with pytest.raises(ValueError):
+            overlay.incr("unknown", 1)
+
+
+class TestOverlay:
+    @pytest.mark.asyncio
+    async def test_single_hmget_per_page(self, overlay, fake_redis):
+        overlay.incr("service", 1)
+        overlay.incr("service", 1)
+        overlay.incr("service", 3)
+        items = [SimpleNamespace(id=i, view_count=v) for i, v in ((1, 10), (2, None), (3, 5))]
+        fake_redis.calls.clear()
+
+        assert await overlay.overlay("service", items) == {1: 12, 2: 0, 3: 6}
+        assert overlay.display_counts("service", items) == {1: 12, 2: 0, 3: 6}
+        assert fake_redis.calls == ["hmget", "hmget"]
+
+    @pytest.mark.asyncio
+    async def test_forum_batch_helper_uses_overlay(self, overlay, monkeypatch):
+        monkeypatch.setattr(view_counts_module, "_view_count_overlay", overlay)
+        overlay.incr("forum_post", 2)
+        posts = [SimpleNamespace(id=1, view_count=4), SimpleNamespace(id=2, view_count=4)]
+        assert await forum_routes._batch_get_post_display_view_counts(posts) == {1: 4, 2: 5}
+        assert await forum_routes.get_post_display_view_count(2, 4) == 5
+
+
+class TestFlush:
+    def test_flush_applies_and_settles(self, overlay, fake_redis, db):
+        for post_id in (1, 1, 2):
+            overlay.incr("forum_post", post_id)
+        synced = []
+
+        def on_synced(ids):
+            synced.extend(ids)
+            # 落库与扣减之间的新浏览不能丢
+            overlay.incr("forum_post", 2)
+
+        assert overlay.flush("forum_post", db, on_synced=on_synced) == 2
+        assert _views(db) == {1: 12, 2: 1, 3: 5}
+        assert sorted(synced) == [1, 2]
+        assert fake_redis.hashes[hash_key("forum_post")] == {"2": b"1"}
+
+        assert overlay.flush("forum_post", db) == 1
+        assert _views(db) == {1: 12, 2: 2, 3: 5}
+        assert hash_key("forum_post") not in fake_redis.hashes
+
+    def test_flush_drains_legacy_keys(self, overlay, fake_redis, db):
+        fake_redis.set("forum:post:view_count:3", 4)
+        overlay.incr("forum_post", 3)
+
+        assert overlay.flush("forum_post", db) == 1
+        assert _views(db)[3] == 10
+        assert fake_redis.strings == {}
+        assert overlay.flush("forum_post", db) == 0